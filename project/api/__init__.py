@@ -1,3 +1,13 @@
+import time
+
+# Reference point for cold-start timing (see track_cold_start)
+BOOT_STARTED = time.perf_counter()
+
+import importlib
+import logging
+import threading
+
+import click
 from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
@@ -9,59 +19,150 @@ import inspect
 db = SQLAlchemy()
 bcrypt = Bcrypt()
 login_manager = LoginManager()
+logger = logging.getLogger(__name__)
+
+# (module, blueprint attribute, url prefix); None keeps the blueprint's own routes
+BLUEPRINTS = [
+    ('.auth', 'auth_bp', '/api/auth'),
+    ('.products', 'products_bp', '/api'),
+    ('.orders', 'orders_bp', '/api'),
+    ('.payments', 'payments_bp', '/api'),
+    ('.inquiries', 'inquiries_bp', '/api/inquiries'),
+    ('.cart', 'cart_bp', None),
+    ('.catalog', 'catalog_bp', '/api'),
+    ('.search', 'search_bp', '/api'),
+    ('.admin', 'admin_bp', '/api/admin'),
+]
 
 def create_app(config_class=None):
+    started = time.perf_counter()
     app = Flask(__name__)
-    # Directly use the Config class from config.py, ignoring any server-passed config
-    app.config.from_object(Config)
+    # Use the Config class from config.py unless a config class is passed explicitly (e.g. tests)
+    app.config.from_object(config_class if isinstance(config_class, type) else Config)
+
+    from .logging_setup import configure_logging
+    configure_logging(app)
 
     db.init_app(app)
     bcrypt.init_app(app)
+    from .passwords import password_hasher
+    password_hasher.init_app(app)
     login_manager.init_app(app)
-    
+
+    from .gateway_http import gateway_http
+    gateway_http.init_app(app)
+    from .metrics import metrics
+    metrics.init_app(app)
+
     # Allow all origins from the specific frontend URL for simplicity and robustness.
     CORS(app, supports_credentials=True, origins=[
-        "https://mandi2mandi.com", 
-        "https://mandi2mandi.vercel.app", 
-        "https://mandi2mandi-1-0-0.web.app", 
+        "https://mandi2mandi.com",
+        "https://mandi2mandi.vercel.app",
+        "https://mandi2mandi-1-0-0.web.app",
         "https://6000-firebase-studio-1750850256213.cluster-fdkw7vjj7bgguspe3fbbc25tra.cloudworkstations.dev"
     ])
 
     from .models import User, Product, Image, Order, Cart, CartItem, Inquiry, ChatMessage
-    
-    with app.app_context():
-        # ✅ FIXED: Only create tables if they don't exist
-        # DO NOT drop tables - this preserves all your data including admin users!
+
+    fast_boot = app.config.get('FAST_BOOT', False)
+    if not fast_boot:
+        with app.app_context():
+            # Default startup: create any missing tables before serving.
+            # DO NOT drop tables - this preserves all your data including admin users!
+            db.create_all()
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create any missing tables (schema work is not done at startup in fast-boot mode)"""
         db.create_all()
+        click.echo("✅ Database tables created (existing tables left untouched)")
 
+    from .ipn_queue import ipn_worker_command
+    app.cli.add_command(ipn_worker_command)
+    from .catalog_snapshot import build_catalog_snapshot_command
+    app.cli.add_command(build_catalog_snapshot_command)
+    from .contact_detection import scan_chat_contacts_command
+    app.cli.add_command(scan_chat_contacts_command)
 
     @app.route('/')
     def index():
         return jsonify({"status": "Backend is running"})
 
-    from .auth import auth_bp
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    if not fast_boot:
+        register_blueprints(app)
+
+    # Session user from the per-id cache (api/user_cache.py) instead of a query per request
+    from .user_cache import init_user_cache, load_user
+    init_user_cache(app)
+    login_manager.user_loader(load_user)
+
+    # Blueprints (and the payment crypto they pull in) load on the first request in fast-boot mode
+    track_cold_start(app, started, defer_blueprints=fast_boot)
+
+    return app
+
+
+def register_blueprints(app):
+    """Import and register every API blueprint (once per app)"""
+    if app.extensions.get('blueprints_registered'):
+        return
+    for module_name, attribute, url_prefix in BLUEPRINTS:
+        module = importlib.import_module(module_name, __name__)
+        app.register_blueprint(getattr(module, attribute), url_prefix=url_prefix)
+    app.extensions['blueprints_registered'] = True
+
+
+def track_cold_start(app, started, defer_blueprints=False):
+    """
+    Wrap the WSGI app to time the first request and, if deferred, register
+    the blueprints just before it is routed
 
-    from .products import products_bp
-    app.register_blueprint(products_bp, url_prefix='/api')
+    Timings (ms) are kept in app.extensions['cold_start']:
+        import_to_ready      package import -> create_app returned
+        create_app           time spent inside create_app
+        first_request        handling time of the first request (incl. lazy imports)
+        import_to_first_response  package import -> first response ready
+    """
+    ready = time.perf_counter()
+    stats = {
+        'fast_boot': defer_blueprints,
+        'import_to_ready_ms': round((ready - BOOT_STARTED) * 1000, 1),
+        'create_app_ms': round((ready - started) * 1000, 1),
+        'first_request_ms': None,
+        'import_to_first_response_ms': None,
+        'first_request_path': None,
+    }
+    app.extensions['cold_start'] = stats
 
-    from .orders import orders_bp
-    app.register_blueprint(orders_bp, url_prefix='/api')
+    wsgi_app = app.wsgi_app
+    lock = threading.Lock()
+    pending = [True]
 
-    from .payments import payments_bp
-    app.register_blueprint(payments_bp, url_prefix='/api')
+    def cold_start_wsgi_app(environ, start_response):
+        if not pending[0]:
+            return wsgi_app(environ, start_response)
 
-    from .inquiries import inquiries_bp
-    app.register_blueprint(inquiries_bp, url_prefix='/api/inquiries')
+        request_started = time.perf_counter()
+        with lock:
+            # Concurrent first requests wait here until the routes exist
+            if defer_blueprints:
+                register_blueprints(app)
+            first = pending[0]
+            pending[0] = False
 
-    from .cart import cart_bp
-    app.register_blueprint(cart_bp)
+        response = wsgi_app(environ, start_response)
+        if not first:
+            return response
 
-    from .admin import admin_bp
-    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+        finished = time.perf_counter()
+        stats['first_request_ms'] = round((finished - request_started) * 1000, 1)
+        stats['import_to_first_response_ms'] = round((finished - BOOT_STARTED) * 1000, 1)
+        stats['first_request_path'] = environ.get('PATH_INFO')
 
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+        logger.info('Cold start: app ready in %s ms (create_app %s ms), first request %s served %s ms '
+                    'after import (%s ms handling, fast_boot=%s)',
+                    stats['import_to_ready_ms'], stats['create_app_ms'], stats['first_request_path'],
+                    stats['import_to_first_response_ms'], stats['first_request_ms'], defer_blueprints)
+        return response
 
-    return app
\ No newline at end of file
+    app.wsgi_app = cold_start_wsgi_app
@@ -1,13 +1,24 @@
 from functools import wraps
-from flask import Blueprint, jsonify, request, Response
+from flask import Blueprint, jsonify, request, Response, stream_with_context, current_app
 from flask_login import login_required, current_user
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from .models import Order, Product, User
 from . import db
+from .cache import TTLCache
+import base64
+import binascii
 import csv
-import io
+import datetime
 
 admin_bp = Blueprint('admin', __name__)
 
+ORDERS_PAGE_SIZE = 50
+ORDERS_MAX_PAGE_SIZE = 200
+
+# Totals for /orders/count keyed by filter set; cleared when an order's status changes
+order_count_cache = TTLCache(ttl=30, maxsize=1000)
+
 # Decorator to check for admin role
 def admin_required(f):
     @wraps(f)
@@ -21,62 +32,176 @@ def admin_required(f):
 @admin_bp.route('/orders', methods=['GET'])
 @admin_required
 def get_all_orders():
-    """Admin endpoint to view all orders with filtering."""
-    status_filter = request.args.get('status')
-    
-    query = Order.query
-    
-    if status_filter:
-        query = query.filter(Order.status == status_filter)
-        
-    orders = query.order_by(Order.ordered_on.desc()).all()
-    return jsonify([order.to_json(with_buyer=True) for order in orders])
+    """
+    Admin endpoint to view orders, newest first, one keyset page at a time.
+    Filters: status, start_date, end_date, payment_option, buyer_id, buyer_email
+    Paging: ?limit=50 (max 200) and ?cursor=<nextCursor from the previous page>
+    """
+    try:
+        filters = order_filter_args()
+        limit = min(max(int(request.args.get('limit', ORDERS_PAGE_SIZE)), 1), ORDERS_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        position = decode_order_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "Invalid filter, limit or cursor"}), 400
+
+    query = filter_orders(Order.query.options(joinedload(Order.buyer)), filters)
+    if position:
+        # Seek past the last row of the previous page instead of OFFSET-scanning
+        query = query.filter(tuple_(Order.ordered_on, Order.id) < position)
+
+    # One extra row tells us whether another page exists
+    orders = query.order_by(Order.ordered_on.desc(), Order.id.desc()).limit(limit + 1).all()
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+
+    return jsonify({
+        'orders': [order.to_json(with_buyer=True) for order in orders],
+        'nextCursor': encode_order_cursor(orders[-1]) if has_more else None,
+        'limit': limit,
+    })
+
+@admin_bp.route('/orders/count', methods=['GET'])
+@admin_required
+def get_orders_count():
+    """Admin endpoint for the total number of orders matching the list filters (cached briefly)."""
+    try:
+        filters = order_filter_args()
+    except ValueError:
+        return jsonify({"error": "Invalid filter"}), 400
+
+    key = tuple(sorted(filters.items()))
+    total = order_count_cache.get(key)
+    if total is None:
+        total = filter_orders(db.session.query(func.count(Order.id)), filters).scalar()
+        order_count_cache.set(key, total, ttl=current_app.config.get('ADMIN_ORDER_COUNT_CACHE_TTL', 30))
+
+    return jsonify({'total': total})
+
+CSV_HEADER = [
+    'Order ID', 'Date', 'Buyer Name', 'Buyer Email', 'Product Name',
+    'Quantity', 'Unit', 'Total Price', 'Amount Paid', 'Payment Option',
+    'Transaction ID', 'Status', 'Address Line 1', 'Address Line 2',
+    'City', 'State', 'Pincode'
+]
+CSV_BATCH_SIZE = 1000  # Rows fetched per server-side cursor batch and per yielded chunk
+
+
+def parse_date_arg(name, end_of_day=False):
+    """
+    Parse a YYYY-MM-DD query arg into a datetime
+    end_of_day returns the start of the next day so the filter can be exclusive
+    Raises ValueError on a malformed date
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.datetime.strptime(value, '%Y-%m-%d')
+    if end_of_day:
+        parsed += datetime.timedelta(days=1)
+    return parsed
+
+
+def order_filter_args():
+    """
+    Read the order filters shared by admin order endpoints:
+    status, start_date/end_date (YYYY-MM-DD, inclusive), payment_option, buyer_id, buyer_email
+    Raises ValueError on a malformed date or buyer_id
+    """
+    buyer_id = request.args.get('buyer_id')
+    return {
+        'status': request.args.get('status') or None,
+        'start_date': parse_date_arg('start_date'),
+        'end_date': parse_date_arg('end_date', end_of_day=True),
+        'payment_option': request.args.get('payment_option') or None,
+        'buyer_id': int(buyer_id) if buyer_id else None,
+        'buyer_email': request.args.get('buyer_email') or None,
+    }
+
+
+def filter_orders(query, filters=None):
+    """Apply order_filter_args() to an Order query"""
+    if filters is None:
+        filters = order_filter_args()
+
+    if filters['status']:
+        query = query.filter(Order.status == filters['status'])
+    if filters['start_date']:
+        query = query.filter(Order.ordered_on >= filters['start_date'])
+    if filters['end_date']:
+        query = query.filter(Order.ordered_on < filters['end_date'])
+    if filters['payment_option']:
+        query = query.filter(Order.payment_option == filters['payment_option'])
+    if filters['buyer_id']:
+        query = query.filter(Order.user_id == filters['buyer_id'])
+    if filters['buyer_email']:
+        query = query.filter(Order.user_id.in_(
+            db.session.query(User.id).filter(User.email == filters['buyer_email'])
+        ))
+    return query
+
+
+def encode_order_cursor(order):
+    """Opaque keyset cursor for the (ordered_on, id) position of an order"""
+    raw = f"{order.ordered_on.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_order_cursor(cursor):
+    """Inverse of encode_order_cursor; raises ValueError on a malformed cursor"""
+    try:
+        ordered_on, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.datetime.fromisoformat(ordered_on), int(order_id)
+    except (UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(str(e))
+
+
+class _CSVLine:
+    """File-like sink that hands back what csv.writer writes instead of storing it"""
+    def write(self, value):
+        return value
+
 
 @admin_bp.route('/orders/download', methods=['GET'])
 @admin_required
 def download_orders_csv():
-    """Admin endpoint to download all orders as a CSV file."""
-    orders = Order.query.order_by(Order.ordered_on.desc()).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    header = [
-        'Order ID', 'Date', 'Buyer Name', 'Buyer Email', 'Product Name', 
-        'Quantity', 'Unit', 'Total Price', 'Amount Paid', 'Payment Option',
-        'Transaction ID', 'Status', 'Address Line 1', 'Address Line 2',
-        'City', 'State', 'Pincode'
-    ]
-    writer.writerow(header)
-    
-    # Write data
-    for order in orders:
-        row = [
-            f"ORD{order.id:06d}",
-            order.ordered_on.strftime('%Y-%m-%d %H:%M:%S'),
-            order.buyer.name,
-            order.buyer.email,
-            order.product_name,
-            order.quantity,
-            order.unit,
-            order.total_price,
-            order.amount_paid,
-            order.payment_option,
-            order.utr_code,
-            order.status,
-            order.address_line_1,
-            order.address_line_2,
-            order.city,
-            order.state,
-            order.pincode
-        ]
-        writer.writerow(row)
-        
-    output.seek(0)
-    
+    """
+    Admin endpoint to download orders as a streamed CSV file.
+    Optional filters: ?status=Booked&start_date=2025-01-01&end_date=2025-01-31
+    """
+    try:
+        query = filter_orders(
+            db.session.query(
+                Order.id, Order.ordered_on, User.name, User.email, Order.product_name,
+                Order.quantity, Order.unit, Order.total_price, Order.amount_paid,
+                Order.payment_option, Order.utr_code, Order.status, Order.address_line_1,
+                Order.address_line_2, Order.city, Order.state, Order.pincode
+            ).join(User, User.id == Order.user_id)
+        )
+    except ValueError:
+        return jsonify({"error": "Dates must be in YYYY-MM-DD format"}), 400
+
+    # Plain column tuples (no ORM objects), fetched in batches through a server-side cursor
+    rows = query.order_by(Order.ordered_on.desc()).execution_options(yield_per=CSV_BATCH_SIZE)
+
+    def generate():
+        writer = csv.writer(_CSVLine())
+        yield writer.writerow(CSV_HEADER)
+
+        chunk = []
+        for row in rows:
+            chunk.append(writer.writerow((
+                f"ORD{row[0]:06d}",
+                row[1].strftime('%Y-%m-%d %H:%M:%S'),
+            ) + tuple(row[2:])))
+            if len(chunk) >= CSV_BATCH_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
     return Response(
-        output,
+        stream_with_context(generate()),
         mimetype="text/csv",
         headers={"Content-Disposition": "attachment;filename=mandi2mandi_orders.csv"}
     )
@@ -97,6 +222,7 @@ def update_order_status(order_id):
         
     order.status = new_status
     db.session.commit()
+    order_count_cache.clear()
     
     return jsonify({"message": f"Order {order_id} status updated to {new_status}"}), 200
 
@@ -104,7 +230,11 @@ def update_order_status(order_id):
 @admin_required
 def get_pending_products():
     """Admin endpoint to get all products with 'Pending' status."""
-    pending_products = Product.query.filter_by(status='Pending').order_by(Product.created_on.desc()).all()
+    # Seller joined in and images fetched by id (SELECT ... IN, 500 listings per query), never one per product
+    pending_products = Product.query.options(
+        joinedload(Product.user),
+        selectinload(Product.images)
+    ).filter_by(status='Pending').order_by(Product.created_on.desc()).all()
     return jsonify([product.to_json(with_seller=True) for product in pending_products])
 
 @admin_bp.route('/products/<int:product_id>/status', methods=['PUT'])
@@ -123,5 +253,88 @@ def update_product_status(product_id):
         
     product.status = new_status
     db.session.commit()
-    
+
+    from .search import index_listing_status
+    index_listing_status(product)
+
     return jsonify({"message": f"Product {product_id} status updated to {new_status}"}), 200
+
+
+@admin_bp.route('/airpay/token-cache', methods=['GET'])
+@admin_required
+def get_airpay_token_cache_stats():
+    """Admin endpoint to inspect Airpay OAuth2 token cache hit/miss/refresh counters."""
+    from .airpay_utils import airpay_token_cache
+    return jsonify(airpay_token_cache.stats()), 200
+
+
+@admin_bp.route('/user-cache', methods=['GET'])
+@admin_required
+def get_user_cache_stats():
+    """Admin endpoint for the session user cache of this worker: hits, misses, hit rate, invalidations."""
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(dict(cache.stats(), enabled=True)), 200
+
+
+@admin_bp.route('/chat-events', methods=['GET'])
+@admin_required
+def get_chat_event_stats():
+    """Admin endpoint for chat long-polling in this worker: waiters, wakeups and polls saved."""
+    from .chat_events import get_chat_broker
+    return jsonify(get_chat_broker().stats_dict()), 200
+
+
+@admin_bp.route('/ipn-queue', methods=['GET'])
+@admin_required
+def get_ipn_queue_stats():
+    """Admin endpoint for the IPN queue: backlog, lag of the oldest notification, dead letters."""
+    from .ipn_queue import backlog_stats
+    return jsonify(backlog_stats()), 200
+
+
+@admin_bp.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """Admin endpoint: request, SQL, gateway and crypto metrics of this worker in the Prometheus text format."""
+    from .metrics import prometheus_text
+    return Response(prometheus_text(current_app), mimetype='text/plain; version=0.0.4')
+
+
+@admin_bp.route('/metrics/profile', methods=['GET', 'POST', 'DELETE'])
+@admin_required
+def request_profile():
+    """
+    Admin endpoint for the sampling profiler (PROFILER_ENABLED, this worker only)
+    POST {"thresholdMs": 500, "endpoint": "/api/cart"} arms it for the next
+    request at least that slow (endpoint optional), DELETE disarms it and GET
+    shows the state and the last capture.
+    """
+    from .metrics import metrics
+    profiler = metrics.profiler
+    if request.method == 'POST':
+        if not profiler.enabled:
+            return jsonify({"error": "Profiler is disabled (set PROFILER_ENABLED)"}), 400
+        data = request.get_json(silent=True) or {}
+        try:
+            threshold_ms = float(data.get('thresholdMs', 500))
+        except (TypeError, ValueError):
+            return jsonify({"error": "thresholdMs must be a number"}), 400
+        profiler.arm(threshold_ms, data.get('endpoint') or None)
+    elif request.method == 'DELETE':
+        profiler.disarm()
+    return jsonify(profiler.status()), 200
+
+
+@admin_bp.route('/metrics/profile/folded', methods=['GET'])
+@admin_required
+def download_request_profile():
+    """Admin endpoint: the last captured profile as collapsed stacks (flamegraph.pl, speedscope)."""
+    from .metrics import metrics
+    capture = metrics.profiler.capture
+    if capture is None:
+        return jsonify({"error": "No profile captured yet"}), 404
+    return Response(capture['folded'] + '\n', mimetype='text/plain', headers={
+        'Content-Disposition': 'attachment; filename=request-profile.folded',
+    })
@@ -6,70 +6,96 @@ Uses AES encryption, OAuth2 authentication, and checksum verification
 import hashlib
 import zlib
 import json
+import logging
 import base64
-import requests
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Optional, Any
+from functools import lru_cache
+from typing import Dict, Optional, Any, Callable, Tuple
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
+from .gateway_http import gateway_http
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# Backend domain registered with Airpay, base64-encoded as 'mer_dom' (see build_payment_request)
+MERCHANT_DOMAIN = base64.b64encode(b'https://www.mandi.ramhotravels.com').decode('utf-8')
 
 
 class AirpayV4Functions:
     """
     Airpay V4 API encryption and checksum utilities
     Based on official Airpay Python SDK v4
+
+    An instance is bound to one credential set: the AES key, privatekey and
+    checksum suffix derive only from static config, so they are computed once
+    in __init__ instead of on every request. Instances hold no mutable state
+    and are shared between threads; use airpay_functions() to get the cached
+    one for a credential set.
     """
+    # Fixed IV for Airpay (as per their SDK)
+    IV = 'c0f9e2d16031b0ce'
 
-    @staticmethod
-    def encrypt_string(my_string: str, username: str, password: str) -> str:
+    def __init__(self, merchant_id: str = '', username: str = '', password: str = '', secret_key: str = ''):
+        """
+        Args:
+            merchant_id: Airpay merchant ID
+            username: Airpay username
+            password: Airpay password
+            secret_key: Airpay secret key (only needed for privatekey)
+        """
+        self.credentials = (merchant_id, username, password, secret_key)
+        self.merchant_id = merchant_id
+        self.username = username
+
+        # Secret key from username and password (md5 hex digest used as a 32-byte AES key)
+        self._aes_key = hashlib.md5(f"{username}~:~{password}".encode()).hexdigest().encode()
+        self._iv = self.IV.encode()
+
+        # Step 5 of the payment request: privatekey = sha256(secret_key@username:|:password)
+        self.privatekey = hashlib.sha256(f"{secret_key}@{username}:|:{password}".encode()).hexdigest()
+
+        # Static tail of the callback CRC string ({...}:{message}:{merchant_id}:{username})
+        self._crc_suffix = f":{merchant_id}:{username}".encode('utf-8')
+
+    @metrics.time_crypto('airpay_encrypt')
+    def encrypt_string(self, my_string: str) -> str:
         """
         Encrypt data using AES-CBC encryption for Airpay V4 API
 
         Args:
             my_string: JSON string to encrypt
-            username: Airpay username
-            password: Airpay password
 
         Returns:
             IV + base64 encoded encrypted data
         """
-        # Generate secret key from username and password
-        secret_key = hashlib.md5(f"{username}~:~{password}".encode()).hexdigest()
-
-        # Fixed IV for Airpay (as per their SDK)
-        iv = 'c0f9e2d16031b0ce'
-
         # Pad the request data and encrypt using AES-CBC
-        cipher = AES.new(secret_key.encode(), AES.MODE_CBC, iv.encode())
+        cipher = AES.new(self._aes_key, AES.MODE_CBC, self._iv)
         encrypted_data = cipher.encrypt(pad(my_string.encode(), AES.block_size))
 
         # Combine IV and encrypted data, then base64 encode
-        data = iv + base64.b64encode(encrypted_data).decode()
-
-        return data
+        return self.IV + base64.b64encode(encrypted_data).decode()
 
-    @staticmethod
-    def decrypt_string(encrypted_data: str, username: str, password: str) -> str:
+    @metrics.time_crypto('airpay_decrypt')
+    def decrypt_string(self, encrypted_data: str) -> str:
         """
         Decrypt response from Airpay V4 API
 
         Args:
             encrypted_data: Encrypted response from Airpay (IV + encrypted data)
-            username: Airpay username
-            password: Airpay password
 
         Returns:
             Decrypted JSON string
         """
-        # Generate secret key from username and password
-        secret_key = hashlib.md5(f"{username}~:~{password}".encode()).hexdigest()
-
         # Extract IV (first 16 chars) and encrypted data
         iv = encrypted_data[:16]
         encrypted_data = encrypted_data[16:]
 
         # Decrypt the data using AES-CBC
-        cipher = AES.new(secret_key.encode(), AES.MODE_CBC, iv.encode())
+        cipher = AES.new(self._aes_key, AES.MODE_CBC, iv.encode())
         decrypted_data = cipher.decrypt(base64.b64decode(encrypted_data))
 
         # Remove padding from the decrypted data
@@ -97,31 +123,12 @@ class AirpayV4Functions:
         # Calculate SHA256 hash
         return hashlib.sha256(data_with_date.encode()).hexdigest()
 
-    @staticmethod
-    def encrypt_sha(data: str, salt: str) -> str:
-        """
-        Encrypt data using SHA256 (for privatekey generation)
-
-        Args:
-            data: Data to encrypt (username:|:password)
-            salt: Secret key
-
-        Returns:
-            SHA256 hash
-        """
-        key = salt + '@' + data
-        return hashlib.sha256(key.encode()).hexdigest()
-
-    @staticmethod
-    def verify_response_checksum(response_data: Dict[str, str], merchant_id: str,
-                                  username: str) -> tuple[bool, str]:
+    def verify_response_checksum(self, response_data: Dict[str, str]) -> tuple[bool, str]:
         """
         Verify Airpay callback response using CRC32 checksum
 
         Args:
             response_data: Response data from Airpay
-            merchant_id: Airpay merchant ID
-            username: Airpay username
 
         Returns:
             Tuple of (is_valid, merchant_secure_hash)
@@ -135,16 +142,15 @@ class AirpayV4Functions:
         chmod = str(response_data.get('chmod', response_data.get('CHMOD', ''))).strip()
         customer_vpa = str(response_data.get('CUSTOMERVPA', '')).strip()
 
-        # Build CRC data string
-        crc_data = f"{transaction_id}:{ap_transaction_id}:{amount}:{transaction_status}:{message}:{merchant_id}:{username}"
+        # CRC data string: transaction fields, then the static merchant_id:username suffix
+        crc_data = f"{transaction_id}:{ap_transaction_id}:{amount}:{transaction_status}:{message}"
+        mer_sec_hash = zlib.crc32(self._crc_suffix, zlib.crc32(crc_data.encode('utf-8')))
 
         # Add UPI VPA if payment method is UPI
         if chmod.lower() == 'upi' and customer_vpa:
-            crc_data += f":{customer_vpa}"
+            mer_sec_hash = zlib.crc32(f":{customer_vpa}".encode('utf-8'), mer_sec_hash)
 
-        # Calculate CRC32 checksum
-        mer_sec_hash = zlib.crc32(crc_data.encode('utf-8')) & 0xffffffff
-        merchant_secure_hash = "%u" % mer_sec_hash
+        merchant_secure_hash = "%u" % (mer_sec_hash & 0xffffffff)
 
         # Verify against Airpay's hash
         is_valid = ap_secure_hash == merchant_secure_hash
@@ -152,10 +158,20 @@ class AirpayV4Functions:
         return is_valid, merchant_secure_hash
 
 
-def get_oauth2_token(merchant_id: str, username: str, password: str,
-                     client_id: str, client_secret: str) -> Optional[str]:
+@lru_cache(maxsize=8)
+def airpay_functions(merchant_id: str, username: str, password: str,
+                     secret_key: str = '') -> AirpayV4Functions:
+    """
+    Shared AirpayV4Functions for a credential set
+    Key material is derived on first use and reused by every later request
     """
-    Get OAuth2 access token from Airpay V4 API
+    return AirpayV4Functions(merchant_id, username, password, secret_key)
+
+
+def fetch_oauth2_token(merchant_id: str, username: str, password: str,
+                       client_id: str, client_secret: str) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Request a fresh OAuth2 access token from Airpay V4 API
 
     Args:
         merchant_id: Airpay merchant ID
@@ -165,7 +181,7 @@ def get_oauth2_token(merchant_id: str, username: str, password: str,
         client_secret: OAuth2 client secret
 
     Returns:
-        Access token string or None if error
+        Tuple of (access_token, expires_in seconds); (None, None) if error
     """
     token_url = 'https://kraken.airpay.co.in/airpay/pay/v4/api/oauth2/'
 
@@ -180,8 +196,8 @@ def get_oauth2_token(merchant_id: str, username: str, password: str,
     request_string = json.dumps(request)
 
     # Encrypt request
-    functions = AirpayV4Functions()
-    encdata = functions.encrypt_string(request_string, username, password)
+    functions = airpay_functions(merchant_id, username, password)
+    encdata = functions.encrypt_string(request_string)
 
     # Calculate checksum
     checksum = functions.checksum_cal(request)
@@ -194,30 +210,213 @@ def get_oauth2_token(merchant_id: str, username: str, password: str,
     }
 
     try:
-        # Send POST request
-        response = requests.post(token_url, data=req, timeout=30)
+        # Send POST request over the pooled keep-alive session
+        response = gateway_http.post('airpay', token_url, data=req)
         response_json = response.json()
 
         # Decrypt response
-        decrypt_data = functions.decrypt_string(response_json['response'], username, password)
+        decrypt_data = functions.decrypt_string(response_json['response'])
         token_response = json.loads(decrypt_data)
 
         # Check for errors
         if 'success' in token_response and not token_response['success']:
-            print(f"[AIRPAY ERROR] Token request failed: {token_response.get('msg', 'Unknown error')}")
-            return None
+            logger.error('Airpay token request failed: %s', token_response.get('msg', 'Unknown error'))
+            return None, None
 
         # Extract access token
-        access_token = token_response.get('data', {}).get('access_token')
+        token_data = token_response.get('data', {})
+        access_token = token_data.get('access_token')
         if not access_token:
-            print("[AIRPAY ERROR] No access token in response")
-            return None
+            logger.error('No access token in the Airpay token response')
+            return None, None
+
+        try:
+            expires_in = int(token_data.get('expires_in'))
+        except (TypeError, ValueError):
+            expires_in = None
 
-        return access_token
+        return access_token, expires_in
 
     except Exception as e:
-        print(f"[AIRPAY ERROR] Exception getting OAuth2 token: {str(e)}")
-        return None
+        logger.exception('Airpay OAuth2 token request failed')
+        return None, None
+
+
+def get_oauth2_token(merchant_id: str, username: str, password: str,
+                     client_id: str, client_secret: str) -> Optional[str]:
+    """
+    Get OAuth2 access token from Airpay V4 API (uncached)
+
+    Args:
+        merchant_id: Airpay merchant ID
+        username: Airpay username
+        password: Airpay password
+        client_id: OAuth2 client ID
+        client_secret: OAuth2 client secret
+
+    Returns:
+        Access token string or None if error
+    """
+    access_token, _ = fetch_oauth2_token(merchant_id, username, password, client_id, client_secret)
+    return access_token
+
+
+class _TokenEntry:
+    """Cached token plus the monotonic deadlines that govern it"""
+    __slots__ = ('token', 'expires_at', 'refresh_at', 'refreshing')
+
+    def __init__(self, token: str, expires_at: float, refresh_at: float):
+        self.token = token
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+        self.refreshing = False
+
+
+class _InFlight:
+    """A token request other callers can wait on instead of issuing their own"""
+    __slots__ = ('event', 'token')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.token = None
+
+
+class AirpayTokenCache:
+    """
+    Process-wide cache of Airpay OAuth2 tokens keyed by (merchant_id, client_id)
+
+    - Tokens are reused until their expiry (from 'expires_in', else DEFAULT_TTL)
+    - Once a token enters its refresh window it is still served while a
+      background thread fetches its replacement
+    - Concurrent misses for the same key share a single in-flight request
+    """
+    DEFAULT_TTL = 300  # Seconds, used when Airpay does not send expires_in
+    REFRESH_MARGIN = 60  # Seconds before expiry to start a background refresh
+    EXPIRY_SKEW = 5  # Seconds shaved off expiry to absorb network latency
+
+    def __init__(self, fetcher: Optional[Callable[..., Tuple[Optional[str], Optional[int]]]] = None):
+        self._fetcher = fetcher or fetch_oauth2_token
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], _TokenEntry] = {}
+        self._inflight: Dict[Tuple[str, str], _InFlight] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'fetch_failures': 0,
+        }
+
+    def get_token(self, merchant_id: str, username: str, password: str,
+                  client_id: str, client_secret: str) -> Optional[str]:
+        """
+        Return a valid access token, fetching one only when none is cached
+
+        Returns:
+            Access token string or None if Airpay could not issue one
+        """
+        key = (merchant_id, client_id)
+        credentials = (merchant_id, username, password, client_id, client_secret)
+
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry and now < entry.expires_at:
+                self._stats['hits'] += 1
+                if now >= entry.refresh_at and not entry.refreshing:
+                    entry.refreshing = True
+                    threading.Thread(
+                        target=self._refresh, args=(key, credentials),
+                        name='airpay-token-refresh', daemon=True
+                    ).start()
+                return entry.token
+
+            flight = self._inflight.get(key)
+            if flight:
+                self._stats['coalesced'] += 1
+                owner = False
+            else:
+                self._stats['misses'] += 1
+                flight = self._inflight[key] = _InFlight()
+                owner = True
+
+        if not owner:
+            flight.event.wait()
+            return flight.token
+
+        try:
+            flight.token = self._fetch(key, credentials)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+        return flight.token
+
+    def invalidate(self, merchant_id: str, client_id: str) -> None:
+        """Drop the cached token, e.g. after Airpay rejects it"""
+        with self._lock:
+            self._entries.pop((merchant_id, client_id), None)
+
+    def clear(self) -> None:
+        """Drop all cached tokens and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of hit/miss/refresh counters plus the number of cached tokens"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['cached_tokens'] = len(self._entries)
+        return snapshot
+
+    def _fetch(self, key: Tuple[str, str], credentials: Tuple[str, ...]) -> Optional[str]:
+        """Fetch a token and store it; returns None (and caches nothing) on failure"""
+        token, expires_in = self._fetcher(*credentials)
+        if not token:
+            with self._lock:
+                self._stats['fetch_failures'] += 1
+            return None
+
+        ttl = expires_in if expires_in and expires_in > 0 else self.DEFAULT_TTL
+        ttl = max(ttl - self.EXPIRY_SKEW, 1)
+        fetched_at = time.monotonic()
+        expires_at = fetched_at + ttl
+        # Short-lived tokens refresh after 80% of their life instead of at a fixed margin
+        refresh_at = expires_at - min(self.REFRESH_MARGIN, ttl * 0.2)
+
+        with self._lock:
+            self._entries[key] = _TokenEntry(token, expires_at, refresh_at)
+        return token
+
+    def _refresh(self, key: Tuple[str, str], credentials: Tuple[str, ...]) -> None:
+        """Background refresh; on failure the current token keeps serving until it expires"""
+        token = error = None
+        try:
+            token = self._fetch(key, credentials)
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            if token:
+                self._stats['refreshes'] += 1
+            else:
+                self._stats['refresh_failures'] += 1
+                entry = self._entries.get(key)
+                if entry:
+                    entry.refreshing = False
+            failed = self._stats['refresh_failures']
+            attempted = failed + self._stats['refreshes']
+
+        if not token:
+            logger.error('Airpay background token refresh failed (%d of %d attempted refreshes failed); '
+                         'the current token serves until it expires', failed, attempted, exc_info=error)
+
+
+# Shared by every request handled in this process
+airpay_token_cache = AirpayTokenCache()
 
 
 def build_payment_request(
@@ -283,8 +482,6 @@ def build_payment_request(
             else:
                 buyer_phone = buyer_phone[:10]  # Truncate if too long
 
-    print(f"[AIRPAY V4 DEBUG] Sanitized buyer_phone: {buyer_phone}")
-
     # Validate order_id according to Airpay specification
     # Airpay requirements: NUMERIC ONLY, length 1-20 characters
     order_id_str = str(order_id).strip()
@@ -303,23 +500,20 @@ def build_payment_request(
         raise Exception("Order ID must be at least 1 digit")
 
     order_id = order_id_numeric
-    print(f"[AIRPAY V4 DEBUG] Validated order_id (numeric, {len(order_id)} digits): {order_id}")
+    logger.debug('Airpay order_id %s, buyer phone %s', order_id, buyer_phone)
 
-    # Step 1: Get OAuth2 access token
-    print(f"[AIRPAY V4 DEBUG] Getting OAuth2 token...")
-    access_token = get_oauth2_token(merchant_id, username, password, client_id, client_secret)
+    # Step 1: Get OAuth2 access token (cached per merchant/client across requests)
+    access_token = airpay_token_cache.get_token(merchant_id, username, password, client_id, client_secret)
 
     if not access_token:
         raise Exception("Failed to get OAuth2 access token from Airpay")
 
-    print(f"[AIRPAY V4 DEBUG] Got access token: {access_token[:20]}...")
-
     # Step 2: Prepare payment data
     # IMPORTANT: Use the BACKEND domain where payment API is hosted
     # This must match the domain you registered in Airpay merchant portal (sanctum.airpay.co.in)
     # Backend: https://www.mandi.ramhotravels.com (where payment initiation happens)
     # Frontend: https://mandi2mandi.com (user-facing website)
-    mer_dom = base64.b64encode(b'https://www.mandi.ramhotravels.com').decode('utf-8')
+    mer_dom = MERCHANT_DOMAIN
 
     post_data = {
         'buyer_email': buyer_email,
@@ -339,16 +533,16 @@ def build_payment_request(
         'mer_dom': mer_dom
     }
 
-    # Step 3: Encrypt payment data
-    functions = AirpayV4Functions()
+    # Step 3: Encrypt payment data (key material is derived once per credential set)
+    functions = airpay_functions(merchant_id, username, password, secret_key)
     data_json = json.dumps(post_data)
-    request_data = functions.encrypt_string(data_json, username, password)
+    request_data = functions.encrypt_string(data_json)
 
     # Step 4: Calculate checksum
     checksum_req = functions.checksum_cal(post_data)
 
-    # Step 5: Generate privatekey
-    privatekey = functions.encrypt_sha(f"{username}:|:{password}", secret_key)
+    # Step 5: privatekey (precomputed from username, password and secret key)
+    privatekey = functions.privatekey
 
     # Step 6: Build payment URL with token
     payment_url = f'https://payments.airpay.co.in/pay/v4/index.php?token={access_token}'
@@ -363,8 +557,7 @@ def build_payment_request(
         'airpay_url': payment_url  # Frontend expects 'airpay_url' field
     }
 
-    print(f"[AIRPAY V4 DEBUG] Payment params prepared successfully")
-    print(f"[AIRPAY V4 DEBUG] Payment URL: {payment_url[:50]}...")
+    logger.debug('Airpay payment request prepared for order_id %s', order_id)
 
     return payment_params
 
@@ -404,8 +597,8 @@ def validate_callback_response(
 
     try:
         # Decrypt response
-        functions = AirpayV4Functions()
-        decrypted_data = functions.decrypt_string(response_data['response'], username, password)
+        functions = airpay_functions(merchant_id, username, password)
+        decrypted_data = functions.decrypt_string(response_data['response'])
         data_dict = json.loads(decrypted_data)
 
         # Extract data from response
@@ -418,11 +611,7 @@ def validate_callback_response(
         message = str(data.get('message', '')).strip()
 
         # Verify checksum
-        is_valid, calculated_hash = functions.verify_response_checksum(
-            data,
-            merchant_id,
-            username
-        )
+        is_valid, calculated_hash = functions.verify_response_checksum(data)
 
         if not is_valid:
             result['error'] = (
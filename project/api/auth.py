@@ -1,11 +1,19 @@
 from flask import Blueprint, request, jsonify
 from .models import User
+from .passwords import PasswordHasherBusy
 from . import db
 from flask_login import login_user, logout_user, login_required, current_user
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
 
+def busy_response():
+    """503 when every password hashing slot is taken (api/passwords.py)"""
+    response = jsonify({"error": "Too many logins in progress, please try again"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @auth_bp.route('/signup', methods=['POST'], strict_slashes=False)
 def signup():
     data = request.get_json()
@@ -24,7 +32,10 @@ def signup():
     if role not in ['trader', 'buyer', 'admin']:
         return jsonify({"error": "Invalid role specified"}), 400
 
-    new_user = User(name=name, email=email, password=password, role=role)
+    try:
+        new_user = User(name=name, email=email, password=password, role=role)
+    except PasswordHasherBusy:
+        return busy_response()
     db.session.add(new_user)
     db.session.commit()
 
@@ -42,7 +53,18 @@ def login():
     
     user = User.query.filter_by(email=email).first()
 
-    if user and user.check_password(password):
+    try:
+        valid = user is not None and user.check_password(password)
+    except PasswordHasherBusy:
+        return busy_response()
+
+    if valid:
+        try:
+            # Moves the stored hash to the current BCRYPT_LOG_ROUNDS
+            if user.upgrade_password_hash(password):
+                db.session.commit()
+        except PasswordHasherBusy:
+            pass  # Rehashed on a later login
         login_user(user, remember=True)
         return jsonify({
             "message": "Login successful",
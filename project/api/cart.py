@@ -3,15 +3,100 @@ Cart API endpoints
 Handles shopping cart operations: add, update, remove, get cart
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from . import db
+from .cache import TTLCache
+from .catalog import get_catalog
 from .models import Cart, CartItem
+from .shipping import ShippingError, quote_consignments, quote_shipping_batch, location_state, UNKNOWN_STATE
 
 cart_bp = Blueprint('cart', __name__)
 
 MINIMUM_QUANTITY = 2000
 
+# Badge counts per user id; TTL comes from CART_COUNT_CACHE_TTL (0 disables)
+cart_count_cache = TTLCache(ttl=5, maxsize=10000)
+
+
+def count_cart_items(user_id):
+    """Number of items in a user's cart as a single SELECT count(*), no ORM objects"""
+    return db.session.query(func.count(CartItem.id)).join(
+        Cart, Cart.id == CartItem.cart_id
+    ).filter(Cart.user_id == user_id).scalar()
+
+
+def invalidate_cart_count(user_id):
+    """Call after any change to the number of items in a user's cart"""
+    cart_count_cache.delete(user_id)
+
+
+def load_cart(user_id):
+    """Fetch a user's cart together with all of its items in one joined query"""
+    return Cart.query.options(joinedload(Cart.items)).filter_by(user_id=user_id).first()
+
+
+def create_cart(user_id):
+    """Add an empty cart to the session; its items collection needs no lazy load"""
+    cart = Cart(user_id=user_id, items=[])
+    db.session.add(cart)
+    return cart
+
+
+def quote_cart_shipping(cart, to_state):
+    """
+    Shipping charge per cart item from its listing's state to to_state
+    The same quote is shown by /api/cart/quote and charged at checkout.
+    Items over 10 tons ship as several consignments (quote_consignments).
+    Returns [(from_state, charge)] in cart.items order
+
+    Raises:
+        ShippingError: an item cannot be shipped (e.g. a non-positive quantity)
+    """
+    catalog = get_catalog()
+    products = [catalog.get(item.product_id) if catalog is not None else None for item in cart.items]
+    origins = [location_state(item.location or (product or {}).get('location', '')) or UNKNOWN_STATE
+               for item, product in zip(cart.items, products)]
+    charges = quote_shipping_batch(
+        [item.quantity for item in cart.items],
+        [item.unit for item in cart.items],
+        origins,
+        [to_state] * len(cart.items),
+        [(product or {}).get('category', '') for product in products],
+        split=True,
+    )
+
+    quotes = []
+    for item, origin, charge in zip(cart.items, origins, charges):
+        if charge != charge:  # NaN: re-quote for the reason
+            quote_consignments(item.quantity, item.unit, origin, to_state)
+        quotes.append((origin, float(charge)))
+    return quotes
+
+
+def find_cart_item(cart, item_id):
+    """
+    Find an item in the user's already-loaded cart
+    Returns (item, error_response); only misses hit the database to tell 404 from 403
+    """
+    if cart:
+        for item in cart.items:
+            if item.id == item_id:
+                return item, None
+
+    if not db.session.get(CartItem, item_id):
+        return None, (jsonify({
+            'success': False,
+            'message': 'Cart item not found'
+        }), 404)
+
+    return None, (jsonify({
+        'success': False,
+        'message': 'Unauthorized access'
+    }), 403)
+
 @cart_bp.route('/api/cart', methods=['GET', 'OPTIONS'])
 def get_cart():
     """Get current user's cart with all items"""
@@ -30,17 +115,20 @@ def get_cart():
         return jsonify({"error": "Authentication required"}), 401
 
     try:
-        cart = Cart.query.filter_by(user_id=current_user.id).first()
+        cart = load_cart(current_user.id)
 
         if not cart:
             # Create empty cart if doesn't exist
-            cart = Cart(user_id=current_user.id)
-            db.session.add(cart)
+            cart = create_cart(current_user.id)
+            db.session.flush()
+            cart_json = cart.to_json()
             db.session.commit()
+        else:
+            cart_json = cart.to_json()
 
         return jsonify({
             'success': True,
-            'cart': cart.to_json()
+            'cart': cart_json
         }), 200
 
     except Exception as e:
@@ -88,18 +176,24 @@ def add_to_cart():
                 'message': f'Minimum purchase quantity is {MINIMUM_QUANTITY} {data["unit"]}'
             }), 400
 
-        # Get or create cart
-        cart = Cart.query.filter_by(user_id=current_user.id).first()
+        # Catalog products must exist and carry their listed price (checked in memory, no DB hit)
+        catalog = get_catalog()
+        if catalog is not None:
+            error = catalog.validate_cart_item(str(data['productId']), float(data['pricePerUnit']))
+            if error:
+                return jsonify({
+                    'success': False,
+                    'message': error
+                }), 400
+
+        # Get or create cart (items come with it, so no per-item lookups below)
+        cart = load_cart(current_user.id)
         if not cart:
-            cart = Cart(user_id=current_user.id)
-            db.session.add(cart)
-            db.session.commit()
+            cart = create_cart(current_user.id)
 
         # Check if item already exists in cart
-        existing_item = CartItem.query.filter_by(
-            cart_id=cart.id,
-            product_id=data['productId']
-        ).first()
+        product_id = str(data['productId'])
+        existing_item = next((item for item in cart.items if item.product_id == product_id), None)
 
         if existing_item:
             # Update quantity
@@ -108,8 +202,7 @@ def add_to_cart():
         else:
             # Add new item
             cart_item = CartItem(
-                cart_id=cart.id,
-                product_id=data['productId'],
+                product_id=product_id,
                 product_name=data['productName'],
                 price_per_unit=float(data['pricePerUnit']),
                 unit=data['unit'],
@@ -118,18 +211,19 @@ def add_to_cart():
                 seller_name=data.get('sellerName'),
                 location=data.get('location')
             )
-            db.session.add(cart_item)
+            cart.items.append(cart_item)
             message = 'Item added to cart successfully'
 
+        # Serialize after flush but before commit, which would expire the loaded cart
+        db.session.flush()
+        cart_json = cart.to_json()
         db.session.commit()
-
-        # Refresh cart to get updated data
-        db.session.refresh(cart)
+        invalidate_cart_count(current_user.id)
 
         return jsonify({
             'success': True,
             'message': message,
-            'cart': cart.to_json()
+            'cart': cart_json
         }), 200
 
     except ValueError as e:
@@ -160,21 +254,12 @@ def update_cart_item(item_id):
 
         quantity = float(data['quantity'])
 
-        # Get cart item
-        cart_item = CartItem.query.get(item_id)
+        # Get cart item from the user's own cart (verifies ownership)
+        cart = load_cart(current_user.id)
+        cart_item, error = find_cart_item(cart, item_id)
 
-        if not cart_item:
-            return jsonify({
-                'success': False,
-                'message': 'Cart item not found'
-            }), 404
-
-        # Verify ownership
-        if cart_item.cart.user_id != current_user.id:
-            return jsonify({
-                'success': False,
-                'message': 'Unauthorized access'
-            }), 403
+        if error:
+            return error
 
         # Validate minimum quantity
         if quantity < MINIMUM_QUANTITY:
@@ -184,16 +269,14 @@ def update_cart_item(item_id):
             }), 400
 
         cart_item.quantity = quantity
+        db.session.flush()
+        cart_json = cart.to_json()
         db.session.commit()
 
-        # Refresh cart to get updated data
-        cart = cart_item.cart
-        db.session.refresh(cart)
-
         return jsonify({
             'success': True,
             'message': 'Cart item updated successfully',
-            'cart': cart.to_json()
+            'cart': cart_json
         }), 200
 
     except ValueError as e:
@@ -214,32 +297,24 @@ def update_cart_item(item_id):
 def remove_from_cart(item_id):
     """Remove item from cart"""
     try:
-        cart_item = CartItem.query.get(item_id)
+        # Get cart item from the user's own cart (verifies ownership)
+        cart = load_cart(current_user.id)
+        cart_item, error = find_cart_item(cart, item_id)
 
-        if not cart_item:
-            return jsonify({
-                'success': False,
-                'message': 'Cart item not found'
-            }), 404
+        if error:
+            return error
 
-        # Verify ownership
-        if cart_item.cart.user_id != current_user.id:
-            return jsonify({
-                'success': False,
-                'message': 'Unauthorized access'
-            }), 403
-
-        cart = cart_item.cart
-        db.session.delete(cart_item)
+        # delete-orphan cascade deletes the row on flush
+        cart.items.remove(cart_item)
+        db.session.flush()
+        cart_json = cart.to_json()
         db.session.commit()
-
-        # Refresh cart to get updated data
-        db.session.refresh(cart)
+        invalidate_cart_count(current_user.id)
 
         return jsonify({
             'success': True,
             'message': 'Item removed from cart successfully',
-            'cart': cart.to_json()
+            'cart': cart_json
         }), 200
 
     except Exception as e:
@@ -255,7 +330,7 @@ def remove_from_cart(item_id):
 def clear_cart():
     """Clear all items from cart"""
     try:
-        cart = Cart.query.filter_by(user_id=current_user.id).first()
+        cart = load_cart(current_user.id)
 
         if not cart:
             return jsonify({
@@ -263,17 +338,17 @@ def clear_cart():
                 'message': 'Cart not found'
             }), 404
 
-        # Delete all cart items
-        CartItem.query.filter_by(cart_id=cart.id).delete()
+        # Delete all cart items (one batched DELETE via delete-orphan cascade)
+        cart.items.clear()
+        db.session.flush()
+        cart_json = cart.to_json()
         db.session.commit()
-
-        # Refresh cart to get updated data
-        db.session.refresh(cart)
+        invalidate_cart_count(current_user.id)
 
         return jsonify({
             'success': True,
             'message': 'Cart cleared successfully',
-            'cart': cart.to_json()
+            'cart': cart_json
         }), 200
 
     except Exception as e:
@@ -284,22 +359,68 @@ def clear_cart():
         }), 500
 
 
+@cart_bp.route('/api/cart/quote', methods=['GET'])
+@login_required
+def quote_cart():
+    """Shipping per item and the total that checkout will charge for delivery to ?state="""
+    state = (request.args.get('state') or '').strip()
+    if not state:
+        return jsonify({
+            'success': False,
+            'message': 'Delivery state is required'
+        }), 400
+
+    cart = load_cart(current_user.id)
+    items = cart.items if cart else []
+    try:
+        quotes = quote_cart_shipping(cart, state) if items else []
+    except ShippingError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    quoted_items = []
+    for item, (origin, charge) in zip(items, quotes):
+        quoted_items.append({
+            'id': item.id,
+            'productName': item.product_name,
+            'subtotal': item.quantity * item.price_per_unit,
+            'fromState': origin,
+            'shippingCharge': charge,
+        })
+    subtotal = sum(item['subtotal'] for item in quoted_items)
+    shipping_total = sum(item['shippingCharge'] for item in quoted_items)
+
+    return jsonify({
+        'success': True,
+        'quote': {
+            'state': state,
+            'items': quoted_items,
+            'subtotal': subtotal,
+            'shippingTotal': shipping_total,
+            'totalAmount': subtotal + shipping_total,
+        }
+    }), 200
+
+
 @cart_bp.route('/api/cart/count', methods=['GET'])
 @login_required
 def get_cart_count():
     """Get total number of items in cart (for badge display)"""
     try:
-        cart = Cart.query.filter_by(user_id=current_user.id).first()
+        user_id = current_user.id
+        ttl = current_app.config.get('CART_COUNT_CACHE_TTL', 5)
 
-        if not cart:
-            return jsonify({
-                'success': True,
-                'count': 0
-            }), 200
+        count = cart_count_cache.get(user_id) if ttl else None
+        if count is None:
+            count = count_cart_items(user_id)
+            if ttl:
+                cart_count_cache.set(user_id, count, ttl=ttl)
 
         return jsonify({
             'success': True,
-            'count': len(cart.items)
+            'count': count
         }), 200
 
     except Exception as e:
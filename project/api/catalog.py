@@ -0,0 +1,284 @@
+"""
+Commodity catalog API
+Server-side, read-only view of public/db/commodity_data.json (the listings the
+frontend renders through src/lib/products.ts), parsed once per process and
+indexed by id, category/subcategory, seller and location
+"""
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Blueprint, request, jsonify, current_app
+
+catalog_bp = Blueprint('catalog', __name__)
+logger = logging.getLogger(__name__)
+
+CATALOG_PAGE_SIZE = 50
+CATALOG_MAX_PAGE_SIZE = 200
+
+# "₹ 180 /- Kg", "₹ 1,250.50 /- Piece" (same pattern as processRawProduct in products.ts)
+PRICE_PATTERN = re.compile(r'₹\s*([\d,.]+)\s*/-\s*(\w+)', re.IGNORECASE)
+PLACEHOLDER_IMAGE = '/placeholder.svg'
+# Lookup miss in the filter indexes (shared, so misses do not create new lists)
+NO_POSITIONS: Tuple[int, ...] = ()
+
+
+def parse_price(raw_price: str) -> Tuple[float, str]:
+    """Price and unit from a listing's display price; (0, 'Kg') when it does not parse"""
+    match = PRICE_PATTERN.search(raw_price or '')
+    if not match:
+        return 0.0, 'Kg'
+    try:
+        return float(match.group(1).replace(',', '')), match.group(2).strip()
+    except ValueError:
+        return 0.0, match.group(2).strip()
+
+
+def location_keys(location: str) -> List[str]:
+    """Lookup keys for a location: the full string and each comma-separated part (city, state)"""
+    location = (location or '').strip().lower()
+    if not location:
+        return []
+    parts = [part.strip() for part in location.split(',') if part.strip()]
+    return list(dict.fromkeys([location] + parts))
+
+
+class CommodityCatalog:
+    """
+    In-memory commodity catalog
+
+    Products are kept once, in file order, as the JSON-ready dicts the
+    frontend expects; every index maps a key to a sorted list of positions
+    in that list, so a filtered page is an intersection plus a slice.
+    The catalog never changes after loading, so intersections are memoized
+    per filter combination.
+    """
+    MATCH_CACHE_SIZE = 4096
+
+    def __init__(self, raw_data: Dict[str, Dict[str, List[Dict[str, Any]]]]):
+        self.products: List[Dict[str, Any]] = []
+        self.categories: Dict[str, List[str]] = {}
+        self.by_id: Dict[str, int] = {}
+        self.by_category: Dict[str, List[int]] = {}
+        self.by_subcategory: Dict[Tuple[str, str], List[int]] = {}
+        self.by_seller: Dict[str, List[int]] = {}
+        self.by_location: Dict[str, List[int]] = {}
+        # Set form of posting lists used as the probe side of an intersection, built on demand
+        self._posting_sets: Dict[int, Tuple[List[int], frozenset]] = {}
+        self._match_cache: Dict[tuple, List[int]] = {}
+
+        for category, subcategories in raw_data.items():
+            self.categories[category] = []
+            for subcategory, listings in subcategories.items():
+                self.categories[category].append(subcategory)
+                if not isinstance(listings, list):
+                    continue
+                for listing in listings:
+                    if listing and listing.get('id'):
+                        self._add(listing, category, subcategory)
+
+    def _add(self, listing: Dict[str, Any], category: str, subcategory: str) -> None:
+        product_id = str(listing['id'])
+        if product_id in self.by_id:
+            return
+        price, unit = parse_price(listing.get('price', ''))
+        image = listing.get('image') or ''
+        product = {
+            'id': product_id,
+            'title': listing.get('title', ''),
+            'location': listing.get('location', ''),
+            'price': price,
+            'unit': unit,
+            'images': [image if image.startswith('http') else PLACEHOLDER_IMAGE],
+            'date': listing.get('date', ''),
+            'seller': listing.get('seller', ''),
+            'category': category,
+            'subcategory': subcategory,
+            'aiHint': f"{subcategory} {category}".lower(),
+        }
+
+        position = len(self.products)
+        self.products.append(product)
+        self.by_id[product_id] = position
+        self.by_category.setdefault(category, []).append(position)
+        self.by_subcategory.setdefault((category, subcategory), []).append(position)
+        seller = product['seller'].strip().lower()
+        if seller:
+            self.by_seller.setdefault(seller, []).append(position)
+        for key in location_keys(product['location']):
+            self.by_location.setdefault(key, []).append(position)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'CommodityCatalog':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        position = self.by_id.get(str(product_id))
+        return None if position is None else self.products[position]
+
+    def query(self, category: Optional[str] = None, subcategory: Optional[str] = None,
+              seller: Optional[str] = None, location: Optional[str] = None,
+              offset: int = 0, limit: int = CATALOG_PAGE_SIZE) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        One page of products matching every given filter, in catalog order
+
+        Returns:
+            Tuple of (products on the page, total matches)
+        """
+        key = (category, subcategory,
+               seller.strip().lower() if seller is not None else None,
+               location.strip().lower() if location is not None else None)
+        if key == (None, None, None, None):
+            return self.products[offset:offset + limit], len(self.products)
+
+        matches = self._match_cache.get(key)
+        if matches is None:
+            matches = self._matches(*key)
+            if len(self._match_cache) >= self.MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            self._match_cache[key] = matches
+
+        return [self.products[position] for position in matches[offset:offset + limit]], len(matches)
+
+    def _matches(self, category, subcategory, seller, location) -> List[int]:
+        """Positions matching every filter (seller/location already lower-cased)"""
+        postings = []
+        if subcategory is not None:
+            postings.append(self.by_subcategory.get((category or '', subcategory), NO_POSITIONS))
+        elif category is not None:
+            postings.append(self.by_category.get(category, NO_POSITIONS))
+        if seller is not None:
+            postings.append(self.by_seller.get(seller, NO_POSITIONS))
+        if location is not None:
+            postings.append(self.by_location.get(location, NO_POSITIONS))
+
+        # Walk the shortest list, probe the others
+        postings.sort(key=len)
+        if not postings[0]:
+            return []  # An unknown value; only the index's own lists reach _posting_set
+        if len(postings) == 1:
+            return postings[0]
+        others = [self._posting_set(p) for p in postings[1:]]
+        return [position for position in postings[0] if all(position in other for other in others)]
+
+    def _posting_set(self, posting: List[int]) -> frozenset:
+        cached = self._posting_sets.get(id(posting))
+        if cached is None or cached[0] is not posting:
+            cached = self._posting_sets[id(posting)] = (posting, frozenset(posting))
+        return cached[1]
+
+    def validate_cart_item(self, product_id: str, price_per_unit: float) -> Optional[str]:
+        """Error message if the product is not in the catalog or the price does not match it"""
+        product = self.get(product_id)
+        if product is None:
+            return 'Unknown product'
+        if abs(product['price'] - price_per_unit) > 0.005:
+            return f"Price has changed to ₹{product['price']:g} / {product['unit']}"
+        return None
+
+
+_catalogs: Dict[Tuple[str, Optional[str]], Optional[CommodityCatalog]] = {}
+_catalogs_lock = threading.Lock()
+
+
+def open_catalog(path: str, snapshot_path: Optional[str] = None) -> CommodityCatalog:
+    """Map the snapshot if it is up to date with the JSON, otherwise parse the JSON"""
+    if snapshot_path:
+        from .catalog_snapshot import CatalogSnapshot, snapshot_is_current
+        if snapshot_is_current(snapshot_path, path):
+            try:
+                return CatalogSnapshot(snapshot_path)
+            except (OSError, ValueError) as e:
+                logger.warning('Ignoring catalog snapshot %s: %s', snapshot_path, e)
+    return CommodityCatalog.from_file(path)
+
+
+def load_catalog(path: str, snapshot_path: Optional[str] = None) -> Optional[CommodityCatalog]:
+    """Catalog for a file, opened on first use and shared by the whole process; None if missing"""
+    key = (path, snapshot_path)
+    catalog = _catalogs.get(key)
+    if catalog is not None or key in _catalogs:
+        return catalog
+
+    with _catalogs_lock:
+        if key not in _catalogs:
+            try:
+                _catalogs[key] = open_catalog(path, snapshot_path)
+                logger.info('Loaded %d catalog products (%s) from %s',
+                            len(_catalogs[key]), type(_catalogs[key]).__name__, path)
+            except (OSError, ValueError) as e:
+                logger.warning('Commodity catalog unavailable (%s): %s', path, e)
+                _catalogs[key] = None
+        return _catalogs[key]
+
+
+def get_catalog() -> Optional[CommodityCatalog]:
+    """Catalog configured by COMMODITY_CATALOG_PATH for the current app (None when unset)"""
+    path = current_app.config.get('COMMODITY_CATALOG_PATH')
+    return load_catalog(path, current_app.config.get('COMMODITY_CATALOG_SNAPSHOT')) if path else None
+
+
+def catalog_unavailable():
+    return jsonify({"error": "Catalog is not available"}), 503
+
+
+@catalog_bp.route('/catalog', methods=['GET'])
+def list_catalog():
+    """
+    Catalog products in file order
+    Filters: category, subcategory (with category), seller, location (city, state or both)
+    Paging: ?limit=50 (max 200) and ?offset=<nextOffset from the previous page>
+    """
+    catalog = get_catalog()
+    if catalog is None:
+        return catalog_unavailable()
+
+    try:
+        limit = min(max(int(request.args.get('limit', CATALOG_PAGE_SIZE)), 1), CATALOG_MAX_PAGE_SIZE)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "Invalid limit or offset"}), 400
+
+    products, total = catalog.query(
+        category=request.args.get('category') or None,
+        subcategory=request.args.get('subcategory') or None,
+        seller=request.args.get('seller') or None,
+        location=request.args.get('location') or None,
+        offset=offset,
+        limit=limit,
+    )
+
+    return jsonify({
+        'products': products,
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'nextOffset': offset + limit if offset + limit < total else None,
+    })
+
+
+@catalog_bp.route('/catalog/categories', methods=['GET'])
+def list_catalog_categories():
+    """Categories with their subcategories, in catalog order"""
+    catalog = get_catalog()
+    if catalog is None:
+        return catalog_unavailable()
+    return jsonify(catalog.categories)
+
+
+@catalog_bp.route('/catalog/<product_id>', methods=['GET'])
+def get_catalog_product(product_id):
+    catalog = get_catalog()
+    if catalog is None:
+        return catalog_unavailable()
+
+    product = catalog.get(product_id)
+    if product is None:
+        return jsonify({"error": "Product not found"}), 404
+    return jsonify(product)
@@ -0,0 +1,341 @@
+"""
+Compact binary snapshot of the commodity catalog
+`flask --app run build-catalog-snapshot` compiles commodity_data.json into a
+columnar file that workers mmap read-only, so every gunicorn worker shares
+the same page-cache pages instead of holding its own parsed copy
+
+Layout (little-endian, every section 8-byte aligned):
+    header          magic, version, product count, then (offset, length) per section
+    string_offsets  uint32[strings + 1]   start of each interned UTF-8 string
+    string_data     bytes                 all distinct strings, concatenated
+    columns         uint32[fields][n]     string id of each field, one column per field
+    prices          float64[n]            parsed price per unit
+    id_order        uint32[n]             positions sorted by product id
+    categories      uint32[k][2]          (category, subcategory) in catalog order
+    index_*         uint32[keys][3]       (key string id, start, count), sorted by key
+    postings        uint32[]              positions referenced by the index_* sections
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .catalog import CommodityCatalog
+
+MAGIC = b'M2MCATLG'
+VERSION = 1
+FIELDS = ('id', 'title', 'location', 'unit', 'image', 'date', 'seller', 'category', 'subcategory')
+INDEXES = ('category', 'subcategory', 'seller', 'location')
+SECTIONS = ('string_offsets', 'string_data', 'columns', 'prices', 'id_order', 'categories') + \
+    tuple(f'index_{name}' for name in INDEXES) + ('postings',)
+HEADER = struct.Struct('<8sII' + 'QQ' * len(SECTIONS))
+# Subcategory index keys are "category<SEP>subcategory"
+KEY_SEPARATOR = '\x1f'
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def build_snapshot(catalog: CommodityCatalog, out_path: str) -> int:
+    """
+    Write a snapshot of a parsed catalog
+    The file is written next to out_path and renamed into place, so workers
+    that already mapped the previous snapshot keep reading a consistent file
+
+    Returns:
+        Size of the snapshot in bytes
+    """
+    strings: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        string_id = strings.get(value)
+        if string_id is None:
+            string_id = strings[value] = len(strings)
+        return string_id
+
+    columns = {field: array('I') for field in FIELDS}
+    prices = array('d')
+    for product in catalog.products:
+        row = dict(product, image=product['images'][0])
+        for field in FIELDS:
+            columns[field].append(intern(row[field]))
+        prices.append(product['price'])
+
+    id_order = array('I', sorted(range(len(catalog.products)), key=lambda i: catalog.products[i]['id']))
+
+    categories = array('I')
+    for category, subcategories in catalog.categories.items():
+        for subcategory in subcategories:
+            categories.extend((intern(category), intern(subcategory)))
+
+    postings = array('I')
+    index_sections = {}
+    sources = {
+        'category': catalog.by_category,
+        'subcategory': {KEY_SEPARATOR.join(key): value for key, value in catalog.by_subcategory.items()},
+        'seller': catalog.by_seller,
+        'location': catalog.by_location,
+    }
+    for name in INDEXES:
+        table = array('I')
+        for key in sorted(sources[name]):
+            positions = sources[name][key]
+            table.extend((intern(key), len(postings), len(positions)))
+            postings.extend(positions)
+        index_sections[f'index_{name}'] = table
+
+    encoded = [value.encode('utf-8') for value in strings]
+    string_offsets = array('I', [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    column_data = array('I')
+    for field in FIELDS:
+        column_data.extend(columns[field])
+
+    payloads = {
+        'string_offsets': string_offsets.tobytes(),
+        'string_data': b''.join(encoded),
+        'columns': column_data.tobytes(),
+        'prices': prices.tobytes(),
+        'id_order': id_order.tobytes(),
+        'categories': categories.tobytes(),
+        'postings': postings.tobytes(),
+    }
+    payloads.update({name: table.tobytes() for name, table in index_sections.items()})
+
+    layout = []
+    offset = _align(HEADER.size)
+    for name in SECTIONS:
+        layout.extend((offset, len(payloads[name])))
+        offset = _align(offset + len(payloads[name]))
+
+    tmp_path = f'{out_path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(catalog.products), *layout))
+        for name, section_offset in zip(SECTIONS, layout[::2]):
+            f.write(b'\0' * (section_offset - f.tell()))
+            f.write(payloads[name])
+        size = f.tell()
+    os.replace(tmp_path, out_path)
+    return size
+
+
+class _Strings:
+    """Interned string table decoded straight from the mapped file (recent strings kept decoded)"""
+    __slots__ = ('offsets', 'data', 'decode')
+
+    def __init__(self, offsets: memoryview, data: memoryview, cache_size: int):
+        self.offsets = offsets
+        self.data = data
+        self.decode = lru_cache(maxsize=cache_size)(self._decode)
+
+    def _decode(self, string_id: int) -> str:
+        return str(self.data[self.offsets[string_id]:self.offsets[string_id + 1]], 'utf-8')
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.decode(string_id)
+
+
+class _Products:
+    """Sequence of product dicts, built from the columns only when indexed"""
+    __slots__ = ('snapshot',)
+
+    def __init__(self, snapshot: 'CatalogSnapshot'):
+        self.snapshot = snapshot
+
+    def __len__(self) -> int:
+        return self.snapshot.count
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.snapshot.product(i) for i in range(*position.indices(self.snapshot.count))]
+        if position < 0:
+            position += self.snapshot.count
+        if not 0 <= position < self.snapshot.count:
+            raise IndexError(position)
+        return self.snapshot.product(position)
+
+
+class _IdIndex:
+    """Product id -> position by binary search over id_order (recent lookups remembered)"""
+    __slots__ = ('snapshot', 'lookup')
+
+    def __init__(self, snapshot: 'CatalogSnapshot', cache_size: int):
+        self.snapshot = snapshot
+        self.lookup = lru_cache(maxsize=cache_size)(self._search)
+
+    def get(self, product_id: str, default: Optional[int] = None) -> Optional[int]:
+        position = self.lookup(product_id)
+        return default if position is None else position
+
+    def _search(self, product_id: str) -> Optional[int]:
+        snapshot = self.snapshot
+        ids = snapshot.id_column
+        order = snapshot.id_order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            value = snapshot.strings[ids[order[middle]]]
+            if value < product_id:
+                low = middle + 1
+            elif value > product_id:
+                high = middle
+            else:
+                return order[middle]
+        return None
+
+    def __contains__(self, product_id: str) -> bool:
+        return self.get(product_id) is not None
+
+
+class _PostingIndex:
+    """
+    Key -> posting list (a uint32 view into the mapped file)
+    Views are remembered per key so the same key always yields the same
+    object, which CommodityCatalog relies on to reuse its probe sets
+    """
+    __slots__ = ('snapshot', 'table', 'views')
+
+    def __init__(self, snapshot: 'CatalogSnapshot', table: memoryview):
+        self.snapshot = snapshot
+        self.table = table
+        self.views: Dict[str, memoryview] = {}
+
+    def __len__(self) -> int:
+        return len(self.table) // 3
+
+    def get(self, key, default=None):
+        if isinstance(key, tuple):
+            key = KEY_SEPARATOR.join(key)
+        view = self.views.get(key)
+        if view is not None:
+            return view
+
+        strings, table = self.snapshot.strings, self.table
+        low, high = 0, len(table) // 3
+        while low < high:
+            middle = (low + high) // 2
+            value = strings[table[middle * 3]]
+            if value < key:
+                low = middle + 1
+            elif value > key:
+                high = middle
+            else:
+                start, count = table[middle * 3 + 1], table[middle * 3 + 2]
+                view = self.views[key] = self.snapshot.postings[start:start + count]
+                return view
+        return default
+
+    def __getitem__(self, key):
+        view = self.get(key)
+        if view is None:
+            raise KeyError(key)
+        return view
+
+
+class CatalogSnapshot(CommodityCatalog):
+    """
+    CommodityCatalog backed by a read-only mmap of a snapshot file
+    Only the (small) category tree is decoded at open; products, ids and
+    posting lists are read from the shared mapping on demand. Bounded LRU
+    caches keep the hot products and strings decoded, so private memory
+    stays at most CACHE_SIZE products however large the catalog grows.
+    """
+    CACHE_SIZE = 2048
+
+    def __init__(self, path: str):
+        if sys.byteorder != 'little':
+            raise ValueError("Catalog snapshots are little-endian")
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if len(view) < HEADER.size:
+            raise ValueError("Truncated catalog snapshot")
+        magic, version, self.count, *layout = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} catalog snapshot")
+
+        sections = {}
+        for name, offset, length in zip(SECTIONS, layout[::2], layout[1::2]):
+            if offset + length > len(view):
+                raise ValueError("Truncated catalog snapshot")
+            section = view[offset:offset + length]
+            sections[name] = section if name == 'string_data' else section.cast('d' if name == 'prices' else 'I')
+
+        self.strings = _Strings(sections['string_offsets'], sections['string_data'], self.CACHE_SIZE * 4)
+        self._columns = sections['columns']
+        self._prices = sections['prices']
+        self.id_order = sections['id_order']
+        self.id_column = self._columns[:self.count]  # 'id' is the first column
+        self.postings = sections['postings']
+
+        self.product = lru_cache(maxsize=self.CACHE_SIZE)(self._build_product)
+        self.products = _Products(self)
+        self.by_id = _IdIndex(self, self.CACHE_SIZE)
+        self.by_category = _PostingIndex(self, sections['index_category'])
+        self.by_subcategory = _PostingIndex(self, sections['index_subcategory'])
+        self.by_seller = _PostingIndex(self, sections['index_seller'])
+        self.by_location = _PostingIndex(self, sections['index_location'])
+
+        self.categories: Dict[str, List[str]] = {}
+        pairs = sections['categories']
+        for i in range(0, len(pairs), 2):
+            self.categories.setdefault(self.strings[pairs[i]], []).append(self.strings[pairs[i + 1]])
+
+        self._posting_sets = {}
+        self._match_cache = {}
+
+    def _build_product(self, position: int) -> Dict[str, Any]:
+        """Product dict for a position, in the same shape CommodityCatalog stores (see self.product)"""
+        strings, columns, count = self.strings, self._columns, self.count
+        row = {field: strings[columns[index * count + position]] for index, field in enumerate(FIELDS)}
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'location': row['location'],
+            'price': self._prices[position],
+            'unit': row['unit'],
+            'images': [row['image']],
+            'date': row['date'],
+            'seller': row['seller'],
+            'category': row['category'],
+            'subcategory': row['subcategory'],
+            'aiHint': f"{row['subcategory']} {row['category']}".lower(),
+        }
+
+
+def snapshot_is_current(snapshot_path: str, source_path: Optional[str]) -> bool:
+    """True if the snapshot exists and is no older than its JSON source (or the source is gone)"""
+    try:
+        snapshot_mtime = os.stat(snapshot_path).st_mtime
+    except OSError:
+        return False
+    try:
+        return snapshot_mtime >= os.stat(source_path).st_mtime if source_path else True
+    except OSError:
+        return True
+
+
+@click.command('build-catalog-snapshot')
+@with_appcontext
+def build_catalog_snapshot_command():
+    """Compile COMMODITY_CATALOG_PATH into the mmap snapshot at COMMODITY_CATALOG_SNAPSHOT"""
+    source = current_app.config.get('COMMODITY_CATALOG_PATH')
+    target = current_app.config.get('COMMODITY_CATALOG_SNAPSHOT')
+    if not source or not target:
+        raise click.ClickException("COMMODITY_CATALOG_PATH and COMMODITY_CATALOG_SNAPSHOT must both be set")
+
+    catalog = CommodityCatalog.from_file(source)
+    size = build_snapshot(catalog, target)
+    click.echo(f"✅ Wrote {len(catalog)} products to {target} ({size / 1024:.0f} KiB, "
+               f"source {os.path.getsize(source) / 1024:.0f} KiB)")
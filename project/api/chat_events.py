@@ -0,0 +1,247 @@
+"""
+Chat message notifications for long-polling
+send_message publishes "inquiry N has a new message" to a broker;
+GET /api/inquiries/<id>/messages/wait blocks on it until the inquiry has a
+message newer than the client's cursor, or the timeout passes, instead of the
+client re-polling GET /<id>/messages every few seconds.
+
+Brokers (CHAT_PUBSUB):
+    local      in-process only; right for a single worker process
+    postgres   Postgres LISTEN/NOTIFY, so a message sent through any worker
+               wakes waiters in every worker
+
+A waiting request holds no database connection, only its thread (or greenlet
+under gevent) and a condition variable, so run long-polling deployments with
+threaded or gevent workers, e.g. `gunicorn -k gthread --threads 32`.
+"""
+import logging
+import select
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'chat_messages'
+
+
+class _Channel:
+    """Waiters on one inquiry; version counts the messages published to it"""
+    __slots__ = ('condition', 'version', 'waiters')
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.waiters = 0
+
+
+class Subscription:
+    """
+    A request's interest in an inquiry, taken before it reads the messages
+    so a message published between that read and wait() is not missed
+    """
+
+    def __init__(self, broker: 'LocalChatBroker', inquiry_id: int):
+        self.broker = broker
+        self.inquiry_id = inquiry_id
+        self.channel = None
+        self.version = 0
+
+    def __enter__(self) -> 'Subscription':
+        self.channel = self.broker._join(self.inquiry_id)
+        with self.channel.condition:
+            self.version = self.channel.version
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.broker._leave(self.inquiry_id, self.channel)
+
+    def wait(self, timeout: float) -> bool:
+        """Block until a message is published to the inquiry (True) or timeout seconds pass (False)"""
+        started = time.monotonic()
+        with self.channel.condition:
+            woken = self.channel.condition.wait_for(lambda: self.channel.version != self.version, timeout)
+        self.broker.stats.record_wait(woken, time.monotonic() - started)
+        return woken
+
+
+class ChatEventStats:
+    """
+    Long-poll counters for this process
+    polls_saved estimates the short polls (one every poll_interval seconds)
+    that the time spent waiting replaced, net of the long-poll requests
+    """
+
+    def __init__(self, poll_interval: float):
+        self._lock = threading.Lock()
+        self.poll_interval = poll_interval
+        self.started = time.monotonic()
+        self.published = 0
+        self.waits = 0
+        self.woken = 0
+        self.timeouts = 0
+        self.waited_seconds = 0.0
+
+    def record_publish(self) -> None:
+        with self._lock:
+            self.published += 1
+
+    def record_wait(self, woken: bool, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.woken += woken
+            self.timeouts += not woken
+            self.waited_seconds += seconds
+
+    def to_dict(self, waiting: int) -> Dict[str, Any]:
+        with self._lock:
+            minutes = max(time.monotonic() - self.started, 1.0) / 60
+            polls_saved = max(self.waited_seconds / self.poll_interval - self.waits, 0)
+            return {
+                'waiting': waiting,
+                'published': self.published,
+                'waits': self.waits,
+                'woken': self.woken,
+                'timeouts': self.timeouts,
+                'waitedSeconds': round(self.waited_seconds, 3),
+                'pollInterval': self.poll_interval,
+                'pollsSaved': round(polls_saved),
+                'pollsSavedPerMinute': round(polls_saved / minutes, 2),
+            }
+
+
+class LocalChatBroker:
+    """In-process broker: a condition variable per inquiry that has waiters"""
+    name = 'local'
+
+    def __init__(self, poll_interval: float = 3.0):
+        self._lock = threading.Lock()
+        self._channels: Dict[int, _Channel] = {}
+        self.stats = ChatEventStats(poll_interval)
+
+    def subscribe(self, inquiry_id: int) -> Subscription:
+        return Subscription(self, inquiry_id)
+
+    def publish(self, inquiry_id: int, message_id: Optional[int] = None) -> None:
+        """Wake every waiter on the inquiry; call after the message is committed"""
+        self.stats.record_publish()
+        self._deliver(inquiry_id)
+
+    def _deliver(self, inquiry_id: int) -> None:
+        channel = self._channels.get(inquiry_id)
+        if channel is None:
+            return  # Nobody in this process is waiting on it
+        with channel.condition:
+            channel.version += 1
+            channel.condition.notify_all()
+
+    def _join(self, inquiry_id: int) -> _Channel:
+        with self._lock:
+            channel = self._channels.get(inquiry_id)
+            if channel is None:
+                channel = self._channels[inquiry_id] = _Channel()
+            channel.waiters += 1
+            return channel
+
+    def _leave(self, inquiry_id: int, channel: _Channel) -> None:
+        with self._lock:
+            channel.waiters -= 1
+            if channel.waiters == 0 and self._channels.get(inquiry_id) is channel:
+                del self._channels[inquiry_id]
+
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(channel.waiters for channel in self._channels.values())
+
+    def stats_dict(self) -> Dict[str, Any]:
+        return dict(self.stats.to_dict(self.waiting()), broker=self.name)
+
+
+class PostgresChatBroker(LocalChatBroker):
+    """
+    Cross-worker broker over Postgres LISTEN/NOTIFY
+    publish() sends NOTIFY chat_messages '<inquiry id>'; one listener thread
+    per process holds a dedicated connection on LISTEN and hands every
+    notification to the local waiters, including the publisher's own.
+    """
+    name = 'postgres'
+    RECONNECT_DELAY = 5
+
+    def __init__(self, engine, poll_interval: float = 3.0):
+        super().__init__(poll_interval)
+        self.engine = engine
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, inquiry_id: int) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(inquiry_id)
+
+    def publish(self, inquiry_id: int, message_id: Optional[int] = None) -> None:
+        self.stats.record_publish()
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("SELECT pg_notify(%s, %s)", (CHANNEL, str(inquiry_id)))
+            conn.commit()
+
+    def _ensure_listener(self) -> None:
+        # Started lazily so each forked worker gets its own thread and connection
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='chat-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = self.engine.raw_connection()
+                dbapi_conn = conn.driver_connection
+                dbapi_conn.autocommit = True
+                with dbapi_conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                while True:
+                    if select.select([dbapi_conn], [], [], 60) == ([], [], []):
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        notify = dbapi_conn.notifies.pop(0)
+                        try:
+                            self._deliver(int(notify.payload))
+                        except ValueError:
+                            pass
+            except Exception as e:
+                logger.warning('Chat listener disconnected, retrying in %ss: %s', self.RECONNECT_DELAY, e)
+                time.sleep(self.RECONNECT_DELAY)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.invalidate()  # Never hand a LISTENing connection back to the pool
+                    except Exception:
+                        pass
+
+
+_broker_lock = threading.Lock()
+
+
+def get_chat_broker() -> LocalChatBroker:
+    """The current app's broker (CHAT_PUBSUB), created on first use"""
+    broker = current_app.extensions.get('chat_broker')
+    if broker is not None:
+        return broker
+
+    with _broker_lock:
+        broker = current_app.extensions.get('chat_broker')
+        if broker is None:
+            poll_interval = current_app.config.get('CHAT_POLL_INTERVAL', 3)
+            if current_app.config.get('CHAT_PUBSUB', 'local') == 'postgres':
+                broker = PostgresChatBroker(db.engine, poll_interval)
+            else:
+                broker = LocalChatBroker(poll_interval)
+            current_app.extensions['chat_broker'] = broker
+    return broker
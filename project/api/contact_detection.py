@@ -0,0 +1,183 @@
+"""
+Contact information detection for inquiry chat
+Server-side port of src/lib/contact-detection.ts, so send_message enforces
+the same rule the chat UI does (phone numbers and emails are blocked,
+WhatsApp and social media mentions are allowed with a warning) even when
+the client skips the check.
+
+The frontend runs 17 regexes one after another. Here the same rules, plus
+spelled-out or spaced-out mobile numbers ("nine eight 7 6 5 ..."), are one
+regex over the lowercased message with a named group per type, factored so
+every branch starts with a literal character: the engine only tries a branch
+where the message has a digit, '+', '(', '@' or the first letter of a
+keyword, and one finditer pass finds every type. An '@' is resolved in code,
+since the frontend counts it both as an email (when a local part and domain
+surround it) and as an @handle.
+"""
+import re
+import time
+from collections import namedtuple
+from typing import Iterator, List, Optional, Set, Tuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from . import db
+
+PHONE = 'phone number'
+EMAIL = 'email address'
+WHATSAPP = 'WhatsApp'
+SOCIAL = 'social media'
+
+# Reported in this order, like detectContactInfo
+CONTACT_TYPES = (PHONE, EMAIL, WHATSAPP, SOCIAL)
+
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+# The patterns of src/lib/contact-detection.ts as written there (JS regexes:
+# ASCII \b, \d, \w). The matcher below is tested against them.
+FRONTEND_PATTERNS = {
+    PHONE: [
+        r'\b[6-9]\d{9}\b',                            # Indian mobile numbers (10 digits starting with 6-9)
+        r'\+91[\s-]?[6-9]\d{9}\b',                    # With +91 country code
+        r'\b91[\s-]?[6-9]\d{9}\b',                    # With 91 country code (without +)
+        r'\b[6-9]\d{2}[\s.-]\d{3}[\s.-]\d{4}\b',      # With various separators
+        r'\(\d{3}\)[\s.-]?\d{3}[\s.-]?\d{4}\b',       # Formatted with parentheses
+        r'\b\d{10,}\b',                               # Multiple digits in sequence (10 or more)
+    ],
+    EMAIL: [r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'],
+    WHATSAPP: [r'(?i:whatsapp)', r'(?i:\bwa\b)', r'(?i:\bwapp\b)', r"(?i:what'?s?app)"],
+    SOCIAL: [r'(?i:instagram)', r'(?i:facebook)', r'(?i:\btelegram\b)', r'(?i:\btwitter\b)',
+             r'(?i:\blinkedin\b)', r'@\w+'],
+}
+
+# "\b" before a branch's first character, checked after it is matched so the
+# branch still starts with a literal
+_WORD_START = r'(?<!\w.)'
+# Server-only: a mobile number written digit by digit with separators or as
+# words ("98 76 54 32 10", "9.8.7.6.5.4.3.2.1.0", "nine eight 7 six ...") or
+# in Devanagari digits (०-९)
+_DIGIT = r'(?:[0-9\u0966-\u096f]|zero|one|two|three|four|five|six|seven|eight|nine)'
+_NOT_NUMBER = r'(?<![0-9a-z\u0966-\u096f].)'
+# Between two digits: one space, '-', '_', '*' or '|', or a '.', ',' or '/' with single
+# digits on both sides ("9.8.7"), so dates and prices ("6/10/2024", "7.50, 8.25") do not count
+_SEPARATOR = (r'(?:[\s_*|-]|[.,/](?<![0-9\u0966-\u096f]{2}.)(?![0-9\u0966-\u096f]{2}))?')
+
+CONTACT_PATTERN = re.compile('|'.join([
+    # \b\d{10,}\b (which covers \b[6-9]\d{9}\b), \b91[\s-]?[6-9]\d{9}\b,
+    # \b[6-9]\d{2}[\s.-]\d{3}[\s.-]\d{4}\b, +91 and (987) forms
+    r'(?P<phone>[0-9]' + _WORD_START + r'(?:\d{9,}|(?<=9)1[\s-]?[6-9]\d{9}|(?<=[6-9])\d{2}[\s.-]\d{3}[\s.-]\d{4})\b'
+    r'|\+91[\s-]?[6-9]\d{9}\b|\(\d{3}\)[\s.-]?\d{3}[\s.-]?\d{4}\b)',
+    r'(?P<obfuscated>(?:[6-9\u096c-\u096f]' + _NOT_NUMBER + r'|s' + _NOT_NUMBER + r'(?:ix|even)|e' + _NOT_NUMBER
+    + r'ight|n' + _NOT_NUMBER + r'ine)(?:' + _SEPARATOR + _DIGIT + r'){9}(?![0-9\u0966-\u096f]))',
+    r'(?P<at>@)',
+    # whatsapp, \bwa\b, \bwapp\b, what'?s?app
+    r"(?P<whatsapp>w(?:hat'?s?app|" + _WORD_START + r'a(?:pp)?\b))',
+    r'(?P<social>instagram|facebook|t' + _WORD_START + r'(?:elegram|witter)\b|l' + _WORD_START + r'inkedin\b)',
+]), re.ASCII)
+GROUP_TYPES = {'phone': PHONE, 'obfuscated': PHONE, 'whatsapp': WHATSAPP, 'social': SOCIAL}
+
+# What may follow the "@" of an email, and what may sit between its last word character and the "@"
+EMAIL_DOMAIN = re.compile(r'[a-z0-9.-]+\.[a-z|]{2,}\b', re.ASCII)
+EMAIL_LOCAL_TAIL = '.%+-'
+WORD = re.compile(r'\w', re.ASCII)
+
+ContactDetection = namedtuple('ContactDetection', ['has_contact', 'types', 'severity'])
+NO_CONTACT = ContactDetection(False, [], 'low')
+
+
+def _at_types(text: str, at: int) -> Set[str]:
+    """Types an "@" at this index belongs to: an email address and/or an @handle"""
+    types = set()
+    if WORD.match(text, at + 1):
+        types.add(SOCIAL)
+    start = at
+    while start and text[start - 1] in EMAIL_LOCAL_TAIL:
+        start -= 1
+    if start and WORD.match(text, start - 1) and EMAIL_DOMAIN.match(text, at + 1):
+        types.add(EMAIL)
+    return types
+
+
+def detect_contact_info(text: Optional[str]) -> ContactDetection:
+    """Contact types found in text and their severity, like detectContactInfo"""
+    if not text:
+        return NO_CONTACT
+
+    text = text.lower()
+    found = set()
+    for match in CONTACT_PATTERN.finditer(text):
+        if match.lastgroup == 'at':
+            found.update(_at_types(text, match.start()))
+        else:
+            found.add(GROUP_TYPES[match.lastgroup])
+        if len(found) == len(CONTACT_TYPES):
+            break  # Nothing left to find
+    if not found:
+        return NO_CONTACT
+
+    types = [contact_type for contact_type in CONTACT_TYPES if contact_type in found]
+    severity = 'high' if PHONE in found or EMAIL in found else 'medium'
+    return ContactDetection(True, types, severity)
+
+
+def contact_warning_message(types: List[str]) -> str:
+    """getContactWarningMessage"""
+    if not types:
+        return ''
+    return (f"⚠️ Detected {', '.join(types)} in your message. For your safety and to maintain platform "
+            f"integrity, please use our chat system for communication. Direct contact sharing may violate "
+            f"our terms of service.")
+
+
+def contact_block_message(types: List[str]) -> str:
+    """getContactBlockMessage"""
+    if not types:
+        return ''
+    return (f"🚫 This message contains contact information ({', '.join(types)}) and cannot be sent. "
+            f"Please use our secure chat system for all communication. Our premium members get verified "
+            f"seller contacts.")
+
+
+def scan_chat_messages(chunk_size: int = 1000, after_id: int = 0,
+                       min_severity: str = 'medium') -> Iterator[Tuple[tuple, ContactDetection]]:
+    """
+    Rescan stored chat messages in id order, chunk_size rows per query
+    Yields (row, detection) for every message at or above min_severity, where
+    row is (id, inquiry_id, sender_id, message). Keyset pagination on the
+    primary key keeps each query cheap however far into the table the scan is.
+    """
+    from .models import ChatMessage
+
+    threshold = SEVERITY_RANK[min_severity]
+    columns = (ChatMessage.id, ChatMessage.inquiry_id, ChatMessage.sender_id, ChatMessage.message)
+    while True:
+        rows = db.session.execute(
+            select(*columns).where(ChatMessage.id > after_id).order_by(ChatMessage.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        for row in rows:
+            detection = detect_contact_info(row.message)
+            if detection.has_contact and SEVERITY_RANK[detection.severity] >= threshold:
+                yield tuple(row), detection
+        after_id = rows[-1].id
+        db.session.rollback()  # End the read transaction between chunks
+
+
+@click.command('scan-chat-contacts')
+@click.option('--chunk-size', type=int, default=1000, help='Messages read per query.')
+@click.option('--after-id', type=int, default=0, help='Resume after this message id.')
+@click.option('--severity', type=click.Choice(['medium', 'high']), default='medium',
+              help='Lowest severity to report.')
+@with_appcontext
+def scan_chat_contacts_command(chunk_size, after_id, severity):
+    """Report stored chat messages that share contact information"""
+    started = time.perf_counter()
+    flagged = 0
+    for (message_id, inquiry_id, sender_id, _), detection in scan_chat_messages(chunk_size, after_id, severity):
+        flagged += 1
+        click.echo(f"message {message_id} (inquiry {inquiry_id}, sender {sender_id}): "
+                   f"{detection.severity}, {', '.join(detection.types)}")
+    click.echo(f"✅ Scan finished in {time.perf_counter() - started:.1f}s: {flagged} messages flagged")
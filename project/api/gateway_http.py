@@ -0,0 +1,144 @@
+"""
+Shared HTTP client for outbound payment gateway calls
+One keep-alive requests.Session per gateway with its own connection pool,
+retry/backoff policy and timeouts, so repeated calls to Airpay, SabPaisa
+and PayU reuse TCP+TLS connections instead of opening a new one each time
+
+requests/urllib3 are imported when the first session is built, so
+importing this module (done by create_app) stays cheap at startup
+"""
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    import requests
+
+# Methods that are safe to replay after a read error or 5xx response.
+# Other methods (POST) are only retried when the connection could not be
+# established, i.e. when the request never reached the gateway.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+DEFAULT_SETTINGS = {
+    'connect_timeout': 5,
+    'read_timeout': 30,
+    'pool_connections': 4,   # Distinct hosts kept per gateway
+    'pool_maxsize': 10,      # Keep-alive connections per host
+    'retries': 3,
+    'backoff_factor': 0.3,   # 0.3s, 0.6s, 1.2s between attempts
+    'status_forcelist': (429, 500, 502, 503, 504),
+}
+
+
+class GatewayHTTP:
+    """
+    Per-gateway pooled HTTP sessions
+
+    Settings come from DEFAULT_SETTINGS, overridden per gateway by the
+    GATEWAY_HTTP_SETTINGS config dict, e.g.:
+
+        GATEWAY_HTTP_SETTINGS = {
+            'airpay': {'connect_timeout': 3, 'read_timeout': 20},
+            'sabpaisa': {'retries': 2},
+        }
+
+    Usable outside a request/app context (e.g. from background threads).
+    """
+
+    def __init__(self, app=None):
+        self._settings: Dict[str, Dict[str, Any]] = {}
+        self._sessions: Dict[str, 'requests.Session'] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Load per-gateway settings from the Flask config"""
+        self.configure(app.config.get('GATEWAY_HTTP_SETTINGS', {}))
+
+    def configure(self, settings: Dict[str, Dict[str, Any]]) -> None:
+        """Replace per-gateway settings; existing sessions are rebuilt lazily"""
+        with self._lock:
+            self._settings = {name: dict(values) for name, values in settings.items()}
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def settings_for(self, gateway: str) -> Dict[str, Any]:
+        """Effective settings for a gateway (defaults merged with overrides)"""
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(self._settings.get(gateway, {}))
+        return settings
+
+    def timeout_for(self, gateway: str) -> Tuple[float, float]:
+        """(connect, read) timeout tuple for a gateway"""
+        settings = self.settings_for(gateway)
+        return settings['connect_timeout'], settings['read_timeout']
+
+    def session(self, gateway: str) -> 'requests.Session':
+        """Return the pooled session for a gateway, creating it on first use"""
+        session = self._sessions.get(gateway)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(gateway)
+            if session is None:
+                session = self._build_session(self.settings_for(gateway))
+                self._sessions[gateway] = session
+        return session
+
+    def request(self, gateway: str, method: str, url: str,
+                timeout: Optional[Any] = None, **kwargs) -> 'requests.Response':
+        """Send a request through the gateway's pooled session"""
+        if timeout is None:
+            timeout = self.timeout_for(gateway)
+        with metrics.time_gateway(gateway, method):
+            return self.session(gateway).request(method, url, timeout=timeout, **kwargs)
+
+    def get(self, gateway: str, url: str, **kwargs) -> 'requests.Response':
+        return self.request(gateway, 'GET', url, **kwargs)
+
+    def post(self, gateway: str, url: str, **kwargs) -> 'requests.Response':
+        return self.request(gateway, 'POST', url, **kwargs)
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    @staticmethod
+    def _build_session(settings: Dict[str, Any]) -> 'requests.Session':
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=settings['retries'],
+            connect=settings['retries'],
+            read=settings['retries'],
+            status=settings['retries'],
+            backoff_factor=settings['backoff_factor'],
+            status_forcelist=settings['status_forcelist'],
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=settings['pool_connections'],
+            pool_maxsize=settings['pool_maxsize'],
+            max_retries=retry,
+        )
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Connection'] = 'keep-alive'
+        return session
+
+
+# Shared by every outbound gateway call in this process
+gateway_http = GatewayHTTP()
@@ -1,10 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
+from sqlalchemy import update, select, func, or_
 from . import db
 from .models import Inquiry, ChatMessage
+from .chat_events import get_chat_broker
+from .contact_detection import detect_contact_info, contact_block_message, contact_warning_message
+from .shipping import rated_charge
 import datetime
+import logging
 
 inquiries_bp = Blueprint('inquiries', __name__)
+logger = logging.getLogger(__name__)
 
 @inquiries_bp.route('/submit', methods=['POST'])
 @login_required
@@ -131,9 +137,10 @@ def approve_inquiry(inquiry_id):
         if shipping_rate_per_kg <= 0:
             return jsonify({'error': 'Shipping rate must be greater than 0'}), 400
 
-        # Get shipping charge and final total from request
-        shipping_charge = float(data.get('shippingCharge', 0))
-        final_total = float(data.get('finalTotal', inquiry.estimated_price + shipping_charge))
+        # Shipping charge and final total are computed here from the seller's rate
+        # (any shippingCharge/finalTotal sent by the client is ignored)
+        shipping_charge = rated_charge(inquiry.quantity, inquiry.unit, shipping_rate_per_kg)
+        final_total = inquiry.estimated_price + shipping_charge
 
         # Update inquiry with approval and shipping data
         inquiry.status = 'Approved'
@@ -189,10 +196,55 @@ def reject_inquiry(inquiry_id):
 # CHAT MESSAGE ENDPOINTS
 # ============================================
 
+def parse_message_cursor(args):
+    """(after_id, since) from ?after_id= and ?since= (ISO timestamp); raises ValueError"""
+    after_id = int(args['after_id']) if args.get('after_id') else None
+    since = datetime.datetime.fromisoformat(args['since']) if args.get('since') else None
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone().replace(tzinfo=None)  # created_on is naive server-local time
+    return after_id, since
+
+
+def read_messages(inquiry_id, reader_id, after_id=None, since=None):
+    """
+    Messages newer than the cursor, oldest first, after marking the other
+    party's messages read (one UPDATE; commit only if any changed)
+    """
+    marked = db.session.execute(
+        update(ChatMessage)
+        .where(ChatMessage.inquiry_id == inquiry_id,
+               ChatMessage.sender_id != reader_id,
+               ChatMessage.is_read.is_(False))
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if marked:
+        db.session.commit()
+
+    query = ChatMessage.query.filter_by(inquiry_id=inquiry_id)
+    if after_id is not None:
+        query = query.filter(ChatMessage.id > after_id)
+    if since is not None:
+        query = query.filter(ChatMessage.created_on > since)
+    return query.order_by(ChatMessage.created_on.asc(), ChatMessage.id.asc()).all()
+
+
+def messages_response(messages, after_id):
+    return jsonify({
+        'messages': [message.to_json() for message in messages],
+        'lastId': messages[-1].id if messages else after_id,
+    }), 200
+
+
 @inquiries_bp.route('/<int:inquiry_id>/messages', methods=['GET'])
 @login_required
 def get_messages(inquiry_id):
-    """Get all chat messages for an inquiry"""
+    """
+    Get chat messages for an inquiry, oldest first, and mark the other
+    party's messages read
+    Incremental polls: ?after_id=<lastId from the previous response> and/or
+    ?since=<ISO timestamp> return only newer messages
+    """
     try:
         inquiry = Inquiry.query.get(inquiry_id)
 
@@ -203,20 +255,78 @@ def get_messages(inquiry_id):
         if inquiry.buyer_id != current_user.id and inquiry.seller_id != current_user.id and current_user.role != 'admin':
             return jsonify({'error': 'Unauthorized'}), 403
 
-        messages = ChatMessage.query.filter_by(inquiry_id=inquiry_id).order_by(ChatMessage.created_on.asc()).all()
+        try:
+            after_id, since = parse_message_cursor(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid after_id or since'}), 400
+
+        return messages_response(read_messages(inquiry_id, current_user.id, after_id, since), after_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to fetch messages: {str(e)}'}), 500
+
 
-        # Mark messages as read if user is not the sender
-        for message in messages:
-            if message.sender_id != current_user.id and not message.is_read:
-                message.is_read = True
+@inquiries_bp.route('/<int:inquiry_id>/messages/wait', methods=['GET'])
+@login_required
+def wait_for_messages(inquiry_id):
+    """
+    Long-poll for chat messages: same response as GET /messages, but if
+    nothing is newer than ?after_id= it waits up to ?timeout= seconds
+    (default and max CHAT_LONG_POLL_TIMEOUT) for a new message first.
+    An empty response means the wait timed out; call again with the same lastId.
+    """
+    try:
+        inquiry = Inquiry.query.get(inquiry_id)
 
-        db.session.commit()
+        if not inquiry:
+            return jsonify({'error': 'Inquiry not found'}), 404
+
+        if inquiry.buyer_id != current_user.id and inquiry.seller_id != current_user.id and current_user.role != 'admin':
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        max_timeout = current_app.config.get('CHAT_LONG_POLL_TIMEOUT', 25)
+        try:
+            after_id, since = parse_message_cursor(request.args)
+            timeout = min(max(float(request.args.get('timeout', max_timeout)), 0), max_timeout)
+        except ValueError:
+            return jsonify({'error': 'Invalid after_id, since or timeout'}), 400
+
+        reader_id = current_user.id
+        with get_chat_broker().subscribe(inquiry_id) as subscription:
+            messages = read_messages(inquiry_id, reader_id, after_id, since)
+            if not messages and timeout:
+                # Give the connection back to the pool while idle
+                db.session.close()
+                if subscription.wait(timeout):
+                    messages = read_messages(inquiry_id, reader_id, after_id, since)
+
+        return messages_response(messages, after_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to fetch messages: {str(e)}'}), 500
 
+
+@inquiries_bp.route('/unread-count', methods=['GET'])
+@login_required
+def get_unread_count():
+    """Unread chat messages for the current user across their inquiries (as buyer or seller)"""
+    try:
+        rows = db.session.execute(
+            select(ChatMessage.inquiry_id, func.count())
+            .join(Inquiry, Inquiry.id == ChatMessage.inquiry_id)
+            .where(or_(Inquiry.buyer_id == current_user.id, Inquiry.seller_id == current_user.id),
+                   ChatMessage.sender_id != current_user.id,
+                   ChatMessage.is_read.is_(False))
+            .group_by(ChatMessage.inquiry_id)
+        ).all()
+
+        by_inquiry = {str(inquiry_id): count for inquiry_id, count in rows}
         return jsonify({
-            'messages': [message.to_json() for message in messages]
+            'total': sum(by_inquiry.values()),
+            'byInquiry': by_inquiry,
         }), 200
     except Exception as e:
-        return jsonify({'error': f'Failed to fetch messages: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to count unread messages: {str(e)}'}), 500
 
 
 @inquiries_bp.route('/<int:inquiry_id>/messages', methods=['POST'])
@@ -238,6 +348,15 @@ def send_message(inquiry_id):
         if not data or 'message' not in data:
             return jsonify({'error': 'Message is required'}), 400
 
+        # Same rule as the chat UI: phone numbers and emails are blocked,
+        # WhatsApp/social media mentions go through with a warning
+        contact = detect_contact_info(data['message'])
+        if contact.severity == 'high':
+            return jsonify({
+                'error': contact_block_message(contact.types),
+                'contactTypes': contact.types,
+            }), 400
+
         # Determine sender name and role
         # If admin is sending, show as seller to maintain seller identity
         if current_user.role == 'admin':
@@ -259,12 +378,22 @@ def send_message(inquiry_id):
 
         db.session.add(chat_message)
         db.session.commit()
-
-        return jsonify({
+        try:
+            get_chat_broker().publish(inquiry_id, chat_message.id)
+        except Exception:
+            # The message is stored: a 500 would make the client send it again. Waiters
+            # still get it on their next poll (at the latest when the long-poll times out)
+            logger.warning('Chat publish failed for inquiry %s message %s', inquiry_id, chat_message.id,
+                           exc_info=True)
+
+        response = {
             'success': True,
             'message': 'Message sent successfully',
             'chatMessage': chat_message.to_json()
-        }), 201
+        }
+        if contact.has_contact:
+            response['warning'] = contact_warning_message(contact.types)
+        return jsonify(response), 201
 
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,245 @@
+"""
+Durable queue for gateway payment notifications (IPN)
+In queue mode /airpay-ipn verifies a notification, stores it in ipn_jobs and
+acknowledges at once. The worker here claims jobs in batches, applies each
+one with apply_payment_result, retries failures with exponential backoff and
+moves jobs that keep failing to ipn_dead_letters.
+
+Run the worker as a separate process (e.g. a PythonAnywhere always-on task):
+    flask --app run ipn-worker
+"""
+import datetime
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import case, delete, func, select, update
+
+from . import db
+from .models import IPNJob, IPNDeadLetter
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+PROCESSING = 'processing'
+
+
+class IPNWorkerStats:
+    """
+    Counters for the worker in this process, printed when `flask ipn-worker`
+    stops. The web processes never run the worker, so they are not served by
+    /api/admin/ipn-queue or /api/admin/metrics
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.batches = 0
+        self.applied = 0
+        self.duplicates = 0
+        self.not_found = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.last_batch_at = None
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def batch_done(self) -> None:
+        with self._lock:
+            self.batches += 1
+            self.last_batch_at = datetime.datetime.now()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'applied': self.applied,
+                'duplicates': self.duplicates,
+                'notFound': self.not_found,
+                'retried': self.retried,
+                'deadLettered': self.dead_lettered,
+                'lastBatchAt': self.last_batch_at.isoformat() if self.last_batch_at else None,
+            }
+
+
+worker_stats = IPNWorkerStats()
+
+
+def enqueue_ipn(gateway, txn_id, outcome, gateway_txn_id, payload):
+    """Store a verified notification for the worker and commit; returns the job id"""
+    job = IPNJob(
+        gateway=gateway,
+        txn_id=txn_id,
+        outcome=outcome,
+        gateway_txn_id=gateway_txn_id,
+        payload=json.dumps(payload, sort_keys=True),
+        status=QUEUED,
+        next_attempt_at=datetime.datetime.now(),
+    )
+    db.session.add(job)
+    db.session.flush()
+    job_id = job.id
+    db.session.commit()
+    return job_id
+
+
+def retry_delay(attempts, base, cap):
+    """Seconds before retry number `attempts` (1-based): base, 2*base, 4*base ... capped"""
+    return min(cap, base * 2 ** (attempts - 1))
+
+
+def claim_jobs(limit, lease):
+    """
+    Claim up to `limit` due jobs for this worker and commit the claim
+
+    Due jobs are queued jobs whose retry time has passed, plus processing
+    jobs whose lease ran out (their worker died). On Postgres concurrent
+    workers skip each other's rows (FOR UPDATE SKIP LOCKED).
+    """
+    now = datetime.datetime.now()
+    jobs = db.session.execute(
+        select(IPNJob.id, IPNJob.txn_id, IPNJob.outcome, IPNJob.gateway_txn_id, IPNJob.attempts)
+        .where(IPNJob.status.in_([QUEUED, PROCESSING]), IPNJob.next_attempt_at <= now)
+        .order_by(IPNJob.next_attempt_at, IPNJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not jobs:
+        db.session.rollback()
+        return []
+
+    db.session.execute(
+        update(IPNJob)
+        .where(IPNJob.id.in_([job.id for job in jobs]))
+        .values(status=PROCESSING, next_attempt_at=now + datetime.timedelta(seconds=lease))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return jobs
+
+
+def fail_job(job, error, max_attempts, backoff, backoff_max):
+    """Schedule a retry with backoff, or move the job to the dead-letter table"""
+    attempts = job.attempts + 1
+    message = f"{type(error).__name__}: {error}"[:2000]
+
+    if attempts >= max_attempts:
+        row = db.session.get(IPNJob, job.id)
+        db.session.add(IPNDeadLetter(
+            job_id=row.id, gateway=row.gateway, txn_id=row.txn_id, outcome=row.outcome,
+            gateway_txn_id=row.gateway_txn_id, payload=row.payload, attempts=attempts,
+            last_error=message, created_on=row.created_on,
+        ))
+        db.session.delete(row)
+        db.session.commit()
+        worker_stats.incr('dead_lettered')
+        logger.error('IPN job %s (txnid %s) dead-lettered after %d attempts: %s',
+                     job.id, job.txn_id, attempts, message)
+        return
+
+    delay = retry_delay(attempts, backoff, backoff_max)
+    db.session.execute(
+        update(IPNJob)
+        .where(IPNJob.id == job.id)
+        .values(status=QUEUED, attempts=attempts, last_error=message,
+                next_attempt_at=datetime.datetime.now() + datetime.timedelta(seconds=delay))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    worker_stats.incr('retried')
+    logger.warning('IPN job %s (txnid %s) attempt %d failed, retry in %.0fs: %s',
+                   job.id, job.txn_id, attempts, delay, message)
+
+
+def process_batch(limit=None):
+    """
+    Claim and apply one batch of due jobs; returns the number claimed
+
+    Each job is applied and deleted in one transaction, so a notification is
+    either fully applied and gone from the queue or still queued for a retry.
+    """
+    from .payments import apply_payment_result
+    from .cart import invalidate_cart_count
+
+    config = current_app.config
+    jobs = claim_jobs(limit or config['IPN_WORKER_BATCH_SIZE'], config['IPN_CLAIM_LEASE'])
+
+    for job in jobs:
+        try:
+            result = apply_payment_result(job.txn_id, job.outcome, job.gateway_txn_id, commit=False)
+            db.session.execute(delete(IPNJob).where(IPNJob.id == job.id))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            fail_job(job, e, config['IPN_MAX_ATTEMPTS'], config['IPN_RETRY_BACKOFF'],
+                     config['IPN_RETRY_BACKOFF_MAX'])
+            continue
+
+        if result.cart_user_id:
+            invalidate_cart_count(result.cart_user_id)
+        worker_stats.incr({'applied': 'applied', 'duplicate': 'duplicates'}.get(result.outcome, 'not_found'))
+
+    if jobs:
+        worker_stats.batch_done()
+    return len(jobs)
+
+
+def backlog_stats():
+    """Queue depth and lag (age of the oldest waiting notification)"""
+    now = datetime.datetime.now()
+    waiting, processing, oldest = db.session.execute(
+        select(
+            func.count(IPNJob.id),
+            func.coalesce(func.sum(case((IPNJob.status == PROCESSING, 1), else_=0)), 0),
+            func.min(IPNJob.created_on),
+        )
+    ).one()
+    dead_letters = db.session.execute(select(func.count(IPNDeadLetter.id))).scalar()
+
+    return {
+        'backlog': waiting,
+        'processing': processing,
+        'deadLetters': dead_letters,
+        'lagSeconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+    }
+
+
+def run_worker(poll_interval=None, batch_size=None, once=False, stop_event=None):
+    """Apply queued notifications until stopped; sleeps only when the queue is drained"""
+    config = current_app.config
+    poll_interval = config['IPN_WORKER_POLL_INTERVAL'] if poll_interval is None else poll_interval
+    batch_size = batch_size or config['IPN_WORKER_BATCH_SIZE']
+
+    while True:
+        claimed = process_batch(batch_size)
+        if once or (stop_event is not None and stop_event.is_set()):
+            return
+        if claimed < batch_size:
+            if stop_event is not None:
+                if stop_event.wait(poll_interval):
+                    return
+            else:
+                time.sleep(poll_interval)
+
+
+@click.command('ipn-worker')
+@click.option('--once', is_flag=True, help='Process one batch and exit.')
+@click.option('--batch-size', type=int, default=None, help='Jobs claimed per batch.')
+@with_appcontext
+def ipn_worker_command(once, batch_size):
+    """Apply queued payment notifications (AIRPAY_IPN_MODE=queue)"""
+    click.echo("🔄 IPN worker started")
+    try:
+        run_worker(batch_size=batch_size, once=once)
+    except KeyboardInterrupt:
+        pass
+    click.echo(f"IPN worker stopped: {worker_stats.to_dict()}")
@@ -0,0 +1,266 @@
+"""
+Structured, non-blocking logging for the API modules
+create_app calls configure_logging(app). Every logger under "api"
+(logging.getLogger(__name__) in a module) hands its records to a
+QueueHandler, so a request thread only formats the message and puts it on
+a queue; a QueueListener thread redacts, renders and writes it to stdout.
+A payment callback no longer waits on a blocked stdout pipe.
+
+    LOG_LEVEL    level of the "api" loggers (INFO)
+    LOG_LEVELS   per-module overrides, e.g. "api.payments=DEBUG,api.ipn_queue=WARNING"
+    LOG_FORMAT   "text" (timestamp level logger: message key=value ...) or "json"
+    LOG_REDACT   mask credentials and PII before writing (on by default)
+
+Fields passed with extra={...} are rendered as key=value pairs (or JSON
+keys). Redaction masks the values of credential-like keys (password,
+secret, token, key, salt, hash, ...) in the message and the fields, Indian
+mobile numbers and email addresses, and long opaque strings (tokens,
+hashes, encrypted payloads).
+
+A call below the logger's level returns after the logger's cached level
+check, so debug lines cost next to nothing when disabled; a debug line
+that is expensive to build is guarded with logger.isEnabledFor.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+from typing import Any, Dict, Optional
+
+LOGGER_NAME = 'api'
+
+logger = logging.getLogger(__name__)
+
+# LogRecord attributes; anything else on a record came from extra={...}
+RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+SENSITIVE_KEY = re.compile(
+    r'pass(?:word|wd)?|secret|token|salt|hash|key|encdata|checksum|otp|cvv|card', re.IGNORECASE)
+# key=value, key: value, 'key': 'value' and "key": "value" inside a message. Matched
+# case-sensitively against the lowercased text: IGNORECASE makes this alternation ~8x slower
+SENSITIVE_PAIR = re.compile(
+    r'''(?:pass(?:word|wd)?|secret|token|salt|hash|key|encdata|checksum|otp|cvv)'''
+    r'''["']?\s*[:=]\s*["']?([^\s,&"'}\]]+)''')
+SENSITIVE_PAIR_ANY_CASE = re.compile(SENSITIVE_PAIR.pattern, re.IGNORECASE)
+# The patterns below start with a literal or a character set so re can skip ahead to
+# candidates; word-boundary checks come after the first character for that reason
+# Email domain, matched from the '@'; the local part is found by walking back
+EMAIL_DOMAIN = re.compile(r'@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b')
+EMAIL_LOCAL = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-')
+# 10-digit Indian mobile, optionally +91/91 prefixed; longer digit runs (order ids) are left alone
+PHONE = re.compile(r'[+6-9](?<![\w+].)(?:(?<=\+)91[\s-]?[6-9]|(?<=9)1[\s-]?[6-9]|(?<=[6-9]))\d{7}(\d{2})(?!\w)')
+# Access tokens, hex digests and base64 payloads (no '-', so UUID txnids survive); only
+# searched when some whitespace-separated word is long enough to contain one
+OPAQUE = re.compile(r'(?<![\w-])(?:eyJ[\w-]+\.[\w-]+\.[\w-]*|[A-Za-z0-9+/_]{32,}={0,2})(?![\w-])')
+OPAQUE_MIN_LENGTH = 32
+
+MASK = '***'
+
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_output: Optional[logging.StreamHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+# Loggers given their own level by LOG_LEVELS, reset when a later app drops them
+_overridden: Dict[str, int] = {}
+
+
+def redact_text(text: str) -> str:
+    """Mask credentials, mobile numbers, emails and opaque tokens in free text"""
+    text = mask_sensitive_pairs(text)
+    if any(len(word) >= OPAQUE_MIN_LENGTH for word in text.split()):
+        text = OPAQUE.sub('[redacted]', text)
+    if '@' in text:
+        text = mask_emails(text)
+    return PHONE.sub(r'********\1', text)
+
+
+def mask_sensitive_pairs(text: str) -> str:
+    """Replace the value of every credential-like key=value pair with MASK"""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few non-ASCII characters change length when lowercased, which would shift the offsets
+        matches = SENSITIVE_PAIR_ANY_CASE.finditer(text)
+    else:
+        matches = SENSITIVE_PAIR.finditer(lowered)
+    parts, end = [], 0
+    for match in matches:
+        parts.append(text[end:match.start(1)])
+        parts.append(MASK)
+        end = match.end(1)
+    if not parts:
+        return text
+    parts.append(text[end:])
+    return ''.join(parts)
+
+
+def mask_emails(text: str) -> str:
+    """ravi.kumar@gmail.com -> r***@gmail.com"""
+    parts, end = [], 0
+    for match in EMAIL_DOMAIN.finditer(text):
+        at = start = match.start()
+        while start > end and text[start - 1] in EMAIL_LOCAL:
+            start -= 1
+        if start == at:
+            continue
+        parts.append(text[end:start + 1])
+        parts.append(MASK)
+        end = at
+    if not parts:
+        return text
+    parts.append(text[end:])
+    return ''.join(parts)
+
+
+def redact_value(key: str, value: Any) -> Any:
+    """Redact one extra field: credential-like keys lose their value, text is scrubbed"""
+    if SENSITIVE_KEY.search(key):
+        return MASK
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {k: redact_value(str(k), v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [redact_value(key, v) for v in value]
+    return redact_text(str(value))
+
+
+def extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """The extra={...} fields of a record"""
+    return {key: value for key, value in vars(record).items()
+            if key not in RECORD_ATTRS and not key.startswith('_')}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text lines: "<time> <LEVEL> <logger>: <message> key=value ...", redacted"""
+
+    def __init__(self, redact: bool = True):
+        super().__init__()
+        self.redact = redact
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            message = f'{message}\n{record.exc_text}'
+        fields = extra_fields(record)
+        if self.redact:
+            message = redact_text(message)
+            fields = {key: redact_value(key, value) for key, value in fields.items()}
+        return self.render(record, message, fields)
+
+    def render(self, record: logging.LogRecord, message: str, fields: Dict[str, Any]) -> str:
+        pairs = ''.join(f' {key}={value}' for key, value in fields.items())
+        return f'{self.formatTime(record)} {record.levelname} {record.name}: {message}{pairs}'
+
+
+class JSONFormatter(StructuredFormatter):
+    """One JSON object per line, extra fields as top-level keys"""
+
+    def render(self, record: logging.LogRecord, message: str, fields: Dict[str, Any]) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': message,
+        }
+        entry.update(fields)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+FORMATTERS = {'text': StructuredFormatter, 'json': JSONFormatter}
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue with their message rendered; the stock
+    prepare() also runs a Formatter and copies the record, which costs
+    more than the rest of the logging call
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments can be request data that changes after the call returns
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks keep the request's frames alive; keep the text instead
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class StdoutHandler(logging.StreamHandler):
+    """Writes to sys.stdout as it is at emit time (servers and tests swap it), or to a given stream"""
+
+    def __init__(self, stream=None):
+        logging.Handler.__init__(self)
+        self._stream = stream
+
+    @property
+    def stream(self):
+        return self._stream or sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        self._stream = value
+
+
+def parse_levels(spec: Optional[str]) -> Dict[str, int]:
+    """'api.payments=DEBUG,api.ipn_queue=WARNING' -> {logger name: level}; bad entries are skipped"""
+    levels = {}
+    for entry in (spec or '').split(','):
+        name, _, level = entry.partition('=')
+        name, level = name.strip(), level.strip().upper()
+        if not name:
+            continue
+        value = logging.getLevelName(level)
+        if not isinstance(value, int):
+            logger.warning("LOG_LEVELS: ignoring '%s' (unknown level)", entry.strip())
+            continue
+        levels[name] = value
+    return levels
+
+
+def configure_logging(app, stream=None) -> None:
+    """
+    Apply the app's levels and format to the "api" loggers; the queue and
+    listener thread are set up once per process. stream replaces stdout
+    as the destination (tests); None writes to sys.stdout
+    """
+    global _queue_handler, _output, _listener
+    root = logging.getLogger(LOGGER_NAME)
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO').upper())
+
+    formatter_class = FORMATTERS.get(app.config.get('LOG_FORMAT', 'text').lower(), StructuredFormatter)
+    formatter = formatter_class(redact=app.config.get('LOG_REDACT', True))
+
+    if _listener is None:
+        records = queue.SimpleQueue()
+        _output = StdoutHandler()
+        _listener = logging.handlers.QueueListener(records, _output)
+        _listener.start()
+        atexit.register(_listener.stop)
+        _queue_handler = RecordQueueHandler(records)
+        root.addHandler(_queue_handler)
+        root.propagate = False
+
+    _output.setFormatter(formatter)
+    _output.setStream(stream)
+
+    # After the output is set up, so a skipped LOG_LEVELS entry is logged there
+    levels = parse_levels(app.config.get('LOG_LEVELS'))
+    for name in set(_overridden) - set(levels):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+    _overridden.clear()
+    _overridden.update(levels)
+
+
+def flush_logs() -> None:
+    """Block until every queued record has been written"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()  # Drains the queue, then restarts with the same handlers
+        _listener.start()
@@ -0,0 +1,481 @@
+"""
+Request metrics and an opt-in sampling profiler
+create_app calls metrics.init_app(app), which times every request and
+attributes to its endpoint (the URL rule, e.g. /api/inquiries/<int:inquiry_id>/messages):
+
+    latency         histogram of request duration, plus a request counter by status
+    SQL             statements per request (histogram) and SQL seconds, from
+                    SQLAlchemy engine events
+    gateway calls   time in outbound payment gateway requests (gateway_http)
+    crypto          time in bcrypt and the gateway AES/hash helpers
+
+/api/admin/metrics renders all of it in the Prometheus text format, together
+with the Airpay token cache, IPN queue, chat long-poll and cold-start
+counters that have their own JSON endpoints.
+
+Counters are per process (like the token cache and chat broker stats), so
+with several workers each one reports its own numbers.
+
+The profiler (PROFILER_ENABLED) is armed from the admin API with a latency
+threshold; while armed, a background thread samples the stacks of requests
+in flight every PROFILER_SAMPLE_INTERVAL_MS, and the first request slower
+than the threshold is kept as collapsed stacks ("frame;frame;frame count"),
+ready for flamegraph.pl or speedscope. Arming lasts for one capture.
+"""
+import bisect
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import g, request
+
+PREFIX = 'mandi'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CALL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Endpoint label for a request no URL rule matched (404s), and for work outside a request
+UNMATCHED = '<unmatched>'
+BACKGROUND = '<background>'
+
+
+class Histogram:
+    """Cumulative-bucket histogram for one label set"""
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+class RequestStats:
+    """What one request spent its time on"""
+    __slots__ = ('endpoint', 'started', 'sql_count', 'sql_seconds', 'gateway_seconds', 'crypto_seconds',
+                 'profile')
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.gateway_seconds = 0.0
+        self.crypto_seconds = 0.0
+        self.profile = None
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar('request_stats', default=None)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    Process-wide request metrics (one instance, `metrics`, shared by every app
+    in the process like gateway_http)
+
+    Usable outside a request: SQL, gateway and crypto time spent in
+    background threads is recorded under the endpoint label <background>.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiler = SamplingProfiler()
+        self._engine_hooked = False
+        self.reset()
+
+    def reset(self) -> None:
+        self.profiler.disarm()
+        self.profiler.capture = None
+        with self._lock:
+            # (method, endpoint, status) -> count
+            self.requests: Dict[Tuple[str, str, int], int] = {}
+            # Histograms by label values
+            self.latency: Dict[Tuple[str, str], Histogram] = {}
+            self.sql_per_request: Dict[Tuple[str], Histogram] = {}
+            self.gateway: Dict[Tuple[str, str], Histogram] = {}
+            self.crypto: Dict[Tuple[str], Histogram] = {}
+            # endpoint -> [sql statements, sql seconds, gateway seconds, crypto seconds]
+            self.totals: Dict[str, List[float]] = {}
+            self.gateway_errors: Dict[Tuple[str, str], int] = {}
+
+    def init_app(self, app) -> None:
+        """Time this app's requests (METRICS_ENABLED) and hook SQLAlchemy once per process"""
+        self.profiler.configure(app.config.get('PROFILER_ENABLED', False),
+                                app.config.get('PROFILER_SAMPLE_INTERVAL_MS', 5))
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        self._hook_engines()
+
+    def _before_request(self) -> None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else UNMATCHED
+        stats = RequestStats(endpoint)
+        stats.profile = self.profiler.start_request(endpoint)
+        g._metrics_token = _current.set(stats)
+        g._metrics_status = 500  # Replaced by _after_request unless the request fails without a response
+
+    @staticmethod
+    def _after_request(response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc=None) -> None:
+        token = g.pop('_metrics_token', None)
+        if token is None:
+            return
+        stats = _current.get()
+        _current.reset(token)
+        seconds = time.perf_counter() - stats.started
+        status = g.pop('_metrics_status', 500)
+        if stats.profile is not None:
+            self.profiler.finish_request(stats.profile, seconds, request.method, request.full_path)
+
+        method = request.method
+        with self._lock:
+            key = (method, stats.endpoint, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self._histogram(self.latency, (method, stats.endpoint), LATENCY_BUCKETS).observe(seconds)
+            self._histogram(self.sql_per_request, (stats.endpoint,), SQL_COUNT_BUCKETS).observe(stats.sql_count)
+            totals = self._totals(stats.endpoint)
+            totals[0] += stats.sql_count
+            totals[1] += stats.sql_seconds
+            totals[2] += stats.gateway_seconds
+            totals[3] += stats.crypto_seconds
+
+    def _histogram(self, family: Dict[tuple, Histogram], labels: tuple, buckets: Sequence[float]) -> Histogram:
+        histogram = family.get(labels)
+        if histogram is None:
+            histogram = family[labels] = Histogram(buckets)
+        return histogram
+
+    def _totals(self, endpoint: str) -> List[float]:
+        totals = self.totals.get(endpoint)
+        if totals is None:
+            totals = self.totals[endpoint] = [0, 0.0, 0.0, 0.0]
+        return totals
+
+    def _hook_engines(self) -> None:
+        if self._engine_hooked:
+            return
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        # Listening on the Engine class covers every app's engine, including ones created later
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engine_hooked = True
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['metrics_query_started'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('metrics_query_started', None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_seconds += seconds
+        else:
+            with self._lock:
+                totals = self._totals(BACKGROUND)
+                totals[0] += 1
+                totals[1] += seconds
+
+    @contextmanager
+    def time_gateway(self, gateway: str, method: str) -> Iterator[None]:
+        """Time an outbound gateway request (errors are counted separately)"""
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            stats = _current.get()
+            if stats is not None:
+                stats.gateway_seconds += seconds
+            with self._lock:
+                self._histogram(self.gateway, (gateway, method), CALL_BUCKETS).observe(seconds)
+                if failed:
+                    self.gateway_errors[(gateway, method)] = self.gateway_errors.get((gateway, method), 0) + 1
+                if stats is None:
+                    self._totals(BACKGROUND)[2] += seconds
+
+    @contextmanager
+    def time_crypto(self, operation: str) -> Iterator[None]:
+        """Time a bcrypt/cipher/hash call; also usable as a decorator"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            stats = _current.get()
+            if stats is not None:
+                stats.crypto_seconds += seconds
+            with self._lock:
+                self._histogram(self.crypto, (operation,), CALL_BUCKETS).observe(seconds)
+                if stats is None:
+                    self._totals(BACKGROUND)[3] += seconds
+
+    def prometheus_lines(self) -> List[str]:
+        with self._lock:
+            lines = []
+            self._sample_lines(lines, 'http_requests_total', 'Requests handled, by endpoint and status',
+                                ('method', 'endpoint', 'status'), self.requests)
+            self._histogram_lines(lines, 'http_request_duration_seconds', 'Request latency',
+                                  ('method', 'endpoint'), self.latency)
+            self._histogram_lines(lines, 'http_request_sql_statements', 'SQL statements per request',
+                                  ('endpoint',), self.sql_per_request)
+            for index, (name, help_text) in enumerate((
+                    ('sql_statements_total', 'SQL statements executed'),
+                    ('sql_seconds_total', 'Time in SQL statements'),
+                    ('gateway_seconds_total', 'Time in outbound payment gateway requests'),
+                    ('crypto_seconds_total', 'Time in bcrypt and payment crypto'))):
+                self._sample_lines(lines, name, f"{help_text}, by endpoint", ('endpoint',),
+                                    {(endpoint,): totals[index] for endpoint, totals in self.totals.items()})
+            self._histogram_lines(lines, 'gateway_request_duration_seconds', 'Outbound payment gateway requests',
+                                  ('gateway', 'method'), self.gateway)
+            self._sample_lines(lines, 'gateway_request_errors_total', 'Gateway requests that raised',
+                                ('gateway', 'method'), self.gateway_errors)
+            self._histogram_lines(lines, 'crypto_duration_seconds', 'bcrypt and payment crypto calls',
+                                  ('operation',), self.crypto)
+            return lines
+
+    @staticmethod
+    def _sample_lines(lines: List[str], name: str, help_text: str, label_names: Sequence[str],
+                       values: Dict[tuple, float], kind: str = 'counter') -> None:
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+        for labels, value in sorted(values.items()):
+            lines.append(f'{PREFIX}_{name}{_labels(label_names, labels)} {_number(value)}')
+
+    @staticmethod
+    def _histogram_lines(lines: List[str], name: str, help_text: str, label_names: Sequence[str],
+                         family: Dict[tuple, Histogram]) -> None:
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} histogram')
+        for labels, histogram in sorted(family.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                le = _labels(label_names, labels, f'le="{bound}"')
+                lines.append(f'{PREFIX}_{name}_bucket{le} {cumulative}')
+            le = _labels(label_names, labels, 'le="+Inf"')
+            lines.append(f'{PREFIX}_{name}_bucket{le} {histogram.count}')
+            lines.append(f'{PREFIX}_{name}_sum{_labels(label_names, labels)} {_number(histogram.sum)}')
+            lines.append(f'{PREFIX}_{name}_count{_labels(label_names, labels)} {histogram.count}')
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace(os.sep, '/').rsplit('/', 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{frame.f_lineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Stack from the outermost frame to this one, as one collapsed-stack line prefix"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+class ProfiledRequest:
+    """Stacks sampled from one request's thread"""
+    __slots__ = ('thread_id', 'endpoint', 'stacks')
+
+    def __init__(self, thread_id: int, endpoint: str):
+        self.thread_id = thread_id
+        self.endpoint = endpoint
+        self.stacks: Counter = Counter()
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of in-flight requests while armed and keeps the first
+    request slower than the threshold
+
+    Sampling uses sys._current_frames() from a daemon thread, so the profiled
+    requests run unmodified; each sample costs the sampler one stack walk per
+    request in flight.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.interval = 0.005
+        self.armed: Optional[Dict[str, Any]] = None
+        self.capture: Optional[Dict[str, Any]] = None
+        self._active: Dict[int, ProfiledRequest] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(self, enabled: bool, interval_ms: float) -> None:
+        self.enabled = bool(enabled)
+        self.interval = max(float(interval_ms), 0.5) / 1000
+
+    def arm(self, threshold_ms: float, endpoint: Optional[str] = None) -> Dict[str, Any]:
+        """Capture the next request (on `endpoint`, if given) that takes at least threshold_ms"""
+        with self._lock:
+            self.armed = {'thresholdMs': float(threshold_ms), 'endpoint': endpoint, 'armedAt': time.time()}
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._sample, name='request-profiler', daemon=True)
+                self._thread.start()
+            return dict(self.armed)
+
+    def disarm(self) -> None:
+        with self._lock:
+            self.armed = None
+            self._active.clear()
+
+    def start_request(self, endpoint: str) -> Optional[ProfiledRequest]:
+        armed = self.armed
+        if armed is None or (armed['endpoint'] and armed['endpoint'] != endpoint):
+            return None
+        profiled = ProfiledRequest(threading.get_ident(), endpoint)
+        with self._lock:
+            if self.armed is None:
+                return None
+            self._active[profiled.thread_id] = profiled
+        return profiled
+
+    def finish_request(self, profiled: ProfiledRequest, seconds: float, method: str, path: str) -> None:
+        with self._lock:
+            self._active.pop(profiled.thread_id, None)
+            if self.armed is None or seconds * 1000 < self.armed['thresholdMs']:
+                return
+            self.capture = {
+                'endpoint': profiled.endpoint,
+                'method': method,
+                'path': path,
+                'durationMs': round(seconds * 1000, 1),
+                'samples': sum(profiled.stacks.values()),
+                'intervalMs': self.interval * 1000,
+                'capturedAt': time.time(),
+                'folded': '\n'.join(f'{stack} {count}' for stack, count in profiled.stacks.most_common()),
+            }
+            self.armed = None
+            self._active.clear()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            capture = dict(self.capture) if self.capture else None
+            if capture:
+                capture.pop('folded')
+            return {'enabled': self.enabled, 'armed': dict(self.armed) if self.armed else None,
+                    'inFlight': len(self._active), 'capture': capture}
+
+    def _sample(self) -> None:
+        while True:
+            with self._lock:
+                if self.armed is None:
+                    self._thread = None
+                    return
+                active = list(self._active.values())
+            if active:
+                frames = sys._current_frames()
+                for profiled in active:
+                    frame = frames.get(profiled.thread_id)
+                    if frame is not None:
+                        profiled.stacks[collapse_stack(frame)] += 1
+                del frames
+            time.sleep(self.interval)
+
+
+# Shared by every app in this process
+metrics = Metrics()
+
+
+def prometheus_text(app) -> str:
+    """Request metrics plus the counters other modules keep, in the Prometheus text format"""
+    lines = metrics.prometheus_lines()
+    family = Metrics._sample_lines
+
+    cold_start = app.extensions.get('cold_start') or {}
+    family(lines, 'cold_start_milliseconds', 'Startup timings of this worker', ('phase',),
+          {(name[:-3],): value for name, value in cold_start.items()
+           if name.endswith('_ms') and value is not None}, kind='gauge')
+
+    from .airpay_utils import airpay_token_cache
+    token_stats = airpay_token_cache.stats()
+    cached_tokens = token_stats.pop('cached_tokens')
+    family(lines, 'airpay_token_cache_events_total', 'Airpay OAuth2 token cache events', ('event',),
+          {(name,): value for name, value in token_stats.items()})
+    family(lines, 'airpay_token_cache_tokens', 'Airpay tokens cached', (), {(): cached_tokens}, kind='gauge')
+
+    user_cache = app.extensions.get('user_cache')
+    if user_cache is not None:
+        user_stats = user_cache.stats()
+        family(lines, 'user_cache_events_total', 'Session user cache lookups and invalidations', ('event',),
+              {(name,): user_stats[name] for name in ('hits', 'misses', 'invalidations', 'errors')})
+        if user_stats['size'] is not None:
+            family(lines, 'user_cache_entries', 'Users cached in this worker', (), {(): user_stats['size']},
+                  kind='gauge')
+
+    from .passwords import password_hasher
+    hasher = password_hasher.stats()
+    family(lines, 'password_hasher_calls_total', 'bcrypt calls on the password pool', ('event',),
+          {(name,): hasher[name] for name in ('hashes', 'checks', 'rehashes', 'rejected')})
+    family(lines, 'password_hasher_wait_seconds_total', 'Time bcrypt calls waited for a pool thread', (),
+          {(): hasher['waitSeconds']})
+    family(lines, 'password_hasher_pending', 'bcrypt calls running or queued', (), {(): hasher['pending']},
+          kind='gauge')
+
+    from .ipn_queue import backlog_stats
+    try:
+        backlog = backlog_stats()
+    except Exception:  # Queue tables not created (AIRPAY_IPN_MODE=sync, the default)
+        from . import db
+        db.session.rollback()
+        backlog = None
+    if backlog is not None:
+        family(lines, 'ipn_queue_jobs', 'IPN queue depth', ('state',),
+              {('backlog',): backlog['backlog'], ('processing',): backlog['processing'],
+               ('dead_letter',): backlog['deadLetters']}, kind='gauge')
+        family(lines, 'ipn_queue_lag_seconds', 'Age of the oldest queued IPN', (), {(): backlog['lagSeconds']},
+              kind='gauge')
+
+    broker = app.extensions.get('chat_broker')
+    if broker is not None:
+        chat = broker.stats_dict()
+        family(lines, 'chat_long_poll_waiting', 'Chat long-polls waiting', (), {(): chat['waiting']}, kind='gauge')
+        family(lines, 'chat_long_poll_events_total', 'Chat long-poll events', ('event',),
+              {(name,): chat[name] for name in ('published', 'waits', 'woken', 'timeouts', 'pollsSaved')})
+
+    return '\n'.join(lines) + '\n'
@@ -1,4 +1,5 @@
-from . import db, bcrypt
+from . import db
+from .passwords import password_hasher
 from flask_login import UserMixin
 import datetime
 
@@ -26,13 +27,21 @@ class User(db.Model, UserMixin):
     def __init__(self, name, email, password, role='buyer'):
         self.name = name
         self.email = email
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = password_hasher.hash(password)
         self.role = role
         self.registered_on = datetime.datetime.now()
         self.has_subscription = False
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password, password)
+        return password_hasher.check(self.password, password)
+
+    def upgrade_password_hash(self, password):
+        """After a successful check: rehash at the configured cost if the stored hash uses another"""
+        new_hash = password_hasher.rehash(self.password, password)
+        if new_hash is None:
+            return False
+        self.password = new_hash
+        return True
 
     def to_json(self):
         return {
@@ -47,6 +56,10 @@ class User(db.Model, UserMixin):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_user_id_created_on', 'user_id', 'created_on'),  # My listings
+        db.Index('ix_products_status_created_on', 'status', 'created_on'),  # Admin pending queue
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(200), nullable=False)
     location = db.Column(db.String(200), nullable=False)
@@ -79,6 +92,12 @@ class Image(db.Model):
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_utr_code', 'utr_code'),  # Payment callbacks and /payment-status
+        db.Index('ix_orders_user_id_ordered_on', 'user_id', 'ordered_on'),  # My orders
+        db.Index('ix_orders_ordered_on_id', 'ordered_on', 'id'),  # Admin keyset pagination
+        db.Index('ix_orders_txn_id', 'txn_id'),  # Payment callbacks update every order of a checkout
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     product_name = db.Column(db.String(200), nullable=False)
     quantity = db.Column(db.Float, nullable=False)
@@ -100,6 +119,8 @@ class Order(db.Model):
     
     ordered_on = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Checkout this order was paid under; utr_code is replaced by the gateway's id on success
+    txn_id = db.Column(db.String(50), db.ForeignKey('payment_transactions.txn_id'), nullable=True)
 
     def to_json(self, with_buyer=False):
         data = {
@@ -145,6 +166,66 @@ class Order(db.Model):
             }
         }
 
+class PaymentTransaction(db.Model):
+    """
+    PaymentTransaction Model - one gateway checkout (our txnid) and all of its orders
+    The status doubles as the callback idempotency record: a replayed callback
+    with an outcome already applied is answered from this row without writes
+    """
+    __tablename__ = 'payment_transactions'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    txn_id = db.Column(db.String(50), unique=True, nullable=False)  # txnid sent to the gateway
+    gateway = db.Column(db.String(20), nullable=False)  # payu, sabpaisa, airpay
+    source = db.Column(db.String(20), nullable=False, default='direct')  # direct, cart
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(50), nullable=False, default='Pending')  # Pending, Booked, Failed
+    gateway_txn_id = db.Column(db.String(100), nullable=True)  # mihpayid / sabpaisaTxnId / ap_transaction_id
+    created_on = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+    updated_on = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+    # Relationships
+    orders = db.relationship('Order', backref='payment_transaction', lazy=True)
+
+class IPNJob(db.Model):
+    """
+    IPNJob Model - a verified gateway notification waiting to be applied
+    Written by /airpay-ipn in queue mode, consumed by the IPN worker (api/ipn_queue.py)
+    """
+    __tablename__ = 'ipn_jobs'
+    __table_args__ = (
+        db.Index('ix_ipn_jobs_status_next_attempt_at', 'status', 'next_attempt_at'),  # Worker claim
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    gateway = db.Column(db.String(20), nullable=False)
+    txn_id = db.Column(db.String(50), nullable=False)
+    outcome = db.Column(db.String(50), nullable=False)  # Booked, Failed
+    gateway_txn_id = db.Column(db.String(100), nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # Raw notification form (JSON)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, processing
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+    last_error = db.Column(db.Text, nullable=True)
+    created_on = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+
+class IPNDeadLetter(db.Model):
+    """IPNDeadLetter Model - notifications that still failed after the last retry"""
+    __tablename__ = 'ipn_dead_letters'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_id = db.Column(db.Integer, nullable=False)
+    gateway = db.Column(db.String(20), nullable=False)
+    txn_id = db.Column(db.String(50), nullable=False)
+    outcome = db.Column(db.String(50), nullable=False)
+    gateway_txn_id = db.Column(db.String(100), nullable=True)
+    payload = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_on = db.Column(db.DateTime, nullable=False)  # When the notification was received
+    failed_on = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+
 class Cart(db.Model):
     """Cart Model - shopping cart for buyers"""
     __tablename__ = 'carts'
@@ -159,12 +240,20 @@ class Cart(db.Model):
     items = db.relationship('CartItem', backref='cart', lazy=True, cascade="all, delete-orphan")
 
     def to_json(self):
+        # Single pass over the items for the list and both totals
+        items = []
+        total_amount = 0
+        for item in self.items:
+            item_json = item.to_json()
+            total_amount += item_json['subtotal']
+            items.append(item_json)
+
         return {
             'id': self.id,
             'userId': self.user_id,
-            'items': [item.to_json() for item in self.items],
-            'totalItems': len(self.items),
-            'totalAmount': sum([item.quantity * item.price_per_unit for item in self.items]),
+            'items': items,
+            'totalItems': len(items),
+            'totalAmount': total_amount,
             'createdOn': self.created_on.isoformat(),
             'updatedOn': self.updated_on.isoformat(),
         }
@@ -172,6 +261,9 @@ class Cart(db.Model):
 class CartItem(db.Model):
     """CartItem Model - individual items in cart"""
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        db.Index('ix_cart_items_cart_id_product_id', 'cart_id', 'product_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), nullable=False)
@@ -204,6 +296,10 @@ class CartItem(db.Model):
 class Inquiry(db.Model):
     """Inquiry Model - for buyer inquiries awaiting seller approval"""
     __tablename__ = 'inquiries'
+    __table_args__ = (
+        db.Index('ix_inquiries_buyer_id_created_on', 'buyer_id', 'created_on'),
+        db.Index('ix_inquiries_seller_id_created_on', 'seller_id', 'created_on'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     product_id = db.Column(db.Integer, nullable=False)
@@ -275,6 +371,9 @@ class Inquiry(db.Model):
 class ChatMessage(db.Model):
     """Chat Message Model - for storing chat history between buyer and seller"""
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        db.Index('ix_chat_messages_inquiry_id_created_on', 'inquiry_id', 'created_on'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     inquiry_id = db.Column(db.Integer, db.ForeignKey('inquiries.id'), nullable=False)
@@ -0,0 +1,194 @@
+"""
+Password hashing on a bounded thread pool
+bcrypt is deliberately slow (about 250 ms per login at the default cost of
+12), and /api/auth/login and /signup used to run it on the request thread.
+In a threaded worker a burst of logins then used every core for hashing
+and slowed every other request of that worker. Hashes and checks now run
+on BCRYPT_WORKERS pool threads. The request thread only waits for its
+result, so at most BCRYPT_WORKERS cores are busy with bcrypt at a time.
+At most BCRYPT_QUEUE_SIZE more wait their turn. Beyond that a request gets
+PasswordHasherBusy after BCRYPT_QUEUE_TIMEOUT seconds, and the auth
+endpoints answer 503 with Retry-After.
+
+The cost (BCRYPT_LOG_ROUNDS) is read from the config. A stored hash records
+the cost it was made with ($2b$12$...). After a successful login,
+rehash() makes a new hash at the configured cost when the stored one
+differs, so changing the cost needs no migration. Each user is moved over
+on their next login.
+
+The pool threads run each call in the caller's contextvars context, so
+bcrypt time is still attributed to the request in /api/admin/metrics.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from . import bcrypt
+from .metrics import metrics
+
+
+class PasswordHasherBusy(Exception):
+    """No pool slot became free within BCRYPT_QUEUE_TIMEOUT"""
+
+
+def hash_cost(pw_hash: str) -> Optional[int]:
+    """The cost a bcrypt hash was made with ($2b$12$... -> 12); None if it is not a bcrypt hash"""
+    parts = pw_hash.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    bcrypt hash/check on a bounded pool
+
+    Settings come from the Flask config (see config.py):
+        BCRYPT_LOG_ROUNDS      cost of new hashes
+        BCRYPT_WORKERS         pool threads (0: one per CPU)
+        BCRYPT_QUEUE_SIZE      calls that may wait while every thread is busy
+        BCRYPT_QUEUE_TIMEOUT   seconds a caller waits for a slot before PasswordHasherBusy
+
+    The pool is started on first use, so it is created in each worker
+    process after a pre-forking server has forked.
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.workers = os.cpu_count() or 1
+        self.queue_size = 4 * self.workers
+        self.queue_timeout = 2.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self.pending = 0  # Calls holding a slot (running or queued); not reset by configure()
+        self._reset_counters()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Load the cost and pool settings from the Flask config"""
+        self.configure(
+            rounds=app.config.get('BCRYPT_LOG_ROUNDS', 12),
+            workers=app.config.get('BCRYPT_WORKERS', 0),
+            queue_size=app.config.get('BCRYPT_QUEUE_SIZE'),
+            queue_timeout=app.config.get('BCRYPT_QUEUE_TIMEOUT', 2.0),
+        )
+
+    def configure(self, rounds: int = 12, workers: int = 0, queue_size: Optional[int] = None,
+                  queue_timeout: float = 2.0) -> None:
+        """Replace the settings; a running pool finishes its calls and a new one starts on next use"""
+        workers = workers or os.cpu_count() or 1
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.rounds = rounds
+            self.workers = workers
+            self.queue_size = 4 * workers if queue_size is None else queue_size
+            self.queue_timeout = queue_timeout
+            self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+            self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        self.hashes = 0
+        self.checks = 0
+        self.rehashes = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            return self._executor
+
+    def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) on the pool and wait for its result"""
+        slots = self._slots
+        if not slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy(f'{self.workers + self.queue_size} password hashes already in progress')
+        with self._lock:
+            self.pending += 1
+
+        context = contextvars.copy_context()
+        queued = time.perf_counter()
+
+        def call():
+            waited = time.perf_counter() - queued
+            with self._lock:
+                self.wait_seconds += waited
+            return context.run(fn, *args)
+
+        try:
+            future = self._pool().submit(call)
+        except BaseException:
+            self._release(slots)
+            raise
+        future.add_done_callback(lambda _: self._release(slots))
+        return future.result()
+
+    def _release(self, slots: threading.BoundedSemaphore) -> None:
+        with self._lock:
+            self.pending -= 1
+        slots.release()
+
+    def hash(self, password: str) -> str:
+        """A new hash of password at the configured cost"""
+        with self._lock:
+            self.hashes += 1
+        return self.run(_hash, password, self.rounds)
+
+    def check(self, pw_hash: str, password: str) -> bool:
+        with self._lock:
+            self.checks += 1
+        return self.run(_check, pw_hash, password)
+
+    def needs_rehash(self, pw_hash: str) -> bool:
+        cost = hash_cost(pw_hash)
+        return cost is not None and cost != self.rounds
+
+    def rehash(self, pw_hash: str, password: str) -> Optional[str]:
+        """
+        A new hash of a password that has just been checked against pw_hash,
+        or None when pw_hash already has the configured cost
+        """
+        if not self.needs_rehash(pw_hash):
+            return None
+        new_hash = self.hash(password)
+        with self._lock:
+            self.rehashes += 1
+        return new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'cost': self.rounds,
+                'workers': self.workers,
+                'queueSize': self.queue_size,
+                'pending': self.pending,
+                'hashes': self.hashes,
+                'checks': self.checks,
+                'rehashes': self.rehashes,
+                'rejected': self.rejected,
+                'waitSeconds': round(self.wait_seconds, 6),
+            }
+
+
+def _hash(password: str, rounds: int) -> str:
+    with metrics.time_crypto('bcrypt_hash'):
+        return bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+
+def _check(pw_hash: str, password: str) -> bool:
+    with metrics.time_crypto('bcrypt_check'):
+        return bcrypt.check_password_hash(pw_hash, password)
+
+
+# Shared by every app in this process
+password_hasher = PasswordHasher()
@@ -4,19 +4,20 @@ import uuid
 import hashlib
 import re
 import time
+import datetime
+import logging
+from collections import namedtuple
+from sqlalchemy import insert, update, delete, select, or_
 from . import db
-from .models import Order, Inquiry, Cart, CartItem
-from .sabpaisa_utils import (
-    build_payment_request,
-    create_encrypted_request,
-    parse_callback_response
-)
-from .airpay_utils import (
-    build_payment_request as build_airpay_request,
-    validate_callback_response as validate_airpay_response
-)
+from .models import Order, Inquiry, Cart, CartItem, PaymentTransaction
+from .cart import load_cart, invalidate_cart_count, quote_cart_shipping
+from .shipping import ShippingError
+from .metrics import metrics
+# Gateway helpers (and pycryptodome) are imported inside the handlers that
+# use them, so loading this blueprint does not pay for the crypto stack
 
 payments_bp = Blueprint('payments', __name__)
+logger = logging.getLogger(__name__)
 
 def generate_airpay_orderid():
     """
@@ -190,6 +191,7 @@ def sanitize_payer_name(name):
     # If after sanitization the name is empty, return a default
     return sanitized if sanitized else "Customer"
 
+@metrics.time_crypto('payu_hash')
 def generate_hash(params, salt):
     """Generate PayU payment hash"""
     # Extract UDF fields (udf1 through udf10)
@@ -207,6 +209,7 @@ def generate_hash(params, salt):
     hash_string = f"{params['key']}|{params['txnid']}|{params['amount']}|{params['productinfo']}|{params['firstname']}|{params['email']}|{udf1}|{udf2}|{udf3}|{udf4}|{udf5}|{udf6}|{udf7}|{udf8}|{udf9}|{udf10}|{salt}"
     return hashlib.sha512(hash_string.encode('utf-8')).hexdigest().lower()
 
+@metrics.time_crypto('payu_verify')
 def verify_hash(params, salt):
     """Verify PayU response hash"""
     # Extract UDF fields from response
@@ -236,6 +239,8 @@ def initiate_payment():
     - /initiate-sabpaisa-payment -> SabPaisa
     - /initiate-payment -> Airpay (legacy route)
     """
+    from .sabpaisa_utils import build_payment_request, create_encrypted_request
+    from .airpay_utils import build_payment_request as build_airpay_request
     # Handle OPTIONS preflight request
     from flask import make_response
     if request.method == 'OPTIONS':
@@ -282,8 +287,16 @@ def initiate_payment():
     else:
         txnid = str(uuid.uuid4())
 
-    # Create the order and save it to the DB with a 'Pending' status
+    # Create the transaction and its order and save them to the DB with a 'Pending' status
     try:
+        db.session.add(PaymentTransaction(
+            txn_id=txnid,
+            gateway=gateway,
+            source='direct',
+            user_id=current_user.id,
+            amount=float(data['total_amount']),
+            status='Pending'
+        ))
         new_order = Order(
             user_id=current_user.id,
             product_name=data['product_name'],
@@ -300,7 +313,8 @@ def initiate_payment():
             address_line_2='',
             city='',
             state='',
-            status='Pending'
+            status='Pending',
+            txn_id=txnid
         )
         db.session.add(new_order)
         db.session.commit()
@@ -311,7 +325,7 @@ def initiate_payment():
     try:
         if gateway == 'sabpaisa':
             # SabPaisa payment gateway
-            print(f"[SABPAISA] Processing payment for txnid: {txnid}")
+            logger.info('SabPaisa payment for txnid %s', txnid)
             client_code = current_app.config['SABPAISA_CLIENT_CODE']
 
             # Sanitize payer name to remove special characters
@@ -338,8 +352,6 @@ def initiate_payment():
                 current_app.config['SABPAISA_AUTH_IV']
             )
 
-            print(f"[SABPAISA] Payment URL: {current_app.config['SABPAISA_BASE_URL']}")
-
             return jsonify({
                 'payment_url': current_app.config['SABPAISA_BASE_URL'],
                 'encData': enc_data,
@@ -348,7 +360,7 @@ def initiate_payment():
 
         elif gateway == 'airpay':
             # Airpay V4 payment gateway with OAuth2
-            print(f"[AIRPAY] Processing payment for txnid: {txnid}")
+            logger.info('Airpay payment for txnid %s', txnid)
             buyer_first_name, buyer_last_name = split_name_for_airpay(current_user.name)
 
             # Get mobile number from request (required for Airpay)
@@ -366,7 +378,7 @@ def initiate_payment():
             if buyer_phone[0] not in ['6', '7', '8', '9']:
                 return jsonify({'error': 'Mobile number must start with 6, 7, 8, or 9'}), 400
 
-            print(f"[AIRPAY] Using mobile number: {buyer_phone}")
+            logger.debug('Airpay buyer mobile %s', buyer_phone)
 
             # Build Airpay V4 payment request (this gets OAuth2 token internally)
             airpay_params = build_airpay_request(
@@ -391,8 +403,6 @@ def initiate_payment():
                 client_secret=current_app.config['AIRPAY_CLIENT_SECRET'],
             )
 
-            print(f"[AIRPAY] Payment URL: {airpay_params.get('airpay_url', 'N/A')}")
-
             # Return with payment_url field for frontend compatibility
             response = airpay_params.copy()
             response['payment_url'] = response.get('airpay_url', '')
@@ -400,7 +410,7 @@ def initiate_payment():
 
         else:
             # PayU payment gateway (default)
-            print(f"[PAYU] Processing payment for txnid: {txnid}")
+            logger.info('PayU payment for txnid %s', txnid)
 
             payu_params = {
                 'key': current_app.config['PAYU_KEY'],
@@ -419,8 +429,7 @@ def initiate_payment():
             payu_params['hash'] = payment_hash
 
             payment_url = 'https://secure.payu.in/_payment'
-            print(f"[PAYU] Payment URL: {payment_url}")
-            print(f"[PAYU] Amount: {payu_params['amount']}, Product: {payu_params['productinfo']}")
+            logger.debug('PayU amount %s, product %s', payu_params['amount'], payu_params['productinfo'])
 
             return jsonify({
                 'payment_url': payment_url,
@@ -437,11 +446,64 @@ def initiate_payment():
             })
 
     except Exception as e:
-        print(f"[PAYMENT ERROR] {gateway.upper()} payment failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('%s payment failed for txnid %s', gateway, txnid)
         return jsonify({'error': str(e)}), 500
 
+def create_cart_orders(cart, user_id, txnid, gateway, data):
+    """
+    Insert the checkout's PaymentTransaction, then one Pending order per cart
+    item in a single multi-row INSERT
+    All orders share the checkout txnid (utr_code and txn_id). The caller commits.
+    Each item ships from its listing's state to the buyer's, priced server-side
+    like /api/cart/quote (total_price is the goods, amount_paid adds the
+    item's shipping charge).
+    Returns (order_ids, total_amount)
+
+    Raises:
+        ShippingError: an item cannot be shipped (e.g. a non-positive quantity)
+    """
+
+    ordered_on = datetime.datetime.now()
+    shared = {
+        'user_id': user_id,
+        'payment_option': data['paymentOption'],
+        'utr_code': txnid,  # Same txnid for all items in this cart checkout
+        'txn_id': txnid,
+        'buyer_name': data['buyerName'],
+        'buyer_mobile': data['mobile'],
+        'pincode': data['pincode'],
+        'address_line_1': data['addressLine1'],
+        'address_line_2': data.get('addressLine2', ''),
+        'city': data['city'],
+        'state': data['state'],
+        'status': 'Pending',
+        'ordered_on': ordered_on,
+    }
+
+    shipping = quote_cart_shipping(cart, data['state'])
+
+    rows = []
+    total_amount = 0
+    for item, (_, shipping_charge) in zip(cart.items, shipping):
+        item_total = item.quantity * item.price_per_unit
+        total_amount += item_total + shipping_charge
+        rows.append(dict(
+            shared,
+            product_name=item.product_name,
+            quantity=item.quantity,
+            unit=item.unit,
+            total_price=item_total,
+            amount_paid=item_total + shipping_charge,
+        ))
+
+    db.session.execute(insert(PaymentTransaction).values(
+        txn_id=txnid, gateway=gateway, source='cart', user_id=user_id,
+        amount=total_amount, status='Pending', created_on=ordered_on, updated_on=ordered_on
+    ))
+    result = db.session.execute(insert(Order).returning(Order.id), rows)
+    return [row.id for row in result], total_amount
+
+
 @payments_bp.route('/initiate-cart-payment', methods=['POST'])
 @login_required
 def initiate_cart_payment():
@@ -449,6 +511,8 @@ def initiate_cart_payment():
     Initiate payment for all items in cart
     Creates orders for each cart item and returns payment gateway params
     """
+    from .sabpaisa_utils import build_payment_request, create_encrypted_request
+    from .airpay_utils import build_payment_request as build_airpay_request
     data = request.get_json()
 
     required_fields = [
@@ -459,8 +523,8 @@ def initiate_cart_payment():
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        # Get user's cart
-        cart = Cart.query.filter_by(user_id=current_user.id).first()
+        # Get user's cart and its items in one query
+        cart = load_cart(current_user.id)
 
         if not cart or len(cart.items) == 0:
             return jsonify({"error": "Cart is empty"}), 400
@@ -476,34 +540,13 @@ def initiate_cart_payment():
         else:
             txnid = str(uuid.uuid4())
 
-        # Calculate total amount
-        total_amount = sum([item.quantity * item.price_per_unit for item in cart.items])
-
-        # Create orders for each cart item
-        created_orders = []
-        for item in cart.items:
-            item_total = item.quantity * item.price_per_unit
-            new_order = Order(
-                user_id=current_user.id,
-                product_name=item.product_name,
-                quantity=item.quantity,
-                unit=item.unit,
-                total_price=item_total,
-                amount_paid=item_total,
-                payment_option=data['paymentOption'],
-                utr_code=txnid,  # Same txnid for all items in this cart checkout
-                buyer_name=data['buyerName'],
-                buyer_mobile=data['mobile'],
-                pincode=data['pincode'],
-                address_line_1=data['addressLine1'],
-                address_line_2=data.get('addressLine2', ''),
-                city=data['city'],
-                state=data['state'],
-                status='Pending'
-            )
-            db.session.add(new_order)
-            created_orders.append(new_order)
+        # The transaction row, then one multi-row INSERT ... RETURNING for all cart items
+        order_ids, total_amount = create_cart_orders(cart, current_user.id, txnid, gateway, data)
+        logger.info('Cart checkout created %d orders for txnid %s', len(order_ids), txnid)
 
+        # Read before commit; commit expires the cart and the user
+        item_count = len(cart.items)
+        buyer_email = current_user.email
         db.session.commit()
 
         # Prepare payment gateway params based on gateway selection
@@ -515,7 +558,7 @@ def initiate_cart_payment():
                 transaction_id=txnid,
                 amount=total_amount,
                 buyer_name=data['buyerName'],
-                buyer_email=current_user.email,
+                buyer_email=buyer_email,
                 buyer_phone=data['mobile'],
                 currency='INR'
             )
@@ -529,10 +572,10 @@ def initiate_cart_payment():
             buyer_first_name, buyer_last_name = split_name_for_airpay(data['buyerName'])
 
             # Generate product description
-            product_desc = f"Cart checkout - {len(cart.items)} items"
+            product_desc = f"Cart checkout - {item_count} items"
 
             airpay_params = build_airpay_request(
-                buyer_email=current_user.email,
+                buyer_email=buyer_email,
                 buyer_phone=data['mobile'],
                 buyer_first_name=buyer_first_name,
                 buyer_last_name=buyer_last_name,
@@ -550,10 +593,10 @@ def initiate_cart_payment():
             salt = current_app.config['PAYU_SALT']
 
             # Generate product description
-            product_name = f"Cart checkout - {len(cart.items)} items"
+            product_name = f"Cart checkout - {item_count} items"
 
             amount_str = f"{total_amount:.2f}"
-            email = current_user.email
+            email = buyer_email
             productinfo = product_name
             firstname = data['buyerName']
             phone = data['mobile']
@@ -581,10 +624,105 @@ def initiate_cart_payment():
 
             return jsonify(payu_params)
 
+    except ShippingError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Failed to initiate cart payment: {str(e)}'}), 500
 
+# Result of applying a gateway callback: outcome is 'applied', 'duplicate' or 'not_found',
+# status is the transaction's status afterwards, cart_user_id the buyer whose cart was emptied
+PaymentResult = namedtuple('PaymentResult', ['outcome', 'status', 'cart_user_id'], defaults=[None])
+
+
+def apply_payment_result(txnid, status, gateway_txn_id=None, commit=True):
+    """
+    Record a gateway callback outcome ('Booked' or 'Failed') for a checkout
+
+    One indexed lookup on payment_transactions.txn_id decides whether there is
+    anything to do: a replay of an outcome already applied (or any callback
+    after the transaction is Booked) returns 'duplicate' without writing.
+    Otherwise the transaction is claimed with a conditional UPDATE, so two
+    concurrent deliveries of the same callback apply it once, and every linked
+    order is updated with one set-based UPDATE ... WHERE txn_id = ?.
+    A successful cart checkout also empties the buyer's cart.
+
+    With commit=False the caller commits (e.g. together with its own job
+    bookkeeping) and then calls invalidate_cart_count(result.cart_user_id).
+    """
+    transaction = db.session.execute(
+        select(PaymentTransaction.status, PaymentTransaction.user_id, PaymentTransaction.source)
+        .where(PaymentTransaction.txn_id == txnid)
+    ).first()
+
+    if transaction is None:
+        return apply_legacy_payment_result(txnid, status, gateway_txn_id, commit=commit)
+
+    if transaction.status in (status, 'Booked'):
+        return PaymentResult('duplicate', transaction.status)
+
+    values = {'status': status}
+    if status == 'Booked' and gateway_txn_id:
+        values['gateway_txn_id'] = gateway_txn_id
+
+    claimed = db.session.execute(
+        update(PaymentTransaction)
+        .where(PaymentTransaction.txn_id == txnid, PaymentTransaction.status == transaction.status)
+        .values(updated_on=datetime.datetime.now(), **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        # Another delivery of this callback got there first
+        db.session.rollback()
+        return PaymentResult('duplicate', status)
+
+    order_values = {'status': status}
+    if status == 'Booked' and gateway_txn_id:
+        order_values['utr_code'] = gateway_txn_id  # Gateway's transaction ID as the UTR
+    db.session.execute(
+        update(Order).where(Order.txn_id == txnid).values(**order_values)
+        .execution_options(synchronize_session=False)
+    )
+
+    clear_cart = status == 'Booked' and transaction.source == 'cart'
+    if clear_cart:
+        db.session.execute(
+            delete(CartItem)
+            .where(CartItem.cart_id.in_(select(Cart.id).where(Cart.user_id == transaction.user_id)))
+            .execution_options(synchronize_session=False)
+        )
+
+    cart_user_id = transaction.user_id if clear_cart else None
+    if commit:
+        db.session.commit()
+        if cart_user_id:
+            invalidate_cart_count(cart_user_id)
+    return PaymentResult('applied', status, cart_user_id)
+
+
+def apply_legacy_payment_result(txnid, status, gateway_txn_id=None, commit=True):
+    """
+    Callback for orders created before payment_transactions existed:
+    update every order still carrying the txnid as its utr_code
+    """
+    values = {'status': status}
+    if status == 'Booked' and gateway_txn_id:
+        values['utr_code'] = gateway_txn_id
+    updated = db.session.execute(
+        update(Order)
+        .where(Order.utr_code == txnid, Order.status != 'Booked')
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.session.rollback()
+        return PaymentResult('not_found', None)
+    if commit:
+        db.session.commit()
+    return PaymentResult('applied', status)
+
+
 @payments_bp.route('/payment-success', methods=['POST'])
 def payment_success():
     """Handle successful payment callback from PayU"""
@@ -599,21 +737,12 @@ def payment_success():
             # FIXED: Using correct frontend URL
             return redirect('https://mandi2mandi.com/confirmation?status=error&message=Invalid+hash')
         
-        # Update order status
-        order = Order.query.filter_by(utr_code=payu_data.get('txnid')).first()
-
-        if order:
-            order.status = 'Booked'
-            order.utr_code = payu_data.get('mihpayid', payu_data.get('txnid'))  # Update with PayU transaction ID
-
-            # Clear cart after successful payment (for cart checkout)
-            # This will only clear if it was a cart checkout (multiple orders with same txnid)
-            user_cart = Cart.query.filter_by(user_id=order.user_id).first()
-            if user_cart:
-                CartItem.query.filter_by(cart_id=user_cart.id).delete()
+        # Book every order of the checkout with the PayU transaction ID (clears the cart for cart checkouts)
+        apply_payment_result(
+            payu_data.get('txnid'), 'Booked',
+            gateway_txn_id=payu_data.get('mihpayid', payu_data.get('txnid'))
+        )
 
-            db.session.commit()
-        
         # FIXED: Using correct frontend URL    
         return redirect(f'https://mandi2mandi.com/confirmation?status=success&txnid={payu_data.get("txnid")}')
     except Exception as e:
@@ -626,12 +755,8 @@ def payment_failure():
     
     try:
         # Update order status
-        order = Order.query.filter_by(utr_code=payu_data.get('txnid')).first()
-        
-        if order:
-            order.status = 'Failed'
-            db.session.commit()
-        
+        apply_payment_result(payu_data.get('txnid'), 'Failed')
+
         # FIXED: Using correct frontend URL    
         return redirect(f'https://mandi2mandi.com/confirmation?status=failed&txnid={payu_data.get("txnid")}')
     except Exception as e:
@@ -642,7 +767,11 @@ def payment_failure():
 def get_payment_status(txnid):
     """Get payment status for a transaction"""
     try:
-        order = Order.query.filter_by(utr_code=txnid, user_id=current_user.id).first()
+        # utr_code holds the gateway's ID once paid, txn_id keeps ours
+        order = Order.query.filter(
+            or_(Order.txn_id == txnid, Order.utr_code == txnid),
+            Order.user_id == current_user.id
+        ).first()
 
         if not order:
             return jsonify({"error": "Order not found"}), 404
@@ -668,27 +797,25 @@ def get_payu_hash():
     Generate PayU hash, SabPaisa encrypted data, or Airpay params for subscription payment
     This endpoint is called by Next.js frontend to initiate payment
     """
+    from .sabpaisa_utils import build_payment_request, create_encrypted_request
+    from .airpay_utils import build_payment_request as build_airpay_request
     try:
         data = request.get_json()
-        print(f"\n{'='*60}")
-        print(f"[PAYMENT HASH DEBUG] Received request")
-        print(f"{'='*60}")
-
         if not data:
-            print("[PAYMENT HASH DEBUG] ERROR: No data provided")
+            logger.warning('Payment hash request without data')
             return jsonify({"error": "No data provided"}), 400
 
-        print(f"[PAYMENT HASH DEBUG] Request data: {data}")
+        logger.debug('Payment hash request: %s', data)
 
         required_fields = ['txnid', 'amount', 'productinfo', 'firstname', 'email']
         if not all(field in data for field in required_fields):
             missing = [f for f in required_fields if f not in data]
-            print(f"[PAYMENT HASH DEBUG] ERROR: Missing required fields: {missing}")
+            logger.warning('Payment hash request missing fields: %s', missing)
             return jsonify({"error": "Missing required fields"}), 400
 
         # Get selected gateway (default to PayU for backward compatibility)
         gateway = data.get('gateway', 'payu').lower()
-        print(f"[PAYMENT HASH DEBUG] Selected gateway: {gateway}")
+        logger.info('Payment hash for txnid %s via %s', data['txnid'], gateway)
 
         if gateway == 'sabpaisa':
             # SabPaisa payment gateway
@@ -731,20 +858,18 @@ def get_payu_hash():
             }), 200
         elif gateway == 'airpay':
             # Airpay V4 payment gateway
-            print(f"[PAYMENT HASH DEBUG] Processing Airpay V4 payment")
-            print(f"[PAYMENT HASH DEBUG] Airpay config check:")
-            print(f"  MERCHANT_ID: {current_app.config.get('AIRPAY_MERCHANT_ID', 'NOT SET')}")
-            print(f"  USERNAME: {current_app.config.get('AIRPAY_USERNAME', 'NOT SET')}")
-            print(f"  PASSWORD: {'SET' if current_app.config.get('AIRPAY_PASSWORD') else 'NOT SET'}")
-            print(f"  SECRET_KEY: {'SET' if current_app.config.get('AIRPAY_SECRET_KEY') else 'NOT SET'}")
-            print(f"  CLIENT_ID: {'SET' if current_app.config.get('AIRPAY_CLIENT_ID') else 'NOT SET'}")
-            print(f"  CLIENT_SECRET: {'SET' if current_app.config.get('AIRPAY_CLIENT_SECRET') else 'NOT SET'}")
-            print(f"  BASE_URL: {current_app.config.get('AIRPAY_BASE_URL', 'NOT SET')}")
+            if logger.isEnabledFor(logging.DEBUG):
+                config = current_app.config
+                missing = [name for name in ('AIRPAY_MERCHANT_ID', 'AIRPAY_USERNAME', 'AIRPAY_PASSWORD',
+                                             'AIRPAY_SECRET_KEY', 'AIRPAY_CLIENT_ID', 'AIRPAY_CLIENT_SECRET')
+                           if not config.get(name)]
+                logger.debug('Airpay config: merchant %s, base URL %s, missing %s',
+                             config.get('AIRPAY_MERCHANT_ID'), config.get('AIRPAY_BASE_URL'), missing or 'none')
 
             # Split buyer name into first and last name (sanitized for Airpay)
             buyer_first_name, buyer_last_name = split_name_for_airpay(data['firstname'])
 
-            print(f"[PAYMENT HASH DEBUG] Name split: '{data['firstname']}' -> first='{buyer_first_name}', last='{buyer_last_name}'")
+            logger.debug("Name split: %r -> first=%r, last=%r", data['firstname'], buyer_first_name, buyer_last_name)
 
             # Build Airpay V4 payment request for subscription with OAuth2
             # Note: For subscription payments, we don't have real user address data
@@ -761,11 +886,7 @@ def get_payu_hash():
                 # Use a valid but generic number
                 # Airpay may reject obvious test patterns like 9999999999, 1111111111, etc.
                 buyer_phone = '7012345678'  # Generic valid format
-                print(f"[PAYMENT HASH DEBUG] WARNING: No phone provided, using placeholder: {buyer_phone}")
-            else:
-                print(f"[PAYMENT HASH DEBUG] Phone number provided: {buyer_phone}")
-
-            print(f"[PAYMENT HASH DEBUG] Calling build_airpay_request...")
+                logger.warning('No phone for Airpay txnid %s, using the placeholder number', data['txnid'])
 
             airpay_params = build_airpay_request(
                 buyer_email=data['email'],
@@ -789,12 +910,7 @@ def get_payu_hash():
                 client_secret=current_app.config['AIRPAY_CLIENT_SECRET'],
             )
 
-            print(f"[PAYMENT HASH DEBUG] Airpay params generated successfully")
-            print(f"[PAYMENT HASH DEBUG] Params keys: {list(airpay_params.keys())}")
-
             airpay_params['gateway'] = 'airpay'
-
-            print(f"[PAYMENT HASH DEBUG] Returning Airpay params to frontend")
             return jsonify(airpay_params), 200
         else:
             # PayU payment gateway (default)
@@ -825,6 +941,7 @@ def get_payu_hash():
             }), 200
 
     except Exception as e:
+        logger.exception('Payment hash failed')
         return jsonify({"error": f"Failed to generate hash: {str(e)}"}), 500
 
 
@@ -961,6 +1078,7 @@ def sabpaisa_subscription_payment_success():
     """
     Handle successful subscription payment callback from SabPaisa
     """
+    from .sabpaisa_utils import parse_callback_response
     try:
         # Get encrypted response from SabPaisa
         enc_data = request.form.get('encData')
@@ -1002,6 +1120,7 @@ def sabpaisa_subscription_payment_failure():
     """
     Handle failed subscription payment callback from SabPaisa
     """
+    from .sabpaisa_utils import parse_callback_response
     try:
         # Get encrypted response from SabPaisa
         enc_data = request.form.get('encData')
@@ -1030,6 +1149,7 @@ def sabpaisa_subscription_payment_failure():
 @payments_bp.route('/sabpaisa-payment-success', methods=['POST'])
 def sabpaisa_payment_success():
     """Handle successful payment callback from SabPaisa"""
+    from .sabpaisa_utils import parse_callback_response
     try:
         # Get encrypted response from SabPaisa
         enc_data = request.form.get('encData')
@@ -1052,14 +1172,8 @@ def sabpaisa_payment_success():
         # Get transaction ID
         txnid = response_data.get('clientTxnId', '')
 
-        # Update order status
-        order = Order.query.filter_by(utr_code=txnid).first()
-
-        if order:
-            order.status = 'Booked'
-            # Use SabPaisa transaction reference as UTR
-            order.utr_code = response_data.get('sabpaisaTxnId', txnid)
-            db.session.commit()
+        # Update order status, using the SabPaisa transaction reference as UTR
+        apply_payment_result(txnid, 'Booked', gateway_txn_id=response_data.get('sabpaisaTxnId', txnid))
 
         return redirect(f'https://mandi2mandi.com/confirmation?status=success&txnid={txnid}')
     except Exception as e:
@@ -1069,6 +1183,7 @@ def sabpaisa_payment_success():
 @payments_bp.route('/sabpaisa-payment-failure', methods=['POST'])
 def sabpaisa_payment_failure():
     """Handle failed payment callback from SabPaisa"""
+    from .sabpaisa_utils import parse_callback_response
     try:
         # Get encrypted response from SabPaisa
         enc_data = request.form.get('encData')
@@ -1085,11 +1200,8 @@ def sabpaisa_payment_failure():
             txnid = request.form.get('txnId', '')
 
         # Update order status
-        order = Order.query.filter_by(utr_code=txnid).first()
-
-        if order:
-            order.status = 'Failed'
-            db.session.commit()
+        if txnid:
+            apply_payment_result(txnid, 'Failed')
 
         return redirect(f'https://mandi2mandi.com/confirmation?status=failed&txnid={txnid}')
     except Exception as e:
@@ -1103,11 +1215,12 @@ def sabpaisa_payment_failure():
 @payments_bp.route('/airpay-payment-success', methods=['POST'])
 def airpay_payment_success():
     """Handle successful payment callback from Airpay V4"""
+    from .airpay_utils import validate_callback_response as validate_airpay_response
     try:
         # Get form data from Airpay V4 (contains encrypted 'response' field)
         airpay_data = request.form.to_dict()
 
-        print(f"[AIRPAY V4 DEBUG] Callback received: {list(airpay_data.keys())}")
+        logger.debug('Airpay success callback', extra={'fields': list(airpay_data)})
 
         # Validate and decrypt the callback response
         validation_result = validate_airpay_response(
@@ -1119,7 +1232,7 @@ def airpay_payment_success():
 
         if not validation_result['valid']:
             error_msg = validation_result.get('error', 'Invalid response')
-            print(f"[AIRPAY V4 ERROR] Validation failed: {error_msg}")
+            logger.warning('Airpay callback validation failed: %s', error_msg)
             return redirect(f'https://mandi2mandi.com/confirmation?status=error&message={error_msg}')
 
         # Check transaction status (200 = SUCCESS in Airpay)
@@ -1127,41 +1240,33 @@ def airpay_payment_success():
         txnid = validation_result['transaction_id']
 
         if transaction_status == '200':
-            # Update order status
-            order = Order.query.filter_by(utr_code=txnid).first()
-
-            if order:
-                order.status = 'Booked'
-                order.utr_code = validation_result['ap_transaction_id']  # Update with Airpay transaction ID
-                db.session.commit()
+            # Update order status with the Airpay transaction ID
+            apply_payment_result(txnid, 'Booked', gateway_txn_id=validation_result['ap_transaction_id'])
 
-            print(f"[AIRPAY V4 DEBUG] Payment successful for txnid: {txnid}")
+            logger.info('Airpay payment successful for txnid %s', txnid)
             return redirect(f'https://mandi2mandi.com/confirmation?status=success&txnid={txnid}')
         else:
             # Payment failed but callback received
-            order = Order.query.filter_by(utr_code=txnid).first()
-
-            if order:
-                order.status = 'Failed'
-                db.session.commit()
+            apply_payment_result(txnid, 'Failed')
 
             message = validation_result.get('message', 'Payment failed')
-            print(f"[AIRPAY V4 DEBUG] Payment failed: {message}")
+            logger.info('Airpay payment failed for txnid %s: %s', txnid, message)
             return redirect(f'https://mandi2mandi.com/confirmation?status=failed&txnid={txnid}&message={message}')
 
     except Exception as e:
-        print(f"[AIRPAY V4 ERROR] Exception: {str(e)}")
+        logger.exception('Airpay success callback failed')
         return redirect(f'https://mandi2mandi.com/confirmation?status=error&message={str(e)}')
 
 
 @payments_bp.route('/airpay-payment-failure', methods=['POST'])
 def airpay_payment_failure():
     """Handle failed payment callback from Airpay V4"""
+    from .airpay_utils import validate_callback_response as validate_airpay_response
     try:
         # Get form data from Airpay V4
         airpay_data = request.form.to_dict()
 
-        print(f"[AIRPAY V4 DEBUG] Failure callback received: {list(airpay_data.keys())}")
+        logger.debug('Airpay failure callback', extra={'fields': list(airpay_data)})
 
         # Try to decrypt and get transaction ID
         txnid = ''
@@ -1180,16 +1285,12 @@ def airpay_payment_failure():
 
         if txnid:
             # Update order status
-            order = Order.query.filter_by(utr_code=txnid).first()
-
-            if order:
-                order.status = 'Failed'
-                db.session.commit()
+            apply_payment_result(txnid, 'Failed')
 
         return redirect(f'https://mandi2mandi.com/confirmation?status=failed&txnid={txnid}')
 
     except Exception as e:
-        print(f"[AIRPAY V4 ERROR] Failure exception: {str(e)}")
+        logger.exception('Airpay failure callback failed')
         return redirect(f'https://mandi2mandi.com/confirmation?status=error&message={str(e)}')
 
 
@@ -1200,11 +1301,12 @@ def airpay_payment_failure():
 @payments_bp.route('/airpay-subscription-success', methods=['POST'])
 def airpay_subscription_payment_success():
     """Handle successful subscription payment callback from Airpay V4"""
+    from .airpay_utils import validate_callback_response as validate_airpay_response
     try:
         # Get form data from Airpay V4 (contains encrypted 'response' field)
         airpay_data = request.form.to_dict()
 
-        print(f"[AIRPAY V4 SUBSCRIPTION DEBUG] Callback received: {list(airpay_data.keys())}")
+        logger.debug('Airpay subscription success callback', extra={'fields': list(airpay_data)})
 
         # Validate and decrypt the callback response
         validation_result = validate_airpay_response(
@@ -1216,7 +1318,7 @@ def airpay_subscription_payment_success():
 
         if not validation_result['valid']:
             error_msg = validation_result.get('error', 'Invalid response')
-            print(f"[AIRPAY V4 SUBSCRIPTION ERROR] Validation failed: {error_msg}")
+            logger.warning('Airpay subscription callback validation failed: %s', error_msg)
             return redirect(f'https://mandi2mandi.com/payment/failed?reason={error_msg}')
 
         # Check transaction status (200 = SUCCESS in Airpay)
@@ -1225,7 +1327,7 @@ def airpay_subscription_payment_success():
         ap_txn_id = validation_result['ap_transaction_id']
 
         if transaction_status == '200':
-            print(f"[AIRPAY V4 SUBSCRIPTION DEBUG] Payment successful for txnid: {txnid}")
+            logger.info('Airpay subscription payment successful for txnid %s', txnid)
             # Payment is verified - redirect to Next.js success handler
             return redirect(
                 f'https://mandi2mandi.com/api/payment/success?'
@@ -1237,22 +1339,23 @@ def airpay_subscription_payment_success():
         else:
             # Payment failed but callback received
             message = validation_result.get('message', 'Payment failed')
-            print(f"[AIRPAY V4 SUBSCRIPTION DEBUG] Payment failed: {message}")
+            logger.info('Airpay subscription payment failed for txnid %s: %s', txnid, message)
             return redirect(f'https://mandi2mandi.com/payment/failed?txnid={txnid}&message={message}')
 
     except Exception as e:
-        print(f"[AIRPAY V4 SUBSCRIPTION ERROR] Exception: {str(e)}")
+        logger.exception('Airpay subscription success callback failed')
         return redirect(f'https://mandi2mandi.com/payment/failed?reason={str(e)}')
 
 
 @payments_bp.route('/airpay-subscription-failure', methods=['POST'])
 def airpay_subscription_payment_failure():
     """Handle failed subscription payment callback from Airpay V4"""
+    from .airpay_utils import validate_callback_response as validate_airpay_response
     try:
         # Get form data from Airpay V4
         airpay_data = request.form.to_dict()
 
-        print(f"[AIRPAY V4 SUBSCRIPTION DEBUG] Failure callback received: {list(airpay_data.keys())}")
+        logger.debug('Airpay subscription failure callback', extra={'fields': list(airpay_data)})
 
         # Try to decrypt and get transaction ID
         txnid = ''
@@ -1272,7 +1375,7 @@ def airpay_subscription_payment_failure():
         return redirect(f'https://mandi2mandi.com/payment/failed?txnid={txnid}')
 
     except Exception as e:
-        print(f"[AIRPAY V4 SUBSCRIPTION ERROR] Failure exception: {str(e)}")
+        logger.exception('Airpay subscription failure callback failed')
         return redirect(f'https://mandi2mandi.com/payment/failed?reason={str(e)}')
 
 
@@ -1288,6 +1391,7 @@ def airpay_ipn():
     This receives notifications for pending/failed transactions that couldn't complete in real-time
     Reference: https://sanctum.airpay.co.in - IPN Callback response
     """
+    from .airpay_utils import validate_callback_response as validate_airpay_response
     # Handle OPTIONS preflight
     from flask import make_response
     if request.method == 'OPTIONS':
@@ -1302,13 +1406,10 @@ def airpay_ipn():
         # Get encrypted response from Airpay
         airpay_data = request.form.to_dict()
 
-        print(f"\n{'='*60}")
-        print(f"[AIRPAY IPN] Received S2S notification")
-        print(f"{'='*60}")
-        print(f"[AIRPAY IPN] Form keys: {list(airpay_data.keys())}")
+        logger.debug('Airpay IPN received', extra={'fields': list(airpay_data)})
 
         if not airpay_data or 'response' not in airpay_data:
-            print(f"[AIRPAY IPN ERROR] No response data received")
+            logger.warning('Airpay IPN without response data')
             return jsonify({'status': 'error', 'message': 'No response data'}), 400
 
         # Validate and decrypt the response
@@ -1321,7 +1422,7 @@ def airpay_ipn():
 
         if not validation_result['valid']:
             error_msg = validation_result.get('error', 'Invalid response')
-            print(f"[AIRPAY IPN ERROR] Validation failed: {error_msg}")
+            logger.warning('Airpay IPN validation failed: %s', error_msg)
             return jsonify({'status': 'error', 'message': error_msg}), 400
 
         # Extract transaction details
@@ -1331,48 +1432,45 @@ def airpay_ipn():
         amount = validation_result['amount']
         message = validation_result['message']
 
-        print(f"[AIRPAY IPN] Transaction Details:")
-        print(f"  - TxnID: {txnid}")
-        print(f"  - Airpay TxnID: {ap_txn_id}")
-        print(f"  - Status: {transaction_status}")
-        print(f"  - Amount: {amount}")
-        print(f"  - Message: {message}")
-
-        # Update order status based on transaction status
-        order = Order.query.filter_by(utr_code=txnid).first()
+        logger.info('Airpay IPN for txnid %s: status %s', txnid, transaction_status,
+                    extra={'ap_txn_id': ap_txn_id, 'amount': amount, 'gateway_message': message})
 
-        if order:
-            print(f"[AIRPAY IPN] Found order ID: {order.id}")
-
-            if transaction_status == '200':  # Success (Airpay success code)
-                order.status = 'Booked'
-                order.utr_code = ap_txn_id  # Update with Airpay transaction ID
-
-                # Clear cart if this was a cart purchase
-                user_cart = Cart.query.filter_by(user_id=order.user_id).first()
-                if user_cart:
-                    CartItem.query.filter_by(cart_id=user_cart.id).delete()
+        if current_app.config.get('AIRPAY_IPN_MODE') == 'queue':
+            # Verified: store it for the IPN worker and acknowledge without touching orders
+            from .ipn_queue import enqueue_ipn
+            success = transaction_status == '200'
+            job_id = enqueue_ipn('airpay', txnid, 'Booked' if success else 'Failed',
+                                 ap_txn_id if success else None, airpay_data)
+            logger.info('Airpay IPN for txnid %s queued as job %s', txnid, job_id)
+            return jsonify({
+                'status': 'success',
+                'message': 'IPN queued',
+                'txnid': txnid,
+                'order_status': 'queued'
+            }), 200
 
-                print(f"[AIRPAY IPN] ✅ Order {order.id} marked as Booked")
-            else:  # Failed or other status
-                order.status = 'Failed'
-                print(f"[AIRPAY IPN] ❌ Order {order.id} marked as Failed (Status: {transaction_status})")
+        # Update every order of the transaction (200 = Airpay success code);
+        # replayed IPNs are answered from the transaction row without writes
+        if transaction_status == '200':
+            result = apply_payment_result(txnid, 'Booked', gateway_txn_id=ap_txn_id)
+        else:
+            result = apply_payment_result(txnid, 'Failed')
 
-            db.session.commit()
-            print(f"[AIRPAY IPN] Database updated successfully")
+        if result.outcome == 'applied':
+            logger.info('Orders for txnid %s marked as %s', txnid, result.status)
+        elif result.outcome == 'duplicate':
+            logger.info('Duplicate Airpay IPN for txnid %s, already %s', txnid, result.status)
         else:
-            print(f"[AIRPAY IPN WARNING] ⚠️  Order not found for txnid: {txnid}")
+            logger.warning('Airpay IPN for unknown txnid %s', txnid)
 
         # Return success response to Airpay (must return 200 OK)
         return jsonify({
             'status': 'success',
             'message': 'IPN processed successfully',
             'txnid': txnid,
-            'order_status': order.status if order else 'not_found'
+            'order_status': result.status or 'not_found'
         }), 200
 
     except Exception as e:
-        print(f"[AIRPAY IPN ERROR] Exception occurred: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Airpay IPN failed')
         return jsonify({'status': 'error', 'message': str(e)}), 500
\ No newline at end of file
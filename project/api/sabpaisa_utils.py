@@ -7,14 +7,20 @@ import base64
 import os
 import hmac
 import hashlib
+from functools import lru_cache
 from Crypto.Cipher import AES
 from datetime import datetime
+from .metrics import metrics
 
 
 class AES256HMACSHA384HEX:
     """
     Official SabPaisa encryption class
     Uses AES-256-GCM mode with HMAC-SHA384 authentication
+
+    Instances hold only the decoded keys and an HMAC prototype that is copied,
+    never updated, so one instance can be shared between threads. Use
+    crypto_context() to get the cached instance for a credential set.
     """
     IV_SIZE = 12  # GCM uses 12-byte nonce
     TAG_SIZE = 16  # GCM authentication tag size
@@ -34,6 +40,16 @@ class AES256HMACSHA384HEX:
         self.auth_key = base64.b64decode(auth_key)
         self.auth_iv = base64.b64decode(auth_iv)
 
+        # Keyed HMAC state (ipad/opad already absorbed); each message works on a copy
+        self._hmac_prototype = hmac.new(self.auth_iv, digestmod=hashlib.sha384)
+
+    def _hmac(self, *parts) -> bytes:
+        """HMAC-SHA384 over the concatenation of parts, without concatenating them"""
+        mac = self._hmac_prototype.copy()
+        for part in parts:
+            mac.update(part)
+        return mac.digest()
+
     @staticmethod
     def bytes_to_hex(b: bytes) -> str:
         """Convert bytes to uppercase hex string"""
@@ -44,6 +60,7 @@ class AES256HMACSHA384HEX:
         """Convert hex string to bytes"""
         return bytes.fromhex(h)
 
+    @metrics.time_crypto('sabpaisa_encrypt')
     def encrypt(self, plaintext: str) -> str:
         """
         Encrypt plaintext using AES-256-GCM + HMAC-SHA384
@@ -63,18 +80,13 @@ class AES256HMACSHA384HEX:
         # Encrypt and get authentication tag
         ciphertext, tag = cipher.encrypt_and_digest(plaintext.encode('utf-8'))
 
-        # Combine: IV + ciphertext + tag
-        encrypted_message = iv + ciphertext + tag
+        # Calculate HMAC-SHA384 over the encrypted message (IV + ciphertext + tag)
+        hmac_calculated = self._hmac(iv, ciphertext, tag)
 
-        # Calculate HMAC-SHA384 over encrypted message
-        hmac_calculated = hmac.new(self.auth_iv, encrypted_message, hashlib.sha384).digest()
-
-        # Final message: HMAC + encrypted_message
-        final_message = hmac_calculated + encrypted_message
-
-        # Return as uppercase hex
-        return self.bytes_to_hex(final_message)
+        # Final message: HMAC + IV + ciphertext + tag, as uppercase hex
+        return self.bytes_to_hex(b''.join((hmac_calculated, iv, ciphertext, tag)))
 
+    @metrics.time_crypto('sabpaisa_decrypt')
     def decrypt(self, hex_ciphertext: str) -> str:
         """
         Decrypt SabPaisa response
@@ -85,25 +97,24 @@ class AES256HMACSHA384HEX:
         Returns:
             Decrypted plaintext
         """
-        full_message = self.hex_to_bytes(hex_ciphertext)
+        full_message = memoryview(self.hex_to_bytes(hex_ciphertext))
 
         if len(full_message) < self.HMAC_LENGTH + self.IV_SIZE + self.TAG_SIZE:
             raise ValueError("Invalid ciphertext length")
 
-        # Extract HMAC and encrypted data
+        # Slices of a memoryview share the decoded buffer instead of copying it
         hmac_received = full_message[:self.HMAC_LENGTH]
         encrypted_data = full_message[self.HMAC_LENGTH:]
 
         # Verify HMAC
-        hmac_calculated = hmac.new(self.auth_iv, encrypted_data, hashlib.sha384).digest()
+        hmac_calculated = self._hmac(encrypted_data)
         if not hmac.compare_digest(hmac_received, hmac_calculated):
             raise ValueError("HMAC validation failed. Data may be tampered!")
 
         # Extract IV, ciphertext, and tag
         iv = encrypted_data[:self.IV_SIZE]
-        ciphertext_with_tag = encrypted_data[self.IV_SIZE:]
-        ciphertext = ciphertext_with_tag[:-self.TAG_SIZE]
-        tag = ciphertext_with_tag[-self.TAG_SIZE:]
+        ciphertext = encrypted_data[self.IV_SIZE:-self.TAG_SIZE]
+        tag = encrypted_data[-self.TAG_SIZE:]
 
         # Decrypt
         cipher = AES.new(self.auth_key, AES.MODE_GCM, nonce=iv, mac_len=self.TAG_SIZE)
@@ -112,6 +123,19 @@ class AES256HMACSHA384HEX:
         return plaintext_bytes.decode('utf-8')
 
 
+@lru_cache(maxsize=8)
+def _crypto_context(auth_key: str, auth_iv: str) -> AES256HMACSHA384HEX:
+    return AES256HMACSHA384HEX(auth_key, auth_iv)
+
+
+def crypto_context(auth_key: str, auth_iv: str) -> AES256HMACSHA384HEX:
+    """
+    Shared AES256HMACSHA384HEX for a credential set
+    Keys are base64-decoded and the HMAC is keyed once per process, not per request
+    """
+    return _crypto_context(auth_key.strip(), auth_iv.strip())
+
+
 def build_payment_request(
     payer_name: str,
     payer_email: str,
@@ -159,8 +183,7 @@ def create_encrypted_request(params_str: str, auth_key: str, auth_iv: str) -> st
     """
     Encrypt payment request using official SabPaisa encryption
     """
-    crypto = AES256HMACSHA384HEX(auth_key, auth_iv)
-    return crypto.encrypt(params_str).strip()
+    return crypto_context(auth_key, auth_iv).encrypt(params_str).strip()
 
 
 def parse_callback_response(enc_response: str, auth_key: str, auth_iv: str) -> dict:
@@ -168,8 +191,7 @@ def parse_callback_response(enc_response: str, auth_key: str, auth_iv: str) -> d
     Decrypt and parse SabPaisa callback response
     """
     try:
-        crypto = AES256HMACSHA384HEX(auth_key, auth_iv)
-        decrypted = crypto.decrypt(enc_response.strip())
+        decrypted = crypto_context(auth_key, auth_iv).decrypt(enc_response.strip())
 
         response_dict = {}
         for pair in decrypted.split("&"):
@@ -0,0 +1,472 @@
+"""
+Product search API
+One in-memory inverted index per app over the commodity catalog and Active
+trader listings (Product rows), searched by name, category, seller and
+location
+
+Tokens are folded so spelling variants meet: Devanagari is transliterated
+to Latin, aspirates/long vowels/doubled letters are collapsed
+("हल्दी" = "haldi" = "haldee", "jeera" = "jira" = "zeera"), and a short
+commodity synonym table links Hindi and English names. Each query token
+matches exact terms, then terms it prefixes, then terms one edit away
+(symmetric-delete lookup), and every token must match.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.orm import joinedload, subqueryload
+
+from .models import Product
+
+search_bp = Blueprint('search', __name__)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+# \w alone would split Devanagari words at vowel signs, which are not alphanumeric
+TOKEN_PATTERN = re.compile(r'[\w\u0900-\u097f]+')
+STOPWORDS = frozenset({'a', 'an', 'and', 'for', 'in', 'of', 'the', 'sale', 'ka', 'ki', 'ke'})
+
+# Field weights: a hit in the product name outranks one in its seller or location
+NAME, CATEGORY, SELLER, LOCATION, DESCRIPTION = 3.0, 2.0, 1.0, 1.0, 1.0
+SYNONYM_WEIGHT = 0.8  # Relative to the word itself
+EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.5  # How a query token matched a term
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_TERMS = 64
+MIN_FUZZY_LENGTH = 4
+
+# Common Hindi commodity names and their English equivalents (folded on load)
+SYNONYMS = {
+    'haldi': 'turmeric', 'jeera': 'cumin', 'mirch': 'chilli', 'dhaniya': 'coriander',
+    'elaichi': 'cardamom', 'laung': 'clove', 'methi': 'fenugreek', 'saunf': 'fennel',
+    'rai': 'mustard', 'sarson': 'mustard', 'ajwain': 'carom', 'adrak': 'ginger',
+    'lahsun': 'garlic', 'pyaz': 'onion', 'aloo': 'potato', 'tamatar': 'tomato',
+    'gehun': 'wheat', 'chawal': 'rice', 'makka': 'maize', 'bajra': 'millet',
+    'chana': 'chickpea', 'moong': 'mung', 'masoor': 'lentil', 'mungfali': 'groundnut',
+    'badam': 'almond', 'kaju': 'cashew', 'kishmish': 'raisin', 'akhrot': 'walnut',
+    'nariyal': 'coconut', 'gur': 'jaggery', 'cheeni': 'sugar', 'kapas': 'cotton',
+    'aam': 'mango', 'kela': 'banana', 'seb': 'apple', 'angoor': 'grapes',
+}
+
+_VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ii', 'उ': 'u', 'ऊ': 'uu', 'ऋ': 'ri',
+    'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au',
+}
+_MATRAS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ii', 'ु': 'u', 'ू': 'uu', 'ृ': 'ri',
+    'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au',
+}
+_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n', 'च': 'ch', 'छ': 'chh', 'ज': 'j',
+    'झ': 'jh', 'ञ': 'n', 'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n', 'त': 't',
+    'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n', 'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh',
+    'म': 'm', 'य': 'y', 'र': 'r', 'ल': 'l', 'ळ': 'l', 'व': 'v', 'श': 'sh', 'ष': 'sh',
+    'स': 's', 'ह': 'h',
+}
+# Nukta-modified consonants (decomposed: consonant + U+093C)
+_NUKTA_FORMS = {'k': 'q', 'kh': 'kh', 'g': 'g', 'j': 'z', 'd': 'r', 'dh': 'rh', 'ph': 'f', 'y': 'y'}
+_SIGNS = {'ं': 'n', 'ँ': 'n', 'ः': 'h'}
+_VIRAMA, _NUKTA = '्', '़'
+_DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+# Applied in order to already-lowercased Latin text
+_FOLDS = (
+    ('ph', 'f'), ('kh', 'k'), ('gh', 'g'), ('chh', 'c'), ('ch', 'c'), ('jh', 'j'), ('th', 't'),
+    ('dh', 'd'), ('bh', 'b'), ('sh', 's'), ('w', 'v'), ('z', 'j'), ('q', 'k'),
+    ('ee', 'i'), ('oo', 'u'),
+)
+_REPEATS = re.compile(r'(.)\1+')
+
+
+def transliterate(word: str) -> str:
+    """
+    Latin rendering of a Devanagari word
+    The inherent 'a' is dropped at the end of the word and between a vowel
+    and a consonant followed by a vowel, as spoken ("सरसों" -> "sarson")
+    """
+    units: List[List[str]] = []  # [latin, kind]; kind is 'C' consonant, 'V' vowel, 'a' inherent vowel
+    for char in unicodedata.normalize('NFD', word):
+        if char in _CONSONANTS:
+            units.append([_CONSONANTS[char], 'C'])
+            units.append(['a', 'a'])
+        elif char == _NUKTA:
+            for unit in reversed(units):
+                if unit[1] == 'C':
+                    unit[0] = _NUKTA_FORMS.get(unit[0], unit[0])
+                    break
+        elif char in _MATRAS or char == _VIRAMA:
+            if units and units[-1][1] == 'a':
+                units.pop()
+            if char != _VIRAMA:
+                units.append([_MATRAS[char], 'V'])
+        elif char in _SIGNS:
+            units.append([_SIGNS[char], 'V'])  # Nasalisation belongs to the syllable's vowel
+        elif char in _VOWELS:
+            units.append([_VOWELS[char], 'V'])
+        else:
+            units.append([_DIGITS.get(char, char), 'V'])
+
+    if len(units) > 2 and units[-1][1] == 'a':
+        units.pop()
+    for i in range(len(units) - 3, 1, -1):
+        if units[i][1] == 'a' and units[i - 1][1] == 'C' and units[i - 2][1] in 'Va' \
+                and units[i + 1][1] == 'C' and units[i + 2][1] in 'Va':
+            del units[i]
+    return ''.join(latin for latin, _ in units)
+
+
+def fold(word: str) -> str:
+    """Spelling-variant-insensitive form of a lowercase Latin word"""
+    for source, target in _FOLDS:
+        if source in word:
+            word = word.replace(source, target)
+    return _REPEATS.sub(r'\1', word)
+
+
+@lru_cache(maxsize=65536)
+def _term(word: str) -> str:
+    """Folded term of one lowercase word (the vocabulary is small, so terms are memoized)"""
+    if any('\u0900' <= char <= '\u097f' for char in word):
+        word = transliterate(word)
+    else:
+        # Strip accents from Latin letters (é -> e)
+        word = unicodedata.normalize('NFKD', word).encode('ascii', 'ignore').decode() or word
+    return fold(word)
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded search terms of a text, stopwords removed, in order"""
+    terms = []
+    for word in TOKEN_PATTERN.findall((text or '').lower()):
+        if word not in STOPWORDS:
+            term = _term(word)
+            if term and term not in STOPWORDS:
+                terms.append(term)
+    return terms
+
+
+def _deletes(term: str) -> Set[str]:
+    """The term with each single character removed (symmetric-delete fuzzy keys)"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion, substitution or adjacent swap"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+    return a[i:] == b[i + 1:]
+
+
+SYNONYM_TERMS: Dict[str, List[str]] = {}
+for _hindi, _english in SYNONYMS.items():
+    _hindi, _english = fold(_hindi), fold(_english)
+    SYNONYM_TERMS.setdefault(_hindi, []).append(_english)
+    SYNONYM_TERMS.setdefault(_english, []).append(_hindi)
+
+
+class SearchIndex:
+    """
+    Thread-safe inverted index with incremental add/remove
+
+    postings maps a term to {doc slot: best field weight}; terms is the
+    sorted vocabulary (prefix ranges by bisect) and fuzzy maps every
+    one-character deletion of a term back to the terms producing it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.terms: List[str] = []
+        self.fuzzy: Dict[str, Set[str]] = {}
+        self.docs: List[Optional[Tuple[str, Dict[str, Any], Dict[str, float]]]] = []
+        self.slots: Dict[str, int] = {}  # Document key -> slot
+        self.free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add(self, key: str, fields: Iterable[Tuple[str, float]], payload: Dict[str, Any]) -> None:
+        """Index (or re-index) a document from (text, weight) fields"""
+        weights: Dict[str, float] = {}
+        for text, weight in fields:
+            for term in tokenize(text):
+                if weights.get(term, 0) < weight:
+                    weights[term] = weight
+                for synonym in SYNONYM_TERMS.get(term, ()):
+                    if weights.get(synonym, 0) < weight * SYNONYM_WEIGHT:
+                        weights[synonym] = weight * SYNONYM_WEIGHT
+
+        with self._lock:
+            self.remove(key)
+            slot = self.free.pop() if self.free else len(self.docs)
+            if slot == len(self.docs):
+                self.docs.append(None)
+            self.docs[slot] = (key, payload, weights)
+            self.slots[key] = slot
+            for term, weight in weights.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = {}
+                    insort(self.terms, term)
+                    for variant in _deletes(term) | {term}:
+                        self.fuzzy.setdefault(variant, set()).add(term)
+                postings[slot] = weight
+
+    def remove(self, key: str) -> bool:
+        with self._lock:
+            slot = self.slots.pop(key, None)
+            if slot is None:
+                return False
+            _, _, weights = self.docs[slot]
+            for term in weights:
+                postings = self.postings[term]
+                del postings[slot]
+                if not postings:
+                    del self.postings[term]
+                    del self.terms[bisect_left(self.terms, term)]
+                    for variant in _deletes(term) | {term}:
+                        variants = self.fuzzy[variant]
+                        variants.discard(term)
+                        if not variants:
+                            del self.fuzzy[variant]
+            self.docs[slot] = None
+            self.free.append(slot)
+            return True
+
+    def keys(self, prefix: str = '') -> List[str]:
+        with self._lock:
+            return [key for key in self.slots if key.startswith(prefix)]
+
+    def payload(self, key: str) -> Optional[Dict[str, Any]]:
+        slot = self.slots.get(key)
+        return None if slot is None else self.docs[slot][1]
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Indexed terms a query token stands for, with their match weight"""
+        matches: Dict[str, float] = {}
+        if len(token) >= MIN_PREFIX_LENGTH:
+            start = bisect_left(self.terms, token)
+            for term in self.terms[start:start + MAX_PREFIX_TERMS]:
+                if not term.startswith(token):
+                    break
+                matches[term] = PREFIX
+        if len(token) >= MIN_FUZZY_LENGTH:
+            for variant in _deletes(token) | {token}:
+                for term in self.fuzzy.get(variant, ()):
+                    if term not in matches and within_one_edit(token, term):
+                        matches[term] = FUZZY
+        if token in self.postings:
+            matches[token] = EXACT
+        return matches
+
+    def search(self, query: str, limit: int = SEARCH_PAGE_SIZE) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Best matches for a query; every query token must match
+
+        Returns:
+            Tuple of (payloads of the top `limit` documents, total matches)
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            expansions = []
+            for token in tokens:
+                matches = self._expand(token)
+                if not matches:
+                    return [], 0
+                expansions.append([(self.postings[term], weight) for term, weight in matches.items()])
+
+            # Rarest token first, so later tokens only probe its candidates
+            expansions.sort(key=lambda lists: sum(len(postings) for postings, _ in lists))
+
+            scores: Dict[int, float] = {}
+            for postings, weight in expansions[0]:
+                for slot, field_weight in postings.items():
+                    score = weight * field_weight
+                    if scores.get(slot, 0) < score:
+                        scores[slot] = score
+
+            for lists in expansions[1:]:
+                narrowed = {}
+                for slot, score in scores.items():
+                    best = 0.0
+                    for postings, weight in lists:
+                        field_weight = postings.get(slot)
+                        if field_weight is not None and field_weight * weight > best:
+                            best = field_weight * weight
+                    if best:
+                        narrowed[slot] = score + best
+                scores = narrowed
+                if not scores:
+                    return [], 0
+
+            # Highest score first, earlier (catalog-order) documents break ties
+            top = heapq.nsmallest(limit, scores, key=lambda slot: (-scores[slot], slot))
+            return [self.docs[slot][1] for slot in top], len(scores)
+
+
+def catalog_document(product: Dict[str, Any]) -> Tuple[str, List[Tuple[str, float]], Dict[str, Any]]:
+    """Index key, weighted fields and result payload of a commodity catalog product"""
+    payload = {
+        'type': 'catalog',
+        'id': product['id'],
+        'title': product['title'],
+        'price': product['price'],
+        'unit': product['unit'],
+        'seller': product['seller'],
+        'location': product['location'],
+        'category': product['category'],
+        'subcategory': product['subcategory'],
+        'image': product['images'][0] if product['images'] else None,
+    }
+    fields = [
+        (product['title'], NAME),
+        (f"{product['subcategory']} {product['category'].replace('-', ' ')}", CATEGORY),
+        (product['seller'], SELLER),
+        (product['location'], LOCATION),
+    ]
+    return f"c:{product['id']}", fields, payload
+
+
+def listing_document(product: Product) -> Tuple[str, List[Tuple[str, float]], Dict[str, Any]]:
+    """Index key, weighted fields and result payload of an Active trader listing"""
+    seller = product.user.name if product.user else ''
+    payload = {
+        'type': 'listing',
+        'id': product.id,
+        'title': product.name,
+        'price': product.price,
+        'unit': product.unit,
+        'seller': seller,
+        'location': product.location,
+        'image': product.images[0].url if product.images else None,
+    }
+    fields = [
+        (product.name, NAME),
+        (product.description or '', DESCRIPTION),
+        (seller, SELLER),
+        (product.location, LOCATION),
+    ]
+    return f"p:{product.id}", fields, payload
+
+
+class ProductSearch:
+    """The app's search index plus the bookkeeping that keeps its listings current"""
+
+    def __init__(self, refresh_interval: float):
+        self.index = SearchIndex()
+        self.refresh_interval = refresh_interval
+        self.listings_refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def load_catalog(self, catalog) -> None:
+        for product in catalog.products:
+            self.index.add(*catalog_document(product))
+
+    def index_listing(self, product: Product) -> None:
+        """Add an Active listing, drop any other"""
+        if product.status == 'Active':
+            self.index.add(*listing_document(product))
+        else:
+            self.index.remove(f"p:{product.id}")
+
+    def refresh_listings(self, force: bool = False) -> None:
+        """
+        Re-sync listings with the database every refresh_interval seconds, so
+        status changes made through other workers show up here too
+        """
+        if not force and time.monotonic() - self.listings_refreshed_at < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # Another request is already refreshing
+        try:
+            active = Product.query.options(
+                joinedload(Product.user), subqueryload(Product.images)
+            ).filter_by(status='Active').all()
+            seen = set()
+            for product in active:
+                key, fields, payload = listing_document(product)
+                seen.add(key)
+                if self.index.payload(key) != payload:
+                    self.index.add(key, fields, payload)
+            for key in self.index.keys('p:'):
+                if key not in seen:
+                    self.index.remove(key)
+            self.listings_refreshed_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+
+_build_lock = threading.Lock()
+
+
+def get_product_search() -> ProductSearch:
+    """The current app's search index, built on first use"""
+    search = current_app.extensions.get('product_search')
+    if search is not None:
+        return search
+
+    with _build_lock:
+        search = current_app.extensions.get('product_search')
+        if search is None:
+            from .catalog import get_catalog
+            search = ProductSearch(current_app.config.get('SEARCH_LISTINGS_REFRESH', 60))
+            catalog = get_catalog()
+            if catalog is not None:
+                search.load_catalog(catalog)
+            search.refresh_listings(force=True)
+            current_app.extensions['product_search'] = search
+    return search
+
+
+def index_listing_status(product: Product) -> None:
+    """Apply a listing's status change to this worker's index, if it has been built"""
+    search = current_app.extensions.get('product_search')
+    if search is not None:
+        search.index_listing(product)
+
+
+@search_bp.route('/search', methods=['GET'])
+def search_products():
+    """
+    Search catalog products and Active trader listings
+    Params: ?q=<text> (English or Hindi, prefixes and single typos are tolerated), ?limit=20 (max 100)
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({"error": "Missing search query 'q'"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+
+    search = get_product_search()
+    search.refresh_listings()
+    started = time.perf_counter()
+    results, total = search.index.search(query, limit)
+
+    return jsonify({
+        'query': query,
+        'results': results,
+        'total': total,
+        'limit': limit,
+        'tookMs': round((time.perf_counter() - started) * 1000, 2),
+    })
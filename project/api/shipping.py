@@ -0,0 +1,264 @@
+"""
+Shipping charges
+Server-side port of the frontend's src/lib/shipping.ts so totals are priced
+here rather than trusted from the client. Two models:
+
+    quote_shipping   the platform rate model: road/rail blend by intra- or
+                     inter-state route, perishable uplift, bulk tier
+                     discounts and a minimum charge
+    rated_charge     a seller-set rate per kg (used when an inquiry is approved)
+
+quote_shipping prices one consignment of at most MAX_WEIGHT_KG, like the UI.
+Cart checkout uses quote_consignments, which ships a heavier line as full
+consignments plus the remainder, so bulk orders (the minimum quantity is
+2000 units) are never refused for their weight.
+
+Both have a batch form for whole carts and inquiry backlogs, vectorized with
+NumPy when it is installed and a plain loop when it is not (NumPy is an
+optional speed-up, not a requirement). Rounding follows JavaScript's
+Math.round (halves round up) so server and UI agree to the rupee.
+"""
+import math
+from collections import namedtuple
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+INTRA_STATE_RATE_ROAD = 1.0   # ₹/kg (midpoint: 0.5-1.5)
+INTRA_STATE_RATE_RAIL = 0.55  # ₹/kg (midpoint: 0.3-0.8)
+INTER_STATE_RATE_ROAD = 2.25  # ₹/kg (midpoint: 1.5-3.0)
+INTER_STATE_RATE_RAIL = 1.3   # ₹/kg (midpoint: 0.8-1.8)
+ROAD_WEIGHT = 0.7             # 70% weightage for road (agri-dominant mode)
+RAIL_WEIGHT = 0.3             # 30% for rail
+PERISHABLE_UPLIFT = 1.25      # +25% for fruits/veg (reefer/cold storage)
+MIN_CHARGE = 50               # Minimum ₹50/order
+TIER_BREAKS = (0, 10, 50)     # kg thresholds for progressive discount
+TIER_DISCOUNTS = (1.0, 0.95, 0.85)  # Multipliers: full rate, -5%, -15%
+MAX_WEIGHT_KG = 10000         # Max 10 tons per consignment
+
+INTRA_STATE_RATE = ROAD_WEIGHT * INTRA_STATE_RATE_ROAD + RAIL_WEIGHT * INTRA_STATE_RATE_RAIL
+INTER_STATE_RATE = ROAD_WEIGHT * INTER_STATE_RATE_ROAD + RAIL_WEIGHT * INTER_STATE_RATE_RAIL
+
+PERISHABLE_CATEGORIES = ('vegetables', 'fruits', 'dairy', 'meat', 'fish', 'flowers')
+
+# Unit -> (multiplier, divisor) to kg (20 pieces of eggs = 1 kg); unknown units are treated as kg.
+# Kept as a pair so quantity * m / d is bit-for-bit what convertToKg computes
+UNIT_TO_KG = {
+    'kg': (1, 1), 'kilogram': (1, 1),
+    'piece': (1, 20), 'pieces': (1, 20), 'pcs': (1, 20),
+    'gram': (1, 1000), 'g': (1, 1000),
+    'quintal': (100, 1), 'q': (100, 1),
+    'ton': (1000, 1), 'tonne': (1000, 1), 't': (1000, 1),
+}
+
+# Batches smaller than this are priced with the plain loop (NumPy's per-call overhead dominates)
+NUMPY_MIN_BATCH = 64
+
+ShippingQuote = namedtuple('ShippingQuote', [
+    'charge', 'weight_kg', 'base_rate_per_kg', 'tier_multiplier', 'is_intra_state', 'is_perishable',
+    'raw_charge',
+])
+
+
+class ShippingError(ValueError):
+    """A quote that cannot be priced (same messages as calculateShippingCharge)"""
+
+
+def js_round(value: float) -> int:
+    """Math.round: nearest integer, halves up (Python's round() would round halves to even)"""
+    return math.floor(value + 0.5)
+
+
+@lru_cache(maxsize=256)
+def unit_to_kg(unit: str) -> Tuple[int, int]:
+    return UNIT_TO_KG.get((unit or '').lower().strip(), (1, 1))
+
+
+def convert_to_kg(quantity: float, unit: str) -> float:
+    multiplier, divisor = unit_to_kg(unit)
+    return quantity * multiplier / divisor
+
+
+@lru_cache(maxsize=1024)
+def is_perishable_category(category: str) -> bool:
+    category = (category or '').lower().strip()
+    return any(perishable in category for perishable in PERISHABLE_CATEGORIES)
+
+
+@lru_cache(maxsize=1024)
+def state_key(state: str) -> str:
+    return (state or '').lower().strip()
+
+
+# Origin for goods whose seller location is unknown: never a buyer's state, so priced inter-state
+UNKNOWN_STATE = 'unknown'
+
+
+def location_state(location: str) -> str:
+    """State part of a listing location ("Erode, Tamil Nadu" -> "Tamil Nadu")"""
+    return (location or '').rsplit(',', 1)[-1].strip()
+
+
+def tier_multiplier(weight_kg: float) -> float:
+    multiplier = 1.0
+    for tier_break, discount in zip(TIER_BREAKS, TIER_DISCOUNTS):
+        if weight_kg > tier_break:
+            multiplier = discount
+    return multiplier
+
+
+def quote_shipping(weight: float, unit: str, from_state: str, to_state: str, category: str = '') -> ShippingQuote:
+    """
+    Shipping charge for one consignment under the platform rate model
+
+    Raises:
+        ShippingError: non-positive or over-limit weight, or a missing state
+    """
+    if weight <= 0:
+        raise ShippingError("Weight must be greater than 0")
+    weight_kg = convert_to_kg(weight, unit)
+    if weight_kg > MAX_WEIGHT_KG:
+        raise ShippingError("Weight exceeds maximum limit (10 tons)")
+    if not from_state or not to_state:
+        raise ShippingError("Missing location information")
+
+    is_intra_state = state_key(from_state) == state_key(to_state)
+    base_rate = INTRA_STATE_RATE if is_intra_state else INTER_STATE_RATE
+    is_perishable = is_perishable_category(category)
+    if is_perishable:
+        base_rate *= PERISHABLE_UPLIFT
+
+    multiplier = tier_multiplier(weight_kg)
+    raw_charge = weight_kg * base_rate * multiplier
+    return ShippingQuote(
+        charge=js_round(max(raw_charge, MIN_CHARGE)),
+        weight_kg=weight_kg,
+        base_rate_per_kg=base_rate,
+        tier_multiplier=multiplier,
+        is_intra_state=is_intra_state,
+        is_perishable=is_perishable,
+        raw_charge=raw_charge,
+    )
+
+
+def quote_consignments(weight: float, unit: str, from_state: str, to_state: str, category: str = '') -> int:
+    """
+    Shipping charge for a line of any weight, sent as full MAX_WEIGHT_KG
+    consignments plus one for the remainder, each priced by quote_shipping
+
+    Raises:
+        ShippingError: non-positive weight or a missing state
+    """
+    weight_kg = convert_to_kg(weight, unit) if weight > 0 else weight
+    if weight_kg <= MAX_WEIGHT_KG:
+        return quote_shipping(weight, unit, from_state, to_state, category).charge
+    full, remainder = divmod(weight_kg, MAX_WEIGHT_KG)
+    charge = int(full) * quote_shipping(MAX_WEIGHT_KG, 'kg', from_state, to_state, category).charge
+    if remainder > 0:
+        charge += quote_shipping(remainder, 'kg', from_state, to_state, category).charge
+    return charge
+
+
+def rated_charge(quantity: float, unit: str, rate_per_kg: float) -> int:
+    """Charge for a seller-set rate per kg (the inquiry approval dialog's calculateShipping)"""
+    return js_round(convert_to_kg(quantity, unit) * rate_per_kg)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _encode(numpy, values: Sequence):
+    """
+    (codes, distinct) with values[i] == distinct[codes[i]], so string work
+    (normalizing units, states, categories) runs once per distinct value
+    """
+    distinct = list(set(values))
+    positions = {value: position for position, value in enumerate(distinct)}
+    return numpy.fromiter(map(positions.__getitem__, values), dtype=numpy.intp, count=len(values)), distinct
+
+
+def _weights_kg(numpy, quantities: Sequence[float], units: Sequence[str]):
+    codes, distinct = _encode(numpy, units)
+    conversions = numpy.array([unit_to_kg(unit) for unit in distinct], dtype=numpy.float64).reshape(-1, 2)
+    return numpy.asarray(quantities, dtype=numpy.float64) * conversions[codes, 0] / conversions[codes, 1]
+
+
+def quote_shipping_batch(weights: Sequence[float], units: Sequence[str], from_states: Sequence[str],
+                         to_states: Sequence[str], categories: Optional[Sequence[str]] = None,
+                         split: bool = False):
+    """
+    Charges for many consignments at once under the platform rate model
+    split prices each line with quote_consignments instead of quote_shipping
+
+    Returns:
+        Charges in input order (a NumPy float array when NumPy is installed
+        and the batch is large, else a list); NaN where the single quote
+        would raise ShippingError
+    """
+    count = len(weights)
+    if categories is None:
+        categories = [''] * count
+    numpy = _numpy() if count >= NUMPY_MIN_BATCH else None
+
+    if numpy is None:
+        charges = []
+        for weight, unit, from_state, to_state, category in zip(weights, units, from_states, to_states, categories):
+            try:
+                if split:
+                    charges.append(quote_consignments(weight, unit, from_state, to_state, category))
+                else:
+                    charges.append(quote_shipping(weight, unit, from_state, to_state, category).charge)
+            except ShippingError:
+                charges.append(math.nan)
+        return charges
+
+    weights = numpy.asarray(weights, dtype=numpy.float64)
+    weight_kg = _weights_kg(numpy, weights, units)
+
+    # Both ends of the route as ids of their normalized state names
+    key_ids = {}
+    ends = []
+    for states in (from_states, to_states):
+        codes, distinct = _encode(numpy, states)
+        ids = numpy.array([key_ids.setdefault(state_key(state), len(key_ids)) for state in distinct])
+        present = numpy.array([bool(state) for state in distinct])
+        ends.append((ids[codes], present[codes]))
+    (from_ids, from_present), (to_ids, to_present) = ends
+
+    codes, distinct = _encode(numpy, categories)
+    perishable = numpy.array([is_perishable_category(category) for category in distinct])[codes]
+
+    rate = numpy.where(from_ids == to_ids, INTRA_STATE_RATE, INTER_STATE_RATE)
+    rate = numpy.where(perishable, rate * PERISHABLE_UPLIFT, rate)
+
+    def charge(kg):
+        multiplier = numpy.select([kg > tier_break for tier_break in TIER_BREAKS[::-1]], TIER_DISCOUNTS[::-1], 1.0)
+        return numpy.floor(numpy.maximum(kg * rate * multiplier, MIN_CHARGE) + 0.5)
+
+    charges = charge(weight_kg)
+    valid = (weights > 0) & from_present & to_present
+    if split:
+        heavy = weight_kg > MAX_WEIGHT_KG
+        if heavy.any():
+            full, remainder = numpy.divmod(weight_kg, MAX_WEIGHT_KG)
+            split_charges = full * charge(numpy.full(count, float(MAX_WEIGHT_KG)))
+            split_charges += numpy.where(remainder > 0, charge(remainder), 0.0)
+            charges = numpy.where(heavy, split_charges, charges)
+    else:
+        valid &= weight_kg <= MAX_WEIGHT_KG
+    charges[~valid] = numpy.nan
+    return charges
+
+
+def rated_charge_batch(quantities: Sequence[float], units: Sequence[str], rates_per_kg: Sequence[float]):
+    """rated_charge for many inquiries at once (NumPy array or list, as quote_shipping_batch)"""
+    numpy = _numpy() if len(quantities) >= NUMPY_MIN_BATCH else None
+    if numpy is None:
+        return [rated_charge(quantity, unit, rate) for quantity, unit, rate in zip(quantities, units, rates_per_kg)]
+
+    weight_kg = _weights_kg(numpy, quantities, units)
+    return numpy.floor(weight_kg * numpy.asarray(rates_per_kg, dtype=numpy.float64) + 0.5)
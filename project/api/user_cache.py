@@ -0,0 +1,253 @@
+"""
+Cached Flask-Login user loader
+Every authenticated request used to start with SELECT ... FROM users WHERE
+id = ? (a round trip to the remote Postgres) before any endpoint code ran.
+The loader now keeps the columns that to_json() and the role checks read
+(CACHED_FIELDS) per user id, and on a hit puts a User with those columns
+into the request's session without a query. It is a real, persistent User
+in the session's identity map, so writes (update_subscription) and
+relationships work as before; the other columns (password, payment ids)
+are loaded on first access.
+
+Entries are invalidated when a session commits an UPDATE or DELETE of a
+User (subscription updates, role changes, anything through the ORM), and
+expire after USER_CACHE_TTL seconds otherwise. Bulk update(User)
+statements bypass the ORM; call invalidate_user() after them.
+
+Backends (USER_CACHE_BACKEND):
+    local   per-worker TTL/LRU cache (api/cache.py); a change made in one
+            worker reaches the others when their entry expires
+    redis   one cache shared by all workers (USER_CACHE_REDIS_URL; needs
+            the optional `redis` package), so invalidation is immediate
+
+Hits, misses and invalidations are counted per worker and shown at
+/api/admin/user-cache and /api/admin/metrics.
+"""
+import datetime
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from . import db
+from .cache import TTLCache
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# What to_json() and the role/subscription checks read
+CACHED_FIELDS = ('name', 'email', 'role', 'registered_on', 'has_subscription', 'subscription_expiry')
+DATETIME_FIELDS = frozenset(['registered_on', 'subscription_expiry'])
+
+# session.info key for the ids of users changed in the session's current transaction
+CHANGED_USERS = 'user_cache_changed'
+
+
+def snapshot_user(user: User) -> Dict[str, Any]:
+    """CACHED_FIELDS of a loaded User as JSON-compatible values"""
+    snapshot = {}
+    for field in CACHED_FIELDS:
+        value = getattr(user, field)
+        snapshot[field] = value.isoformat() if field in DATETIME_FIELDS and value is not None else value
+    return snapshot
+
+
+def attach_user(user_id: int, snapshot: Dict[str, Any]) -> User:
+    """A persistent User in db.session built from a snapshot, without a query"""
+    user = User.__mapper__.class_manager.new_instance()  # Skips User.__init__ (password hashing)
+    set_committed_value(user, 'id', user_id)
+    for field in CACHED_FIELDS:
+        value = snapshot[field]
+        if field in DATETIME_FIELDS and value is not None:
+            value = datetime.datetime.fromisoformat(value)
+        set_committed_value(user, field, value)
+    make_transient_to_detached(user)  # Columns not in the snapshot become expired, i.e. lazy-loaded
+    db.session.add(user)
+    return user
+
+
+class LocalUserBackend:
+    """Per-worker TTL/LRU store"""
+    name = 'local'
+
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self.cache.get(user_id)
+
+    def set(self, user_id: int, snapshot: Dict[str, Any]) -> None:
+        self.cache.set(user_id, snapshot)
+
+    def delete(self, user_id: int) -> None:
+        self.cache.delete(user_id)
+
+    def size(self) -> Optional[int]:
+        return self.cache.stats()['size']
+
+
+class RedisUserBackend:
+    """Store shared by every worker, as JSON strings with a Redis TTL"""
+    name = 'redis'
+    PREFIX = 'mandi:user:'
+
+    def __init__(self, url: str, ttl: float):
+        import redis  # Optional dependency, only needed for USER_CACHE_BACKEND=redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.ttl = max(1, int(ttl))
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(f'{self.PREFIX}{user_id}')
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, user_id: int, snapshot: Dict[str, Any]) -> None:
+        self.client.setex(f'{self.PREFIX}{user_id}', self.ttl, json.dumps(snapshot))
+
+    def delete(self, user_id: int) -> None:
+        self.client.delete(f'{self.PREFIX}{user_id}')
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class UserCache:
+    """
+    User loader over a backend (any object with get/set/delete/size)
+    A backend that fails (e.g. Redis down) is treated as a miss, so the
+    request falls back to the database
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def load(self, user_id: int) -> Optional[User]:
+        """The User for a session's user id; None if it no longer exists"""
+        in_session = db.session.identity_map.get(identity_key(User, user_id))
+        if in_session is not None:
+            return in_session
+
+        try:
+            snapshot = self.backend.get(user_id)
+        except Exception as e:
+            self._count('errors')
+            logger.warning('User cache %s get failed: %s', self.backend.name, e)
+            snapshot = None
+        if snapshot is not None:
+            self._count('hits')
+            return attach_user(user_id, snapshot)
+
+        self._count('misses')
+        user = db.session.get(User, user_id)
+        if user is not None:
+            try:
+                self.backend.set(user_id, snapshot_user(user))
+            except Exception as e:
+                self._count('errors')
+                logger.warning('User cache %s set failed: %s', self.backend.name, e)
+        return user
+
+    def invalidate(self, user_id: int) -> None:
+        self._count('invalidations')
+        try:
+            self.backend.delete(user_id)
+        except Exception as e:
+            self._count('errors')
+            logger.warning('User cache %s delete failed for user %s: %s', self.backend.name, user_id, e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'backend': self.backend.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'errors': self.errors,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+        stats['size'] = self.backend.size()
+        return stats
+
+
+def init_user_cache(app) -> Optional[UserCache]:
+    """Create the app's cache (None when USER_CACHE_TTL is 0) and hook the ORM invalidation once"""
+    ttl = app.config.get('USER_CACHE_TTL', 30)
+    cache = None
+    if ttl:
+        backend_name = app.config.get('USER_CACHE_BACKEND', 'local')
+        if backend_name == 'redis':
+            try:
+                backend = RedisUserBackend(app.config['USER_CACHE_REDIS_URL'], ttl)
+            except Exception as e:  # redis not installed or a bad URL
+                logger.warning('USER_CACHE_BACKEND=redis unavailable (%s), using the per-worker cache', e)
+                backend = LocalUserBackend(ttl, app.config.get('USER_CACHE_SIZE', 10000))
+        else:
+            backend = LocalUserBackend(ttl, app.config.get('USER_CACHE_SIZE', 10000))
+        cache = UserCache(backend)
+    app.extensions['user_cache'] = cache
+    _hook_session_events()
+    return cache
+
+
+def load_user(user_id) -> Optional[User]:
+    """Flask-Login user_loader"""
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        return db.session.get(User, int(user_id))
+    return cache.load(int(user_id))
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a user's cached row (after changing it without the ORM)"""
+    cache = current_app.extensions.get('user_cache')
+    if cache is not None:
+        cache.invalidate(user_id)
+
+
+def _user_changed(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(CHANGED_USERS, set()).add(target.id)
+
+
+def _after_commit(session: Session) -> None:
+    # After the commit, so a concurrent miss cannot re-cache the old row once we have invalidated
+    changed = session.info.pop(CHANGED_USERS, None)
+    if changed and has_app_context():
+        for user_id in changed:
+            invalidate_user(user_id)
+
+
+def _after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(CHANGED_USERS, None)
+
+
+_hooks_lock = threading.Lock()
+_hooked = False
+
+
+def _hook_session_events() -> None:
+    global _hooked
+    with _hooks_lock:
+        if _hooked:
+            return
+        event.listen(User, 'after_update', _user_changed)
+        event.listen(User, 'after_delete', _user_changed)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_soft_rollback', _after_rollback)
+        _hooked = True
@@ -0,0 +1,168 @@
+"""
+Benchmark: Airpay per-checkout and per-callback crypto time
+Compares the previous static AirpayV4Functions path (md5 of username~:~password
+on every encrypt/decrypt, privatekey rehashed on every checkout, CRC string
+rebuilt with the static merchant suffix) with the credential-bound instance
+cached by airpay_functions().
+
+Per checkout: encrypt the payment JSON + request checksum + privatekey
+Per callback: decrypt the response + CRC32 checksum verification
+
+Usage:
+    python benchmarks/bench_airpay_crypto.py
+    python benchmarks/bench_airpay_crypto.py --iterations 50000
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import time
+import zlib
+from datetime import datetime
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+
+from api.airpay_utils import AirpayV4Functions, MERCHANT_DOMAIN, airpay_functions
+
+MERCHANT_ID = '312345'
+USERNAME = 'mandi-merchant'
+PASSWORD = 'p4ssw0rd-from-config'
+SECRET_KEY = 'airpay-secret-key-from-config'
+
+POST_DATA = {
+    'buyer_email': 'ravi@example.com', 'buyer_firstname': 'Ravi', 'buyer_lastname': 'Kumar',
+    'buyer_address': 'Direct Buy', 'buyer_city': 'Mumbai', 'buyer_state': 'Maharashtra',
+    'buyer_country': 'India', 'amount': '90000.00', 'orderid': '1704567890123456789',
+    'buyer_phone': '9876543210', 'buyer_pincode': '400001', 'iso_currency': 'INR',
+    'currency_code': '356', 'merchant_id': MERCHANT_ID, 'mer_dom': MERCHANT_DOMAIN,
+}
+
+
+class LegacyAirpayV4Functions:
+    """The previous static implementation, kept here for comparison"""
+
+    @staticmethod
+    def encrypt_string(my_string, username, password):
+        secret_key = hashlib.md5(f"{username}~:~{password}".encode()).hexdigest()
+        iv = 'c0f9e2d16031b0ce'
+        cipher = AES.new(secret_key.encode(), AES.MODE_CBC, iv.encode())
+        encrypted_data = cipher.encrypt(pad(my_string.encode(), AES.block_size))
+        return iv + base64.b64encode(encrypted_data).decode()
+
+    @staticmethod
+    def decrypt_string(encrypted_data, username, password):
+        secret_key = hashlib.md5(f"{username}~:~{password}".encode()).hexdigest()
+        cipher = AES.new(secret_key.encode(), AES.MODE_CBC, encrypted_data[:16].encode())
+        return unpad(cipher.decrypt(base64.b64decode(encrypted_data[16:])), AES.block_size).decode()
+
+    @staticmethod
+    def checksum_cal(post_data):
+        sorted_data = sorted(post_data.items(), key=lambda x: x[0])
+        data = ''.join([str(value) for _, value in sorted_data])
+        return hashlib.sha256((data + datetime.now().strftime("%Y-%m-%d")).encode()).hexdigest()
+
+    @staticmethod
+    def encrypt_sha(data, salt):
+        return hashlib.sha256((salt + '@' + data).encode()).hexdigest()
+
+    @staticmethod
+    def verify_response_checksum(response_data, merchant_id, username):
+        transaction_id = str(response_data.get('orderid', response_data.get('TRANSACTIONID', ''))).strip()
+        ap_transaction_id = str(response_data.get('ap_transactionid', response_data.get('APTRANSACTIONID', ''))).strip()
+        amount = str(response_data.get('amount', response_data.get('AMOUNT', ''))).strip()
+        transaction_status = str(response_data.get('transaction_status', response_data.get('TRANSACTIONSTATUS', ''))).strip()
+        message = str(response_data.get('message', response_data.get('MESSAGE', ''))).strip()
+        ap_secure_hash = str(response_data.get('ap_securehash', response_data.get('ap_SecureHash', ''))).strip()
+        chmod = str(response_data.get('chmod', response_data.get('CHMOD', ''))).strip()
+        customer_vpa = str(response_data.get('CUSTOMERVPA', '')).strip()
+        crc_data = f"{transaction_id}:{ap_transaction_id}:{amount}:{transaction_status}:{message}:{merchant_id}:{username}"
+        if chmod.lower() == 'upi' and customer_vpa:
+            crc_data += f":{customer_vpa}"
+        merchant_secure_hash = "%u" % (zlib.crc32(crc_data.encode('utf-8')) & 0xffffffff)
+        return ap_secure_hash == merchant_secure_hash, merchant_secure_hash
+
+
+def legacy_checkout():
+    functions = LegacyAirpayV4Functions()
+    encdata = functions.encrypt_string(json.dumps(POST_DATA), USERNAME, PASSWORD)
+    checksum = functions.checksum_cal(POST_DATA)
+    privatekey = functions.encrypt_sha(f"{USERNAME}:|:{PASSWORD}", SECRET_KEY)
+    return encdata, checksum, privatekey
+
+
+def cached_checkout():
+    functions = airpay_functions(MERCHANT_ID, USERNAME, PASSWORD, SECRET_KEY)
+    encdata = functions.encrypt_string(json.dumps(POST_DATA))
+    checksum = functions.checksum_cal(POST_DATA)
+    return encdata, checksum, functions.privatekey
+
+
+def callback_payload():
+    data = {'orderid': POST_DATA['orderid'], 'ap_transactionid': 'AP998877', 'amount': '90000.00',
+            'transaction_status': '200', 'message': 'Success'}
+    crc = f"{data['orderid']}:AP998877:90000.00:200:Success:{MERCHANT_ID}:{USERNAME}"
+    data['ap_securehash'] = str(zlib.crc32(crc.encode('utf-8')) & 0xffffffff)
+    return LegacyAirpayV4Functions.encrypt_string(json.dumps({'data': data}), USERNAME, PASSWORD)
+
+
+def legacy_callback(response):
+    functions = LegacyAirpayV4Functions()
+    data = json.loads(functions.decrypt_string(response, USERNAME, PASSWORD))['data']
+    return functions.verify_response_checksum(data, MERCHANT_ID, USERNAME)[0]
+
+
+def cached_callback(response):
+    functions = airpay_functions(MERCHANT_ID, USERNAME, PASSWORD)
+    data = json.loads(functions.decrypt_string(response))['data']
+    return functions.verify_response_checksum(data)[0]
+
+
+def per_call_us(func, iterations, *args):
+    """Best-of-5 average time per call in microseconds"""
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    response = callback_payload()
+
+    assert legacy_checkout() == cached_checkout()
+    assert legacy_callback(response) and cached_callback(response)
+    assert airpay_functions(MERCHANT_ID, USERNAME, PASSWORD) is airpay_functions(MERCHANT_ID, USERNAME, PASSWORD)
+    assert isinstance(airpay_functions(MERCHANT_ID, USERNAME, PASSWORD), AirpayV4Functions)
+
+    rows = [
+        ('checkout', per_call_us(legacy_checkout, args.iterations),
+         per_call_us(cached_checkout, args.iterations)),
+        ('callback', per_call_us(legacy_callback, args.iterations, response),
+         per_call_us(cached_callback, args.iterations, response)),
+    ]
+
+    print("=" * 64)
+    print(f"AIRPAY CRYPTO PER OPERATION (µs, best of 5 x {args.iterations:,})")
+    print("=" * 64)
+    print(f"{'operation':>10} | {'legacy':>10} | {'cached':>10} | {'saved':>10} | {'speedup':>8}")
+    print("-" * 64)
+    for name, before, after in rows:
+        print(f"{name:>10} | {before:>10.2f} | {after:>10.2f} | {before - after:>10.2f} | {before / after:>7.2f}x")
+    print("=" * 64)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark: cart checkout order creation
+Compares the old per-item path (lazy cart.items, one Order object added
+per item, ORM flush) with the bulk path used by /api/initiate-cart-payment
+(one joined cart+items fetch, the payment transaction row, one multi-row
+INSERT ... RETURNING, one commit) for 1/10/100/500-item carts. Reports
+median time and SQL statements per checkout.
+
+Usage:
+    python benchmarks/bench_cart_checkout.py
+    python benchmarks/bench_cart_checkout.py --sizes 1 10 100 500 2000 --repeat 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import db, create_app
+from api.cart import load_cart
+from api.models import User, Cart, CartItem, Order
+from api.payments import create_cart_orders
+from testing import TestConfig, count_queries
+
+CHECKOUT = {
+    'paymentOption': 'Online', 'buyerName': 'Ravi Kumar', 'mobile': '9876543210',
+    'pincode': '132001', 'addressLine1': 'Shop 4, Grain Market', 'city': 'Karnal',
+    'state': 'Haryana',
+}
+
+
+def legacy_checkout(user_id, txnid, data):
+    """The previous implementation: lazy items, one ORM object per item"""
+    cart = Cart.query.filter_by(user_id=user_id).first()
+    total_amount = sum([item.quantity * item.price_per_unit for item in cart.items])
+    for item in cart.items:
+        item_total = item.quantity * item.price_per_unit
+        db.session.add(Order(
+            user_id=user_id, product_name=item.product_name, quantity=item.quantity,
+            unit=item.unit, total_price=item_total, amount_paid=item_total,
+            payment_option=data['paymentOption'], utr_code=txnid, buyer_name=data['buyerName'],
+            buyer_mobile=data['mobile'], pincode=data['pincode'], address_line_1=data['addressLine1'],
+            address_line_2=data.get('addressLine2', ''), city=data['city'], state=data['state'],
+            status='Pending'
+        ))
+    db.session.commit()
+    return total_amount
+
+
+def bulk_checkout(user_id, txnid, data):
+    cart = load_cart(user_id)
+    _, total_amount = create_cart_orders(cart, user_id, txnid, 'payu', data)
+    db.session.commit()
+    return total_amount
+
+
+def build_app(path, item_count):
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(name='Ravi Kumar', email='ravi@example.com', password='secret')
+        db.session.add(user)
+        db.session.flush()
+        cart = Cart(user_id=user.id)
+        db.session.add(cart)
+        db.session.flush()
+        db.session.add_all([
+            CartItem(cart_id=cart.id, product_id=f'P{i}', product_name=f'Commodity {i}',
+                     price_per_unit=20.0 + i, unit='kg', quantity=2000)
+            for i in range(item_count)
+        ])
+        db.session.commit()
+        user_id = user.id
+    return app, user_id
+
+
+def measure(app, user_id, checkout, repeat):
+    timings = []
+    statements = 0
+    with app.app_context():
+        engine = db.engine
+        for _ in range(repeat):
+            db.session.remove()  # Fresh identity map, as in a new request
+            with count_queries(engine) as counter:
+                started = time.perf_counter()
+                checkout(user_id, str(uuid.uuid4()), CHECKOUT)
+                timings.append(time.perf_counter() - started)
+            statements = counter.count
+    return statistics.median(timings), statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 500])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    print("=" * 84)
+    print("CART CHECKOUT ORDER CREATION BENCHMARK (median per checkout)")
+    print("=" * 84)
+    print(f"{'items':>6} | {'legacy':>10} | {'stmts':>6} | {'bulk':>10} | {'stmts':>6} | {'speedup':>8}")
+    print("-" * 84)
+
+    for size in args.sizes:
+        results = []
+        for checkout in (legacy_checkout, bulk_checkout):
+            with tempfile.TemporaryDirectory() as workdir:
+                app, user_id = build_app(os.path.join(workdir, 'checkout.db'), size)
+                results.append(measure(app, user_id, checkout, args.repeat))
+                with app.app_context():
+                    db.engine.dispose()
+
+        (legacy, legacy_stmts), (bulk, bulk_stmts) = results
+        print(f"{size:>6} | {legacy * 1000:>7.2f} ms | {legacy_stmts:>6} | "
+              f"{bulk * 1000:>7.2f} ms | {bulk_stmts:>6} | {legacy / bulk:>7.1f}x")
+
+    print("=" * 84)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: commodity catalog loading, JSON parse vs mmap snapshot
+Compares CommodityCatalog.from_file (json.load + building every product dict
+and index) with CatalogSnapshot (read-only mmap of the file written by
+`flask --app run build-catalog-snapshot`). Reports load time, query and
+lookup latency, and per-process memory measured in fresh subprocesses:
+private (anonymous) RSS is what every gunicorn worker pays on its own,
+file-backed RSS is page cache shared by all workers mapping the snapshot.
+
+Usage:
+    python benchmarks/bench_catalog_snapshot.py
+    python benchmarks/bench_catalog_snapshot.py --catalog ../public/db/commodity_data.json --repeat 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to import project modules
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_DIR)
+
+from api.catalog import CommodityCatalog
+from api.catalog_snapshot import CatalogSnapshot, build_snapshot
+
+DEFAULT_CATALOG = os.path.join(PROJECT_DIR, '..', 'public', 'db', 'commodity_data.json')
+
+# Run in a fresh interpreter: RSS before/after loading the catalog and serving a workload
+RSS_PROBE = r'''
+import json, sys
+sys.path.insert(0, {project!r})
+
+def status():
+    fields = {{}}
+    with open('/proc/self/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('VmRSS', 'RssAnon', 'RssFile'):
+                fields[name] = int(value.split()[0])
+    return fields
+
+from api.catalog import CommodityCatalog
+from api.catalog_snapshot import CatalogSnapshot
+before = status()
+catalog = CommodityCatalog.from_file({path!r}) if {mode!r} == 'json' else CatalogSnapshot({path!r})
+for category in list(catalog.categories):
+    catalog.query(category=category, limit=50)
+for position in range(0, len(catalog), 7):
+    catalog.get(catalog.products[position]['id'])
+after = status()
+print(json.dumps({{name: after[name] - before[name] for name in after}}))
+'''
+
+
+def timed(func, repeat):
+    """Median wall time in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def per_call_us(func, iterations=2000):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def cold_product_us(open_catalog):
+    """Microseconds per product to read every product once from a freshly opened catalog"""
+    catalog = open_catalog()
+    started = time.perf_counter()
+    for position in range(len(catalog)):
+        catalog.products[position]
+    return (time.perf_counter() - started) / len(catalog) * 1e6
+
+
+def rss_delta(mode, path):
+    """KiB of (VmRSS, RssAnon, RssFile) added by loading the catalog; None off Linux"""
+    if not os.path.exists('/proc/self/status'):
+        return None
+    output = subprocess.run(
+        [sys.executable, '-c', RSS_PROBE.format(project=PROJECT_DIR, path=path, mode=mode)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG, help='commodity_data.json to compile')
+    parser.add_argument('--repeat', type=int, default=10, help='Loads per variant (median reported)')
+    args = parser.parse_args()
+
+    json_catalog = CommodityCatalog.from_file(args.catalog)
+    snapshot_path = os.path.join(tempfile.mkdtemp(), 'commodity_catalog.snapshot')
+    started = time.perf_counter()
+    snapshot_size = build_snapshot(json_catalog, snapshot_path)
+    build_ms = (time.perf_counter() - started) * 1000
+    snapshot = CatalogSnapshot(snapshot_path)
+    assert snapshot.query(category='spices', limit=20) == json_catalog.query(category='spices', limit=20)
+
+    sample_id = json_catalog.products[len(json_catalog) // 2]['id']
+    busy_location = max(json_catalog.by_location, key=lambda key: len(json_catalog.by_location[key]))
+
+    rows = []
+    for name, catalog, load in (
+        ('json', json_catalog, lambda: CommodityCatalog.from_file(args.catalog)),
+        ('snapshot', snapshot, lambda: CatalogSnapshot(snapshot_path)),
+    ):
+        rows.append((
+            name,
+            timed(load, args.repeat),
+            per_call_us(lambda: catalog.get(sample_id)),
+            per_call_us(lambda: catalog.query(category='spices', offset=100, limit=50)),
+            per_call_us(lambda: catalog.query(location=busy_location, category='spices', limit=50)),
+            cold_product_us(load),
+            rss_delta(name, args.catalog if name == 'json' else snapshot_path),
+        ))
+
+    width = 110
+    print("=" * width)
+    print(f"COMMODITY CATALOG: {len(json_catalog)} products, JSON {os.path.getsize(args.catalog) / 1024:,.0f} KiB, "
+          f"snapshot {snapshot_size / 1024:,.0f} KiB (built in {build_ms:.0f} ms)")
+    print("=" * width)
+    print(f"{'loader':>9} | {'load ms':>8} | {'get µs':>7} | {'page µs':>8} | {'2-filter µs':>11} | "
+          f"{'cold µs/item':>12} | {'RSS KiB':>8} | {'private KiB':>11} | {'shared KiB':>10}")
+    print("-" * width)
+    for name, load_ms, get_us, page_us, filter_us, cold_us, rss in rows:
+        rss = rss or {}
+        print(f"{name:>9} | {load_ms:>8.2f} | {get_us:>7.2f} | {page_us:>8.1f} | {filter_us:>11.1f} | "
+              f"{cold_us:>12.2f} | "
+              f"{rss.get('VmRSS', float('nan')):>8,} | {rss.get('RssAnon', float('nan')):>11,} | "
+              f"{rss.get('RssFile', float('nan')):>10,}")
+    print("=" * width)
+    print("get/page/2-filter are repeated (warm) calls; cold = first read of each product after opening")
+    print("private = anonymous memory per worker; shared = file pages in the page cache (one copy for all workers)")
+
+
+if __name__ == '__main__':
+    main()
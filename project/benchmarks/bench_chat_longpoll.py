@@ -0,0 +1,182 @@
+"""
+Benchmark: inquiry chat short-polling vs long-polling
+Runs the app against a temporary SQLite file with --chats open chat windows
+(one buyer thread each) while a seller thread sends --rate messages per chat
+per minute, for --seconds in each mode:
+
+    short   GET /messages?after_id= every --interval seconds (what the UI
+            would need to look live)
+    long    GET /messages/wait?after_id= in a loop (returns on a new message
+            or after --timeout seconds)
+
+Reports requests and SQL statements per chat-minute, and how long a message
+took to reach the other side.
+
+Usage:
+    python benchmarks/bench_chat_longpoll.py
+    python benchmarks/bench_chat_longpoll.py --chats 50 --seconds 30 --interval 3 --rate 4
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from api import create_app, db
+from api.models import User, Inquiry, ChatMessage
+from testing import TestConfig, login
+
+
+def make_app(chats, timeout):
+    path = os.path.join(tempfile.mkdtemp(), 'chat.db')
+
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'check_same_thread': False, 'timeout': 30}}
+        CHAT_LONG_POLL_TIMEOUT = timeout
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        seller = User(name='Seller', email='seller@example.com', password='secret', role='trader')
+        buyers = [User(name=f'Buyer {i}', email=f'buyer{i}@example.com', password='secret') for i in range(chats)]
+        db.session.add_all([seller] + buyers)
+        db.session.flush()
+        inquiries = [Inquiry(
+            product_id=1, product_name='Basmati Rice', seller_id=seller.id, seller_name=seller.name,
+            buyer_id=buyer.id, buyer_name=buyer.name, quantity=25, unit='Quintal', estimated_price=75000,
+            price_per_unit=3000, address_line_1='Shop 4', city='Karnal', state='Haryana', pincode='132001',
+            mobile='9876543210',
+        ) for buyer in buyers]
+        db.session.add_all(inquiries)
+        db.session.commit()
+        return app, seller.id, [(buyer.id, inquiry.id) for buyer, inquiry in zip(buyers, inquiries)]
+
+
+def client_for(app, user_id):
+    client = app.test_client()
+    with app.app_context():
+        login(client, db.session.get(User, user_id))
+    return client
+
+
+def run(mode, args):
+    app, seller_id, chats = make_app(args.chats, args.timeout)
+    with app.app_context():
+        engine = db.engine
+    statements = [0]
+    event.listen(engine, 'before_cursor_execute', lambda *_: statements.__setitem__(0, statements[0] + 1))
+
+    stop = threading.Event()
+    sent_at = {}          # message text -> time sent
+    latencies = []
+    requests = [0]
+    lock = threading.Lock()
+
+    def buyer(user_id, inquiry_id):
+        client = client_for(app, user_id)
+        last_id = client.get(f'/api/inquiries/{inquiry_id}/messages').get_json()['lastId'] or 0
+        while not stop.is_set():
+            if mode == 'short':
+                url = f'/api/inquiries/{inquiry_id}/messages?after_id={last_id}'
+            else:
+                url = f'/api/inquiries/{inquiry_id}/messages/wait?after_id={last_id}'
+            body = client.get(url).get_json()
+            received = time.monotonic()
+            with lock:
+                requests[0] += 1
+                for message in body['messages']:
+                    latencies.append(received - sent_at[message['message']])
+            last_id = body['lastId'] or last_id
+            if mode == 'short':
+                stop.wait(args.interval)
+
+    def seller():
+        client = client_for(app, seller_id)
+        rng = random.Random(5)
+        gap = 60 / (args.rate * args.chats)
+        sequence = 0
+        while not stop.wait(rng.expovariate(1 / gap)):
+            _, inquiry_id = rng.choice(chats)
+            sequence += 1
+            text = f'Offer {sequence}'
+            sent_at[text] = time.monotonic()
+            client.post(f'/api/inquiries/{inquiry_id}/messages', json={'message': text})
+
+    threads = [threading.Thread(target=buyer, args=chat, daemon=True) for chat in chats]
+    threads.append(threading.Thread(target=seller, daemon=True))
+    for thread in threads:
+        thread.start()
+    time.sleep(1)  # Let every buyer open its chat
+    with lock:
+        requests[0] = 0
+        latencies.clear()
+    statements[0] = 0
+    started = time.monotonic()
+    time.sleep(args.seconds)
+    elapsed = time.monotonic() - started
+    with lock:
+        counted_requests, counted_latencies = requests[0], list(latencies)
+    counted_statements = statements[0]
+    stop.set()
+    with app.app_context():
+        broker = app.extensions.get('chat_broker')
+        stats = broker.stats_dict() if broker else {}
+    # Wake long-polls so the threads can exit
+    if broker:
+        for _, inquiry_id in chats:
+            broker.publish(inquiry_id)
+    for thread in threads:
+        thread.join(args.timeout + 5)
+
+    chat_minutes = args.chats * elapsed / 60
+    return {
+        'requests': counted_requests / chat_minutes,
+        'statements': counted_statements / chat_minutes,
+        'messages': len(counted_latencies),
+        'p50': statistics.median(counted_latencies) * 1000 if counted_latencies else float('nan'),
+        'max': max(counted_latencies) * 1000 if counted_latencies else float('nan'),
+        'stats': stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chats', type=int, default=20, help='Open chat windows (buyer threads)')
+    parser.add_argument('--seconds', type=float, default=20, help='Measured run time per mode')
+    parser.add_argument('--interval', type=float, default=3, help='Short-poll interval, seconds')
+    parser.add_argument('--timeout', type=float, default=25, help='Long-poll timeout, seconds')
+    parser.add_argument('--rate', type=float, default=2, help='Messages per chat per minute')
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args) for mode in ('short', 'long')}
+
+    width = 88
+    print("=" * width)
+    print(f"CHAT DELIVERY: {args.chats} chats, {args.rate:g} msg/chat/min, {args.seconds:g} s per mode, "
+          f"short-poll every {args.interval:g} s, long-poll timeout {args.timeout:g} s")
+    print("=" * width)
+    print(f"{'mode':>6} | {'requests/chat-min':>17} | {'SQL/chat-min':>12} | {'messages':>8} | "
+          f"{'latency p50 ms':>14} | {'max ms':>8}")
+    print("-" * width)
+    for mode, result in results.items():
+        print(f"{mode:>6} | {result['requests']:>17.1f} | {result['statements']:>12.1f} | {result['messages']:>8} | "
+              f"{result['p50']:>14.1f} | {result['max']:>8.1f}")
+    print("=" * width)
+    saved = results['short']['requests'] - results['long']['requests']
+    print(f"long-polling saves {saved:.1f} requests per chat-minute "
+          f"({saved * args.chats:.0f}/min for {args.chats} open chats)")
+    print(f"broker counters (long run): {results['long']['stats']}")
+
+
+if __name__ == '__main__':
+    main()
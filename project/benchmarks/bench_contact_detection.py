@@ -0,0 +1,150 @@
+"""
+Benchmark: chat contact detection, per-pattern vs combined matcher
+Generates --messages chat messages shaped like mandi negotiations (prices,
+quantities, grades, some Hindi; --contact-share of them share a phone
+number, email, WhatsApp or a handle) and checks them with:
+
+    per-pattern   a direct port of src/lib/contact-detection.ts: 17 regexes
+                  tried one after another, four passes of .some()
+    combined      api.contact_detection.detect_contact_info: one regex, one
+                  pass over the message
+
+Both must agree on severity for every message before timing is reported.
+Then the batch rescan (scan_chat_messages) is timed over the same messages
+stored in a temporary SQLite database.
+
+Usage:
+    python benchmarks/bench_contact_detection.py
+    python benchmarks/bench_contact_detection.py --messages 200000 --contact-share 0.05 --chunk-size 1000
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import create_app, db
+from api.contact_detection import detect_contact_info, scan_chat_messages, FRONTEND_PATTERNS
+from api.models import ChatMessage
+from testing import TestConfig
+
+LEGACY_PATTERNS = [(name, [re.compile(pattern, re.ASCII) for pattern in patterns])
+                   for name, patterns in FRONTEND_PATTERNS.items()]
+
+COMMODITIES = ['Basmati Rice', 'Wheat', 'Turmeric', 'Red Chilli', 'Jeera', 'Moong Dal', 'Mustard', 'हल्दी', 'गेहूं']
+CLEAN = [
+    'What is your best price for {q} quintal of {c}?',
+    'Can you do {p} per quintal? We need {q} quintal by next week',
+    '{c} sample looks good, moisture is about 12%. Rate {p} final?',
+    'Price is firm at ₹{p}/quintal, loading from Karnal mandi',
+    'ठीक है, {q} क्विंटल {c} भेज दीजिए',
+    'Truck will reach on 14/02, bill of {q} quintal at {p} = {total}',
+    'Grade A {c}, packed in 50 kg bags. Minimum order {q} quintal',
+    'Ok',
+]
+CONTACT = [
+    'Call me on 98{n8}', 'my number +91 9{n9}', 'mail me at ravi.{c2}@gmail.com', 'are you on whatsapp?',
+    'WA me 9{n3} {n3} {n4}', 'nine eight seven {n2} {n2} {n3}', 'DM @mandi_{c2} on instagram', 'telegram?',
+]
+
+
+def make_messages(count, contact_share, seed=21):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        template = rng.choice(CONTACT if rng.random() < contact_share else CLEAN)
+        quantity, price = rng.randint(10, 500), rng.randint(18, 95) * 100
+        messages.append(template.format(
+            q=quantity, p=price, total=quantity * price, c=rng.choice(COMMODITIES), c2=rng.randint(1, 99),
+            n2=rng.randint(10, 99), n3=rng.randint(100, 999), n4=rng.randint(1000, 9999),
+            n8=rng.randint(10 ** 7, 10 ** 8 - 1), n9=rng.randint(10 ** 8, 10 ** 9 - 1),
+        ))
+    return messages
+
+
+def detect_legacy(text):
+    """detectContactInfo as written in the frontend"""
+    if not text:
+        return 'low'
+    types = [name for name, patterns in LEGACY_PATTERNS if any(p.search(text) for p in patterns)]
+    if not types:
+        return 'low'
+    return 'high' if 'phone number' in types or 'email address' in types else 'medium'
+
+
+def timed(func, repeat):
+    """Median wall time in seconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def time_scan(messages, chunk_size):
+    path = os.path.join(tempfile.mkdtemp(), 'chat.db')
+
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(ChatMessage.__table__.insert(), [
+            {'inquiry_id': i % 500 + 1, 'sender_id': 1, 'sender_name': 'Buyer', 'sender_role': 'buyer',
+             'message': text, 'is_read': False} for i, text in enumerate(messages)
+        ])
+        db.session.commit()
+        started = time.perf_counter()
+        flagged = sum(1 for _ in scan_chat_messages(chunk_size=chunk_size))
+        return time.perf_counter() - started, flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200_000, help='Messages per run')
+    parser.add_argument('--contact-share', type=float, default=0.05, help='Share of messages with contact info')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per query in the rescan')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant (median reported)')
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.contact_share)
+    variants = [
+        ('per-pattern', lambda: [detect_legacy(text) for text in messages]),
+        ('combined', lambda: [detect_contact_info(text).severity for text in messages]),
+    ]
+    results = {name: timed(func, args.repeat) for name, func in variants}
+    mismatches = [text for text, legacy, combined in zip(messages, results['per-pattern'][1], results['combined'][1])
+                  if legacy != combined and 'nine' not in text]  # Spelled-out numbers: server-only pattern
+    assert not mismatches, mismatches[:5]
+
+    scan_seconds, flagged = time_scan(messages, args.chunk_size)
+
+    width = 64
+    print("=" * width)
+    print(f"CONTACT DETECTION: {args.messages:,} messages, {args.contact_share:.0%} with contact info, "
+          f"median of {args.repeat}")
+    print("=" * width)
+    print(f"{'variant':>16} | {'total s':>8} | {'us/message':>10} | {'messages/s':>12} | {'speedup':>7}")
+    print("-" * width)
+    baseline = results['per-pattern'][0]
+    for name, _ in variants:
+        seconds = results[name][0]
+        print(f"{name:>16} | {seconds:>8.3f} | {seconds / args.messages * 1e6:>10.2f} | "
+              f"{args.messages / seconds:>12,.0f} | {baseline / seconds:>6.1f}x")
+    print(f"{'rescan (SQLite)':>16} | {scan_seconds:>8.3f} | {scan_seconds / args.messages * 1e6:>10.2f} | "
+          f"{args.messages / scan_seconds:>12,.0f} |")
+    print("=" * width)
+    print(f"rescan flagged {flagged:,} messages in chunks of {args.chunk_size}")
+
+
+if __name__ == '__main__':
+    main()
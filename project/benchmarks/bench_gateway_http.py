@@ -0,0 +1,133 @@
+"""
+Benchmark: pooled keep-alive gateway sessions vs bare requests.post
+Runs a local stub gateway and compares per-call latency and the number of
+TCP connections (handshakes) each approach opens
+
+Usage:
+    python benchmarks/bench_gateway_http.py
+    python benchmarks/bench_gateway_http.py --calls 500 --tls
+"""
+
+import argparse
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+from api.gateway_http import GatewayHTTP
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    """Answers every POST like the Airpay token endpoint, keeping connections open"""
+    protocol_version = 'HTTP/1.1'
+    # Send headers and body in one segment so delayed ACKs don't skew keep-alive timings
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubGatewayHandler.lock:
+            StubGatewayHandler.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        body = json.dumps({'response': 'stub'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_self_signed_cert(directory):
+    """Create a throwaway localhost certificate with the openssl CLI"""
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return cert, key
+
+
+def start_stub_server(use_tls, workdir):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGatewayHandler)
+    server.daemon_threads = True
+    scheme = 'http'
+    if use_tls:
+        cert, key = make_self_signed_cert(workdir)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/oauth2/"
+
+
+def run(label, send, calls):
+    StubGatewayHandler.connections = 0
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = send()
+        response.content
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(f"{label:<28} mean {statistics.mean(timings):7.3f} ms | "
+          f"p50 {timings[len(timings) // 2]:7.3f} ms | "
+          f"p95 {timings[int(len(timings) * 0.95) - 1]:7.3f} ms | "
+          f"connections {StubGatewayHandler.connections}")
+    return statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=300)
+    parser.add_argument('--tls', action='store_true', help='serve the stub over HTTPS (needs openssl)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server, url = start_stub_server(args.tls, workdir)
+        verify = False if args.tls else True
+        payload = {'merchant_id': '351531', 'encdata': 'x' * 512, 'checksum': 'y' * 64}
+        warnings.filterwarnings('ignore')
+
+        client = GatewayHTTP()
+        client.configure({'stub': {'connect_timeout': 2, 'read_timeout': 5}})
+
+        print("=" * 100)
+        print(f"GATEWAY HTTP BENCHMARK ({'HTTPS' if args.tls else 'HTTP'}, {args.calls} calls)")
+        print("=" * 100)
+
+        bare = run('bare requests.post', lambda: requests.post(url, data=payload, timeout=5, verify=verify), args.calls)
+        pooled = run('pooled gateway_http.post', lambda: client.post('stub', url, data=payload, verify=verify), args.calls)
+
+        print("-" * 100)
+        print(f"Pooling saves {bare - pooled:.3f} ms per call ({bare / pooled:.1f}x faster)")
+        print("=" * 100)
+
+        client.close()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
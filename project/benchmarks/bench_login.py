@@ -0,0 +1,157 @@
+"""
+Benchmark: /api/auth/login throughput across bcrypt costs
+For each cost in --costs, --clients threads post --logins logins between
+them while one more thread polls /api/auth/status (a request with no
+bcrypt) the whole time. Two setups per cost:
+
+    unbounded   one hashing thread per client, i.e. every login hashes at
+                once, as when bcrypt ran on the request thread
+    pool        BCRYPT_WORKERS = one per CPU (the default)
+
+Reported: logins per second, login p50/p95 latency, and the p50 latency
+of the status requests served while the logins were running. The last
+line times the one-off rehash of a login whose stored hash has a lower
+cost (the first login after raising BCRYPT_LOG_ROUNDS).
+
+Usage:
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --costs 8,10,12 --clients 16 --logins 64
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import create_app, db, bcrypt
+from api.models import User
+from testing import TestConfig
+
+
+def make_app(path, cost, workers, users):
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        BCRYPT_LOG_ROUNDS = cost
+        BCRYPT_WORKERS = workers
+        BCRYPT_QUEUE_SIZE = 1000
+        USER_CACHE_TTL = 0
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        accounts = [User(name=f'Trader {i}', email=f'trader{i}@example.com', password='secret') for i in range(users)]
+        db.session.add_all(accounts)
+        db.session.commit()
+    app.test_client().get('/api/auth/status')  # Import the blueprints before timing
+    return app
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(app, clients, logins, users):
+    """(logins/s, login p50 s, login p95 s, status p50 s during the logins)"""
+    login_times, status_times = [], []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def login_client(index):
+        client = app.test_client()
+        for i in range(index, logins, clients):
+            started = time.perf_counter()
+            response = client.post('/api/auth/login', json={'email': f'trader{i % users}@example.com',
+                                                            'password': 'secret'})
+            assert response.status_code == 200, response.status_code
+            with lock:
+                login_times.append(time.perf_counter() - started)
+
+    def poll_status():
+        client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/api/auth/status')
+            status_times.append(time.perf_counter() - started)
+            time.sleep(0.005)
+
+    poller = threading.Thread(target=poll_status)
+    threads = [threading.Thread(target=login_client, args=(index,)) for index in range(clients)]
+    poller.start()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    poller.join()
+    return (logins / elapsed, statistics.median(login_times), percentile(login_times, 0.95),
+            statistics.median(status_times))
+
+
+def time_rehash(path, cost, users):
+    """(ms of a login that rehashes, ms of the same login afterwards)"""
+    app = make_app(path, cost, 0, users)
+    with app.app_context():
+        user = User.query.filter_by(email='trader0@example.com').first()
+        user.password = bcrypt.generate_password_hash('secret', max(4, cost - 2)).decode('utf-8')
+        db.session.commit()
+    client = app.test_client()
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        client.post('/api/auth/login', json={'email': 'trader0@example.com', 'password': 'secret'})
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--costs', default='8,10,12', help='Comma-separated BCRYPT_LOG_ROUNDS values')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent login threads')
+    parser.add_argument('--logins', type=int, default=32, help='Logins per setup')
+    parser.add_argument('--users', type=int, default=4, help='Distinct accounts')
+    args = parser.parse_args()
+    costs = [int(cost) for cost in args.costs.split(',')]
+    cpus = os.cpu_count() or 1
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    results = {}
+    try:
+        for cost in costs:
+            for name, workers in (('unbounded', args.clients), ('pool', cpus)):
+                app = make_app(path, cost, workers, args.users)
+                results[(cost, name)] = run(app, args.clients, args.logins, args.users)
+                with app.app_context():
+                    db.engine.dispose()
+        rehash_ms, after_ms = time_rehash(path, costs[-1], args.users)
+    finally:
+        os.remove(path)
+
+    width = 72
+    print("=" * width)
+    print(f"LOGIN THROUGHPUT: {args.logins} logins, {args.clients} clients, {cpus} CPUs")
+    print("=" * width)
+    print(f"{'cost':>4} | {'setup':>9} | {'logins/s':>8} | {'login p50 ms':>12} | {'p95 ms':>7} | "
+          f"{'status p50 ms':>13}")
+    print("-" * width)
+    for (cost, name), (rate, p50, p95, status) in results.items():
+        print(f"{cost:>4} | {name:>9} | {rate:>8.1f} | {p50 * 1000:>12.1f} | {p95 * 1000:>7.1f} | "
+              f"{status * 1000:>13.2f}")
+    print("-" * width)
+    print(f"Cost {max(4, costs[-1] - 2)} -> {costs[-1]} rehash: first login {rehash_ms:.1f} ms, "
+          f"next login {after_ms:.1f} ms")
+    print("=" * width)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: cost of the request metrics middleware
+Sends --requests GETs to the chat endpoints (a few SQL statements each, like
+most of the API) through the Flask test client in three setups:
+
+    off        METRICS_ENABLED=False
+    metrics    METRICS_ENABLED=True (latency histogram, SQL events, counters)
+    profiler   metrics plus the sampling profiler armed with a threshold no
+               request reaches, so every request is sampled the whole time
+
+and reports the time per request and the overhead over "off".
+
+Usage:
+    python benchmarks/bench_metrics_overhead.py
+    python benchmarks/bench_metrics_overhead.py --requests 3000 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import create_app, db
+from api.metrics import metrics
+from api.models import User, Inquiry, ChatMessage
+from testing import TestConfig, login
+
+
+def make_client(enabled):
+    class BenchConfig(TestConfig):
+        METRICS_ENABLED = enabled
+        PROFILER_ENABLED = True
+
+    app = create_app(BenchConfig)
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        seller = User(name='Seller', email='seller@example.com', password='secret', role='trader')
+        buyer = User(name='Buyer', email='buyer@example.com', password='secret')
+        db.session.add_all([seller, buyer])
+        db.session.flush()
+        inquiry = Inquiry(
+            product_id=1, product_name='Basmati Rice', seller_id=seller.id, seller_name=seller.name,
+            buyer_id=buyer.id, buyer_name=buyer.name, quantity=25, unit='Quintal', estimated_price=75000,
+            price_per_unit=3000, address_line_1='Shop 4', city='Karnal', state='Haryana', pincode='132001',
+            mobile='9876543210',
+        )
+        db.session.add(inquiry)
+        db.session.flush()
+        db.session.add_all([ChatMessage(inquiry_id=inquiry.id, sender_id=seller.id, sender_name=seller.name,
+                                        sender_role='trader', message=f'Offer {i}') for i in range(20)])
+        db.session.commit()
+        login(client, buyer)
+        urls = [f'/api/inquiries/{inquiry.id}/messages', '/api/inquiries/unread-count']
+    client.get(urls[0])  # Import the blueprints and mark messages read before timing
+    return client, urls
+
+
+def run(client, urls, count):
+    started = time.perf_counter()
+    for i in range(count):
+        client.get(urls[i % len(urls)])
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per run')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per setup (median reported)')
+    args = parser.parse_args()
+
+    results = {}
+    # "off" runs before any app enables metrics: the SQL hooks are installed process-wide
+    for name in ('off', 'metrics', 'profiler'):
+        if name != 'profiler':
+            client, urls = make_client(name == 'metrics')
+        else:
+            metrics.profiler.arm(threshold_ms=60_000)
+        results[name] = statistics.median(run(client, urls, args.requests) for _ in range(args.repeat))
+        metrics.profiler.disarm()
+
+    width = 60
+    print("=" * width)
+    print(f"METRICS OVERHEAD: {args.requests:,} requests per run, median of {args.repeat}")
+    print("=" * width)
+    print(f"{'setup':>10} | {'us/request':>10} | {'overhead us':>11} | {'overhead':>8}")
+    print("-" * width)
+    baseline = results['off']
+    for name, seconds in results.items():
+        print(f"{name:>10} | {seconds * 1e6:>10.0f} | {(seconds - baseline) * 1e6:>11.0f} | "
+              f"{(seconds / baseline - 1) * 100:>7.1f}%")
+    print("=" * width)
+
+
+if __name__ == '__main__':
+    main()
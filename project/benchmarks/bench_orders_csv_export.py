@@ -0,0 +1,108 @@
+"""
+Benchmark: streamed admin CSV export
+Reports time to first byte, total time and peak Python heap (tracemalloc)
+for /api/admin/orders/download at several table sizes. Peak memory should
+stay flat as the order count grows.
+
+Usage:
+    python benchmarks/bench_orders_csv_export.py
+    python benchmarks/bench_orders_csv_export.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+
+from api import db, create_app, register_blueprints
+from api.models import User, Order
+from testing import TestConfig, login
+
+INSERT_BATCH = 50000
+
+
+def build_app(path, order_count):
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    register_blueprints(app)  # Keep lazy blueprint imports out of the first-byte timing
+    with app.app_context():
+        db.create_all()
+        admin = User(name='Admin', email='admin@example.com', password='secret', role='admin')
+        buyers = [User(name=f'Buyer {i}', email=f'buyer{i}@example.com', password='secret') for i in range(50)]
+        db.session.add_all([admin] + buyers)
+        db.session.flush()
+        buyer_ids = [buyer.id for buyer in buyers]
+
+        start = datetime.datetime(2024, 1, 1)
+        for offset in range(0, order_count, INSERT_BATCH):
+            db.session.execute(insert(Order), [
+                dict(user_id=buyer_ids[i % 50], product_name='Basmati Rice', quantity=2000, unit='kg',
+                     total_price=90000.0, amount_paid=90000.0, payment_option='Online', utr_code=f'TXN{i}',
+                     status='Booked', buyer_name='Buyer', buyer_mobile='9876543210', address_line_1='Shop 4',
+                     address_line_2='', city='Karnal', state='Haryana', pincode='132001',
+                     ordered_on=start + datetime.timedelta(minutes=i))
+                for i in range(offset, min(offset + INSERT_BATCH, order_count))
+            ])
+        db.session.commit()
+        admin_id = admin.id
+    return app, admin_id
+
+
+def measure(app, admin_id):
+    client = app.test_client()
+    with app.app_context():
+        login(client, db.session.get(User, admin_id))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get('/api/admin/orders/download', buffered=False)
+    chunks = iter(response.response)
+    next(chunks)
+    first_byte = time.perf_counter() - started
+
+    total_bytes = 0
+    for chunk in chunks:
+        total_bytes += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, elapsed, peak, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    print("=" * 92)
+    print("ADMIN CSV EXPORT BENCHMARK (streamed, yield_per batches)")
+    print("=" * 92)
+    print(f"{'orders':>10} | {'first byte':>12} | {'total':>10} | {'peak heap':>12} | {'CSV size':>10}")
+    print("-" * 92)
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            app, admin_id = build_app(os.path.join(workdir, 'orders.db'), size)
+            first_byte, elapsed, peak, total_bytes = measure(app, admin_id)
+            with app.app_context():
+                db.engine.dispose()
+
+        print(f"{size:>10} | {first_byte * 1000:>9.2f} ms | {elapsed:>8.2f} s | "
+              f"{peak / 1024 / 1024:>9.2f} MB | {total_bytes / 1024 / 1024:>7.1f} MB")
+
+    print("=" * 92)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark: SabPaisa AES-256-GCM + HMAC-SHA384 encrypt/decrypt throughput
+Compares the previous per-call path (new AES256HMACSHA384HEX per request:
+base64-decode the keys, key a fresh HMAC, concatenate/copy every slice)
+with the cached crypto context used by create_encrypted_request and
+parse_callback_response (keys decoded once, HMAC prototype copied,
+memoryview slicing on decrypt).
+
+Usage:
+    python benchmarks/bench_sabpaisa_crypto.py
+    python benchmarks/bench_sabpaisa_crypto.py --sizes 300 800 4096 --seconds 2
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import sys
+import time
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Crypto.Cipher import AES
+
+from api.sabpaisa_utils import crypto_context, parse_callback_response
+from config import Config
+
+AUTH_KEY = Config.SABPAISA_AUTH_KEY
+AUTH_IV = Config.SABPAISA_AUTH_IV
+
+# ~300 B: payment request string, ~800 B: callback with UDFs, 4 KB: upper bound
+DEFAULT_SIZES = [300, 800, 4096]
+
+
+class LegacyAES256HMACSHA384HEX:
+    """The previous implementation, kept here for comparison"""
+
+    def __init__(self, auth_key, auth_iv):
+        self.auth_key = base64.b64decode(auth_key.strip())
+        self.auth_iv = base64.b64decode(auth_iv.strip())
+
+    def encrypt(self, plaintext):
+        iv = os.urandom(12)
+        cipher = AES.new(self.auth_key, AES.MODE_GCM, nonce=iv, mac_len=16)
+        ciphertext, tag = cipher.encrypt_and_digest(plaintext.encode('utf-8'))
+        encrypted_message = iv + ciphertext + tag
+        hmac_calculated = hmac.new(self.auth_iv, encrypted_message, hashlib.sha384).digest()
+        return (hmac_calculated + encrypted_message).hex().upper()
+
+    def decrypt(self, hex_ciphertext):
+        full_message = bytes.fromhex(hex_ciphertext)
+        hmac_received = full_message[:48]
+        encrypted_data = full_message[48:]
+        hmac_calculated = hmac.new(self.auth_iv, encrypted_data, hashlib.sha384).digest()
+        if not hmac.compare_digest(hmac_received, hmac_calculated):
+            raise ValueError("HMAC validation failed")
+        iv = encrypted_data[:12]
+        ciphertext_with_tag = encrypted_data[12:]
+        cipher = AES.new(self.auth_key, AES.MODE_GCM, nonce=iv, mac_len=16)
+        return cipher.decrypt_and_verify(ciphertext_with_tag[:-16], ciphertext_with_tag[-16:]).decode('utf-8')
+
+
+def legacy_encrypt(payload):
+    return LegacyAES256HMACSHA384HEX(AUTH_KEY, AUTH_IV).encrypt(payload)
+
+
+def legacy_decrypt(encrypted):
+    return LegacyAES256HMACSHA384HEX(AUTH_KEY, AUTH_IV).decrypt(encrypted)
+
+
+def cached_encrypt(payload):
+    return crypto_context(AUTH_KEY, AUTH_IV).encrypt(payload)
+
+
+def cached_decrypt(encrypted):
+    return crypto_context(AUTH_KEY, AUTH_IV).decrypt(encrypted)
+
+
+def make_payload(size):
+    """A SabPaisa-style key=value string of roughly `size` bytes"""
+    base = ("payerName=Ravi Kumar&payerEmail=ravi@example.com&payerMobile=9876543210"
+            "&clientTxnId=3f2c8a1e-6d1b-4c55-9a0e-1c2b3d4e5f60&amount=90000.0&clientCode=RKRM88"
+            "&amountType=INR&channelId=W")
+    udf = 1
+    while len(base) < size:
+        base += f"&udf{udf}=" + 'x' * 40
+        udf += 1
+    return base[:size]
+
+
+def ops_per_second(func, arg, seconds, rounds=5):
+    """Best calls/second over `rounds` rounds sharing roughly `seconds` of wall time"""
+    budget = seconds / rounds
+    best = 0.0
+    for _ in range(rounds):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            for _ in range(100):
+                func(arg)
+            calls += 100
+            elapsed = time.perf_counter() - started
+            if elapsed >= budget:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seconds', type=float, default=1.0, help='Measuring time per cell (best of 5 rounds)')
+    args = parser.parse_args()
+
+    print("=" * 92)
+    print("SABPAISA CRYPTO THROUGHPUT (ops/s, higher is better)")
+    print("=" * 92)
+    print(f"{'payload':>8} | {'op':>8} | {'legacy':>12} | {'cached':>12} | {'speedup':>8} | {'µs/op cached':>13}")
+    print("-" * 92)
+
+    for size in args.sizes:
+        payload = make_payload(size)
+        encrypted = cached_encrypt(payload)
+        assert legacy_decrypt(encrypted) == payload
+        assert cached_decrypt(legacy_encrypt(payload)) == payload
+        assert parse_callback_response(encrypted, AUTH_KEY, AUTH_IV)['clientTxnId']
+
+        for op, legacy, cached, arg in (('encrypt', legacy_encrypt, cached_encrypt, payload),
+                                        ('decrypt', legacy_decrypt, cached_decrypt, encrypted)):
+            before = ops_per_second(legacy, arg, args.seconds)
+            after = ops_per_second(cached, arg, args.seconds)
+            print(f"{size:>6} B | {op:>8} | {before:>12,.0f} | {after:>12,.0f} | "
+                  f"{after / before:>7.2f}x | {1e6 / after:>13.1f}")
+
+    print("=" * 92)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: /api/search index latency at catalog scale and beyond
+Builds a SearchIndex from the commodity catalog, then pads it with synthetic
+listings (titles, sellers and locations recombined from the catalog's own
+vocabulary, a share of them in Devanagari) up to --docs documents, and
+replays a mixed query workload: exact words, short prefixes, typos, Hindi
+and Hinglish spellings, and multi-word queries. Reports build time, memory
+and per-query-kind p50/p99. Also times the previous way of finding a product
+by name, a substring scan over every title (what the frontend does today).
+
+Usage:
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --docs 100000 --rounds 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Add parent directory to path to import project modules
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_DIR)
+
+from api.catalog import CommodityCatalog
+from api.search import SearchIndex, catalog_document, NAME, SELLER, LOCATION
+
+DEFAULT_CATALOG = os.path.join(PROJECT_DIR, '..', 'public', 'db', 'commodity_data.json')
+
+HINDI_NAMES = ['हल्दी', 'जीरा', 'लाल मिर्च', 'प्याज़', 'आलू', 'गेहूं', 'चावल', 'सरसों', 'मूंगफली', 'इलायची']
+
+QUERIES = {
+    'word': ['turmeric', 'onion', 'basmati', 'cardamom', 'potato', 'wheat'],
+    'prefix': ['tu', 'on', 'bas', 'card', 'pot', 'gu'],
+    'typo': ['tumeric', 'onoin', 'basmti', 'cardamon', 'potatoe', 'wheet'],
+    'hindi': ['हल्दी', 'jeera', 'pyaz', 'मिर्च', 'aloo', 'gehun'],
+    'multi': ['turmeric erode', 'red chilli guntur', 'onion nashik maharashtra', 'basmati rice haryana',
+              'haldi powder', 'potato agra'],
+}
+
+
+def synthetic_documents(catalog, count, seed=7):
+    """Listings recombined from the catalog's titles, sellers and locations"""
+    rng = random.Random(seed)
+    titles = [product['title'] for product in catalog.products] + HINDI_NAMES * 20
+    sellers = [product['seller'] for product in catalog.products if product['seller']]
+    locations = [product['location'] for product in catalog.products if product['location']]
+    for i in range(count):
+        fields = [(rng.choice(titles), NAME), (rng.choice(sellers), SELLER), (rng.choice(locations), LOCATION)]
+        yield f'p:{i}', fields, {'type': 'listing', 'id': i, 'title': fields[0][0]}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG, help='commodity_data.json to index')
+    parser.add_argument('--docs', type=int, default=100_000, help='Total documents to index')
+    parser.add_argument('--rounds', type=int, default=20, help='Times each query is run')
+    args = parser.parse_args()
+
+    catalog = CommodityCatalog.from_file(args.catalog)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = SearchIndex()
+    for product in catalog.products:
+        index.add(*catalog_document(product))
+    for document in synthetic_documents(catalog, max(args.docs - len(catalog), 0)):
+        index.add(*document)
+    build_s = time.perf_counter() - started
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+
+    width = 84
+    print("=" * width)
+    print(f"SEARCH INDEX: {len(index):,} documents, {len(index.terms):,} terms, "
+          f"built in {build_s:.1f} s, {memory_mb:,.0f} MiB")
+    print("=" * width)
+    print(f"{'queries':>8} | {'avg hits':>9} | {'p50 ms':>7} | {'p99 ms':>7} | {'max ms':>7} | "
+          f"{'scan p50 ms':>11}")
+    print("-" * width)
+
+    titles = [payload[1]['title'].lower() for payload in index.docs if payload]
+    overall = []
+    for kind, queries in QUERIES.items():
+        samples, hits, scans = [], [], []
+        for _ in range(args.rounds):
+            for query in queries:
+                started = time.perf_counter()
+                _, total = index.search(query, 20)
+                samples.append((time.perf_counter() - started) * 1000)
+                hits.append(total)
+        for query in queries:
+            started = time.perf_counter()
+            [title for title in titles if query.lower() in title][:20]
+            scans.append((time.perf_counter() - started) * 1000)
+        overall.extend(samples)
+        print(f"{kind:>8} | {statistics.mean(hits):>9,.0f} | {percentile(samples, 0.5):>7.2f} | "
+              f"{percentile(samples, 0.99):>7.2f} | {max(samples):>7.2f} | {statistics.median(scans):>11.2f}")
+    print("-" * width)
+    print(f"{'all':>8} | {'':>9} | {percentile(overall, 0.5):>7.2f} | {percentile(overall, 0.99):>7.2f} | "
+          f"{max(overall):>7.2f} |")
+    print("=" * width)
+    print("scan = substring match over every title (exact spelling only, no ranking)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: shipping quotes, one at a time vs batch
+Prices --quotes consignments (random weights, units, origin/destination
+states and categories drawn from the commodity catalog) three ways:
+quote_shipping in a Python loop, quote_shipping_batch on its plain-loop path,
+and quote_shipping_batch vectorized with NumPy. rated_charge (inquiry
+approval with a seller rate) is timed the same way. Results are checked to
+be identical before timing is reported.
+
+Usage:
+    python benchmarks/bench_shipping.py
+    python benchmarks/bench_shipping.py --quotes 1000000 --repeat 3
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import shipping
+from api.shipping import (
+    ShippingError, quote_shipping, quote_shipping_batch, rated_charge, rated_charge_batch, location_state,
+)
+
+STATES = ['Haryana', 'Punjab', 'Uttar Pradesh', 'Maharashtra', 'Gujarat', 'Tamil Nadu', 'Andhra Pradesh',
+          'Karnataka', 'Kerala', 'West Bengal', 'Madhya Pradesh', 'Rajasthan']
+CATEGORIES = ['spices', 'fruits', 'vegetables', 'grains', 'pulses', 'dry-fruits', 'oil-seeds', 'flowers']
+UNITS = ['Kg', 'Quintal', 'Ton', 'Piece', 'kg', 'g']
+
+
+def workload(count, seed=11):
+    rng = random.Random(seed)
+    weights = [rng.choice((rng.uniform(1, 60), rng.uniform(60, 2500), rng.randint(1, 100))) for _ in range(count)]
+    units = [rng.choice(UNITS) for _ in range(count)]
+    # Shipping within the state is common in mandi trade
+    from_states = [location_state(f"City, {rng.choice(STATES)}") for _ in range(count)]
+    to_states = [origin if rng.random() < 0.4 else rng.choice(STATES) for origin in from_states]
+    categories = [rng.choice(CATEGORIES) for _ in range(count)]
+    rates = [round(rng.uniform(0.5, 4), 2) for _ in range(count)]
+    return weights, units, from_states, to_states, categories, rates
+
+
+def quote_loop(weights, units, from_states, to_states, categories):
+    charges = []
+    for args in zip(weights, units, from_states, to_states, categories):
+        try:
+            charges.append(quote_shipping(*args).charge)
+        except ShippingError:
+            charges.append(math.nan)
+    return charges
+
+
+def batch_without_numpy(*args):
+    saved = shipping._numpy
+    shipping._numpy = lambda: None
+    try:
+        return quote_shipping_batch(*args)
+    finally:
+        shipping._numpy = saved
+
+
+def timed(func, repeat):
+    """Median wall time in seconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def same(a, b):
+    return all(x == y or (x != x and y != y) for x, y in zip(a, b)) and len(a) == len(b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=1_000_000, help='Consignments per run')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant (median reported)')
+    args = parser.parse_args()
+
+    weights, units, from_states, to_states, categories, rates = workload(args.quotes)
+    quote_args = (weights, units, from_states, to_states, categories)
+
+    variants = [
+        ('quote loop', lambda: quote_loop(*quote_args)),
+        ('batch, no NumPy', lambda: batch_without_numpy(*quote_args)),
+        ('batch, NumPy', lambda: quote_shipping_batch(*quote_args)),
+        ('rated loop', lambda: [rated_charge(q, u, r) for q, u, r in zip(weights, units, rates)]),
+        ('rated batch', lambda: rated_charge_batch(weights, units, rates)),
+    ]
+    if shipping._numpy() is None:
+        print("NumPy is not installed: the batch variants run the plain loop")
+
+    results = {}
+    for name, func in variants:
+        results[name] = timed(func, args.repeat)
+    assert same(results['quote loop'][1], list(results['batch, NumPy'][1]))
+    assert same(results['rated loop'][1], list(results['rated batch'][1]))
+
+    width = 64
+    print("=" * width)
+    print(f"SHIPPING QUOTES: {args.quotes:,} consignments, median of {args.repeat}")
+    print("=" * width)
+    print(f"{'variant':>16} | {'total s':>8} | {'ns/quote':>9} | {'quotes/s':>12} | {'speedup':>7}")
+    print("-" * width)
+    for name, _ in variants:
+        seconds = results[name][0]
+        baseline = results['rated loop' if name.startswith('rated') else 'quote loop'][0]
+        print(f"{name:>16} | {seconds:>8.3f} | {seconds / args.quotes * 1e9:>9.0f} | "
+              f"{args.quotes / seconds:>12,.0f} | {baseline / seconds:>6.1f}x")
+    print("=" * width)
+
+
+if __name__ == '__main__':
+    main()
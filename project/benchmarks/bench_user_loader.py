@@ -0,0 +1,92 @@
+"""
+Benchmark: Flask-Login user loader, uncached vs the session user cache
+Sends --requests authenticated GETs to /api/auth/status (nothing but the
+session user) and /api/inquiries/unread-count (one more query) as --users
+different users, with USER_CACHE_TTL=0 (a SELECT users per request) and
+with the per-worker cache. The database is SQLite, so --rtt-ms adds a
+sleep before every statement to stand in for the round trip to the remote
+Postgres.
+
+Usage:
+    python benchmarks/bench_user_loader.py
+    python benchmarks/bench_user_loader.py --requests 2000 --users 50 --rtt-ms 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import event
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import create_app, db
+from api.models import User
+from testing import TestConfig, login, count_queries
+
+
+def make_clients(ttl, users, rtt):
+    class BenchConfig(TestConfig):
+        USER_CACHE_TTL = ttl
+
+    app = create_app(BenchConfig)
+    clients = []
+    with app.app_context():
+        db.create_all()
+        accounts = [User(name=f'Trader {i}', email=f'trader{i}@example.com', password='secret') for i in range(users)]
+        db.session.add_all(accounts)
+        db.session.commit()
+        for user in accounts:
+            client = app.test_client()
+            login(client, user)
+            clients.append(client)
+        engine = db.engine
+
+    if rtt:
+        event.listen(engine, 'before_cursor_execute', lambda *args: time.sleep(rtt))
+    clients[0].get('/api/auth/status')  # Import the blueprints before timing
+    return app, engine, clients
+
+
+def run(app, engine, clients, count):
+    urls = ['/api/auth/status', '/api/inquiries/unread-count']
+    with count_queries(engine, ignore_users=False) as counter:
+        started = time.perf_counter()
+        for i in range(count):
+            clients[i % len(clients)].get(urls[i % len(urls)])
+        elapsed = time.perf_counter() - started
+    user_selects = sum(1 for s in counter.statements if s.lstrip().upper().startswith('SELECT USERS.'))
+    return elapsed / count, user_selects / count, counter.count / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per setup')
+    parser.add_argument('--users', type=int, default=50, help='Distinct logged-in users')
+    parser.add_argument('--rtt-ms', type=float, default=2.0, help='Simulated database round trip per statement')
+    args = parser.parse_args()
+
+    results = {}
+    for name, ttl in (('uncached', 0), ('cached', 30)):
+        app, engine, clients = make_clients(ttl, args.users, args.rtt_ms / 1000)
+        results[name] = run(app, engine, clients, args.requests)
+    hit_rate = app.extensions['user_cache'].stats()['hitRate']  # The cached run
+
+    width = 60
+    print("=" * width)
+    print(f"USER LOADER: {args.requests:,} requests, {args.users} users, {args.rtt_ms} ms per statement")
+    print("=" * width)
+    print(f"{'setup':>10} | {'ms/request':>10} | {'user SELECTs':>12} | {'statements':>10}")
+    print("-" * width)
+    for name, (seconds, user_selects, statements) in results.items():
+        print(f"{name:>10} | {seconds * 1000:>10.2f} | {user_selects:>12.3f} | {statements:>10.2f}")
+    print("-" * width)
+    speedup = results['uncached'][0] / results['cached'][0]
+    print(f"Cache hit rate: {hit_rate:.1%}, {speedup:.1f}x faster per request")
+    print("=" * width)
+
+
+if __name__ == '__main__':
+    main()
@@ -38,6 +38,23 @@ class Config:
     AIRPAY_BASE_URL = os.environ.get('AIRPAY_BASE_URL', 'https://payments.airpay.co.in/pay/v4/index.php')
     AIRPAY_OAUTH_URL = os.environ.get('AIRPAY_OAUTH_URL', 'https://kraken.airpay.co.in/airpay/pay/v4/api/oauth2/')
 
+    # Outbound gateway HTTP (pooled keep-alive sessions, see api/gateway_http.py)
+    # Timeouts are in seconds; retries/backoff apply to idempotent calls and connect errors
+    GATEWAY_HTTP_SETTINGS = {
+        'airpay': {
+            'connect_timeout': float(os.environ.get('AIRPAY_CONNECT_TIMEOUT', '5')),
+            'read_timeout': float(os.environ.get('AIRPAY_READ_TIMEOUT', '30')),
+        },
+        'sabpaisa': {
+            'connect_timeout': float(os.environ.get('SABPAISA_CONNECT_TIMEOUT', '5')),
+            'read_timeout': float(os.environ.get('SABPAISA_READ_TIMEOUT', '20')),
+        },
+        'payu': {
+            'connect_timeout': float(os.environ.get('PAYU_CONNECT_TIMEOUT', '5')),
+            'read_timeout': float(os.environ.get('PAYU_READ_TIMEOUT', '20')),
+        },
+    }
+
     # SQLAlchemy Configuration
     SQLALCHEMY_DATABASE_URI = (
         f"postgresql://{DB_USER}:{DB_PASSWORD}"
@@ -59,6 +76,84 @@ class Config:
         },
     }
 
+    # Airpay IPN handling: 'sync' applies the notification inside the request;
+    # 'queue' verifies it, stores it in ipn_jobs and acknowledges straight away,
+    # and `flask --app run ipn-worker` applies queued notifications in batches
+    AIRPAY_IPN_MODE = os.environ.get('AIRPAY_IPN_MODE', 'sync')
+    IPN_WORKER_BATCH_SIZE = int(os.environ.get('IPN_WORKER_BATCH_SIZE', '50'))
+    IPN_WORKER_POLL_INTERVAL = float(os.environ.get('IPN_WORKER_POLL_INTERVAL', '1'))
+    # Attempts before a job moves to ipn_dead_letters; retry delay doubles from
+    # IPN_RETRY_BACKOFF seconds up to IPN_RETRY_BACKOFF_MAX
+    IPN_MAX_ATTEMPTS = int(os.environ.get('IPN_MAX_ATTEMPTS', '8'))
+    IPN_RETRY_BACKOFF = float(os.environ.get('IPN_RETRY_BACKOFF', '2'))
+    IPN_RETRY_BACKOFF_MAX = float(os.environ.get('IPN_RETRY_BACKOFF_MAX', '600'))
+    # Seconds a claimed job stays with its worker before another worker may retake it
+    IPN_CLAIM_LEASE = int(os.environ.get('IPN_CLAIM_LEASE', '300'))
+
+    # Fast boot (opt-in): skip db.create_all() at startup and import the API blueprints
+    # on the first request. Only enable it once tables are created/upgraded with
+    # `flask --app run init-db` and migrations/ as part of each deploy.
+    FAST_BOOT = os.environ.get('FAST_BOOT', 'false').lower() in ('1', 'true', 'yes')
+
+    # Commodity catalog served by /api/catalog and used to validate cart items
+    # (the same file the frontend reads; if it is missing, cart items are not validated)
+    COMMODITY_CATALOG_PATH = os.environ.get('COMMODITY_CATALOG_PATH', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'public', 'db', 'commodity_data.json'))
+    # Compact mmap form of the catalog, shared by all workers; build it with
+    # `flask --app run build-catalog-snapshot` (used only while newer than the JSON)
+    COMMODITY_CATALOG_SNAPSHOT = os.environ.get('COMMODITY_CATALOG_SNAPSHOT', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'commodity_catalog.snapshot'))
+
+    # Seconds between re-syncs of each worker's /api/search index with Active listings
+    # (the worker that approves a listing indexes it immediately)
+    SEARCH_LISTINGS_REFRESH = float(os.environ.get('SEARCH_LISTINGS_REFRESH', '60'))
+
+    # Inquiry chat long-polling (/api/inquiries/<id>/messages/wait): 'local' wakes waiters in this
+    # process only, 'postgres' uses LISTEN/NOTIFY so any worker's messages wake every worker
+    CHAT_PUBSUB = os.environ.get('CHAT_PUBSUB', 'local')
+    # Longest wait per request, below the usual 30 s proxy timeout
+    CHAT_LONG_POLL_TIMEOUT = float(os.environ.get('CHAT_LONG_POLL_TIMEOUT', '25'))
+    # Short-poll interval the chat would otherwise use (for the polls-saved estimate)
+    CHAT_POLL_INTERVAL = float(os.environ.get('CHAT_POLL_INTERVAL', '3'))
+
+    # Logging for the api.* modules (written by a background thread, see api/logging_setup.py).
+    # LOG_LEVELS overrides single modules, e.g. "api.payments=DEBUG,api.ipn_queue=WARNING"
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # 'text' or 'json'
+    # Mask credentials, tokens, mobile numbers and emails in log lines
+    LOG_REDACT = os.environ.get('LOG_REDACT', 'true').lower() in ('1', 'true', 'yes')
+
+    # Per-endpoint latency, SQL, gateway and crypto timings at /api/admin/metrics (Prometheus format)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Allow arming the sampling profiler from /api/admin/metrics/profile; it samples
+    # in-flight request stacks every PROFILER_SAMPLE_INTERVAL_MS until it captures one slow request
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    PROFILER_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILER_SAMPLE_INTERVAL_MS', '5'))
+
+    # Seconds a user's cart badge count is cached per worker (0 disables)
+    CART_COUNT_CACHE_TTL = int(os.environ.get('CART_COUNT_CACHE_TTL', '5'))
+
+    # bcrypt cost of new password hashes; stored hashes with another cost are rehashed on the
+    # user's next login. Each step doubles the time per login (12 is about 250 ms on one core)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', '12'))
+    # Threads that hash/check passwords (0: one per CPU), calls that may queue behind them, and
+    # seconds a login waits for a free slot before a 503 (see api/passwords.py)
+    BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', '0'))
+    BCRYPT_QUEUE_SIZE = int(os.environ['BCRYPT_QUEUE_SIZE']) if os.environ.get('BCRYPT_QUEUE_SIZE') else None
+    BCRYPT_QUEUE_TIMEOUT = float(os.environ.get('BCRYPT_QUEUE_TIMEOUT', '2'))
+
+    # Seconds the session user's row (name, email, role, subscription) is cached by the
+    # Flask-Login loader (0 disables). 'local' caches per worker; 'redis' shares one cache
+    # between workers (needs the redis package and USER_CACHE_REDIS_URL)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', '30'))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+    USER_CACHE_BACKEND = os.environ.get('USER_CACHE_BACKEND', 'local')
+    USER_CACHE_REDIS_URL = os.environ.get('USER_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Seconds the admin order totals (/api/admin/orders/count) are cached per worker
+    ADMIN_ORDER_COUNT_CACHE_TTL = int(os.environ.get('ADMIN_ORDER_COUNT_CACHE_TTL', '30'))
+
     # CORS
     CORS_ORIGINS = ["https://mandi2mandi.com"]
 
@@ -0,0 +1,221 @@
+"""
+Database Migration Script: Add Indexes for Hot Lookup Columns
+Creates the indexes declared in models.py (__table_args__) for payment
+callbacks, order/listing/inquiry/chat lookups and cart item matching, then
+runs EXPLAIN on each hot query to confirm it uses its index.
+
+On Postgres indexes are built with CREATE INDEX CONCURRENTLY, so writes to
+the tables are not blocked while they build. Safe to run multiple times.
+
+Run it after the migrations that add the indexed columns (orders.txn_id comes
+from add_payment_transactions.py). An index whose columns do not exist yet is
+skipped with a note, and the script exits non-zero until a rerun creates it.
+
+Usage:
+    python migrations/add_hot_path_indexes.py
+    python migrations/add_hot_path_indexes.py --check-only
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import db, create_app
+from api.models import Order, Product, Inquiry, ChatMessage, CartItem
+from sqlalchemy import inspect, text
+
+HOT_PATH_MODELS = [Order, Product, Inquiry, ChatMessage, CartItem]
+
+# Columns added by a later migration than their table, and the script that adds them
+COLUMN_MIGRATIONS = {
+    ('orders', 'txn_id'): 'migrations/add_payment_transactions.py',
+}
+
+# (index expected in the plan, hot query, sample parameters)
+INDEX_CHECKS = [
+    ('ix_orders_utr_code',
+     "SELECT id, status FROM orders WHERE utr_code = :txnid",
+     {'txnid': '1704567890123456789'}),
+    ('ix_orders_txn_id',
+     "SELECT id FROM orders WHERE txn_id = :txnid",
+     {'txnid': '1704567890123456789'}),
+    ('ix_orders_user_id_ordered_on',
+     "SELECT id FROM orders WHERE user_id = :user_id ORDER BY ordered_on DESC",
+     {'user_id': 1}),
+    ('ix_orders_ordered_on_id',
+     "SELECT id FROM orders ORDER BY ordered_on DESC, id DESC LIMIT 51",
+     {}),
+    ('ix_products_user_id_created_on',
+     "SELECT id FROM products WHERE user_id = :user_id ORDER BY created_on DESC",
+     {'user_id': 1}),
+    ('ix_products_status_created_on',
+     "SELECT id FROM products WHERE status = :status ORDER BY created_on DESC",
+     {'status': 'Pending'}),
+    ('ix_inquiries_buyer_id_created_on',
+     "SELECT id FROM inquiries WHERE buyer_id = :user_id ORDER BY created_on DESC",
+     {'user_id': 1}),
+    ('ix_inquiries_seller_id_created_on',
+     "SELECT id FROM inquiries WHERE seller_id = :user_id ORDER BY created_on DESC",
+     {'user_id': 1}),
+    ('ix_chat_messages_inquiry_id_created_on',
+     "SELECT id FROM chat_messages WHERE inquiry_id = :inquiry_id ORDER BY created_on ASC",
+     {'inquiry_id': 1}),
+    ('ix_cart_items_cart_id_product_id',
+     "SELECT id FROM cart_items WHERE cart_id = :cart_id AND product_id = :product_id",
+     {'cart_id': 1, 'product_id': 'P1'}),
+]
+
+
+def hot_path_indexes():
+    """(name, table, columns) for every index declared on the hot-path models"""
+    for model in HOT_PATH_MODELS:
+        table = model.__table__
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            yield index.name, table.name, [column.name for column in index.columns]
+
+
+def missing_columns(engine):
+    """{index name: ['table.column', ...]} for hot-path indexes whose columns do not exist yet"""
+    inspector = inspect(engine)
+    existing = {}
+    missing = {}
+    for name, table, columns in hot_path_indexes():
+        if table not in existing:
+            existing[table] = ({column['name'] for column in inspector.get_columns(table)}
+                               if inspector.has_table(table) else set())
+        absent = [f'{table}.{column}' for column in columns if column not in existing[table]]
+        if absent:
+            missing[name] = absent
+    return missing
+
+
+def create_indexes(engine):
+    """Create any missing hot-path index whose columns exist; returns the names created"""
+    is_postgres = engine.dialect.name == 'postgresql'
+    skipped = missing_columns(engine)
+    created = []
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for name, table, columns in hot_path_indexes():
+            if name in skipped:
+                scripts = sorted({COLUMN_MIGRATIONS.get(tuple(column.split('.')), 'its migration')
+                                  for column in skipped[name]})
+                print(f"⏭️  Skipping '{name}': {', '.join(skipped[name])} does not exist yet "
+                      f"(run {', '.join(scripts)} first)")
+                continue
+
+            if is_postgres:
+                # A failed concurrent build leaves an INVALID index behind; rebuild it
+                invalid = conn.execute(text("""
+                    SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+                    WHERE c.relname = :name AND NOT i.indisvalid
+                """), {'name': name}).first()
+                if invalid:
+                    print(f"⚠️  '{name}' is INVALID from an earlier failed build, dropping it")
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+                exists = conn.execute(text(
+                    "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+                ), {'name': name}).first()
+                statement = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+            else:
+                exists = None
+                statement = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+
+            if exists:
+                print(f"✓ '{name}' already exists")
+                continue
+
+            print(f"✅ Creating '{name}' on {table} ({', '.join(columns)})...")
+            conn.execute(text(statement))
+            created.append(name)
+
+        if is_postgres and created:
+            # Fresh statistics so the planner considers the new indexes straight away
+            for table in sorted({model.__tablename__ for model in HOT_PATH_MODELS}):
+                conn.execute(text(f"ANALYZE {table}"))
+
+    return created
+
+
+def explain(conn, sql, params):
+    """Plan text for a query on Postgres or SQLite"""
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)
+        return '\n'.join(str(row[-1]) for row in rows)
+    rows = conn.execute(text(f"EXPLAIN {sql}"), params)
+    return '\n'.join(row[0] for row in rows)
+
+
+def check_index_usage(engine, skip=()):
+    """
+    EXPLAIN every hot query and report whether its index appears in the plan
+    Returns a list of (index_name, used, plan); indexes in skip are left out
+
+    Sequential scans are disabled for the check on Postgres: on small tables
+    the planner rightly prefers a seq scan, which would hide whether the
+    index is usable at all.
+    """
+    results = []
+    with engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text("SET enable_seqscan = off"))
+        for index_name, sql, params in INDEX_CHECKS:
+            if index_name in skip:
+                continue
+            plan = explain(conn, sql, params)
+            results.append((index_name, index_name in plan, plan))
+        conn.rollback()
+    return results
+
+
+def add_hot_path_indexes(check_only=False):
+    """Create hot-path indexes and verify each hot query uses its index"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            engine = db.engine
+
+            if not check_only:
+                print("=" * 60)
+                print("Creating hot-path indexes...")
+                print("=" * 60)
+                created = create_indexes(engine)
+                print(f"\n🔄 Created {len(created)} index(es)")
+
+            skipped = missing_columns(engine)
+            print("\n" + "=" * 60)
+            print("EXPLAIN check: do hot queries use their index?")
+            print("=" * 60)
+            results = check_index_usage(engine, skip=skipped)
+            for index_name, used, plan in results:
+                print(f"{'✓' if used else '❌'} {index_name}")
+                if not used:
+                    print(f"    Plan: {plan}")
+            for index_name, columns in skipped.items():
+                print(f"⏭️  {index_name} (missing {', '.join(columns)})")
+
+            missing = [name for name, used, _ in results if not used]
+            print("\n" + "=" * 60)
+            if missing:
+                print(f"❌ {len(missing)} hot query(s) not using their index")
+            if skipped:
+                print(f"❌ {len(skipped)} index(es) skipped; run the migrations named above, then rerun this script")
+            if not missing and not skipped:
+                print("✅ All hot queries use their indexes")
+            print("=" * 60)
+            return not missing and not skipped
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            raise
+
+if __name__ == '__main__':
+    ok = add_hot_path_indexes(check_only='--check-only' in sys.argv)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,45 @@
+"""
+Database Migration Script: Add IPN Queue Tables
+Creates ipn_jobs (verified notifications waiting for the IPN worker) and
+ipn_dead_letters (notifications that failed every retry). Needed before
+setting AIRPAY_IPN_MODE=queue.
+
+Usage:
+    python migrations/add_ipn_queue_tables.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import db, create_app
+from api.models import IPNJob, IPNDeadLetter
+from sqlalchemy import inspect
+
+def add_ipn_queue_tables():
+    """Create the IPN job and dead-letter tables if they don't exist"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            for model in (IPNJob, IPNDeadLetter):
+                table = model.__table__
+                if inspect(db.engine).has_table(table.name):
+                    print(f"✓ '{table.name}' table already exists")
+                    continue
+                print(f"✅ Creating '{table.name}' table...")
+                table.create(db.engine)
+
+            print("✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Database Migration: Add IPN Queue Tables")
+    print("=" * 60)
+    add_ipn_queue_tables()
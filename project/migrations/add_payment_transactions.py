@@ -0,0 +1,91 @@
+"""
+Database Migration Script: Add Payment Transactions
+Creates the payment_transactions table (one row per gateway txnid), links
+orders to it through a new orders.txn_id column, and backfills a
+transaction for every checkout that is still Pending so in-flight payments
+are handled by the new callback path.
+
+Usage:
+    python migrations/add_payment_transactions.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import project modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import db, create_app
+from api.models import PaymentTransaction
+from sqlalchemy import text
+
+def add_payment_transactions():
+    """Create payment_transactions, add orders.txn_id and backfill pending checkouts"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            result = db.session.execute(text(
+                "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"
+            ))
+            existing_tables = [row[0] for row in result]
+
+            if 'payment_transactions' not in existing_tables:
+                print("✅ Creating 'payment_transactions' table...")
+                PaymentTransaction.__table__.create(db.engine)
+            else:
+                print("✓ 'payment_transactions' table already exists")
+
+            result = db.session.execute(text(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = 'orders'"
+            ))
+            columns = [row[0] for row in result]
+
+            migrations_needed = []
+            if 'txn_id' not in columns:
+                migrations_needed.append(
+                    "ALTER TABLE orders ADD COLUMN txn_id VARCHAR(50) NULL "
+                    "REFERENCES payment_transactions (txn_id)"
+                )
+            migrations_needed.append(
+                "CREATE INDEX IF NOT EXISTS ix_orders_txn_id ON orders (txn_id)"
+            )
+
+            # One transaction per pending checkout (cart checkouts share a utr_code)
+            migrations_needed.append("""
+                INSERT INTO payment_transactions
+                    (txn_id, gateway, source, user_id, amount, status, created_on, updated_on)
+                SELECT utr_code, 'unknown',
+                       CASE WHEN COUNT(*) > 1 THEN 'cart' ELSE 'direct' END,
+                       MIN(user_id), SUM(total_price), 'Pending', MIN(ordered_on), NOW()
+                FROM orders
+                WHERE status = 'Pending' AND txn_id IS NULL
+                GROUP BY utr_code
+                ON CONFLICT (txn_id) DO NOTHING
+            """)
+            migrations_needed.append("""
+                UPDATE orders SET txn_id = utr_code
+                WHERE status = 'Pending' AND txn_id IS NULL
+                  AND utr_code IN (SELECT txn_id FROM payment_transactions)
+            """)
+
+            print(f"🔄 Running {len(migrations_needed)} migrations...")
+            for i, sql in enumerate(migrations_needed, 1):
+                print(f"   [{i}/{len(migrations_needed)}] {' '.join(sql.split())[:90]}")
+                result = db.session.execute(text(sql))
+                if result.rowcount and result.rowcount > 0:
+                    print(f"      {result.rowcount} row(s)")
+
+            db.session.commit()
+            print("✅ Migration completed successfully!")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Database Migration: Add Payment Transactions")
+    print("=" * 60)
+    add_payment_transactions()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Tests for the admin order endpoints: keyset-paginated listing, cached
+totals and the streamed CSV export
+
+Usage:
+    python test_admin_orders.py
+    python -m pytest test_admin_orders.py
+"""
+import csv
+import datetime
+import io
+
+from api import db
+from api.admin import order_count_cache
+from api.models import User, Order
+from testing import make_app, login, count_queries
+
+
+def make_order(user_id, day, status='Booked', **fields):
+    values = dict(
+        user_id=user_id, product_name='Basmati Rice', quantity=2000, unit='kg',
+        total_price=90000.0, amount_paid=90000.0, payment_option='Online', utr_code=f'TXN{day}',
+        status=status, buyer_name='Buyer', buyer_mobile='9876543210', address_line_1='Shop 4',
+        city='Karnal', state='Haryana', pincode='132001',
+        ordered_on=datetime.datetime(2025, 1, day, 10, 30),
+    )
+    values.update(fields)
+    return Order(**values)
+
+
+def setup_orders():
+    order_count_cache.clear()
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        admin = User(name='Admin', email='admin@example.com', password='secret', role='admin')
+        buyers = [User(name=f'Buyer {i}', email=f'buyer{i}@example.com', password='secret') for i in range(3)]
+        db.session.add_all([admin] + buyers)
+        db.session.flush()
+
+        for day in range(1, 11):
+            db.session.add(make_order(buyers[day % 3].id, day, status='Booked' if day % 2 else 'Pending'))
+        db.session.commit()
+        login(client, admin)
+
+    return app, client
+
+
+def read_csv(response):
+    return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+
+def test_export_streams_all_orders_with_buyers():
+    app, client = setup_orders()
+    with app.app_context():
+        engine = db.engine
+
+    with count_queries(engine) as counter:
+        response = client.get('/api/admin/orders/download', buffered=False)
+        # The header goes out as its own chunk, before any order row is fetched
+        chunks = iter(response.response)
+        first_chunk = next(chunks)
+        body = first_chunk + b''.join(chunks)
+        response.close()
+        rows = list(csv.reader(io.StringIO(body.decode())))
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert first_chunk.decode().startswith('Order ID,Date,')
+    assert rows[0][:4] == ['Order ID', 'Date', 'Buyer Name', 'Buyer Email']
+    assert len(rows) == 11
+    # Newest first, buyer joined in the same query
+    assert rows[1][1] == '2025-01-10 10:30:00'
+    assert rows[1][2] == 'Buyer 1' and rows[1][3] == 'buyer1@example.com'
+    assert counter.count == 1, counter.statements
+
+
+def test_export_filters_by_status_and_date_range():
+    app, client = setup_orders()
+
+    rows = read_csv(client.get('/api/admin/orders/download?status=Booked'))
+    assert len(rows) == 1 + 5
+    assert all(row[11] == 'Booked' for row in rows[1:])
+
+    rows = read_csv(client.get('/api/admin/orders/download?start_date=2025-01-03&end_date=2025-01-05'))
+    assert [row[1][:10] for row in rows[1:]] == ['2025-01-05', '2025-01-04', '2025-01-03']
+
+
+def test_export_rejects_bad_dates():
+    app, client = setup_orders()
+    assert client.get('/api/admin/orders/download?start_date=05-01-2025').status_code == 400
+
+
+def test_listing_pages_through_all_orders_by_cursor():
+    app, client = setup_orders()
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        url = '/api/admin/orders?limit=4' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        pages += 1
+        seen.extend(order['date'] for order in data['orders'])
+        cursor = data['nextCursor']
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == [f'2025-01-{day:02d}' for day in range(10, 0, -1)]
+
+
+def test_listing_breaks_timestamp_ties_by_id():
+    app, client = setup_orders()
+    with app.app_context():
+        buyer_id = User.query.filter_by(email='buyer0@example.com').first().id
+        for _ in range(3):
+            db.session.add(make_order(buyer_id, 20))
+        db.session.commit()
+
+    first = client.get('/api/admin/orders?limit=2').get_json()
+    second = client.get(f"/api/admin/orders?limit=2&cursor={first['nextCursor']}").get_json()
+    ids = [order['id'] for order in first['orders'] + second['orders']]
+    assert len(set(ids)) == 4
+    assert ids[:3] == sorted(ids[:3], reverse=True)
+
+
+def test_listing_query_count_does_not_grow_with_page_size():
+    app, client = setup_orders()
+    with app.app_context():
+        engine = db.engine
+
+    with count_queries(engine) as counter:
+        data = client.get('/api/admin/orders?limit=10').get_json()
+
+    assert len(data['orders']) == 10
+    assert all(order['buyer']['email'].endswith('@example.com') for order in data['orders'])
+    assert counter.count == 1, counter.statements
+
+
+def test_listing_filters():
+    app, client = setup_orders()
+    with app.app_context():
+        buyer = User.query.filter_by(email='buyer1@example.com').first()
+        db.session.add(make_order(buyer.id, 11, payment_option='Cash'))
+        db.session.commit()
+        buyer_id = buyer.id
+
+    def days(query):
+        return [order['date'][-2:] for order in client.get('/api/admin/orders?' + query).get_json()['orders']]
+
+    assert days('status=Pending') == ['10', '08', '06', '04', '02']
+    assert days('start_date=2025-01-02&end_date=2025-01-03') == ['03', '02']
+    assert days('payment_option=Cash') == ['11']
+    assert days(f'buyer_id={buyer_id}') == ['11', '10', '07', '04', '01']
+    assert days('buyer_email=buyer1@example.com&status=Booked') == ['11', '07', '01']
+    assert client.get('/api/admin/orders?cursor=not-a-cursor').status_code == 400
+
+
+def test_orders_count_is_cached_until_status_changes():
+    app, client = setup_orders()
+    with app.app_context():
+        engine = db.engine
+
+    assert client.get('/api/admin/orders/count').get_json()['total'] == 10
+    assert client.get('/api/admin/orders/count?status=Booked').get_json()['total'] == 5
+
+    with count_queries(engine) as counter:
+        assert client.get('/api/admin/orders/count?status=Booked').get_json()['total'] == 5
+    assert counter.count == 0, counter.statements
+
+    order_id = client.get('/api/admin/orders?status=Pending&limit=1').get_json()['orders'][0]['id']
+    client.put(f'/api/admin/orders/{order_id}/status', json={'status': 'Booked'})
+    assert client.get('/api/admin/orders/count?status=Booked').get_json()['total'] == 6
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("ADMIN ORDER ENDPOINT TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
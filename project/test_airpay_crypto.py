@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Airpay crypto tests
+A credential-bound AirpayV4Functions must produce exactly what the SDK's
+per-call formulas produce (Airpay uses a fixed IV, so ciphertexts compare
+byte for byte)
+
+Usage:
+    python test_airpay_crypto.py
+    python -m pytest test_airpay_crypto.py
+"""
+import base64
+import hashlib
+import json
+import zlib
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+
+from api.airpay_utils import AirpayV4Functions, airpay_functions
+
+MERCHANT_ID = '312345'
+USERNAME = 'mandi-merchant'
+PASSWORD = 'p4ssw0rd'
+SECRET_KEY = 'airpay-secret'
+
+
+def sdk_encrypt(my_string):
+    """Airpay SDK v4 encryption, key derived per call"""
+    secret_key = hashlib.md5(f"{USERNAME}~:~{PASSWORD}".encode()).hexdigest()
+    cipher = AES.new(secret_key.encode(), AES.MODE_CBC, b'c0f9e2d16031b0ce')
+    return 'c0f9e2d16031b0ce' + base64.b64encode(cipher.encrypt(pad(my_string.encode(), AES.block_size))).decode()
+
+
+def crc_hash(crc_data):
+    return "%u" % (zlib.crc32(crc_data.encode('utf-8')) & 0xffffffff)
+
+
+def test_functions_are_cached_per_credential_set():
+    functions = airpay_functions(MERCHANT_ID, USERNAME, PASSWORD, SECRET_KEY)
+    assert functions is airpay_functions(MERCHANT_ID, USERNAME, PASSWORD, SECRET_KEY)
+    assert functions is not airpay_functions(MERCHANT_ID, USERNAME, 'rotated', SECRET_KEY)
+    assert functions.credentials == (MERCHANT_ID, USERNAME, PASSWORD, SECRET_KEY)
+
+
+def test_encryption_matches_sdk_and_round_trips():
+    functions = AirpayV4Functions(MERCHANT_ID, USERNAME, PASSWORD)
+    payload = json.dumps({'orderid': '1704567890123456789', 'amount': '90000.00'})
+
+    encrypted = functions.encrypt_string(payload)
+
+    assert encrypted == sdk_encrypt(payload)
+    assert functions.decrypt_string(encrypted) == payload
+
+
+def test_privatekey_matches_sdk_formula():
+    functions = AirpayV4Functions(MERCHANT_ID, USERNAME, PASSWORD, SECRET_KEY)
+    expected = hashlib.sha256(f"{SECRET_KEY}@{USERNAME}:|:{PASSWORD}".encode()).hexdigest()
+    assert functions.privatekey == expected
+
+
+def test_response_checksum_with_precomputed_suffix():
+    functions = AirpayV4Functions(MERCHANT_ID, USERNAME, PASSWORD)
+    data = {'orderid': '17045', 'ap_transactionid': 'AP1', 'amount': '3.00',
+            'transaction_status': '200', 'message': 'Success'}
+    data['ap_securehash'] = crc_hash(f"17045:AP1:3.00:200:Success:{MERCHANT_ID}:{USERNAME}")
+    assert functions.verify_response_checksum(data) == (True, data['ap_securehash'])
+
+    upi = dict(data, chmod='upi', CUSTOMERVPA='ravi@okbank')
+    upi['ap_securehash'] = crc_hash(f"17045:AP1:3.00:200:Success:{MERCHANT_ID}:{USERNAME}:ravi@okbank")
+    assert functions.verify_response_checksum(upi)[0]
+
+    assert not functions.verify_response_checksum(dict(data, amount='300.00'))[0]
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("AIRPAY CRYPTO TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
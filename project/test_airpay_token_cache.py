@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test the Airpay OAuth2 token cache
+Uses a fake fetcher so no request ever reaches Airpay
+
+Usage:
+    python test_airpay_token_cache.py
+    python -m pytest test_airpay_token_cache.py
+"""
+import logging
+import threading
+import time
+
+from api.airpay_utils import AirpayTokenCache
+
+CREDENTIALS = ('351531', 'user', 'pass', 'client', 'secret')
+
+
+class FakeFetcher:
+    """Stands in for fetch_oauth2_token and counts calls"""
+
+    def __init__(self, expires_in=3600, delay=0.0, fail=False):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, merchant_id, username, password, client_id, client_secret):
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            return None, None
+        return f"token-{call_number}", self.expires_in
+
+
+def test_second_call_is_a_hit():
+    fetcher = FakeFetcher()
+    cache = AirpayTokenCache(fetcher=fetcher)
+
+    assert cache.get_token(*CREDENTIALS) == 'token-1'
+    assert cache.get_token(*CREDENTIALS) == 'token-1'
+
+    stats = cache.stats()
+    assert fetcher.calls == 1
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+    assert stats['cached_tokens'] == 1
+
+
+def test_tokens_are_keyed_by_merchant_and_client():
+    fetcher = FakeFetcher()
+    cache = AirpayTokenCache(fetcher=fetcher)
+
+    cache.get_token(*CREDENTIALS)
+    cache.get_token('999999', 'user', 'pass', 'client', 'secret')
+    cache.get_token('351531', 'user', 'pass', 'other-client', 'secret')
+
+    assert fetcher.calls == 3
+    assert cache.stats()['cached_tokens'] == 3
+
+
+def test_expired_token_is_refetched():
+    fetcher = FakeFetcher(expires_in=1)
+    cache = AirpayTokenCache(fetcher=fetcher)
+    cache.EXPIRY_SKEW = 0
+
+    assert cache.get_token(*CREDENTIALS) == 'token-1'
+    time.sleep(1.05)
+    assert cache.get_token(*CREDENTIALS) == 'token-2'
+    assert cache.stats()['misses'] == 2
+
+
+def test_concurrent_misses_share_one_request():
+    fetcher = FakeFetcher(delay=0.2)
+    cache = AirpayTokenCache(fetcher=fetcher)
+    results = []
+
+    def worker():
+        results.append(cache.get_token(*CREDENTIALS))
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert fetcher.calls == 1
+    assert results == ['token-1'] * 20
+    assert stats['misses'] == 1
+    assert stats['coalesced'] == 19
+
+
+def test_background_refresh_before_expiry():
+    fetcher = FakeFetcher(expires_in=10)
+    cache = AirpayTokenCache(fetcher=fetcher)
+    cache.EXPIRY_SKEW = 0
+    cache.REFRESH_MARGIN = 9.9  # Capped at 20% of the 10s lifetime, so refresh starts after 8s
+
+    assert cache.get_token(*CREDENTIALS) == 'token-1'
+
+    # Pretend 8.5 seconds have passed by pulling the refresh deadline forward
+    entry = next(iter(cache._entries.values()))
+    entry.refresh_at = time.monotonic() - 0.1
+
+    # Still inside its lifetime, so the old token is served while the refresh runs
+    assert cache.get_token(*CREDENTIALS) == 'token-1'
+
+    deadline = time.monotonic() + 2
+    while cache.stats()['refreshes'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert cache.stats()['refreshes'] == 1
+    assert cache.get_token(*CREDENTIALS) == 'token-2'
+    assert fetcher.calls == 2
+
+
+def test_failed_background_refresh_is_logged_with_counts():
+    fetcher = FakeFetcher(expires_in=10)
+    cache = AirpayTokenCache(fetcher=fetcher)
+    cache.get_token(*CREDENTIALS)
+    fetcher.fail = True
+    next(iter(cache._entries.values())).refresh_at = time.monotonic() - 0.1
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger('api.airpay_utils')
+    logger.addHandler(handler)
+    try:
+        assert cache.get_token(*CREDENTIALS) == 'token-1'  # Served while the refresh fails
+        deadline = time.monotonic() + 2
+        while not records and time.monotonic() < deadline:  # Logged after the counters
+            time.sleep(0.01)
+    finally:
+        logger.removeHandler(handler)
+
+    assert cache.stats()['refresh_failures'] == 1
+    assert [record.getMessage() for record in records if record.levelno == logging.ERROR] == [
+        'Airpay background token refresh failed (1 of 1 attempted refreshes failed); '
+        'the current token serves until it expires']
+
+
+def test_failed_fetch_is_not_cached():
+    fetcher = FakeFetcher(fail=True)
+    cache = AirpayTokenCache(fetcher=fetcher)
+
+    assert cache.get_token(*CREDENTIALS) is None
+    assert cache.get_token(*CREDENTIALS) is None
+
+    stats = cache.stats()
+    assert fetcher.calls == 2
+    assert stats['fetch_failures'] == 2
+    assert stats['cached_tokens'] == 0
+
+
+def test_invalidate_forces_refetch():
+    fetcher = FakeFetcher()
+    cache = AirpayTokenCache(fetcher=fetcher)
+
+    cache.get_token(*CREDENTIALS)
+    cache.invalidate('351531', 'client')
+
+    assert cache.get_token(*CREDENTIALS) == 'token-2'
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("AIRPAY TOKEN CACHE TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
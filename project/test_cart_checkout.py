@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Cart checkout tests
+/api/initiate-cart-payment must create one Pending order per cart item with
+the shared txnid in a single INSERT, after a single cart+items fetch and
+the insert of their payment transaction, and charge server-priced shipping
+
+Usage:
+    python test_cart_checkout.py
+    python -m pytest test_cart_checkout.py
+"""
+from api import db
+from api.models import User, Cart, CartItem, Order
+from api.shipping import quote_shipping, UNKNOWN_STATE
+from testing import make_app, login, count_queries
+
+CHECKOUT = {
+    'paymentOption': 'Online', 'buyerName': 'Ravi Kumar', 'mobile': '9876543210',
+    'pincode': '132001', 'addressLine1': 'Shop 4, Grain Market', 'city': 'Karnal',
+    'state': 'Haryana', 'gateway': 'payu',
+}
+
+
+def setup_checkout(items):
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        user = User(name='Ravi Kumar', email='ravi@example.com', password='secret')
+        db.session.add(user)
+        db.session.flush()
+        cart = Cart(user_id=user.id)
+        db.session.add(cart)
+        db.session.flush()
+        for i in range(items):
+            db.session.add(CartItem(
+                cart_id=cart.id, product_id=f'P{i}', product_name=f'Product {i}',
+                price_per_unit=10.0 + i, unit='kg', quantity=2000
+            ))
+        db.session.commit()
+        login(client, user)
+        user_id = user.id
+
+    return app, client, user_id
+
+
+def test_checkout_creates_one_order_per_item():
+    items = 30
+    app, client, user_id = setup_checkout(items)
+
+    response = client.post('/api/initiate-cart-payment', json=CHECKOUT)
+
+    params = response.get_json()
+    assert response.status_code == 200, params
+    # No listing location on these items: shipped as inter-state
+    shipping = quote_shipping(2000, 'kg', UNKNOWN_STATE, 'Haryana').charge
+    expected_total = sum((10.0 + i) * 2000 + shipping for i in range(items))
+    assert params['amount'] == f"{expected_total:.2f}"
+    assert params['productinfo'] == f"Cart checkout - {items} items"
+    assert params['email'] == 'ravi@example.com'
+
+    with app.app_context():
+        orders = Order.query.order_by(Order.id).all()
+        assert len(orders) == items
+        assert {order.utr_code for order in orders} == {params['txnid']}
+        assert all(order.status == 'Pending' and order.user_id == user_id for order in orders)
+        assert sorted(order.total_price for order in orders) == [(10.0 + i) * 2000 for i in range(items)]
+        assert all(order.amount_paid == order.total_price + shipping for order in orders)
+        assert len({order.ordered_on for order in orders}) == 1
+
+
+def test_checkout_query_count_is_constant():
+    counts = []
+    for items in (1, 200):
+        app, client, _ = setup_checkout(items)
+        with app.app_context():
+            engine = db.engine
+        with count_queries(engine) as counter:
+            response = client.post('/api/initiate-cart-payment', json=CHECKOUT)
+        assert response.status_code == 200
+        inserts = [s for s in counter.statements if s.lstrip().upper().startswith('INSERT INTO ORDERS')]
+        assert len(inserts) == 1, inserts
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1], counts
+    assert counts[0] <= 3, counts  # Cart+items, transaction row, orders
+
+
+def test_checkout_with_empty_cart():
+    app, client, _ = setup_checkout(0)
+    response = client.post('/api/initiate-cart-payment', json=CHECKOUT)
+    assert response.status_code == 400
+    with app.app_context():
+        assert Order.query.count() == 0
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("CART CHECKOUT TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for the cart endpoints
+Every cart read/mutation should cost at most two SQL statements, however
+many items the cart holds (the session user lookup is not counted)
+
+Usage:
+    python test_cart_queries.py
+    python -m pytest test_cart_queries.py
+"""
+from api import db
+from api.cart import cart_count_cache
+from api.models import User, Cart, CartItem
+from testing import make_app, login, count_queries
+
+MAX_QUERIES = 2
+ITEMS_IN_CART = 25
+
+
+def setup_cart(items=ITEMS_IN_CART):
+    cart_count_cache.clear()
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        user = User(name='Cart Buyer', email='buyer@example.com', password='secret')
+        other = User(name='Other Buyer', email='other@example.com', password='secret')
+        db.session.add_all([user, other])
+        db.session.flush()
+
+        cart = Cart(user_id=user.id)
+        other_cart = Cart(user_id=other.id)
+        db.session.add_all([cart, other_cart])
+        db.session.flush()
+
+        for i in range(items):
+            db.session.add(CartItem(
+                cart_id=cart.id, product_id=f'P{i}', product_name=f'Product {i}',
+                price_per_unit=10.0 + i, unit='kg', quantity=2000
+            ))
+        db.session.add(CartItem(
+            cart_id=other_cart.id, product_id='X1', product_name='Not yours',
+            price_per_unit=5.0, unit='kg', quantity=2000
+        ))
+        db.session.commit()
+
+        first_item_id = cart.items[0].id
+        other_item_id = other_cart.items[0].id
+        login(client, user)
+
+    return app, client, first_item_id, other_item_id
+
+
+def request_counting(app, send):
+    with app.app_context():
+        engine = db.engine
+    with count_queries(engine) as counter:
+        response = send()
+    return response, counter
+
+
+def test_get_cart():
+    app, client, _, _ = setup_cart()
+    response, counter = request_counting(app, lambda: client.get('/api/cart'))
+
+    cart = response.get_json()['cart']
+    assert response.status_code == 200
+    assert cart['totalItems'] == ITEMS_IN_CART
+    assert cart['totalAmount'] == sum((10.0 + i) * 2000 for i in range(ITEMS_IN_CART))
+    assert counter.count <= MAX_QUERIES, counter.statements
+
+
+def test_add_new_item():
+    app, client, _, _ = setup_cart()
+    payload = {'productId': 'NEW', 'productName': 'Turmeric', 'pricePerUnit': 80,
+               'unit': 'kg', 'quantity': 2500}
+    response, counter = request_counting(app, lambda: client.post('/api/cart/add', json=payload))
+
+    cart = response.get_json()['cart']
+    assert response.status_code == 200
+    assert cart['totalItems'] == ITEMS_IN_CART + 1
+    assert all(item['id'] for item in cart['items'])
+    assert counter.count <= MAX_QUERIES, counter.statements
+
+
+def test_add_existing_item_updates_quantity():
+    app, client, _, _ = setup_cart()
+    payload = {'productId': 'P0', 'productName': 'Product 0', 'pricePerUnit': 10,
+               'unit': 'kg', 'quantity': 3000}
+    response, counter = request_counting(app, lambda: client.post('/api/cart/add', json=payload))
+
+    cart = response.get_json()['cart']
+    assert response.get_json()['message'] == 'Cart item updated successfully'
+    assert cart['totalItems'] == ITEMS_IN_CART
+    assert next(item for item in cart['items'] if item['productId'] == 'P0')['quantity'] == 3000
+    assert counter.count <= MAX_QUERIES, counter.statements
+
+
+def test_update_item():
+    app, client, item_id, _ = setup_cart()
+    response, counter = request_counting(
+        app, lambda: client.put(f'/api/cart/update/{item_id}', json={'quantity': 4000}))
+
+    cart = response.get_json()['cart']
+    assert response.status_code == 200
+    assert next(item for item in cart['items'] if item['id'] == item_id)['quantity'] == 4000
+    assert counter.count <= MAX_QUERIES, counter.statements
+
+
+def test_update_rejects_other_users_item():
+    app, client, _, other_item_id = setup_cart()
+    assert client.put(f'/api/cart/update/{other_item_id}', json={'quantity': 4000}).status_code == 403
+    assert client.put('/api/cart/update/99999', json={'quantity': 4000}).status_code == 404
+
+
+def test_remove_item():
+    app, client, item_id, _ = setup_cart()
+    response, counter = request_counting(app, lambda: client.delete(f'/api/cart/remove/{item_id}'))
+
+    cart = response.get_json()['cart']
+    assert response.status_code == 200
+    assert cart['totalItems'] == ITEMS_IN_CART - 1
+    assert item_id not in [item['id'] for item in cart['items']]
+    assert counter.count <= MAX_QUERIES, counter.statements
+
+    with app.app_context():
+        assert db.session.get(CartItem, item_id) is None
+
+
+def test_clear_cart():
+    app, client, _, _ = setup_cart()
+    response, counter = request_counting(app, lambda: client.delete('/api/cart/clear'))
+
+    cart = response.get_json()['cart']
+    assert response.status_code == 200
+    assert cart['totalItems'] == 0
+    assert cart['totalAmount'] == 0
+    assert counter.count <= MAX_QUERIES, counter.statements
+
+    with app.app_context():
+        assert CartItem.query.count() == 1  # Only the other user's item is left
+
+
+def test_cart_count_is_one_scalar_query_then_cached():
+    app, client, item_id, _ = setup_cart()
+
+    response, counter = request_counting(app, lambda: client.get('/api/cart/count'))
+    assert response.get_json()['count'] == ITEMS_IN_CART
+    assert counter.count == 1, counter.statements
+    assert counter.statements[0].lstrip().upper().startswith('SELECT COUNT(')
+
+    response, counter = request_counting(app, lambda: client.get('/api/cart/count'))
+    assert response.get_json()['count'] == ITEMS_IN_CART
+    assert counter.count == 0, counter.statements
+
+
+def test_cart_mutations_invalidate_cached_count():
+    app, client, item_id, _ = setup_cart()
+    payload = {'productId': 'NEW', 'productName': 'Turmeric', 'pricePerUnit': 80,
+               'unit': 'kg', 'quantity': 2500}
+
+    assert client.get('/api/cart/count').get_json()['count'] == ITEMS_IN_CART
+    client.post('/api/cart/add', json=payload)
+    assert client.get('/api/cart/count').get_json()['count'] == ITEMS_IN_CART + 1
+    client.delete(f'/api/cart/remove/{item_id}')
+    assert client.get('/api/cart/count').get_json()['count'] == ITEMS_IN_CART
+    client.delete('/api/cart/clear')
+    assert client.get('/api/cart/count').get_json()['count'] == 0
+
+
+def test_cart_count_without_cart():
+    app, client, _, _ = setup_cart()
+    with app.app_context():
+        user = User(name='New Buyer', email='new@example.com', password='secret')
+        db.session.add(user)
+        db.session.commit()
+        login(client, user)
+
+    assert client.get('/api/cart/count').get_json()['count'] == 0
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("CART QUERY COUNT TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Commodity catalog tests
+/api/catalog filters and pages the in-memory catalog, /api/cart/add
+rejects unknown products and stale prices before touching the database, and
+the mmap snapshot answers exactly like the parsed JSON
+
+Usage:
+    python test_catalog.py
+    python -m pytest test_catalog.py
+"""
+import json
+import os
+import tempfile
+
+from api import db
+from api.catalog import CommodityCatalog, parse_price, load_catalog, open_catalog
+from api.catalog_snapshot import CatalogSnapshot, build_snapshot
+from api.models import User
+from testing import TestConfig, count_queries, login
+
+RAW_CATALOG = {
+    'spices': {
+        'Turmeric': [
+            {'id': '101', 'title': 'Turmeric finger', 'price': '₹ 180 /- Kg', 'seller': 'Ravi',
+             'location': 'Erode, Tamil Nadu', 'image': 'https://img/101.webp', 'date': '1 May 25', 'url': ''},
+            {'id': '102', 'title': 'Turmeric powder', 'price': '₹ 1,250.50 /- Quintal', 'seller': 'Meena',
+             'location': 'Sangli, Maharashtra', 'image': 'N/A', 'date': '2 May 25', 'url': ''},
+        ],
+        'Chilli': [
+            {'id': '103', 'title': 'Teja chilli', 'price': '₹ 220 /- Kg', 'seller': 'ravi',
+             'location': 'Guntur, Andhra Pradesh', 'image': 'https://img/103.webp', 'date': '', 'url': ''},
+        ],
+    },
+    'grains': {
+        'Wheat': [
+            {'id': str(200 + i), 'title': f'Wheat lot {i}', 'price': '₹ 25 /- Kg', 'seller': 'Mandi Traders',
+             'location': 'Karnal, Haryana', 'image': '', 'date': '', 'url': ''}
+            for i in range(7)
+        ],
+        'Rice': [],
+    },
+}
+
+
+def catalog_path():
+    """RAW_CATALOG written once to a temp file (catalogs are cached per path)"""
+    path = os.path.join(tempfile.gettempdir(), 'mandi_test_commodity_data.json')
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(RAW_CATALOG, f)
+    return path
+
+
+class CatalogConfig(TestConfig):
+    COMMODITY_CATALOG_PATH = catalog_path()
+
+
+def make_catalog_app():
+    from api import create_app
+    app = create_app(CatalogConfig)
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        user = User(name='Cart Buyer', email='buyer@example.com', password='secret')
+        db.session.add(user)
+        db.session.commit()
+        login(client, user)
+    return app, client
+
+
+def test_price_parsing_matches_frontend():
+    assert parse_price('₹ 180 /- Kg') == (180.0, 'Kg')
+    assert parse_price('₹ 1,250.50 /- Quintal') == (1250.5, 'Quintal')
+    assert parse_price('Price on request') == (0.0, 'Kg')
+
+
+def test_indexes_and_filters():
+    catalog = CommodityCatalog(RAW_CATALOG)
+
+    assert len(catalog) == 10
+    assert catalog.categories == {'spices': ['Turmeric', 'Chilli'], 'grains': ['Wheat', 'Rice']}
+    assert catalog.get('102')['images'] == ['/placeholder.svg']
+    assert catalog.get('999') is None
+
+    def ids(**filters):
+        products, total = catalog.query(**filters)
+        assert total == len(products)
+        return [product['id'] for product in products]
+
+    assert ids(category='spices') == ['101', '102', '103']
+    assert ids(category='spices', subcategory='Turmeric') == ['101', '102']
+    assert ids(seller='RAVI') == ['101', '103']
+    assert ids(location='tamil nadu') == ['101']
+    assert ids(location='Erode, Tamil Nadu') == ['101']
+    assert ids(category='spices', seller='ravi', location='Guntur') == ['103']
+    assert ids(category='grains', subcategory='Rice') == []
+
+    # Unknown filter values do not add probe sets (the cache holds index lists only)
+    sets = len(catalog._posting_sets)
+    for i in range(20):
+        assert ids(category='spices', seller=f'nobody {i}') == []
+        assert ids(seller='ravi', location=f'nowhere {i}') == []
+        assert ids(seller=f'nobody {i}', location=f'nowhere {i}') == []
+    assert len(catalog._posting_sets) == sets
+
+
+def test_catalog_endpoint_pages():
+    app, client = make_catalog_app()
+
+    first = client.get('/api/catalog?category=grains&limit=3').get_json()
+    assert [p['id'] for p in first['products']] == ['200', '201', '202']
+    assert (first['total'], first['nextOffset']) == (7, 3)
+
+    last = client.get('/api/catalog?category=grains&limit=3&offset=6').get_json()
+    assert [p['id'] for p in last['products']] == ['206']
+    assert last['nextOffset'] is None
+
+    assert client.get('/api/catalog?limit=abc').status_code == 400
+    assert client.get('/api/catalog/categories').get_json()['grains'] == ['Wheat', 'Rice']
+    assert client.get('/api/catalog/103').get_json()['price'] == 220.0
+    assert client.get('/api/catalog/999').status_code == 404
+
+
+def test_add_to_cart_validates_against_catalog_without_db():
+    app, client = make_catalog_app()
+    with app.app_context():
+        engine = db.engine
+    item = {'productName': 'Turmeric finger', 'unit': 'Kg', 'quantity': 2500}
+
+    with count_queries(engine) as counter:
+        unknown = client.post('/api/cart/add', json=dict(item, productId='999', pricePerUnit=180))
+        stale = client.post('/api/cart/add', json=dict(item, productId='101', pricePerUnit=150))
+    assert unknown.status_code == 400
+    assert unknown.get_json()['message'] == 'Unknown product'
+    assert stale.status_code == 400
+    assert '180' in stale.get_json()['message']
+    assert counter.count == 0, counter.statements
+
+    added = client.post('/api/cart/add', json=dict(item, productId='101', pricePerUnit=180))
+    assert added.status_code == 200
+    assert added.get_json()['cart']['items'][0]['productId'] == '101'
+
+
+def test_snapshot_matches_parsed_catalog():
+    catalog = CommodityCatalog(RAW_CATALOG)
+    path = os.path.join(tempfile.mkdtemp(), 'catalog.snapshot')
+    build_snapshot(catalog, path)
+    snapshot = CatalogSnapshot(path)
+
+    assert len(snapshot) == len(catalog)
+    assert snapshot.categories == catalog.categories
+    assert list(snapshot.products[0:len(snapshot)]) == catalog.products
+    assert snapshot.get('102') == catalog.get('102')
+    assert snapshot.get('999') is None
+    for filters in ({}, {'category': 'spices'}, {'category': 'spices', 'subcategory': 'Turmeric'},
+                    {'seller': 'RAVI'}, {'location': 'haryana'}, {'category': 'grains', 'subcategory': 'Rice'},
+                    {'category': 'spices', 'seller': 'ravi', 'location': 'Guntur'}):
+        for offset in (0, 2):
+            assert snapshot.query(offset=offset, limit=3, **filters) == \
+                catalog.query(offset=offset, limit=3, **filters), filters
+    assert snapshot.validate_cart_item('101', 180) is None
+    assert snapshot.validate_cart_item('101', 150) is not None
+
+
+def test_snapshot_used_only_when_current_and_valid():
+    directory = tempfile.mkdtemp()
+    source = os.path.join(directory, 'commodity_data.json')
+    with open(source, 'w', encoding='utf-8') as f:
+        json.dump(RAW_CATALOG, f)
+    snapshot = os.path.join(directory, 'catalog.snapshot')
+
+    assert type(open_catalog(source, snapshot)) is CommodityCatalog  # Not built yet
+
+    build_snapshot(CommodityCatalog.from_file(source), snapshot)
+    assert type(open_catalog(source, snapshot)) is CatalogSnapshot
+
+    os.utime(source, (os.path.getmtime(snapshot) + 10,) * 2)  # JSON edited after the build
+    assert type(open_catalog(source, snapshot)) is CommodityCatalog
+
+    with open(snapshot, 'wb') as f:
+        f.write(b'not a snapshot')
+    os.utime(source, (0, 0))
+    assert type(open_catalog(source, snapshot)) is CommodityCatalog
+
+
+def test_build_snapshot_command():
+    directory = tempfile.mkdtemp()
+
+    class SnapshotConfig(CatalogConfig):
+        COMMODITY_CATALOG_SNAPSHOT = os.path.join(directory, 'catalog.snapshot')
+
+    from api import create_app
+    app = create_app(SnapshotConfig)
+    result = app.test_cli_runner().invoke(args=['build-catalog-snapshot'])
+
+    assert result.exit_code == 0, result.output
+    assert len(CatalogSnapshot(SnapshotConfig.COMMODITY_CATALOG_SNAPSHOT)) == 10
+
+
+def test_shipped_catalog_loads():
+    path = os.path.join(os.path.dirname(__file__), '..', 'public', 'db', 'commodity_data.json')
+    if not os.path.exists(path):
+        return
+    catalog = load_catalog(path)
+    assert len(catalog) > 1000
+    assert set(catalog.categories) >= {'spices', 'fruits', 'vegetables'}
+    products, total = catalog.query(category='spices', limit=10)
+    assert len(products) == 10 and total == len(catalog.by_category['spices'])
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("COMMODITY CATALOG TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
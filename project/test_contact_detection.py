@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Chat contact detection tests
+The combined matcher finds the same contact types as
+src/lib/contact-detection.ts (plus obfuscated numbers), send_message blocks
+phone numbers and emails and warns on WhatsApp/social media, and the batch
+scan walks stored messages in chunks
+
+Usage:
+    python test_contact_detection.py
+    python -m pytest test_contact_detection.py
+"""
+import random
+import re
+
+from api import db
+from api.contact_detection import detect_contact_info, scan_chat_messages, FRONTEND_PATTERNS, CONTACT_TYPES
+from api.models import ChatMessage
+from test_inquiry_chat import setup_chat, as_user
+from testing import count_queries
+
+# Expected types from detectContactInfo in src/lib/contact-detection.ts
+FRONTEND_CASES = [
+    ('Call me on 9876543210', ['phone number']),
+    ('+91 9876543210 pls', ['phone number']),
+    ('919876543210', ['phone number']),
+    ('987-654-3210', ['phone number']),
+    ('(987) 654-3210', ['phone number']),
+    ('order 12345678901234', ['phone number']),
+    ('mail ravi@gmail.com', ['email address', 'social media']),
+    ('9876543210@gmail.com', ['phone number', 'email address', 'social media']),
+    ('whatsapp@x.com', ['email address', 'WhatsApp', 'social media']),
+    ('WA me', ['WhatsApp']),
+    ("what'sapp", ['WhatsApp']),
+    ('send to wa.me', ['WhatsApp']),
+    ('find me on Instagram', ['social media']),
+    ('@ravi_traders', ['social media']),
+    ('ग्राहक 9876543210', ['phone number']),
+    ('whats app', []),
+    ('fb', []),
+    ('price 2500 per quintal for 30 quintal', []),
+    ('₹ 1,23,45,678', []),
+    ('', []),
+]
+
+
+def test_matches_frontend_detection():
+    for text, types in FRONTEND_CASES:
+        detection = detect_contact_info(text)
+        assert detection.types == types, (text, detection)
+        assert detection.has_contact == bool(types)
+        expected = 'low' if not types else 'high' if {'phone number', 'email address'} & set(types) else 'medium'
+        assert detection.severity == expected, (text, detection)
+
+
+def test_combined_pattern_agrees_with_frontend_patterns():
+    # Random strings of contact-like fragments, checked against the frontend's regexes one by one
+    frontend = {name: [re.compile(pattern, re.ASCII) for pattern in patterns]
+                for name, patterns in FRONTEND_PATTERNS.items()}
+    fragments = ['9876543210', '91', '+91', '+', '(987)', '987', '654', '3210', '-', '.', ' ', '@', 'gmail', '.com',
+                 '_', '%', 'WA', 'wa', 'Wapp', 'whats', 'app', "'", 's', 'Instagram', 'faceBook', 'telegram',
+                 'TWITTER', 'linkedin', 'x', '0', '6', 'é', 'हल्दी', '\n']
+    rng = random.Random(1)
+    for _ in range(20000):
+        text = ''.join(rng.choice(fragments) for _ in range(rng.randint(1, 8)))
+        expected = [name for name in CONTACT_TYPES if any(p.search(text) for p in frontend[name])]
+        types = detect_contact_info(text).types
+        if types != expected:  # Only allowed difference: a number the frontend misses
+            assert 'phone number' not in expected and types == ['phone number'] + expected, (text, types)
+
+
+def test_detects_obfuscated_numbers():
+    for text in ('nine eight seven six five four three two one zero', '98 76 54 32 10',
+                 'call 9.8.7.6.5.4.3.2.1.0 now', '९८७६५४३२१०', 'Nine 8 7 6-5-4 three 2 1 0'):
+        assert detect_contact_info(text).types == ['phone number'], text
+    for text in ('need 25 30 40 quintal', 'lot 1 2 3 4 5 6 7 8 9 0', 'someone said nine',
+                 'Delivery between 6/10/2024 - 1/11/2024', 'Rates: 7.50, 8.25, 9.00, 6.75 per kg',
+                 'dispatch 7/8/2024, payment 9/9/2024'):
+        assert not detect_contact_info(text).has_contact, text
+
+
+def test_send_message_blocks_phone_and_warns_on_whatsapp():
+    app, client, ids = setup_chat()
+    as_user(app, client, ids['buyer'])
+    url = f"/api/inquiries/{ids['first']}/messages"
+
+    blocked = client.post(url, json={'message': 'call nine eight 7 6 5 4 3 2 1 0'})
+    assert blocked.status_code == 400
+    assert blocked.get_json()['contactTypes'] == ['phone number']
+    assert 'cannot be sent' in blocked.get_json()['error']
+
+    warned = client.post(url, json={'message': 'Are you on whatsapp?'})
+    assert warned.status_code == 201
+    assert 'WhatsApp' in warned.get_json()['warning']
+
+    clean = client.post(url, json={'message': 'Can you do 2900 per quintal?'})
+    assert clean.status_code == 201 and 'warning' not in clean.get_json()
+    dates = client.post(url, json={'message': 'Delivery between 6/10/2024 - 1/11/2024'})
+    assert dates.status_code == 201 and 'warning' not in dates.get_json()
+
+    with app.app_context():
+        stored = [m.message for m in ChatMessage.query.filter_by(inquiry_id=ids['first']).all()]
+    assert stored[-3:] == ['Are you on whatsapp?', 'Can you do 2900 per quintal?',
+                           'Delivery between 6/10/2024 - 1/11/2024']
+
+
+def test_scan_walks_history_in_chunks():
+    app, _, ids = setup_chat(messages=0)
+    texts = ['Quality?', 'mail me at ravi@gmail.com', 'Grade A', 'telegram?', 'ok', '98765 43210', 'Done']
+    with app.app_context():
+        for text in texts:
+            db.session.add(ChatMessage(inquiry_id=ids['first'], sender_id=ids['buyer'], sender_name='Buyer',
+                                       sender_role='buyer', message=text))
+        db.session.commit()
+        engine = db.engine
+
+        with count_queries(engine) as counter:
+            flagged = [(row[3], detection.severity) for row, detection in scan_chat_messages(chunk_size=3)]
+        # Price is firm (second inquiry) + 7 messages = 8 rows: chunks of 3, 3, 2, then an empty one
+        assert counter.count == 4, counter.statements
+        assert flagged == [('mail me at ravi@gmail.com', 'high'), ('telegram?', 'medium'), ('98765 43210', 'high')]
+
+        high = [row[3] for row, _ in scan_chat_messages(chunk_size=100, min_severity='high')]
+        assert high == ['mail me at ravi@gmail.com', '98765 43210']
+        first_id = ChatMessage.query.order_by(ChatMessage.id).first().id
+        resumed = [row[3] for row, _ in scan_chat_messages(after_id=first_id + 2)]
+        assert resumed == ['telegram?', '98765 43210']
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("CONTACT DETECTION TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Index usage tests for hot lookup queries
+Each hot query (payment callback txnid lookup, order/listing/inquiry/chat
+listings, cart item matching) must be planned with its composite index
+
+Usage:
+    python test_index_usage.py
+    python -m pytest test_index_usage.py
+"""
+from sqlalchemy import create_engine, inspect, text
+
+from api import db
+from migrations.add_hot_path_indexes import (INDEX_CHECKS, hot_path_indexes, create_indexes, check_index_usage,
+                                             missing_columns)
+from testing import make_app
+
+
+def test_every_declared_index_has_a_check():
+    declared = {name for name, _, _ in hot_path_indexes()}
+    checked = {name for name, _, _ in INDEX_CHECKS}
+    assert declared == checked, declared ^ checked
+
+
+def test_hot_queries_use_their_indexes():
+    app = make_app()
+    with app.app_context():
+        results = check_index_usage(db.engine)
+
+    missing = [(name, plan) for name, used, plan in results if not used]
+    assert not missing, missing
+
+
+def test_create_indexes_is_idempotent():
+    app = make_app()
+    with app.app_context():
+        create_indexes(db.engine)
+        create_indexes(db.engine)
+        results = check_index_usage(db.engine)
+
+    assert all(used for _, used, _ in results)
+
+
+def test_indexes_on_columns_not_migrated_yet_are_skipped():
+    """A database from before add_payment_transactions.py has no orders.txn_id"""
+    app = make_app()
+    with app.app_context():
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine, tables=[t for t in db.metadata.sorted_tables if t.name != 'orders'])
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, status VARCHAR(50), "
+                          "utr_code VARCHAR(100), ordered_on DATETIME)"))
+        for index in inspect(conn).get_indexes('products'):
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+
+    assert missing_columns(engine) == {'ix_orders_txn_id': ['orders.txn_id']}
+    created = create_indexes(engine)
+    assert 'ix_orders_txn_id' not in created and 'ix_products_user_id_created_on' in created
+    results = check_index_usage(engine, skip=missing_columns(engine))
+    assert 'ix_orders_txn_id' not in {name for name, _, _ in results}
+    assert all(used for _, used, _ in results)
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("HOT PATH INDEX USAGE TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Inquiry chat tests
+Message polls fetch only what is newer than the client's cursor, mark the
+other party's messages read with one UPDATE (and no commit when nothing was
+unread), unread counts come from one aggregate query, and long-polls wake as
+soon as the other party sends a message
+
+Usage:
+    python test_inquiry_chat.py
+    python -m pytest test_inquiry_chat.py
+"""
+import datetime
+import threading
+import time
+
+from sqlalchemy import event
+
+from api import db
+from api.chat_events import LocalChatBroker
+from api.models import User, Inquiry, ChatMessage
+from testing import make_app, login, count_queries
+
+
+def make_inquiry(buyer, seller, **fields):
+    values = dict(
+        product_id=1, product_name='Basmati Rice', seller_id=seller.id, seller_name=seller.name,
+        buyer_id=buyer.id, buyer_name=buyer.name, quantity=25, unit='Quintal', estimated_price=75000,
+        price_per_unit=3000, address_line_1='Shop 4', city='Karnal', state='Haryana', pincode='132001',
+        mobile='9876543210',
+    )
+    values.update(fields)
+    return Inquiry(**values)
+
+
+def setup_chat(messages=6):
+    """Two inquiries between a buyer and a seller; the first has `messages` alternating messages"""
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        buyer = User(name='Buyer', email='buyer@example.com', password='secret')
+        seller = User(name='Seller', email='seller@example.com', password='secret', role='trader')
+        db.session.add_all([buyer, seller])
+        db.session.flush()
+        first, second = make_inquiry(buyer, seller), make_inquiry(buyer, seller, product_name='Wheat')
+        db.session.add_all([first, second])
+        db.session.flush()
+        started = datetime.datetime(2025, 1, 1, 10, 0)
+        for i in range(messages):
+            sender = buyer if i % 2 == 0 else seller
+            db.session.add(ChatMessage(
+                inquiry_id=first.id, sender_id=sender.id, sender_name=sender.name, sender_role=sender.role,
+                message=f'Message {i}', created_on=started + datetime.timedelta(minutes=i),
+            ))
+        db.session.add(ChatMessage(inquiry_id=second.id, sender_id=seller.id, sender_name=seller.name,
+                                   sender_role=seller.role, message='Price is firm'))
+        db.session.commit()
+        ids = {'buyer': buyer.id, 'seller': seller.id, 'first': first.id, 'second': second.id}
+    return app, client, ids
+
+
+def as_user(app, client, user_id):
+    with app.app_context():
+        login(client, db.session.get(User, user_id))
+
+
+def test_incremental_fetch_with_after_id_and_since():
+    app, client, ids = setup_chat()
+    as_user(app, client, ids['buyer'])
+    url = f"/api/inquiries/{ids['first']}/messages"
+
+    everything = client.get(url).get_json()
+    assert [m['message'] for m in everything['messages']] == [f'Message {i}' for i in range(6)]
+    last_id = everything['lastId']
+
+    newer = client.get(f"{url}?after_id={everything['messages'][3]['id']}").get_json()
+    assert [m['message'] for m in newer['messages']] == ['Message 4', 'Message 5']
+    assert client.get(f'{url}?after_id={last_id}').get_json() == {'messages': [], 'lastId': last_id}
+
+    since = client.get(f'{url}?since=2025-01-01T10:03:30').get_json()
+    assert [m['message'] for m in since['messages']] == ['Message 4', 'Message 5']
+    assert client.get(f'{url}?after_id=abc').status_code == 400
+
+
+def test_read_receipts_are_one_update_and_skip_empty_commits():
+    app, client, ids = setup_chat()
+    as_user(app, client, ids['buyer'])
+    url = f"/api/inquiries/{ids['first']}/messages"
+    with app.app_context():
+        engine = db.engine
+
+    commits = []
+    event.listen(engine, 'commit', lambda conn: commits.append(conn))
+
+    with count_queries(engine) as first_poll:
+        body = client.get(url).get_json()
+    updates = [s for s in first_poll.statements if s.lstrip().upper().startswith('UPDATE')]
+    assert len(updates) == 1, first_poll.statements
+    assert len(commits) == 1
+    assert all(m['isRead'] for m in body['messages'] if m['senderId'] == ids['seller'])
+    assert not any(m['isRead'] for m in body['messages'] if m['senderId'] == ids['buyer'])
+
+    with count_queries(engine) as second_poll:
+        client.get(f"{url}?after_id={body['lastId']}")
+    assert len(commits) == 1  # Nothing was unread: no commit
+    assert len(second_poll.statements) == 3, second_poll.statements  # Inquiry, no-op UPDATE, messages
+
+
+def test_unread_count_is_one_aggregate_query():
+    app, client, ids = setup_chat()
+    as_user(app, client, ids['buyer'])
+    with app.app_context():
+        engine = db.engine
+
+    with count_queries(engine) as counter:
+        counts = client.get('/api/inquiries/unread-count').get_json()
+    assert counts == {'total': 4, 'byInquiry': {str(ids['first']): 3, str(ids['second']): 1}}
+    assert counter.count == 1, counter.statements
+
+    client.get(f"/api/inquiries/{ids['first']}/messages")
+    assert client.get('/api/inquiries/unread-count').get_json() == \
+        {'total': 1, 'byInquiry': {str(ids['second']): 1}}
+
+    as_user(app, client, ids['seller'])
+    assert client.get('/api/inquiries/unread-count').get_json()['total'] == 3
+
+
+def test_broker_wakes_waiters_and_forgets_idle_inquiries():
+    broker = LocalChatBroker(poll_interval=1)
+
+    with broker.subscribe(7) as subscription:
+        broker.publish(7)  # Published after subscribing but before waiting: not lost
+        assert subscription.wait(5)
+    with broker.subscribe(7) as subscription:
+        broker.publish(8)
+        assert not subscription.wait(0.05)
+    assert broker.waiting() == 0 and broker._channels == {}
+
+    stats = broker.stats_dict()
+    assert (stats['waits'], stats['woken'], stats['timeouts'], stats['published']) == (2, 1, 1, 2)
+
+
+def test_long_poll_returns_new_messages_or_times_out():
+    app, client, ids = setup_chat()
+    as_user(app, client, ids['buyer'])
+    url = f"/api/inquiries/{ids['first']}/messages/wait"
+
+    pending = client.get(f'{url}?after_id=0').get_json()  # Already newer messages: no wait
+    assert len(pending['messages']) == 6
+
+    started = time.monotonic()
+    idle = client.get(f"{url}?after_id={pending['lastId']}&timeout=0.2").get_json()
+    assert idle == {'messages': [], 'lastId': pending['lastId']}
+    assert 0.2 <= time.monotonic() - started < 2
+    assert client.get(f'{url}?timeout=soon').status_code == 400
+
+
+def test_long_poll_wakes_on_send():
+    app, buyer_client, ids = setup_chat()
+    seller_client = app.test_client()
+    as_user(app, buyer_client, ids['buyer'])
+    as_user(app, seller_client, ids['seller'])
+    last_id = buyer_client.get(f"/api/inquiries/{ids['first']}/messages").get_json()['lastId']
+
+    result = {}
+
+    def wait():
+        started = time.monotonic()
+        result['body'] = buyer_client.get(
+            f"/api/inquiries/{ids['first']}/messages/wait?after_id={last_id}&timeout=10").get_json()
+        result['seconds'] = time.monotonic() - started
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    broker = app.extensions.get('chat_broker')
+    for _ in range(200):
+        broker = app.extensions.get('chat_broker')
+        if broker is not None and broker.waiting():
+            break
+        time.sleep(0.01)
+    assert broker.waiting() == 1
+
+    seller_client.post(f"/api/inquiries/{ids['first']}/messages", json={'message': 'Dispatching today'})
+    waiter.join(10)
+
+    assert [m['message'] for m in result['body']['messages']] == ['Dispatching today']
+    assert result['body']['messages'][0]['isRead']
+    assert result['seconds'] < 5
+    assert broker.waiting() == 0
+
+
+def test_failed_publish_still_returns_201():
+    class FailingBroker(LocalChatBroker):
+        def publish(self, inquiry_id, message_id):
+            raise RuntimeError('NOTIFY failed')
+
+    app, client, ids = setup_chat(messages=0)
+    app.extensions['chat_broker'] = FailingBroker(3)
+    as_user(app, client, ids['buyer'])
+
+    response = client.post(f"/api/inquiries/{ids['first']}/messages", json={'message': 'Dispatching today'})
+    assert response.status_code == 201
+    with app.app_context():
+        assert [m.message for m in ChatMessage.query.filter_by(inquiry_id=ids['first'])] == ['Dispatching today']
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("INQUIRY CHAT TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
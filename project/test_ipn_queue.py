@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+IPN queue tests
+In queue mode /airpay-ipn verifies and stores the notification without
+touching orders; the worker applies it, retries failures with backoff and
+dead-letters jobs that keep failing
+
+Usage:
+    python test_ipn_queue.py
+    python -m pytest test_ipn_queue.py
+"""
+import datetime
+import json
+import zlib
+
+from sqlalchemy import update
+
+from api import create_app, db
+from api import payments
+from api.airpay_utils import AirpayV4Functions
+from api.ipn_queue import enqueue_ipn, process_batch, backlog_stats, retry_delay, worker_stats
+from api.models import User, Order, PaymentTransaction, IPNJob, IPNDeadLetter
+from testing import TestConfig, login
+
+ITEMS = 3
+
+
+class QueueConfig(TestConfig):
+    AIRPAY_IPN_MODE = 'queue'
+    AIRPAY_MERCHANT_ID = '12345'
+    AIRPAY_USERNAME = 'ipn-user'
+    AIRPAY_PASSWORD = 'ipn-pass'
+    IPN_MAX_ATTEMPTS = 3
+
+
+def setup_transaction():
+    """A Pending cart checkout with ITEMS orders under txnid 1704567890123456789"""
+    worker_stats.reset()
+    app = create_app(QueueConfig)
+    with app.app_context():
+        db.create_all()
+        admin = User(name='Admin', email='admin@example.com', password='secret', role='admin')
+        buyer = User(name='Ravi Kumar', email='ravi@example.com', password='secret')
+        db.session.add_all([admin, buyer])
+        db.session.flush()
+        txnid = '1704567890123456789'
+        db.session.add(PaymentTransaction(txn_id=txnid, gateway='airpay', source='cart',
+                                          user_id=buyer.id, amount=3.0))
+        db.session.flush()
+        for i in range(ITEMS):
+            db.session.add(Order(
+                user_id=buyer.id, product_name=f'Product {i}', quantity=2000, unit='kg', total_price=1.0,
+                amount_paid=1.0, payment_option='Online', utr_code=txnid, txn_id=txnid, status='Pending',
+                buyer_name='Ravi', buyer_mobile='', address_line_1='', city='', state='', pincode=''
+            ))
+        db.session.commit()
+        admin_id = admin.id
+    return app, txnid, admin_id
+
+
+def airpay_ipn_form(txnid, status='200', ap_txn_id='AP998877'):
+    """Encrypted, correctly checksummed Airpay notification"""
+    data = {'orderid': txnid, 'ap_transactionid': ap_txn_id, 'amount': '3.00',
+            'transaction_status': status, 'message': 'Success'}
+    crc = (f"{txnid}:{ap_txn_id}:3.00:{status}:Success:"
+           f"{QueueConfig.AIRPAY_MERCHANT_ID}:{QueueConfig.AIRPAY_USERNAME}")
+    data['ap_securehash'] = str(zlib.crc32(crc.encode('utf-8')) & 0xffffffff)
+    functions = AirpayV4Functions(QueueConfig.AIRPAY_MERCHANT_ID, QueueConfig.AIRPAY_USERNAME,
+                                  QueueConfig.AIRPAY_PASSWORD)
+    encrypted = functions.encrypt_string(json.dumps({'data': data}))
+    return {'response': encrypted}
+
+
+def order_statuses(app, txnid):
+    with app.app_context():
+        return {order.status for order in Order.query.filter_by(txn_id=txnid)}
+
+
+def test_ipn_is_queued_without_touching_orders():
+    app, txnid, _ = setup_transaction()
+
+    response = app.test_client().post('/api/airpay-ipn', data=airpay_ipn_form(txnid))
+
+    assert response.status_code == 200
+    assert response.get_json()['order_status'] == 'queued'
+    assert order_statuses(app, txnid) == {'Pending'}
+    with app.app_context():
+        job = IPNJob.query.one()
+        assert (job.txn_id, job.outcome, job.gateway_txn_id) == (txnid, 'Booked', 'AP998877')
+        assert 'response' in json.loads(job.payload)
+
+
+def test_invalid_ipn_is_rejected_and_not_queued():
+    app, txnid, _ = setup_transaction()
+    form = airpay_ipn_form(txnid)
+    form['response'] = form['response'][:-8] + 'AAAAAAAA'
+
+    response = app.test_client().post('/api/airpay-ipn', data=form)
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert IPNJob.query.count() == 0
+
+
+def test_worker_applies_batch_and_drains_queue():
+    app, txnid, _ = setup_transaction()
+    client = app.test_client()
+    client.post('/api/airpay-ipn', data=airpay_ipn_form(txnid))
+    client.post('/api/airpay-ipn', data=airpay_ipn_form(txnid))  # Gateway retry
+
+    with app.app_context():
+        assert process_batch() == 2
+        assert IPNJob.query.count() == 0
+        transaction = PaymentTransaction.query.filter_by(txn_id=txnid).one()
+        assert (transaction.status, transaction.gateway_txn_id) == ('Booked', 'AP998877')
+
+    assert order_statuses(app, txnid) == {'Booked'}
+    assert worker_stats.applied == 1
+    assert worker_stats.duplicates == 1
+
+
+def test_failed_job_retries_with_backoff_then_dead_letters():
+    app, txnid, _ = setup_transaction()
+    original = payments.apply_payment_result
+
+    def broken(*args, **kwargs):
+        raise RuntimeError('database went away')
+
+    payments.apply_payment_result = broken
+    try:
+        with app.app_context():
+            job_id = enqueue_ipn('airpay', txnid, 'Booked', 'AP1', {'response': 'x'})
+
+            for attempt in range(1, QueueConfig.IPN_MAX_ATTEMPTS):
+                before = datetime.datetime.now()
+                assert process_batch() == 1
+                job = db.session.get(IPNJob, job_id)
+                assert (job.status, job.attempts) == ('queued', attempt)
+                assert 'database went away' in job.last_error
+                delay = (job.next_attempt_at - before).total_seconds()
+                assert delay >= retry_delay(attempt, QueueConfig.IPN_RETRY_BACKOFF,
+                                            QueueConfig.IPN_RETRY_BACKOFF_MAX) - 1
+                assert process_batch() == 0  # Not due yet
+                db.session.execute(update(IPNJob).values(next_attempt_at=before))
+                db.session.commit()
+
+            assert process_batch() == 1
+            assert IPNJob.query.count() == 0
+            dead = IPNDeadLetter.query.one()
+            assert (dead.job_id, dead.txn_id, dead.attempts) == (job_id, txnid, QueueConfig.IPN_MAX_ATTEMPTS)
+    finally:
+        payments.apply_payment_result = original
+
+    assert order_statuses(app, txnid) == {'Pending'}
+    assert worker_stats.retried == QueueConfig.IPN_MAX_ATTEMPTS - 1
+    assert worker_stats.dead_lettered == 1
+
+
+def test_expired_claim_is_picked_up_again():
+    app, txnid, _ = setup_transaction()
+    with app.app_context():
+        enqueue_ipn('airpay', txnid, 'Booked', 'AP1', {'response': 'x'})
+        # A worker claimed it and died; its lease has run out
+        db.session.execute(update(IPNJob).values(
+            status='processing', next_attempt_at=datetime.datetime.now() - datetime.timedelta(seconds=1)))
+        db.session.commit()
+
+        assert process_batch() == 1
+        assert IPNJob.query.count() == 0
+    assert order_statuses(app, txnid) == {'Booked'}
+
+
+def test_backlog_and_lag_metric():
+    app, txnid, admin_id = setup_transaction()
+    with app.app_context():
+        assert backlog_stats()['backlog'] == 0
+        assert backlog_stats()['lagSeconds'] == 0.0
+
+        enqueue_ipn('airpay', txnid, 'Booked', 'AP1', {'response': 'x'})
+        enqueue_ipn('airpay', txnid, 'Booked', 'AP1', {'response': 'x'})
+        db.session.execute(update(IPNJob).values(
+            created_on=datetime.datetime.now() - datetime.timedelta(seconds=90)))
+        db.session.commit()
+        admin = db.session.get(User, admin_id)
+
+        client = app.test_client()
+        login(client, admin)
+    stats = client.get('/api/admin/ipn-queue').get_json()
+
+    assert stats['backlog'] == 2
+    assert stats['processing'] == 0
+    assert stats['deadLetters'] == 0
+    assert stats['lagSeconds'] >= 90
+    assert 'worker' not in stats  # Counted in the ipn-worker process only
+
+
+def test_sync_mode_still_applies_in_request():
+    class SyncConfig(QueueConfig):
+        AIRPAY_IPN_MODE = 'sync'
+
+    app, txnid, _ = setup_transaction()
+    app.config.from_object(SyncConfig)
+    response = app.test_client().post('/api/airpay-ipn', data=airpay_ipn_form(txnid))
+
+    assert response.get_json()['order_status'] == 'Booked'
+    assert order_statuses(app, txnid) == {'Booked'}
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("IPN QUEUE TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
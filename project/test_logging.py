@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Structured logging tests
+Payment log lines are written by the listener thread (not the request
+thread), credentials and PII are masked in messages and extra fields,
+LOG_LEVELS sets per-module levels, and a disabled debug call never formats
+its arguments
+
+Usage:
+    python test_logging.py
+    python -m pytest test_logging.py
+"""
+import io
+import json
+import logging
+import threading
+
+from api import create_app
+from api.logging_setup import configure_logging, flush_logs, StructuredFormatter, redact_text
+from testing import TestConfig, make_app
+
+
+class ThreadRecordingStream(io.StringIO):
+    """Remembers which threads wrote to it"""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def write(self, text):
+        self.threads.add(threading.current_thread().name)
+        return super().write(text)
+
+
+def make_record(message, *args, **extra):
+    record = logging.LogRecord('api.payments', logging.INFO, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_redacts_credentials_and_pii():
+    formatter = StructuredFormatter()
+    line = formatter.format(make_record(
+        'Payment hash request: %s', {'txnid': 'a1b2c3d4-1111-4222-8333-444455556666', 'password': 'hunter2',
+                                     'email': 'ravi.kumar@gmail.com', 'phone': '+91 9876543210'},
+        token='eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiIxIn0.sig', amount='199.00', fields=['response', 'hash'],
+    ))
+    assert 'hunter2' not in line and "'password': '***'" in line
+    assert 'r***@gmail.com' in line and 'ravi.kumar' not in line
+    assert '9876543210' not in line and '********10' in line
+    assert 'a1b2c3d4-1111-4222-8333-444455556666' in line  # Transaction ids stay searchable
+    assert 'token=***' in line and 'amount=199.00' in line and "fields=['response', 'hash']" in line
+
+    assert redact_text('order 1704567890123456789') == 'order 1704567890123456789'
+    assert redact_text(f"hash {'ab12' * 32}") == 'hash [redacted]'
+    assert redact_text('https://payments.airpay.co.in/pay/v4/?token=abc123') == \
+        'https://payments.airpay.co.in/pay/v4/?token=***'
+    assert 'hunter2' in StructuredFormatter(redact=False).format(make_record('password=hunter2'))
+
+
+def test_payment_lines_are_written_by_the_listener_thread():
+    app = make_app()
+    stream = ThreadRecordingStream()
+    configure_logging(app, stream=stream)
+    try:
+        response = app.test_client().post('/api/airpay-ipn', data={})
+        assert response.status_code == 400
+        flush_logs()
+    finally:
+        configure_logging(app)
+
+    assert 'WARNING api.payments: Airpay IPN without response data' in stream.getvalue()
+    assert stream.threads and threading.current_thread().name not in stream.threads
+
+
+def test_per_module_levels_and_json_format():
+    class VerboseConfig(TestConfig):
+        LOG_LEVELS = 'api.payments=DEBUG, api.ipn_queue=WARNING, api.bogus=LOUD'
+        LOG_FORMAT = 'json'
+
+    app = create_app(VerboseConfig)
+    stream = io.StringIO()
+    configure_logging(app, stream=stream)
+    try:
+        assert logging.getLogger('api.payments').isEnabledFor(logging.DEBUG)
+        assert not logging.getLogger('api.ipn_queue').isEnabledFor(logging.INFO)
+        assert not logging.getLogger('api.airpay_utils').isEnabledFor(logging.DEBUG)  # LOG_LEVEL=INFO
+        logging.getLogger('api.payments').debug('Airpay IPN received', extra={'fields': ['response']})
+        flush_logs()
+        entry = json.loads(stream.getvalue().splitlines()[-1])
+        assert entry['level'] == 'DEBUG' and entry['logger'] == 'api.payments'
+        assert entry['message'] == 'Airpay IPN received' and entry['fields'] == ['response']
+        skipped = json.loads(stream.getvalue().splitlines()[0])
+        assert skipped['level'] == 'WARNING' and "'api.bogus=LOUD'" in skipped['message']
+    finally:
+        configure_logging(make_app())
+
+    # A later app without the overrides puts the modules back on LOG_LEVEL
+    assert not logging.getLogger('api.payments').isEnabledFor(logging.DEBUG)
+    assert logging.getLogger('api.ipn_queue').isEnabledFor(logging.INFO)
+
+
+def test_disabled_debug_does_not_format_arguments():
+    make_app()
+    formatted = []
+
+    class Expensive:
+        def __str__(self):
+            formatted.append(True)
+            return 'expensive'
+
+    logger = logging.getLogger('api.payments')
+    logger.debug('Payment hash request: %s', Expensive())
+    assert formatted == []
+    logger.info('Payment hash request: %s', Expensive())
+    flush_logs()
+    assert formatted
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("STRUCTURED LOGGING TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
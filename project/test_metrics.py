@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Request metrics tests
+Requests are timed per URL rule with their SQL statements, gateway and
+crypto time attributed to them, /api/admin/metrics renders valid Prometheus
+text (admins only) including the other stats counters, and the armed
+profiler captures the stacks of one slow request
+
+Usage:
+    python test_metrics.py
+    python -m pytest test_metrics.py
+"""
+import re
+
+from api import db
+from api.metrics import metrics, BACKGROUND
+from api.models import User
+from test_inquiry_chat import setup_chat, as_user
+from testing import make_app, login, count_queries
+
+SAMPLE_LINE = re.compile(r'^[a-z_]+(\{([a-zA-Z_]+="[^"]*",?)+\})? -?[0-9.e+-]+$')
+
+
+def parse_samples(text):
+    """{'name{labels}': value} for every sample line, after checking the line format"""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            assert re.match(r'^# (HELP|TYPE) mandi_[a-z_]+ ', line), line
+            continue
+        assert SAMPLE_LINE.match(line), line
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    return samples
+
+
+def make_admin_client(app):
+    client = app.test_client()
+    with app.app_context():
+        admin = User(name='Admin', email='admin@example.com', password='secret', role='admin')
+        db.session.add(admin)
+        db.session.commit()
+        login(client, admin)
+    return client
+
+
+def test_requests_are_timed_per_url_rule_with_their_sql():
+    app, client, ids = setup_chat()
+    as_user(app, client, ids['buyer'])
+    metrics.reset()
+    with app.app_context():
+        engine = db.engine
+
+    url = f"/api/inquiries/{ids['first']}/messages"
+    rule = '/api/inquiries/<int:inquiry_id>/messages'
+    with count_queries(engine, ignore_users=False) as counter:
+        client.get(url)
+    assert metrics.sql_per_request[(rule,)].sum == counter.count  # Session user, inquiry, UPDATE, messages
+    client.get(url)
+    client.get('/api/no-such-route')
+
+    assert metrics.requests[('GET', rule, 200)] == 2
+    assert metrics.requests[('GET', '<unmatched>', 404)] == 1
+    assert metrics.latency[('GET', rule)].count == 2
+    sql = metrics.sql_per_request[(rule,)]
+    assert sql.count == 2 and metrics.totals[rule][0] == sql.sum
+    assert metrics.totals[rule][1] > 0
+
+
+def test_login_crypto_and_gateway_time():
+    app = make_app()
+    client = app.test_client()
+    metrics.reset()
+    with app.app_context():
+        db.session.add(User(name='Ravi', email='ravi@example.com', password='secret'))
+        db.session.commit()
+    assert metrics.crypto[('bcrypt_hash',)].count == 1
+    assert metrics.totals[BACKGROUND][3] > 0  # Hashed outside a request
+
+    client.post('/api/auth/login', json={'email': 'ravi@example.com', 'password': 'secret'})
+    assert metrics.crypto[('bcrypt_check',)].count == 1
+    assert metrics.totals['/api/auth/login'][3] > 0
+
+    try:
+        with metrics.time_gateway('airpay', 'POST'):
+            raise ConnectionError('gateway down')
+    except ConnectionError:
+        pass
+    assert metrics.gateway[('airpay', 'POST')].count == 1
+    assert metrics.gateway_errors[('airpay', 'POST')] == 1
+
+
+def test_prometheus_endpoint_is_admin_only_and_well_formed():
+    app, client, ids = setup_chat()
+    as_user(app, client, ids['buyer'])
+    metrics.reset()
+    assert client.get('/api/admin/metrics').status_code == 403
+    client.get('/api/inquiries/unread-count')
+
+    admin = make_admin_client(app)
+    response = admin.get('/api/admin/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = parse_samples(response.get_data(as_text=True))
+
+    labels = 'method="GET",endpoint="/api/inquiries/unread-count"'
+    assert samples[f'mandi_http_request_duration_seconds_count{{{labels}}}'] == 1
+    assert samples[f'mandi_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 1
+    assert samples[f'mandi_http_requests_total{{{labels},status="200"}}'] == 1
+    # Folded-in counters from the other stats endpoints
+    assert 'mandi_airpay_token_cache_tokens' in samples
+    assert 'mandi_cold_start_milliseconds{phase="import_to_ready"}' in samples
+    assert samples['mandi_ipn_queue_jobs{state="backlog"}'] == 0
+
+
+def test_profiler_captures_one_slow_request():
+    app, client, ids = setup_chat()
+    metrics.reset()
+    metrics.profiler.configure(True, 2)
+    as_user(app, client, ids['buyer'])
+    admin = make_admin_client(app)
+
+    wait_rule = '/api/inquiries/<int:inquiry_id>/messages/wait'
+    armed = admin.post('/api/admin/metrics/profile', json={'thresholdMs': 100, 'endpoint': wait_rule})
+    assert armed.status_code == 200 and armed.get_json()['armed']['thresholdMs'] == 100
+    assert admin.get('/api/admin/metrics/profile/folded').status_code == 404
+
+    last_id = client.get(f"/api/inquiries/{ids['first']}/messages").get_json()['lastId']
+    client.get(f"/api/inquiries/{ids['first']}/messages/wait?after_id={last_id}&timeout=0.3")
+
+    status = admin.get('/api/admin/metrics/profile').get_json()
+    assert status['armed'] is None  # One capture per arming
+    assert status['capture']['endpoint'] == wait_rule and status['capture']['samples'] > 10
+
+    folded = admin.get('/api/admin/metrics/profile/folded').get_data(as_text=True)
+    stack, count = folded.splitlines()[0].rsplit(' ', 1)
+    assert int(count) > 0 and 'wait_for_messages (api/inquiries.py:' in stack
+
+    metrics.profiler.configure(False, 5)
+    assert admin.post('/api/admin/metrics/profile', json={}).status_code == 400
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("REQUEST METRICS TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
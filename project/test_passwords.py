@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Password hashing tests
+New hashes use BCRYPT_LOG_ROUNDS, a login with a hash of another cost
+rehashes it once (a failed login does not), no more than BCRYPT_WORKERS
+hashes run at a time, and a login that finds every slot taken gets a 503
+
+Usage:
+    python test_passwords.py
+    python -m pytest test_passwords.py
+"""
+import threading
+import time
+
+from api import create_app, db, bcrypt
+from api.models import User
+from api.passwords import password_hasher, hash_cost, PasswordHasherBusy
+from test_metrics import make_admin_client, parse_samples
+from testing import TestConfig, count_queries
+
+
+class CostFiveConfig(TestConfig):
+    BCRYPT_LOG_ROUNDS = 5
+
+
+def make_cost_app(config=CostFiveConfig, stored_cost=4):
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        user = User(name='Ravi', email='ravi@example.com', password='secret')
+        user.password = bcrypt.generate_password_hash('secret', stored_cost).decode('utf-8')
+        db.session.add(user)
+        db.session.commit()
+        return app, user.id, db.engine
+
+
+def stored_hash(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).password
+
+
+def test_new_hashes_use_the_configured_cost():
+    app = create_app(CostFiveConfig)
+    with app.app_context():
+        user = User(name='Ravi', email='ravi@example.com', password='secret')
+        assert hash_cost(user.password) == 5
+        assert user.check_password('secret') and not user.check_password('wrong')
+    assert hash_cost('not-a-bcrypt-hash') is None
+
+
+def test_login_rehashes_an_old_cost_once():
+    app, user_id, engine = make_cost_app()
+    client = app.test_client()
+    old_hash = stored_hash(app, user_id)
+
+    response = client.post('/api/auth/login', json={'email': 'ravi@example.com', 'password': 'secret'})
+    assert response.status_code == 200
+    new_hash = stored_hash(app, user_id)
+    assert hash_cost(old_hash) == 4 and hash_cost(new_hash) == 5
+    assert bcrypt.check_password_hash(new_hash, 'secret')
+
+    with count_queries(engine, ignore_users=False) as counter:
+        response = client.post('/api/auth/login', json={'email': 'ravi@example.com', 'password': 'secret'})
+    assert response.status_code == 200
+    assert not [s for s in counter.statements if s.lstrip().upper().startswith('UPDATE USERS')]
+    assert stored_hash(app, user_id) == new_hash
+    assert password_hasher.stats()['rehashes'] == 1
+
+
+def test_failed_login_does_not_rehash():
+    app, user_id, _ = make_cost_app()
+    old_hash = stored_hash(app, user_id)
+    response = app.test_client().post('/api/auth/login', json={'email': 'ravi@example.com', 'password': 'wrong'})
+    assert response.status_code == 401
+    assert stored_hash(app, user_id) == old_hash and password_hasher.stats()['rehashes'] == 0
+
+
+def test_pool_bounds_concurrent_hashes():
+    class TwoWorkersConfig(TestConfig):
+        BCRYPT_WORKERS = 2
+
+    create_app(TwoWorkersConfig)
+    lock = threading.Lock()
+    running = [0, 0]  # Now, most seen
+
+    def hold():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    threads = [threading.Thread(target=password_hasher.run, args=(hold,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert running[1] == 2
+    assert password_hasher.stats()['pending'] == 0
+
+
+def test_login_gets_503_when_every_slot_is_taken():
+    class OneSlotConfig(TestConfig):
+        BCRYPT_WORKERS = 1
+        BCRYPT_QUEUE_SIZE = 0
+        BCRYPT_QUEUE_TIMEOUT = 0.05
+
+    app, _, _ = make_cost_app(OneSlotConfig, stored_cost=4)
+    client = app.test_client()
+    release = threading.Event()
+    holder = threading.Thread(target=password_hasher.run, args=(release.wait,))
+    holder.start()
+    try:
+        while password_hasher.stats()['pending'] == 0:
+            time.sleep(0.001)
+        response = client.post('/api/auth/login', json={'email': 'ravi@example.com', 'password': 'secret'})
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+        try:
+            password_hasher.hash('secret')
+            assert False, 'expected PasswordHasherBusy'
+        except PasswordHasherBusy:
+            pass
+    finally:
+        release.set()
+        holder.join()
+    response = client.post('/api/auth/login', json={'email': 'ravi@example.com', 'password': 'secret'})
+    assert response.status_code == 200
+
+    samples = parse_samples(make_admin_client(app).get('/api/admin/metrics').get_data(as_text=True))
+    assert samples['mandi_password_hasher_calls_total{event="rejected"}'] == 2
+    assert samples['mandi_password_hasher_pending'] == 0
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("PASSWORD HASHING TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Payment callback tests
+A callback updates every order linked to its transaction, and a replayed
+callback costs one indexed lookup and no writes
+
+Usage:
+    python test_payment_callbacks.py
+    python -m pytest test_payment_callbacks.py
+"""
+from api import db
+from api.models import User, Cart, CartItem, Order, PaymentTransaction
+from api.payments import verify_hash, apply_payment_result
+from api.shipping import quote_shipping, UNKNOWN_STATE
+from testing import TestConfig, make_app, login, count_queries
+
+ITEMS = 3
+CHECKOUT = {
+    'paymentOption': 'Online', 'buyerName': 'Ravi Kumar', 'mobile': '9876543210',
+    'pincode': '132001', 'addressLine1': 'Shop 4, Grain Market', 'city': 'Karnal',
+    'state': 'Haryana', 'gateway': 'payu',
+}
+
+
+def setup_checkout():
+    """Cart checkout with ITEMS items; returns the app, client and txnid"""
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        user = User(name='Ravi Kumar', email='ravi@example.com', password='secret')
+        db.session.add(user)
+        db.session.flush()
+        cart = Cart(user_id=user.id)
+        db.session.add(cart)
+        db.session.flush()
+        for i in range(ITEMS):
+            db.session.add(CartItem(
+                cart_id=cart.id, product_id=f'P{i}', product_name=f'Product {i}',
+                price_per_unit=10.0 + i, unit='kg', quantity=2000
+            ))
+        db.session.commit()
+        login(client, user)
+
+    txnid = client.post('/api/initiate-cart-payment', json=CHECKOUT).get_json()['txnid']
+    return app, client, txnid
+
+
+def payu_callback(txnid, status='success', mihpayid='403993715531234567'):
+    form = {
+        'key': TestConfig.PAYU_KEY, 'txnid': txnid, 'amount': '66000.00', 'productinfo': 'Cart checkout',
+        'firstname': 'Ravi Kumar', 'email': 'ravi@example.com', 'status': status, 'mihpayid': mihpayid,
+    }
+    form['hash'] = verify_hash(form, TestConfig.PAYU_SALT)
+    return form
+
+
+def order_statuses(app, txnid):
+    with app.app_context():
+        return [(order.status, order.utr_code) for order in Order.query.filter_by(txn_id=txnid)]
+
+
+def test_checkout_links_orders_to_one_transaction():
+    app, _, txnid = setup_checkout()
+    with app.app_context():
+        transaction = PaymentTransaction.query.filter_by(txn_id=txnid).one()
+        assert transaction.source == 'cart'
+        assert transaction.status == 'Pending'
+        shipping = quote_shipping(2000, 'kg', UNKNOWN_STATE, 'Haryana').charge
+        assert transaction.amount == sum((10.0 + i) * 2000 + shipping for i in range(ITEMS))
+        assert len(transaction.orders) == ITEMS
+
+
+def test_success_books_every_order_and_clears_cart():
+    app, client, txnid = setup_checkout()
+
+    response = client.post('/api/payment-success', data=payu_callback(txnid))
+
+    assert response.status_code == 302
+    assert 'status=success' in response.location
+    assert order_statuses(app, txnid) == [('Booked', '403993715531234567')] * ITEMS
+    with app.app_context():
+        assert PaymentTransaction.query.filter_by(txn_id=txnid).one().gateway_txn_id == '403993715531234567'
+        assert CartItem.query.count() == 0
+    assert client.get('/api/cart/count').get_json()['count'] == 0
+
+
+def test_replayed_callback_is_one_lookup_and_no_writes():
+    app, client, txnid = setup_checkout()
+    client.post('/api/payment-success', data=payu_callback(txnid))
+
+    with app.app_context():
+        engine = db.engine
+    with count_queries(engine) as counter:
+        response = client.post('/api/payment-success', data=payu_callback(txnid))
+
+    assert response.status_code == 302
+    assert counter.count == 1, counter.statements
+    assert counter.statements[0].lstrip().upper().startswith('SELECT')
+
+
+def test_failure_after_success_does_not_downgrade():
+    app, client, txnid = setup_checkout()
+    client.post('/api/payment-success', data=payu_callback(txnid))
+    client.post('/api/payment-failure', data={'txnid': txnid})
+
+    assert order_statuses(app, txnid) == [('Booked', '403993715531234567')] * ITEMS
+
+
+def test_success_after_failure_books_orders():
+    app, client, txnid = setup_checkout()
+    client.post('/api/payment-failure', data={'txnid': txnid})
+    assert [status for status, _ in order_statuses(app, txnid)] == ['Failed'] * ITEMS
+
+    with app.app_context():
+        result = apply_payment_result(txnid, 'Booked', gateway_txn_id='AP123')
+    assert result.outcome == 'applied'
+    assert order_statuses(app, txnid) == [('Booked', 'AP123')] * ITEMS
+
+
+def test_legacy_orders_without_transaction():
+    app, _, _ = setup_checkout()
+    with app.app_context():
+        user_id = User.query.first().id
+        for i in range(2):
+            db.session.add(Order(
+                user_id=user_id, product_name=f'Old {i}', quantity=2000, unit='kg', total_price=1.0,
+                amount_paid=1.0, payment_option='Online', utr_code='OLD-TXN', status='Pending',
+                buyer_name='Ravi', buyer_mobile='', address_line_1='', city='', state='', pincode=''
+            ))
+        db.session.commit()
+
+        assert apply_payment_result('OLD-TXN', 'Booked', gateway_txn_id='GW1').outcome == 'applied'
+        assert {order.status for order in Order.query.filter_by(utr_code='GW1')} == {'Booked'}
+        assert Order.query.filter_by(utr_code='GW1').count() == 2
+        assert apply_payment_result('MISSING', 'Booked').outcome == 'not_found'
+
+
+def test_payment_status_after_success():
+    app, client, txnid = setup_checkout()
+    client.post('/api/payment-success', data=payu_callback(txnid))
+
+    response = client.get(f'/api/payment-status/{txnid}')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'Booked'
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("PAYMENT CALLBACK TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Query-count regression tests for product listing endpoints
+/api/my-listings and /api/admin/products/pending issue the session user
+lookup, the listing query and one image query per 500 listings (selectinload),
+for 10 products as for 10,000: no Image/seller N+1
+
+Usage:
+    python test_product_listing_queries.py
+    python -m pytest test_product_listing_queries.py
+"""
+import datetime
+import math
+
+from sqlalchemy import insert
+
+from api import db
+from api.models import User, Product, Image
+from testing import make_app, login, count_queries
+
+SIZES = (10, 10000)
+SELLERS = 25  # More than any fixed batch, so a per-seller load would show in the count
+IMAGE_BATCH = 500  # Parent ids per selectinload IN query
+
+
+def setup_listings(product_count):
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        admin = User(name='Admin', email='admin@example.com', password='secret', role='admin')
+        sellers = [User(name=f'Seller {i}', email=f'seller{i}@example.com', password='secret', role='trader')
+                   for i in range(SELLERS)]
+        db.session.add_all([admin] + sellers)
+        db.session.flush()
+        seller_ids = [seller.id for seller in sellers]
+
+        now = datetime.datetime.now()
+        db.session.execute(insert(Product), [
+            {'id': i + 1, 'name': f'Onion lot {i}', 'location': 'Nashik', 'price': 20.0, 'unit': 'kg',
+             'status': 'Pending', 'created_on': now, 'user_id': seller_ids[i % SELLERS]}
+            for i in range(product_count)
+        ])
+        db.session.execute(insert(Image), [
+            {'url': f'https://img.example.com/{i}-{n}.jpg', 'product_id': i + 1}
+            for i in range(product_count) for n in range(2)
+        ])
+        db.session.commit()
+
+        admin_id = admin.id
+        seller_id = seller_ids[0]
+
+    return app, client, admin_id, seller_id
+
+
+def listing_query_count(product_count, path, as_admin):
+    app, client, admin_id, seller_id = setup_listings(product_count)
+    with app.app_context():
+        login(client, db.session.get(User, admin_id if as_admin else seller_id))
+        engine = db.engine
+
+    # Users included: the seller N+1 is a SELECT on users, next to the one session user lookup
+    with count_queries(engine, ignore_users=False) as counter:
+        response = client.get(path)
+
+    products = response.get_json()
+    assert response.status_code == 200
+    assert all(len(product['images']) == 2 for product in products)
+    if as_admin:
+        assert len(products) == product_count
+        assert all(product['seller']['name'].startswith('Seller') for product in products)
+    user_selects = [s for s in counter.statements if s.lstrip().upper().startswith('SELECT USERS.')]
+    assert len(user_selects) <= 1, user_selects  # The session user; sellers come with the products
+    return counter.count, len(products)
+
+
+def expected_queries(listed):
+    """Session user + listings + image batches"""
+    return 2 + math.ceil(listed / IMAGE_BATCH)
+
+
+def test_my_listings_have_no_n_plus_one():
+    counts = [listing_query_count(size, '/api/my-listings', as_admin=False) for size in SIZES]
+    assert [count for count, _ in counts] == [expected_queries(listed) for _, listed in counts], counts
+
+
+def test_admin_pending_products_have_no_n_plus_one():
+    counts = [listing_query_count(size, '/api/admin/products/pending', as_admin=True) for size in SIZES]
+    assert [count for count, _ in counts] == [expected_queries(listed) for _, listed in counts], counts
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("PRODUCT LISTING QUERY COUNT TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
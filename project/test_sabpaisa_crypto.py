@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+SabPaisa crypto context tests
+The cached context must stay wire-compatible with a freshly built
+AES256HMACSHA384HEX and still reject tampered messages
+
+Usage:
+    python test_sabpaisa_crypto.py
+    python -m pytest test_sabpaisa_crypto.py
+"""
+import base64
+import os
+
+from api.sabpaisa_utils import (
+    AES256HMACSHA384HEX, crypto_context, create_encrypted_request, parse_callback_response
+)
+
+AUTH_KEY = base64.b64encode(os.urandom(32)).decode()
+AUTH_IV = base64.b64encode(os.urandom(48)).decode()
+PAYLOAD = "clientTxnId=1704567890123456789&status=SUCCESS&sabpaisaTxnId=SP123&paidAmount=3.0"
+
+
+def test_context_is_cached_per_credential_set():
+    assert crypto_context(AUTH_KEY, AUTH_IV) is crypto_context(f" {AUTH_KEY}\n", AUTH_IV)
+    other_key = base64.b64encode(os.urandom(32)).decode()
+    assert crypto_context(other_key, AUTH_IV) is not crypto_context(AUTH_KEY, AUTH_IV)
+
+
+def test_round_trip_and_interop_with_fresh_instance():
+    encrypted = create_encrypted_request(PAYLOAD, AUTH_KEY, AUTH_IV)
+    assert encrypted == encrypted.upper()
+    assert AES256HMACSHA384HEX(AUTH_KEY, AUTH_IV).decrypt(encrypted) == PAYLOAD
+
+    from_fresh = AES256HMACSHA384HEX(AUTH_KEY, AUTH_IV).encrypt(PAYLOAD)
+    parsed = parse_callback_response(from_fresh, AUTH_KEY, AUTH_IV)
+    assert parsed['clientTxnId'] == '1704567890123456789'
+    assert parsed['status'] == 'SUCCESS'
+
+
+def test_context_reuse_does_not_leak_hmac_state():
+    context = crypto_context(AUTH_KEY, AUTH_IV)
+    messages = [context.encrypt(f"{PAYLOAD}&n={i}") for i in range(5)]
+    assert [context.decrypt(m) for m in messages] == [f"{PAYLOAD}&n={i}" for i in range(5)]
+
+
+def test_tampered_message_is_rejected():
+    encrypted = create_encrypted_request(PAYLOAD, AUTH_KEY, AUTH_IV)
+    tampered = encrypted[:-2] + ('00' if encrypted[-2:] != '00' else '11')
+    try:
+        parse_callback_response(tampered, AUTH_KEY, AUTH_IV)
+    except Exception as e:
+        assert 'HMAC validation failed' in str(e)
+    else:
+        raise AssertionError('tampered response was accepted')
+
+    try:
+        crypto_context(AUTH_KEY, AUTH_IV).decrypt(encrypted[:100])
+    except ValueError as e:
+        assert 'length' in str(e)
+    else:
+        raise AssertionError('truncated response was accepted')
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("SABPAISA CRYPTO TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Product search tests
+Hindi/English spelling variants fold to the same terms, prefixes and single
+typos still match, and listings enter or leave /api/search as soon as an
+admin approves or rejects them
+
+Usage:
+    python test_search.py
+    python -m pytest test_search.py
+"""
+from api import db
+from api.models import User, Product, Image
+from api.search import SearchIndex, tokenize, within_one_edit, NAME, SELLER, LOCATION
+from test_catalog import CatalogConfig
+from testing import login
+
+
+def make_index():
+    index = SearchIndex()
+    for key, title, seller, location in (
+        ('1', 'Turmeric finger for sale in Erode', 'Ravi Kumar', 'Erode, Tamil Nadu'),
+        ('2', 'हल्दी पाउडर', 'मीना', 'सांगली, महाराष्ट्र'),
+        ('3', 'Jeera for sale in Unjha', 'Patel Traders', 'Unjha, Gujarat'),
+        ('4', 'Teja chilli', 'Ravi', 'Guntur, Andhra Pradesh'),
+        ('5', 'Sharbati wheat', 'Mandi Traders', 'Karnal, Haryana'),
+    ):
+        index.add(key, [(title, NAME), (seller, SELLER), (location, LOCATION)], {'id': key})
+    return index
+
+
+def ids(index, query):
+    results, total = index.search(query)
+    assert total == len(results)
+    return [result['id'] for result in results]
+
+
+def test_tokenizer_folds_spelling_variants():
+    assert tokenize('Turmeric for sale in Erode') == ['turmeric', 'erode']
+    assert tokenize('jeera') == tokenize('jira') == tokenize('zeera') == tokenize('जीरा')
+    assert tokenize('haldi') == tokenize('Haldee') == tokenize('हल्दी')
+    assert tokenize('सरसों') == tokenize('sarson')
+    assert tokenize('shimla mirch') == tokenize('शिमला मिर्च')
+    assert within_one_edit('tumeric', 'turmeric') and within_one_edit('trumeric', 'turmeric')
+    assert not within_one_edit('wheat', 'meat')
+
+
+def test_exact_prefix_typo_and_synonym_matches():
+    index = make_index()
+
+    assert ids(index, 'turmeric') == ['1', '2']  # '2' through haldi -> turmeric
+    assert ids(index, 'haldi') == ['2', '1']
+    assert ids(index, 'tur') == ['1', '2']
+    assert ids(index, 'tumeric') == ['1', '2']
+    assert ids(index, 'cumin') == ['3']
+    assert ids(index, 'जीरा') == ['3']
+    assert ids(index, 'ravi') == ['1', '4']
+    assert ids(index, 'chilli guntur') == ['4']
+    assert ids(index, 'wheat gujarat') == []
+    assert ids(index, 'for sale in') == []
+
+
+def test_names_outrank_sellers_and_locations():
+    index = SearchIndex()
+    index.add('seller', [('Basmati rice', NAME), ('Erode Rice Mills', SELLER)], {'id': 'seller'})
+    index.add('name', [('Erode turmeric', NAME), ('Ravi', SELLER)], {'id': 'name'})
+    assert ids(index, 'erode') == ['name', 'seller']
+
+
+def test_documents_update_in_place():
+    index = make_index()
+
+    index.add('5', [('Lokwan wheat', NAME)], {'id': '5', 'title': 'Lokwan wheat'})
+    assert ids(index, 'sharbati') == []
+    assert index.search('lokwan')[0] == [{'id': '5', 'title': 'Lokwan wheat'}]
+
+    assert index.remove('4') and not index.remove('4')
+    assert ids(index, 'chilli') == []
+    assert 'teja' not in index.postings and 'teja' not in index.terms
+    assert len(index) == 4
+
+
+def make_search_app():
+    from api import create_app
+    app = create_app(CatalogConfig)
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        admin = User(name='Admin', email='admin@example.com', password='secret', role='admin')
+        trader = User(name='Sunil Agro', email='trader@example.com', password='secret', role='trader')
+        db.session.add_all([admin, trader])
+        db.session.flush()
+        listing = Product(name='Organic haldi', location='Nizamabad, Telangana', price=150, unit='Kg',
+                          status='Pending', user_id=trader.id)
+        db.session.add(listing)
+        db.session.flush()
+        db.session.add(Image(url='https://img/listing.webp', product_id=listing.id))
+        db.session.commit()
+        login(client, admin)
+        listing_id = listing.id
+    return app, client, listing_id
+
+
+def test_endpoint_searches_catalog_and_listings():
+    app, client, listing_id = make_search_app()
+
+    response = client.get('/api/search?q=turmric')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [(r['type'], r['id']) for r in body['results']] == [('catalog', '101'), ('catalog', '102')]
+    assert body['total'] == 2 and 'tookMs' in body
+
+    assert client.get('/api/search?q=ravi guntur').get_json()['results'][0]['id'] == '103'
+    assert client.get('/api/search?q=').status_code == 400
+    assert client.get('/api/search?q=wheat&limit=x').status_code == 400
+    assert len(client.get('/api/search?q=wheat&limit=3').get_json()['results']) == 3
+
+
+def test_admin_status_change_updates_index():
+    app, client, listing_id = make_search_app()
+
+    def listing_hits():
+        results = client.get('/api/search?q=haldi nizamabad').get_json()['results']
+        return [r for r in results if r['type'] == 'listing']
+
+    assert listing_hits() == []  # Pending listings are not searchable
+
+    client.put(f'/api/admin/products/{listing_id}/status', json={'status': 'Active'})
+    hits = listing_hits()
+    assert [(hit['id'], hit['seller'], hit['image']) for hit in hits] == \
+        [(listing_id, 'Sunil Agro', 'https://img/listing.webp')]
+
+    client.put(f'/api/admin/products/{listing_id}/status', json={'status': 'Rejected'})
+    assert listing_hits() == []
+
+
+def test_refresh_picks_up_changes_from_other_workers():
+    app, client, listing_id = make_search_app()
+    client.get('/api/search?q=haldi')  # Build the index
+
+    with app.app_context():
+        db.session.get(Product, listing_id).status = 'Active'  # e.g. approved through another worker
+        db.session.commit()
+        search = app.extensions['product_search']
+        search.refresh_listings()
+        assert search.index.payload(f'p:{listing_id}') is None  # Not due yet
+        search.refresh_listings(force=True)
+        assert search.index.payload(f'p:{listing_id}')['title'] == 'Organic haldi'
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("PRODUCT SEARCH TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Shipping charge tests
+Quotes match src/lib/shipping.ts to the rupee, lines over 10 tons are
+priced as several consignments, the batch form (NumPy or loop) matches single
+quotes, and approval/checkout totals are priced on the server instead of
+taken from the client
+
+Usage:
+    python test_shipping.py
+    python -m pytest test_shipping.py
+"""
+import math
+import random
+
+from api import db
+from api.models import User, Inquiry, Cart, CartItem, Order
+from api.shipping import (
+    ShippingError, quote_shipping, quote_consignments, quote_shipping_batch, rated_charge, rated_charge_batch,
+    convert_to_kg, NUMPY_MIN_BATCH,
+)
+from test_catalog import make_catalog_app
+from testing import make_app, login
+
+
+def test_quotes_match_frontend():
+    # Expected charges from calculateShippingCharge in src/lib/shipping.ts
+    assert quote_shipping(5, 'kg', 'Haryana', 'haryana ').charge == 50  # Minimum charge
+    assert quote_shipping(100, 'kg', 'Haryana', 'Punjab', 'fruits').charge == 209
+    assert quote_shipping(1, 'Quintal', 'Punjab', 'Punjab').charge == 74
+    assert quote_shipping(200, 'pieces', 'Haryana', 'Punjab').charge == 50
+    assert quote_shipping(2, 'ton', 'Haryana', 'Punjab').charge == 3340
+    assert quote_shipping(2000, 'kg', 'Kerala', 'Kerala', 'Vegetables').charge == 1838
+    assert quote_shipping(10000, 'kg', 'Goa', 'Assam', 'dry-fruits').charge == 20878
+
+    quote = quote_shipping(100, 'kg', 'Haryana', 'Punjab', 'fruits')
+    assert (quote.tier_multiplier, quote.is_intra_state, quote.is_perishable) == (0.85, False, True)
+    assert convert_to_kg(500, 'g') == 0.5 and convert_to_kg(3, 'crate') == 3
+
+    for args, message in (((0, 'kg', 'Goa', 'Goa'), 'greater than 0'),
+                          ((10.5, 'ton', 'Goa', 'Goa'), 'maximum limit'),
+                          ((10, 'kg', '', 'Goa'), 'Missing location')):
+        try:
+            quote_shipping(*args)
+            assert False, args
+        except ShippingError as e:
+            assert message in str(e)
+
+
+def test_heavy_lines_ship_as_consignments():
+    full = quote_shipping(10000, 'kg', 'Haryana', 'Punjab').charge
+    half = quote_shipping(500, 'kg', 'Haryana', 'Punjab').charge
+    assert quote_consignments(2000, 'Quintal', 'Haryana', 'Punjab') == 20 * full  # 200 tons
+    assert quote_consignments(10.5, 'ton', 'Haryana', 'Punjab') == full + half
+    assert quote_consignments(10.001, 'ton', 'Goa', 'Goa') == quote_shipping(10000, 'kg', 'Goa', 'Goa').charge + 50
+    assert quote_consignments(2, 'ton', 'Haryana', 'Punjab') == quote_shipping(2, 'ton', 'Haryana', 'Punjab').charge
+    for args in ((0, 'kg', 'Goa', 'Goa'), (12, 'ton', '', 'Goa')):
+        try:
+            quote_consignments(*args)
+            assert False, args
+        except ShippingError:
+            pass
+
+
+def test_batch_matches_single_quotes():
+    rng = random.Random(3)
+    count = NUMPY_MIN_BATCH * 20
+    weights = [rng.choice([0, -2, rng.uniform(0, 120), rng.uniform(0, 12000), rng.randint(1, 40) * 0.5])
+               for _ in range(count)]
+    units = [rng.choice(['kg', 'Kg ', 'pieces', 'g', 'Quintal', 'ton', 'box']) for _ in range(count)]
+    from_states = [rng.choice(['Haryana', 'haryana ', 'Punjab', '']) for _ in range(count)]
+    to_states = [rng.choice(['Haryana', 'Punjab', 'Kerala']) for _ in range(count)]
+    categories = [rng.choice(['spices', 'fruits', 'Vegetables', '']) for _ in range(count)]
+
+    def single(i, split):
+        try:
+            if split:
+                return quote_consignments(weights[i], units[i], from_states[i], to_states[i], categories[i])
+            return quote_shipping(weights[i], units[i], from_states[i], to_states[i], categories[i]).charge
+        except ShippingError:
+            return math.nan
+
+    for split in (False, True):
+        for size in (count, NUMPY_MIN_BATCH - 1):  # Vectorized (if NumPy is installed) and loop paths
+            charges = quote_shipping_batch(weights[:size], units[:size], from_states[:size], to_states[:size],
+                                           categories[:size], split=split)
+            for i in range(size):
+                expected = single(i, split)
+                assert charges[i] == expected or (math.isnan(charges[i]) and math.isnan(expected)), (split, i)
+
+    rates = [rng.uniform(0.5, 4) for _ in range(count)]
+    quantities = [rng.uniform(1, 500) for _ in range(count)]
+    assert list(rated_charge_batch(quantities, units, rates)) == \
+        [rated_charge(quantity, unit, rate) for quantity, unit, rate in zip(quantities, units, rates)]
+
+
+def test_approval_ignores_client_totals():
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        seller = User(name='Seller', email='seller@example.com', password='secret', role='trader')
+        buyer = User(name='Buyer', email='buyer@example.com', password='secret')
+        db.session.add_all([seller, buyer])
+        db.session.flush()
+        inquiry = Inquiry(
+            product_id=1, product_name='Basmati Rice', seller_id=seller.id, seller_name='Seller',
+            buyer_id=buyer.id, buyer_name='Buyer', quantity=25, unit='Quintal', estimated_price=75000,
+            price_per_unit=3000, address_line_1='Shop 4', city='Karnal', state='Haryana', pincode='132001',
+            mobile='9876543210',
+        )
+        db.session.add(inquiry)
+        db.session.commit()
+        login(client, seller)
+        inquiry_id = inquiry.id
+
+    response = client.post(f'/api/inquiries/{inquiry_id}/approve',
+                           json={'shippingRatePerKg': 1.5, 'shippingCharge': 1, 'finalTotal': 1})
+    assert response.status_code == 200
+    approved = response.get_json()['inquiry']
+    assert (approved['shippingCharge'], approved['finalTotal']) == (3750, 78750)
+
+
+def test_checkout_charges_shipping_from_listing_state():
+    app, client = make_catalog_app()
+    for product_id, quantity in (('101', 3000), ('103', 4000)):  # Erode, Tamil Nadu / Guntur, Andhra Pradesh
+        product = client.get(f'/api/catalog/{product_id}').get_json()
+        client.post('/api/cart/add', json={
+            'productId': product_id, 'productName': product['title'], 'pricePerUnit': product['price'],
+            'unit': product['unit'], 'quantity': quantity, 'location': product['location'],
+        })
+
+    # The cart shows the quote the checkout then charges
+    assert client.get('/api/cart/quote').status_code == 400  # No delivery state
+    quote = client.get('/api/cart/quote?state=Tamil Nadu').get_json()['quote']
+
+    checkout = {'paymentOption': 'Online', 'buyerName': 'Ravi', 'mobile': '9876543210', 'pincode': '600001',
+                'addressLine1': 'Koyambedu', 'city': 'Chennai', 'state': 'Tamil Nadu', 'gateway': 'payu'}
+    response = client.post('/api/initiate-cart-payment', json=checkout)
+    assert response.status_code == 200, response.get_json()
+
+    intra = quote_shipping(3000, 'Kg', 'Tamil Nadu', 'Tamil Nadu', 'spices').charge
+    inter = quote_shipping(4000, 'Kg', 'Andhra Pradesh', 'Tamil Nadu', 'spices').charge
+    assert response.get_json()['amount'] == f"{3000 * 180 + 4000 * 220 + intra + inter:.2f}"
+    assert [(item['fromState'], item['shippingCharge']) for item in quote['items']] == \
+        [('Tamil Nadu', intra), ('Andhra Pradesh', inter)]
+    assert (quote['shippingTotal'], f"{quote['totalAmount']:.2f}") == (intra + inter, response.get_json()['amount'])
+    with app.app_context():
+        assert sorted(order.amount_paid - order.total_price for order in Order.query.all()) == \
+            sorted([intra, inter])
+
+
+def test_checkout_prices_bulk_items_as_consignments():
+    """A 2000-quintal (200 ton) line, the listing minimum, is over the 10 ton consignment cap"""
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        user = User(name='Ravi', email='ravi@example.com', password='secret')
+        db.session.add(user)
+        db.session.flush()
+        cart = Cart(user_id=user.id)
+        db.session.add(cart)
+        db.session.flush()
+        db.session.add(CartItem(cart_id=cart.id, product_id='P1', product_name='Wheat', price_per_unit=2500,
+                                unit='Quintal', quantity=2000, location='Karnal, Haryana'))
+        db.session.commit()
+        login(client, user)
+
+    shipping = quote_consignments(2000, 'Quintal', 'Haryana', 'Punjab')
+    quote = client.get('/api/cart/quote?state=Punjab')
+    assert quote.status_code == 200 and quote.get_json()['quote']['shippingTotal'] == shipping
+
+    response = client.post('/api/initiate-cart-payment', json={
+        'paymentOption': 'Online', 'buyerName': 'Ravi', 'mobile': '9876543210', 'pincode': '141001',
+        'addressLine1': 'Shop 4', 'city': 'Ludhiana', 'state': 'Punjab', 'gateway': 'payu',
+    })
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['amount'] == f"{2000 * 2500 + shipping:.2f}"
+    with app.app_context():
+        order = Order.query.one()
+        assert order.amount_paid - order.total_price == shipping
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("SHIPPING TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
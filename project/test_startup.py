@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Startup tests for fast-boot mode
+create_app must not touch the schema or import the blueprints/crypto stack;
+the first request registers the routes and records cold-start timings
+
+Usage:
+    python test_startup.py
+    python -m pytest test_startup.py
+"""
+import os
+import subprocess
+import sys
+
+from sqlalchemy import inspect
+
+from api import BLUEPRINTS, create_app, db
+from testing import TestConfig
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class DefaultBootConfig(TestConfig):
+    FAST_BOOT = False
+
+
+def test_fast_boot_skips_schema_work():
+    app = create_app(TestConfig)
+    with app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+
+
+def test_fast_boot_defers_blueprint_and_crypto_imports():
+    script = (
+        "import sys\n"
+        "from testing import TestConfig\n"
+        "from api import create_app\n"
+        "create_app(TestConfig)\n"
+        "print(','.join(m for m in ('api.payments', 'api.admin', 'api.sabpaisa_utils', "
+        "'api.airpay_utils', 'Crypto.Cipher', 'requests') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '', result.stdout
+
+
+def test_first_request_registers_blueprints_and_records_cold_start():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    assert 'auth' not in app.blueprints
+    assert app.extensions['cold_start']['first_request_ms'] is None
+
+    response = app.test_client().get('/api/cart/count')
+
+    assert response.status_code == 401  # Routed to the cart blueprint, login required
+    assert set(app.blueprints) == {attribute[:-len('_bp')] for _, attribute, _ in BLUEPRINTS}
+    stats = app.extensions['cold_start']
+    assert stats['first_request_path'] == '/api/cart/count'
+    assert stats['first_request_ms'] is not None
+    assert stats['import_to_first_response_ms'] >= stats['import_to_ready_ms']
+
+
+def test_fast_boot_is_opt_in():
+    env = {key: value for key, value in os.environ.items() if key != 'FAST_BOOT'}
+    result = subprocess.run([sys.executable, '-c', 'from config import Config; print(Config.FAST_BOOT)'],
+                            cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
+
+
+def test_default_boot_creates_tables_and_registers_eagerly():
+    app = create_app(DefaultBootConfig)
+    with app.app_context():
+        assert 'users' in inspect(db.engine).get_table_names()
+    assert 'payments' in app.blueprints
+
+
+def test_init_db_command_creates_tables():
+    app = create_app(TestConfig)
+    result = app.test_cli_runner().invoke(args=['init-db'])
+
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert {'users', 'orders', 'carts'} <= set(inspect(db.engine).get_table_names())
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("FAST BOOT STARTUP TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
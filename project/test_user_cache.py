@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Session user cache tests
+The Flask-Login loader serves repeat requests without querying users,
+subscription and role changes committed through the ORM invalidate the
+entry (a rollback does not), a backend shared by two workers sees the
+other's invalidation, and the hit rate is reported to admins
+
+Usage:
+    python test_user_cache.py
+    python -m pytest test_user_cache.py
+"""
+import os
+import tempfile
+
+from api import create_app, db
+from api.models import User
+from api.user_cache import UserCache, LocalUserBackend
+from test_metrics import make_admin_client, parse_samples
+from testing import TestConfig, make_app, login, count_queries
+
+
+def make_user_client(app, role='buyer'):
+    client = app.test_client()
+    with app.app_context():
+        user = User(name='Ravi', email='ravi@example.com', password='secret', role=role)
+        db.session.add(user)
+        db.session.commit()
+        login(client, user)
+        return client, user.id
+
+
+def user_selects(counter):
+    return [s for s in counter.statements if s.lstrip().upper().startswith('SELECT USERS.')]
+
+
+def test_repeat_requests_do_not_query_the_user():
+    app = make_app()
+    client, user_id = make_user_client(app)
+    cache = app.extensions['user_cache']
+    with app.app_context():
+        engine = db.engine
+
+    with count_queries(engine, ignore_users=False) as first:
+        client.get('/api/auth/status')
+    with count_queries(engine, ignore_users=False) as second:
+        response = client.get('/api/auth/status')
+    assert len(user_selects(first)) == 1 and second.statements == []
+    assert response.get_json()['user'] == {
+        'id': user_id, 'name': 'Ravi', 'email': 'ravi@example.com', 'role': 'buyer', 'hasSubscription': False,
+        'subscriptionExpiry': None, 'createdAt': response.get_json()['user']['createdAt'],
+    }
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_subscription_update_invalidates_the_entry():
+    app = make_app()
+    client, user_id = make_user_client(app)
+    cache = app.extensions['user_cache']
+    with app.app_context():
+        engine = db.engine
+    client.get('/api/auth/status')
+
+    with count_queries(engine, ignore_users=False) as counter:
+        response = client.post('/api/auth/update-subscription', json={
+            'txnid': 'txn-1', 'mihpayid': 'pay-1', 'amount': '199.00', 'subscriptionExpiry': '2027-01-31T00:00:00Z'})
+    assert response.status_code == 200
+    # Cached user attached without a SELECT; the UPDATE writes only the subscription columns
+    update = [s for s in counter.statements if s.lstrip().upper().startswith('UPDATE USERS')]
+    assert len(update) == 1 and 'password' not in update[0] and 'role' not in update[0]
+    assert cache.stats()['invalidations'] == 1
+
+    user = client.get('/api/auth/status').get_json()['user']
+    assert user['hasSubscription'] is True and user['subscriptionExpiry'].startswith('2027-01-31')
+    assert client.get('/api/auth/status').get_json()['user']['hasSubscription'] is True  # Re-cached
+
+
+def test_role_change_through_the_orm_invalidates_and_rollback_does_not():
+    app = make_app()
+    client, user_id = make_user_client(app)
+    cache = app.extensions['user_cache']
+    assert client.get('/api/admin/metrics').status_code == 403
+
+    with app.app_context():
+        db.session.get(User, user_id).role = 'admin'
+        db.session.rollback()
+    assert cache.stats()['invalidations'] == 0
+    assert client.get('/api/admin/metrics').status_code == 403
+
+    with app.app_context():
+        db.session.get(User, user_id).role = 'admin'
+        db.session.commit()
+    assert cache.stats()['invalidations'] == 1
+    assert client.get('/api/admin/metrics').status_code == 200
+
+
+def test_shared_backend_sees_other_workers_invalidation():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+
+    class SharedDatabaseConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    try:
+        shared = LocalUserBackend(ttl=60)  # Stands in for the Redis backend
+        workers = [create_app(SharedDatabaseConfig) for _ in range(2)]
+        with workers[0].app_context():
+            db.create_all()
+        for app in workers:
+            app.extensions['user_cache'] = UserCache(shared)
+
+        client, user_id = make_user_client(workers[0])
+        other = workers[1].test_client()
+        with other.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        assert other.get('/api/auth/status').get_json()['user']['role'] == 'buyer'
+
+        with workers[0].app_context():
+            db.session.get(User, user_id).role = 'trader'
+            db.session.commit()
+        assert other.get('/api/auth/status').get_json()['user']['role'] == 'trader'
+        assert workers[1].extensions['user_cache'].stats()['misses'] == 2
+    finally:
+        for app in workers:
+            with app.app_context():
+                db.engine.dispose()
+        os.remove(path)
+
+
+def test_hit_rate_is_reported_to_admins():
+    app = make_app()
+    client, _ = make_user_client(app)
+    for _ in range(3):
+        client.get('/api/auth/status')
+    admin = make_admin_client(app)
+
+    stats = admin.get('/api/admin/user-cache').get_json()
+    assert stats['enabled'] and stats['backend'] == 'local'
+    assert stats['hits'] == 2 and stats['misses'] == 2 and stats['hitRate'] == 0.5  # Ravi 1+2, admin 1+0
+
+    samples = parse_samples(admin.get('/api/admin/metrics').get_data(as_text=True))
+    assert samples['mandi_user_cache_events_total{event="hits"}'] == 3
+    assert samples['mandi_user_cache_entries'] == 2
+
+
+def test_disabled_cache_queries_every_time():
+    class NoCacheConfig(TestConfig):
+        USER_CACHE_TTL = 0
+
+    app = create_app(NoCacheConfig)
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+    client, _ = make_user_client(app)
+    assert app.extensions['user_cache'] is None
+    client.get('/api/auth/status')
+    with count_queries(engine, ignore_users=False) as counter:
+        assert client.get('/api/auth/status').get_json()['logged_in'] is True
+    assert len(user_selects(counter)) == 1
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+
+    print("=" * 60)
+    print("USER CACHE TESTS")
+    print("=" * 60)
+
+    all_passed = True
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS | {test.__name__}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ FAIL | {test.__name__} {e}")
+
+    print("=" * 60)
+    print("✓ ALL TESTS PASSED!" if all_passed else "✗ SOME TESTS FAILED!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
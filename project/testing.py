@@ -0,0 +1,74 @@
+"""
+Shared helpers for the local test scripts
+Builds the app against an in-memory SQLite database instead of the
+PythonAnywhere Postgres instance, and counts the SQL each request issues
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from config import Config
+
+
+class TestConfig(Config):
+    __test__ = False  # Not a pytest test class
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SESSION_COOKIE_SECURE = False
+    # Cheapest bcrypt cost so creating test users stays fast
+    BCRYPT_LOG_ROUNDS = 4
+    # Tests create their own schema; skip create_all() and import blueprints on first request
+    FAST_BOOT = True
+    # Free-form cart product ids; tests that need the catalog point this at a file
+    COMMODITY_CATALOG_PATH = None
+    COMMODITY_CATALOG_SNAPSHOT = None
+
+
+def make_app():
+    """Create the app with TestConfig and an empty schema"""
+    from api import create_app, db
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def login(client, user):
+    """Log a user into the test client's session without a password round trip"""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+
+
+class QueryCounter:
+    """Records every SQL statement sent to the engine while active"""
+
+    def __init__(self, engine, ignore_users=True):
+        self.engine = engine
+        # The per-request session user lookup belongs to the auth layer, not the endpoint
+        self.ignore_users = ignore_users
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.ignore_users and statement.lstrip().upper().startswith('SELECT USERS.'):
+            return
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+
+@contextmanager
+def count_queries(engine, ignore_users=True):
+    counter = QueryCounter(engine, ignore_users=ignore_users)
+    with counter:
+        yield counter
@@ -3,12 +3,13 @@
 import { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
 import { useAuth } from '@/hooks/use-auth';
-import { useCart } from '@/contexts/CartContext';
+import { useCart, type CartQuote } from '@/contexts/CartContext';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardDescription, CardFooter, CardHeader, CardTitle } from '@/components/ui/card';
 import { Separator } from '@/components/ui/separator';
 import { Badge } from '@/components/ui/badge';
-import { Trash2, Plus, Minus, ShoppingCart, ArrowRight, Package } from 'lucide-react';
+import { Input } from '@/components/ui/input';
+import { Trash2, Plus, Minus, ShoppingCart, ArrowRight, Package, Truck } from 'lucide-react';
 import { useToast } from '@/hooks/use-toast';
 import Link from 'next/link';
 import Image from 'next/image';
@@ -16,9 +17,12 @@ import Image from 'next/image';
 export default function CartPage() {
   const router = useRouter();
   const { isAuthenticated, loading: authLoading } = useAuth();
-  const { cart, loading, updateCartItem, removeFromCart, fetchCart } = useCart();
+  const { cart, loading, updateCartItem, removeFromCart, fetchCart, quoteCart } = useCart();
   const { toast } = useToast();
   const [updatingItems, setUpdatingItems] = useState<Set<number>>(new Set());
+  const [deliveryState, setDeliveryState] = useState('');
+  const [quote, setQuote] = useState<CartQuote | null>(null);
+  const [quoting, setQuoting] = useState(false);
 
   useEffect(() => {
     if (!authLoading && !isAuthenticated) {
@@ -32,6 +36,30 @@ export default function CartPage() {
     }
   }, [isAuthenticated, fetchCart]);
 
+  // A quote is for the cart as it was; quantities or items changed since need a new one
+  useEffect(() => {
+    setQuote(null);
+  }, [cart]);
+
+  const handleQuoteShipping = async () => {
+    if (!deliveryState.trim()) return;
+
+    setQuoting(true);
+    const result = await quoteCart(deliveryState.trim());
+    setQuoting(false);
+
+    if (result.success && result.quote) {
+      setQuote(result.quote);
+    } else {
+      setQuote(null);
+      toast({
+        title: 'Shipping unavailable',
+        description: result.message,
+        variant: 'destructive',
+      });
+    }
+  };
+
   const handleUpdateQuantity = async (itemId: number, currentQuantity: number, change: number) => {
     const newQuantity = currentQuantity + change;
     if (newQuantity < 1) return;
@@ -236,10 +264,39 @@ export default function CartPage() {
                     <span className="text-muted-foreground">Items</span>
                     <span>{cart.totalItems}</span>
                   </div>
+                  <div className="flex justify-between text-sm">
+                    <span className="text-muted-foreground">
+                      Shipping{quote ? ` to ${quote.state}` : ''}
+                    </span>
+                    <span>
+                      {quote ? `₹${quote.shippingTotal.toLocaleString('en-IN')}` : 'Enter delivery state'}
+                    </span>
+                  </div>
                   <Separator />
                   <div className="flex justify-between font-bold text-lg">
                     <span>Total</span>
-                    <span>₹{totalAmount.toLocaleString('en-IN')}</span>
+                    <span>₹{(quote ? quote.totalAmount : totalAmount).toLocaleString('en-IN')}</span>
+                  </div>
+                </div>
+                <div className="space-y-2">
+                  <p className="text-sm text-muted-foreground flex items-center gap-1">
+                    <Truck className="h-4 w-4" />
+                    Shipping is charged per item, from the seller&apos;s state to yours
+                  </p>
+                  <div className="flex gap-2">
+                    <Input
+                      placeholder="Delivery state, e.g. Tamil Nadu"
+                      value={deliveryState}
+                      onChange={(e) => setDeliveryState(e.target.value)}
+                      onKeyDown={(e) => e.key === 'Enter' && handleQuoteShipping()}
+                    />
+                    <Button
+                      variant="outline"
+                      onClick={handleQuoteShipping}
+                      disabled={quoting || !deliveryState.trim()}
+                    >
+                      {quoting ? 'Calculating...' : 'Calculate'}
+                    </Button>
                   </div>
                 </div>
               </CardContent>
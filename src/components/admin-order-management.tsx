@@ -29,14 +29,26 @@ export function AdminOrderManagement() {
   const [error, setError] = useState<string | null>(null);
   const { toast } = useToast();
   const [statusFilter, setStatusFilter] = useState('All');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
-  const fetchOrders = async (filter = 'All') => {
-    setIsLoading(true);
+  // Orders are served one keyset page at a time; pass the previous page's cursor to append the next one
+  const fetchOrders = async (filter = 'All', cursor: string | null = null) => {
+    if (cursor) {
+      setIsLoadingMore(true);
+    } else {
+      setIsLoading(true);
+    }
     setError(null);
-    let url = 'https://www.mandi.ramhotravels.com/api/admin/orders';
+    const params = new URLSearchParams();
     if (filter !== 'All') {
-        url += `?status=${filter}`;
+        params.set('status', filter);
+    }
+    if (cursor) {
+        params.set('cursor', cursor);
     }
+    const query = params.toString();
+    const url = `https://www.mandi.ramhotravels.com/api/admin/orders${query ? `?${query}` : ''}`;
 
     try {
       const response = await fetch(url, {
@@ -46,11 +58,13 @@ export function AdminOrderManagement() {
         throw new Error('Failed to fetch orders. You may not have access.');
       }
       const data = await response.json();
-      setOrders(data);
+      setOrders(prev => (cursor ? [...prev, ...data.orders] : data.orders));
+      setNextCursor(data.nextCursor);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An unknown error occurred.');
     } finally {
       setIsLoading(false);
+      setIsLoadingMore(false);
     }
   };
 
@@ -220,6 +234,13 @@ export function AdminOrderManagement() {
                 ))}
               </TableBody>
             </Table>
+            {nextCursor && (
+              <div className="flex justify-center pt-4">
+                <Button variant="outline" onClick={() => fetchOrders(statusFilter, nextCursor)} disabled={isLoadingMore}>
+                  {isLoadingMore ? 'Loading...' : 'Load more'}
+                </Button>
+              </div>
+            )}
           </div>
         ) : (
           <div className="text-center py-10">
@@ -29,6 +29,23 @@ interface Cart {
   updatedOn: string;
 }
 
+interface CartQuoteItem {
+  id: number;
+  productName: string;
+  subtotal: number;
+  fromState: string;
+  shippingCharge: number;
+}
+
+// Shipping priced by the server (/api/cart/quote); checkout charges totalAmount
+export interface CartQuote {
+  state: string;
+  items: CartQuoteItem[];
+  subtotal: number;
+  shippingTotal: number;
+  totalAmount: number;
+}
+
 interface CartContextType {
   cart: Cart | null;
   loading: boolean;
@@ -48,6 +65,7 @@ interface CartContextType {
   updateCartItem: (itemId: number, quantity: number) => Promise<{ success: boolean; message: string }>;
   removeFromCart: (itemId: number) => Promise<{ success: boolean; message: string }>;
   clearCart: () => Promise<{ success: boolean; message: string }>;
+  quoteCart: (state: string) => Promise<{ success: boolean; message: string; quote?: CartQuote }>;
 }
 
 const CartContext = createContext<CartContextType | undefined>(undefined);
@@ -203,6 +221,29 @@ export function CartProvider({ children }: { children: React.ReactNode }) {
     }
   }, []);
 
+  const quoteCart = useCallback(async (state: string): Promise<{ success: boolean; message: string; quote?: CartQuote }> => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/cart/quote?state=${encodeURIComponent(state)}`, {
+        method: 'GET',
+        credentials: 'include',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      });
+
+      const data = await response.json();
+
+      if (data.success) {
+        return { success: true, message: '', quote: data.quote };
+      } else {
+        return { success: false, message: data.message || 'Failed to calculate shipping' };
+      }
+    } catch (err) {
+      console.error('Error quoting cart:', err);
+      return { success: false, message: 'Network error while calculating shipping' };
+    }
+  }, []);
+
   // Fetch cart on mount
   useEffect(() => {
     fetchCart();
@@ -220,6 +261,7 @@ export function CartProvider({ children }: { children: React.ReactNode }) {
         updateCartItem,
         removeFromCart,
         clearCart,
+        quoteCart,
       }}
     >
       {children}